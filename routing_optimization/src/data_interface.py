@@ -106,40 +106,37 @@ def prepare_vrp_input(
         'vehicle_capacity': vehicle_capacity
     }
     
-    # Add stores
-    for idx, row in df.iterrows():
-        base_demand = float(row.get(config.PREDICTED_DEMAND_COL, row['demand']))
-
-        store = {
-            'id': int(row['store_id']),
-            'demand': base_demand,
-            'time_window': (
-                int(row['time_window_start']),
-                int(row['time_window_end'])
-            )
-        }
-        
-        # Add coordinates if available
-        if 'lat' in df.columns and 'lon' in df.columns:
-            store['lat'] = float(row['lat'])
-            store['lon'] = float(row['lon'])
-
-        # Optional predictive fields
-        quantiles = config.DEMAND_QUANTILE_COLS
-        if quantiles['low'] in df.columns and not pd.isnull(row.get(quantiles['low'], None)):
-            store[quantiles['low']] = float(row[quantiles['low']])
-        if quantiles['mid'] in df.columns and not pd.isnull(row.get(quantiles['mid'], None)):
-            store[quantiles['mid']] = float(row[quantiles['mid']])
-        if quantiles['high'] in df.columns and not pd.isnull(row.get(quantiles['high'], None)):
-            store[quantiles['high']] = float(row[quantiles['high']])
-
-        if config.LEARNING_FEATURE_COL in df.columns and not pd.isnull(row.get(config.LEARNING_FEATURE_COL, None)):
-            store[config.LEARNING_FEATURE_COL] = float(row[config.LEARNING_FEATURE_COL])
-
-        if config.PREDICTED_DEMAND_COL in df.columns and not pd.isnull(row.get(config.PREDICTED_DEMAND_COL, None)):
-            store[config.PREDICTED_DEMAND_COL] = float(row[config.PREDICTED_DEMAND_COL])
-        
-        vrp_input['stores'].append(store)
+    # Add stores: convert whole columns once, then zip plain Python values into dicts
+    demand_col = config.PREDICTED_DEMAND_COL if config.PREDICTED_DEMAND_COL in df.columns else 'demand'
+    stores = [
+        {'id': store_id, 'demand': demand, 'time_window': (tw_start, tw_end)}
+        for store_id, demand, tw_start, tw_end in zip(
+            df['store_id'].astype(int).tolist(),
+            df[demand_col].astype(float).tolist(),
+            df['time_window_start'].astype(int).tolist(),
+            df['time_window_end'].astype(int).tolist(),
+        )
+    ]
+
+    # Add coordinates if available
+    if 'lat' in df.columns and 'lon' in df.columns:
+        for store, lat, lon in zip(stores, df['lat'].astype(float).tolist(), df['lon'].astype(float).tolist()):
+            store['lat'] = lat
+            store['lon'] = lon
+
+    # Optional predictive fields, only where the value is present
+    quantiles = config.DEMAND_QUANTILE_COLS
+    optional_cols = [quantiles['low'], quantiles['mid'], quantiles['high'],
+                     config.LEARNING_FEATURE_COL, config.PREDICTED_DEMAND_COL]
+    for col in optional_cols:
+        if col not in df.columns:
+            continue
+        values = df[col].astype(float)
+        for store, value, present in zip(stores, values.tolist(), values.notna().tolist()):
+            if present:
+                store[col] = value
+
+    vrp_input['stores'] = stores
     
     # Add vehicles
     for i in range(num_vehicles):
@@ -184,11 +181,14 @@ def validate_input_data(vrp_input: Dict) -> Tuple[bool, str]:
     return True, "Input data is valid"
 
 
+def _normalize_name(col) -> str:
+    return re.sub(r"\s+", " ", str(col)).strip().lower()
+
+
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     renamed = {}
     for col in df.columns:
-        new_col = re.sub(r"\s+", " ", str(col)).strip().lower()
-        renamed[col] = new_col
+        renamed[col] = _normalize_name(col)
     return df.rename(columns=renamed)
 
 
@@ -218,12 +218,53 @@ def _stable_store_coords(store_code: int) -> Tuple[float, float]:
     return center_lat + lat_off, center_lon + lon_off
 
 
+def _aggregate_zip_orders_by_day(
+    zf: zipfile.ZipFile,
+    order_file: str,
+    demand_col: str,
+    target_ts: pd.Timestamp = None,
+    chunksize: int = 200_000,
+) -> pd.Series:
+    """
+    Stream the zipped order detail CSV in chunks and sum demand per (day, store).
+    按块读取压缩包内订单明细，只取3列并在块内按目标日期过滤，逐块聚合，峰值内存与文件大小无关。
+
+    Returns:
+        Series indexed by (dt, fulfillment_store_code) with summed demand.
+    """
+    with zf.open(order_file) as f:
+        header = pd.read_csv(f, nrows=0).columns
+    source_cols = {_normalize_name(col): col for col in header}
+
+    if 'dt' not in source_cols or 'fulfillment_store_code' not in source_cols:
+        raise ValueError('DFI order detail file missing required columns: dt, fulfillment_store_code')
+    if demand_col not in source_cols:
+        raise ValueError(f"DFI order detail file missing demand column: {demand_col}")
+
+    usecols = [source_cols['dt'], source_cols['fulfillment_store_code'], source_cols[demand_col]]
+    partials = []
+    with zf.open(order_file) as f:
+        for chunk in pd.read_csv(f, usecols=usecols, dtype={source_cols['dt']: str}, chunksize=chunksize):
+            chunk = _normalize_columns(chunk)
+            chunk['dt'] = pd.to_datetime(chunk['dt'], errors='coerce').dt.normalize()
+            chunk = chunk.dropna(subset=['dt'])
+            if target_ts is not None:
+                chunk = chunk[chunk['dt'] == target_ts]
+            if not chunk.empty:
+                partials.append(chunk.groupby(['dt', 'fulfillment_store_code'])[demand_col].sum())
+
+    if not partials:
+        return pd.Series(dtype=float)
+    return pd.concat(partials).groupby(level=[0, 1]).sum()
+
+
 def load_dfi_zip_as_forecast_data(
     zip_path: str,
     target_date: str = None,
     top_n_stores: int = 25,
     demand_col: str = 'total_quantity_cnt',
     default_time_window: Tuple[int, int] = (8 * 60, 21 * 60),
+    chunksize: int = 200_000,
 ) -> pd.DataFrame:
     """
     Convert DFI zip dataset to forecast dataframe compatible with VRP pipeline.
@@ -234,6 +275,7 @@ def load_dfi_zip_as_forecast_data(
         top_n_stores: Keep top N stores by aggregated demand.
         demand_col: Demand aggregation column in order detail table.
         default_time_window: Fallback time window if store business hours unavailable.
+        chunksize: Rows per chunk when streaming the order detail CSV.
 
     Returns:
         DataFrame ready for prepare_vrp_input.
@@ -242,36 +284,28 @@ def load_dfi_zip_as_forecast_data(
         order_file = [n for n in zf.namelist() if 'case_study_order_detail' in n][0]
         store_file = [n for n in zf.namelist() if 'dim_store' in n][0]
 
-        with zf.open(order_file) as f:
-            orders = pd.read_csv(f)
+        # 指定日期时在块内下推过滤；未指定时按日聚合后取最新一天
+        target_ts = pd.to_datetime(target_date).normalize() if target_date is not None else None
+        daily = _aggregate_zip_orders_by_day(zf, order_file, demand_col, target_ts, chunksize)
+
         with zf.open(store_file) as f:
             stores = pd.read_csv(f)
 
-    orders = _normalize_columns(orders)
     stores = _normalize_columns(stores)
 
-    if 'dt' not in orders.columns or 'fulfillment_store_code' not in orders.columns:
-        raise ValueError('DFI order detail file missing required columns: dt, fulfillment_store_code')
-    if demand_col not in orders.columns:
-        raise ValueError(f"DFI order detail file missing demand column: {demand_col}")
-
-    orders['dt'] = pd.to_datetime(orders['dt'], errors='coerce')
-    orders = orders.dropna(subset=['dt'])
-
-    if target_date is None:
-        target_ts = orders['dt'].max().normalize()
-    else:
-        target_ts = pd.to_datetime(target_date).normalize()
+    if target_ts is None:
+        if daily.empty:
+            raise ValueError('No dated records found in DFI order detail file')
+        target_ts = daily.index.get_level_values('dt').max()
 
-    day_orders = orders[orders['dt'].dt.normalize() == target_ts].copy()
-    if day_orders.empty:
+    if daily.empty or target_ts not in daily.index.get_level_values('dt'):
         raise ValueError(f'No records found in DFI data for date: {target_ts.date()}')
 
     agg = (
-        day_orders
-        .groupby('fulfillment_store_code', as_index=False)[demand_col]
-        .sum()
-        .rename(columns={'fulfillment_store_code': 'store_id', demand_col: 'demand'})
+        daily.xs(target_ts, level='dt')
+        .rename('demand')
+        .rename_axis('store_id')
+        .reset_index()
     )
     agg = agg.sort_values('demand', ascending=False).head(top_n_stores)
 
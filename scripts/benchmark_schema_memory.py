@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure per-instance memory of the slotted schema dataclasses against plain dataclasses
+Usage: python scripts/benchmark_schema_memory.py [--count 200000]
+"""
+
+import argparse
+import sys
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.data_schema import (
+    OrderItem, OrderDetail, OrderDetailSchema, FulfillmentDetailSchema,
+    RouteStopSchema, StoreLocation, orders_from_frame
+)
+
+
+def plain_variant(cls):
+    """Same fields as a regular (dict-backed) dataclass"""
+    return make_dataclass(f"Plain{cls.__name__}", [(f.name, f.type, f) for f in fields(cls)])
+
+
+def measure(build, count):
+    """Traced bytes held by `count` objects returned from build"""
+    tracemalloc.start()
+    objects = build(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current / count
+
+
+def sample_args(count):
+    """Realistic repeated values: 400 stores, 2,000 SKUs, 90 days"""
+    start = datetime(2025, 1, 1, 9)
+    return {
+        OrderItem: lambda i: (f"SKU{i % 2000:05d}", f"Product {i % 2000}", i % 5 + 1),
+        OrderDetail: lambda i: (f"O{i}", f"U{i % 5000}", str(i % 400), date(2025, 1, 1) + timedelta(days=i % 90),
+                                [], i % 9 + 1, i % 4 + 1),
+        OrderDetailSchema: lambda i: (date(2025, 1, 1) + timedelta(days=i % 90), f"O{i}", f"U{i % 5000}",
+                                      i % 400, i % 4 + 1, float(i % 9 + 1)),
+        FulfillmentDetailSchema: lambda i: (f"O{i}", start + timedelta(minutes=i), start + timedelta(minutes=i + 30)),
+        RouteStopSchema: lambda i: (i % 20, i % 400, 22.3 + i % 100 / 1000, 114.1 + i % 100 / 1000),
+        StoreLocation: lambda i: (str(i % 400), 22.3, 114.1, "Sha Tin", f"Shop {i % 400}", "success"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema dataclass memory benchmark")
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"🧮 Bytes per instance ({args.count:,} instances, values included)")
+    print(f"{'schema':<26}{'plain':>10}{'slotted':>10}{'saving':>9}")
+    for cls, make in sample_args(args.count).items():
+        plain = plain_variant(cls)
+        plain_bytes = measure(lambda n: [plain(*make(i)) for i in range(n)], args.count)
+        slotted_bytes = measure(lambda n: [cls(*make(i)) for i in range(n)], args.count)
+        print(f"{cls.__name__:<26}{plain_bytes:>10.0f}{slotted_bytes:>10.0f}{1 - slotted_bytes / plain_bytes:>9.0%}")
+
+    rng = np.random.default_rng(0)
+    n = args.count
+    frame = pd.DataFrame({
+        'dt': (pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 90, n), 'D')).strftime('%Y-%m-%d'),
+        'order_id': [f"O{i}" for i in range(n)],
+        'user_id': [f"U{i}" for i in rng.integers(0, 5000, n)],
+        'fulfillment_store_code': rng.integers(1, 400, n),
+        'unique_sku_cnt': rng.integers(1, 6, n),
+        'total_quantity_cnt': rng.integers(1, 10, n).astype(float),
+    })
+    plain = plain_variant(OrderDetailSchema)
+    row_bytes = measure(lambda _: [plain(**OrderDetailSchema.from_csv_row(r).to_dict()) for r in frame.to_dict('records')], n)
+    batch_bytes = measure(lambda _: orders_from_frame(frame), n)
+    print(f"\n📦 Order load: per-row plain {row_bytes:.0f} B/order, batch slotted {batch_bytes:.0f} B/order "
+          f"({1 - batch_bytes / row_bytes:.0%} less)")
+
+
+if __name__ == "__main__":
+    main()
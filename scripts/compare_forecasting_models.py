@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare per-store Prophet with the global demand model on DFI order data
+Usage: python scripts/compare_forecasting_models.py [--holdout-days 14] [--data-path data/dfi/raw/]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.modules.data.implementations.dfi_data_loader import DFIDataLoader
+from src.modules.forecasting.global_forecaster import compare_forecasters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare demand forecasting models on DFI data")
+    parser.add_argument("--holdout-days", type=int, default=14)
+    parser.add_argument("--data-path", default="data/dfi/raw/")
+    args = parser.parse_args()
+
+    print("📊 Loading DFI daily order summary...")
+    daily = DFIDataLoader(args.data_path).get_daily_order_summary()
+    daily = daily.rename(columns={"dt": "order_date"})
+    daily["unique_sku_count"] = daily["avg_sku_per_order"]
+    print(f"   {len(daily)} store-days, {daily['store_code'].nunique()} stores")
+
+    results = compare_forecasters(daily, holdout_days=args.holdout_days)
+
+    print(f"\n🔮 Holdout accuracy (last {args.holdout_days} days, common stores only)")
+    print(f"{'model':<14}{'MAPE':>8}{'MAE':>10}{'RMSE':>10}{'train s':>10}{'predict s':>11}{'stores':>8}")
+    for name, metrics in results.items():
+        print(
+            f"{name:<14}{metrics.get('mape', float('nan')):>8.3f}{metrics.get('mae', float('nan')):>10.2f}"
+            f"{metrics.get('rmse', float('nan')):>10.2f}{metrics['train_seconds']:>10.2f}"
+            f"{metrics['predict_seconds']:>11.2f}{metrics['stores_forecast']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
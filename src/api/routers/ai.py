@@ -258,7 +258,7 @@ async def analyze_traffic():
         from src.modules.data.implementations.traffic_fetcher import HKTrafficFetcher
         
         fetcher = HKTrafficFetcher()
-        traffic_data = fetcher.fetch_current_traffic()
+        traffic_data = await fetcher.client.run_async(fetcher.fetch_current_traffic_async())
         
         # 转换为字典格式
         traffic_dict = {
@@ -3,6 +3,7 @@
 整合真实DFI数据
 """
 from fastapi import APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, Dict, Any
 from datetime import datetime, date, timedelta
 import numpy as np
@@ -23,6 +24,16 @@ def get_real_kpi() -> Dict[str, Any]:
         return None
 
 
+def get_forecast_demand_summary() -> Optional[Dict[str, Any]]:
+    """次日预测需求（全港与各大区来自同一层级协调结果）"""
+    try:
+        from src.api.services.forecasting_service import get_forecasting_service
+        return get_forecasting_service().get_next_day_demand_summary()
+    except Exception as e:
+        logger.error(f"Failed to get forecast demand summary: {e}")
+        return None
+
+
 def safe_int(val):
     """安全转换为Python int"""
     try:
@@ -56,8 +67,10 @@ async def get_dashboard_kpi():
             stage_durations = real_kpi.get("stage_durations", {})
             total_fulfillment = stage_durations.get("total_fulfillment", {})
             avg_hours = safe_float(total_fulfillment.get("mean_min", 0)) / 60
+            # 冷启动时需加载/训练模型并协调层级，放到线程池执行，不阻塞事件循环
+            demand_summary = await run_in_threadpool(get_forecast_demand_summary)
             
-            return {
+            response = {
                 "success": True,
                 "data_source": "real",
                 "data": {
@@ -100,6 +113,15 @@ async def get_dashboard_kpi():
                 },
                 "updated_at": datetime.now().isoformat()
             }
+            if demand_summary:
+                response["data"]["forecast_demand"] = {
+                    "value": round(safe_float(demand_summary["total"]), 1),
+                    "unit": "件",
+                    "description": f"次日预测需求({demand_summary['date']})",
+                    "by_region": demand_summary["by_region"],
+                    "trend": "up"
+                }
+            return response
     except Exception as e:
         logger.error(f"Error in get_dashboard_kpi: {e}")
     
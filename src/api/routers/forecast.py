@@ -176,16 +176,8 @@ async def get_demand_trend(
     start = date.today() - timedelta(days=days)
     end = date.today() + timedelta(days=7)  # 包含未来7天预测
     
-    forecasts = generate_demand_forecasts(start, end, [store_id])
-    
-    # 按日期聚合
-    trend_data = {}
-    for f in forecasts:
-        if f.date not in trend_data:
-            trend_data[f.date] = {"date": f.date, "forecast": 0, "actual": 0}
-        trend_data[f.date]["forecast"] += f.forecast_demand
-        if f.actual_demand:
-            trend_data[f.date]["actual"] += f.actual_demand
+    # 按日期聚合（服务层缓存）
+    trend = get_forecasting_service().get_demand_trend(store_id, start, end)
     
     # 获取真实门店名称
     store_names = load_store_names()
@@ -195,7 +187,33 @@ async def get_demand_trend(
         "data": {
             "store_id": store_id,
             "store_name": store_names.get(store_id, f"Store {store_id}"),
-            "trend": list(trend_data.values())
+            "trend": trend
+        }
+    }
+
+@router.get("/demand/hierarchy")
+async def get_demand_hierarchy(
+    start_date: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
+    levels: Optional[str] = Query(None, description="层级列表，逗号分隔 (total/region/district/store)")
+):
+    """
+    获取全港/大区/区域层级需求预测（由门店预测自下而上协调，各层级数字一致）
+    """
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式错误，请使用 YYYY-MM-DD")
+    
+    level_list = levels.split(",") if levels else None
+    rows = get_forecasting_service().get_hierarchical_forecasts(start, end, levels=level_list)
+    
+    return {
+        "success": True,
+        "data": {
+            "method": "bottom_up",
+            "forecasts": rows
         }
     }
 
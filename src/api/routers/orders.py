@@ -3,9 +3,10 @@
 """
 from fastapi import APIRouter, Query, HTTPException
 from typing import Optional, List, Dict, Any
-from datetime import datetime, date, timedelta
+from datetime import datetime
 import logging
-import numpy as np
+
+from src.api.services.order_index import InvalidCursorError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -34,7 +35,8 @@ async def get_orders(
     end_date: Optional[str] = Query(None, description="结束日期"),
     status: Optional[str] = Query(None, description="订单状态"),
     page: int = Query(1, ge=1, description="页码"),
-    page_size: int = Query(20, ge=1, le=100, description="每页数量")
+    page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）")
 ):
     """
     获取订单列表 - 真实DFI数据
@@ -43,59 +45,31 @@ async def get_orders(
         from src.api.services.data_service import get_data_service
         service = get_data_service()
         
-        # 获取每日订单数据
-        daily_orders = service.get_daily_orders(store_code=int(store_id) if store_id else None)
-        
-        if not daily_orders:
-            return {
-                "success": True,
-                "data": {
-                    "orders": [],
-                    "total": 0,
-                    "page": page,
-                    "page_size": page_size
-                }
-            }
-        
-        # 转换格式
-        orders = []
-        for i, order in enumerate(daily_orders):
-            order_date = order.get("dt", "") or order.get("order_date", "")
-            # 日期筛选
-            if start_date and order_date < start_date:
-                continue
-            if end_date and order_date > end_date:
-                continue
-            
-            store_code = order.get("store_code")
-            orders.append({
-                "order_id": f"ORD-{order_date}-{store_code}",
-                "order_date": order_date,
-                "store_code": store_code,
-                "store_name": order.get("store_name", f"门店{store_code}"),
-                "district": order.get("district", ""),
-                "total_orders": safe_int(order.get("order_count") or order.get("total_orders", 0)),
-                "total_quantity": safe_int(order.get("total_quantity", 0)),
-                "avg_quantity": safe_float(order.get("avg_sku_per_order") or order.get("avg_quantity_per_order", 0)),
-                "status": "completed"  # 历史订单默认完成
-            })
-        
-        # 分页
-        total = len(orders)
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        paged_orders = orders[start_idx:end_idx]
+        # 门店/状态/日期条件下推到索引，分页只切片，与订单总量无关
+        index = service.get_daily_order_index()
+        result = index.query(
+            filters={"store_code": str(int(store_id)) if store_id else None, "status": status},
+            date_from=start_date,
+            date_to=end_date,
+            offset=(page - 1) * page_size,
+            limit=page_size,
+            cursor=cursor,
+        )
+        total = result.total
         
         return {
             "success": True,
             "data": {
-                "orders": paged_orders,
+                "orders": result.items,
                 "total": total,
                 "page": page,
                 "page_size": page_size,
-                "total_pages": (total + page_size - 1) // page_size
+                "total_pages": (total + page_size - 1) // page_size,
+                "next_cursor": result.next_cursor
             }
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get orders: {e}")
         return {
@@ -223,12 +197,13 @@ async def predict_replenishment(
     """
     try:
         from src.api.services.data_service import get_data_service
-        import numpy as np
+        from src.api.services.inventory_projection import day_to_date, forecast_store_replenishment
+        import pandas as pd
         
         service = get_data_service()
         
         # 获取历史订单数据
-        daily = service.get_daily_orders(store_id=int(store_id) if store_id else None)
+        daily = service.get_daily_orders(store_code=int(store_id) if store_id else None)
         
         if not daily:
             return {
@@ -239,46 +214,54 @@ async def predict_replenishment(
                 }
             }
         
-        # 计算平均需求和标准差
-        orders = [d.get("total_orders", 0) for d in daily[-30:]]  # 最近30天
-        quantities = [d.get("total_quantity", 0) for d in daily[-30:]]
-        
-        avg_orders = np.mean(orders) if orders else 0
-        std_orders = np.std(orders) if orders else 0
-        avg_qty = np.mean(quantities) if quantities else 0
-        std_qty = np.std(quantities) if quantities else 0
+        # 所有门店 × 预测天数一次推演；未指定门店时按全网日汇总预测
+        frame = pd.DataFrame(daily)
+        if not store_id:
+            store_plan = forecast_store_replenishment(frame, days_ahead)
+            frame = frame.groupby("dt", as_index=False)[["order_count", "total_quantity"]].sum().assign(store_code="ALL")
+        plan = forecast_store_replenishment(frame, days_ahead)
         
-        # 生成预测
-        predictions = []
-        for i in range(days_ahead):
-            pred_date = date.today() + timedelta(days=i+1)
-            # 考虑周末效应
-            weekend_factor = 1.2 if pred_date.weekday() >= 5 else 1.0
-            
-            pred_orders = int(avg_orders * weekend_factor)
-            pred_qty = int(avg_qty * weekend_factor)
-            
-            # 安全库存 (P90)
-            safety_qty = int(pred_qty + 1.28 * std_qty)
-            
-            predictions.append({
+        predictions = [
+            {
                 "date": pred_date.isoformat(),
-                "weekday": ["周一", "周二", "周三", "周四", "周五", "周六", "周日"][pred_date.weekday()],
-                "predicted_orders": pred_orders,
-                "predicted_quantity": pred_qty,
-                "safety_stock": safety_qty,
-                "recommended_replenishment": safety_qty  # 建议补货量
-            })
+                "weekday": weekday,
+                "predicted_orders": int(orders),
+                "predicted_quantity": int(quantity),
+                "safety_stock": int(safety),
+                "recommended_replenishment": int(safety)  # 建议补货量
+            }
+            for pred_date, weekday, orders, quantity, safety in zip(
+                plan["dates"], plan["weekdays"], plan["predicted_orders"][0],
+                plan["predicted_quantity"][0], plan["safety_stock"][0]
+            )
+        ]
+        
+        data = {
+            "store_id": store_id,
+            "historical_avg_orders": round(float(plan["avg_orders"][0]), 1),
+            "historical_avg_quantity": round(float(plan["avg_quantity"][0]), 1),
+            "predictions": predictions,
+            "total_recommended": sum(p["recommended_replenishment"] for p in predictions),
+            "stockout_date": day_to_date(plan["dates"], int(plan["days_of_cover"][0])),
+            "reorder_date": day_to_date(plan["dates"], int(plan["reorder_day"][0]))
+        }
+        if not store_id:
+            data["stores"] = [
+                {
+                    "store_code": safe_int(code),
+                    "total_recommended": int(total),
+                    "stockout_date": day_to_date(store_plan["dates"], int(cover)),
+                    "reorder_date": day_to_date(store_plan["dates"], int(reorder))
+                }
+                for code, total, cover, reorder in zip(
+                    store_plan["store_codes"], store_plan["safety_stock"].sum(axis=1),
+                    store_plan["days_of_cover"], store_plan["reorder_day"]
+                )
+            ]
         
         return {
             "success": True,
-            "data": {
-                "store_id": store_id,
-                "historical_avg_orders": round(avg_orders, 1),
-                "historical_avg_quantity": round(avg_qty, 1),
-                "predictions": predictions,
-                "total_recommended": sum(p["recommended_replenishment"] for p in predictions)
-            }
+            "data": data
         }
     except Exception as e:
         logger.error(f"Failed to predict replenishment: {e}")
@@ -3,6 +3,7 @@
 整合真实DFI门店数据
 """
 from fastapi import APIRouter, HTTPException, Query, Depends, Body
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, date, timedelta
@@ -466,6 +467,59 @@ async def approve_replenishment(
         "data": plan.dict()
     }
 
+class StoreDeliveryDemand(BaseModel):
+    """门店弹性补货需求"""
+    store_id: str
+    min_qty: float = 0
+    target_qty: float
+    max_qty: Optional[float] = None
+
+class JointPlanRequest(BaseModel):
+    """补货-配送联合规划请求"""
+    stores: List[StoreDeliveryDemand]
+    num_vehicles: int = 5
+    vehicle_capacity: int = 100
+    time_limit_seconds: int = 10
+
+@router.post("/replenishment/joint-plan")
+async def create_joint_replenishment_plan(request: JointPlanRequest):
+    """
+    补货量与配送路径联合规划
+    一次求解同时确定各门店送货量（在最低量与上限之间）和车辆路线
+    """
+    try:
+        from src.modules.routing.distance_matrix import create_distance_matrix, create_time_matrix
+        from src.modules.routing.joint_planner import create_joint_planner
+        import pandas as pd
+
+        stores = load_real_stores()
+        matched = [item for item in request.stores if item.store_id in stores]
+        if not matched:
+            return {"success": False, "error": "未找到有效门店坐标"}
+
+        demand = pd.DataFrame({
+            "store_id": [item.store_id for item in matched],
+            "min_qty": [item.min_qty for item in matched],
+            "target_qty": [item.target_qty for item in matched],
+            "max_qty": [item.target_qty if item.max_qty is None else item.max_qty for item in matched],
+        })
+        locations = [get_dc_location()] + [(stores[item.store_id]["lat"], stores[item.store_id]["lng"]) for item in matched]
+        distance_matrix = create_distance_matrix(locations, use_euclidean=False)
+
+        planner = create_joint_planner({
+            "num_vehicles": request.num_vehicles,
+            "vehicle_capacity": request.vehicle_capacity,
+            "time_limit_seconds": request.time_limit_seconds,
+        })
+        # 求解器阻塞数秒，放到线程池执行，避免占住事件循环
+        result = await run_in_threadpool(planner.plan, demand, distance_matrix, create_time_matrix(distance_matrix))
+        result["unknown_stores"] = [item.store_id for item in request.stores if item.store_id not in stores]
+
+        return {"success": result["status"] == "success", "data": result}
+    except Exception as e:
+        logger.error(f"联合规划失败: {e}", exc_info=True)
+        return {"success": False, "error": str(e)}
+
 # ==================== 车队调度API ====================
 
 @router.get("/schedules")
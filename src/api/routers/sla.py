@@ -14,6 +14,8 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 from src.api.services.forecasting_service import get_forecasting_service
+from src.api.services.order_index import IndexedOrderStore, InvalidCursorError, field_getter
+from src.modules.forecasting.sla_monitor import StreamingSLAMonitor
 
 # ==================== 请求/响应模型 ====================
 
@@ -66,7 +68,17 @@ DELAY_REASONS = [
 
 # 数据存储
 ORDERS: Dict[str, OrderSLAItem] = {}
+ORDER_INDEX = IndexedOrderStore(  # 与 ORDERS 同步的二级索引，列表查询走索引
+    key=field_getter("order_id"),
+    indexes={
+        "store_id": field_getter("store_id"),
+        "status": field_getter("status"),
+        "sla_achieved": field_getter("sla_achieved"),
+    },
+    date_key=field_getter("order_time"),
+)
 ALERTS: Dict[str, SLAAlertItem] = {}
+SLA_MONITOR = StreamingSLAMonitor(sla_target_hours=4, window_hours=48)  # 订单事件增量聚合
 _stores_cache: Dict[str, str] = {}  # {store_code: store_name}
 
 def load_store_names() -> Dict[str, str]:
@@ -91,6 +103,22 @@ def load_store_names() -> Dict[str, str]:
             "10003": "Mannings Central",
         }
 
+def store_order(order: OrderSLAItem) -> None:
+    """写入订单：更新 ORDERS、二级索引与监控事件"""
+    ORDERS[order.order_id] = order
+    ORDER_INDEX.upsert(order)
+    record_order_events(order)
+
+def record_order_events(order: OrderSLAItem) -> None:
+    """把订单状态转换为监控事件写入 SLA_MONITOR"""
+    SLA_MONITOR.record_order(order.order_id, order.store_id, order.order_time, order.promised_ready_time)
+    if order.status in ("ready", "completed") and order.actual_ready_time:
+        SLA_MONITOR.record_ready(order.order_id, order.actual_ready_time)
+    if order.status == "completed":
+        SLA_MONITOR.record_completion(order.order_id, order.sla_achieved)
+    elif order.status == "cancelled":
+        SLA_MONITOR.record_cancellation(order.order_id)
+
 def load_real_orders(limit: int = 100) -> bool:
     """
     从DFI数据加载真实订单和履约数据
@@ -163,7 +191,7 @@ def load_real_orders(limit: int = 100) -> bool:
                 except:
                     pass
             
-            ORDERS[order_id] = OrderSLAItem(
+            store_order(OrderSLAItem(
                 order_id=order_id,
                 order_time=order_time or order_dt.isoformat(),
                 store_id=store_code,
@@ -177,7 +205,7 @@ def load_real_orders(limit: int = 100) -> bool:
                 delay_reason=delay_reason,
                 customer_name=f"顾客{idx+1:03d}",
                 customer_phone=f"91XX-XX{idx%100:02d}"
-            )
+            ))
         
         logger.info(f"Loaded {len(ORDERS)} orders from real data")
         return True
@@ -224,7 +252,7 @@ def init_mock_orders():
             sla_achieved = None
             delay_reason = None
         
-        ORDERS[order_id] = OrderSLAItem(
+        store_order(OrderSLAItem(
             order_id=order_id,
             order_time=order_time.isoformat(),
             store_id=store_code,
@@ -238,7 +266,7 @@ def init_mock_orders():
             delay_reason=delay_reason,
             customer_name=f"顾客{i+1:03d}",
             customer_phone=f"91XX-XX{i%100:02d}"
-        )
+        ))
 
 def init_mock_alerts():
     """初始化预警数据 - 基于真实门店生成"""
@@ -306,36 +334,32 @@ async def get_orders(
     status: Optional[str] = Query(None, description="订单状态"),
     sla_achieved: Optional[bool] = Query(None, description="SLA是否达标"),
     page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100)
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）")
 ):
     """
-    获取自提订单列表
+    获取自提订单列表（条件下推到二级索引，翻页与订单总量无关）
     """
-    orders = list(ORDERS.values())
-    
-    # 筛选
-    if order_id:
-        orders = [o for o in orders if order_id in o.order_id]
-    if store_id:
-        orders = [o for o in orders if o.store_id == store_id]
-    if status:
-        orders = [o for o in orders if o.status == status]
-    if sla_achieved is not None:
-        orders = [o for o in orders if o.sla_achieved == sla_achieved]
+    filters = {"store_id": store_id, "status": status, "sla_achieved": sla_achieved}
     
-    # 分页
-    total = len(orders)
-    start_idx = (page - 1) * page_size
-    page_data = orders[start_idx:start_idx + page_size]
+    # 筛选 + 分页
+    try:
+        result = ORDER_INDEX.query(filters, date_from, date_to, offset=(page - 1) * page_size,
+                                   limit=page_size, cursor=cursor, key_fragment=order_id)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page_data, total = result.items, result.total
+    status_counts = ORDER_INDEX.count_by("status", filters, date_from, date_to, key_fragment=order_id)
+    sla_counts = ORDER_INDEX.count_by("sla_achieved", filters, date_from, date_to, key_fragment=order_id)
     
     # 统计
     stats = {
         "total_orders": total,
-        "pending": len([o for o in orders if o.status == "pending"]),
-        "ready": len([o for o in orders if o.status == "ready"]),
-        "completed": len([o for o in orders if o.status == "completed"]),
-        "sla_achieved": len([o for o in orders if o.sla_achieved == True]),
-        "sla_breached": len([o for o in orders if o.sla_achieved == False])
+        "pending": status_counts.get("pending", 0),
+        "ready": status_counts.get("ready", 0),
+        "completed": status_counts.get("completed", 0),
+        "sla_achieved": sla_counts.get(True, 0),
+        "sla_breached": sla_counts.get(False, 0)
     }
     
     return {
@@ -346,7 +370,8 @@ async def get_orders(
             "pagination": {
                 "total": total,
                 "page": page,
-                "page_size": page_size
+                "page_size": page_size,
+                "next_cursor": result.next_cursor
             }
         }
     }
@@ -464,7 +489,8 @@ async def get_bottleneck_analysis(
     """
     获取瓶颈分析数据
     """
-    alerts = list(ALERTS.values()) + [SLAAlertItem(**item) for item in get_forecasting_service().get_sla_alerts()]
+    service = get_forecasting_service()
+    alerts = list(ALERTS.values()) + [SLAAlertItem(**item) for item in service.get_sla_alerts()]
     
     # 瓶颈分布
     distribution = {
@@ -505,7 +531,8 @@ async def get_bottleneck_analysis(
                 {"issue": "门店高峰处理延迟", "count": 15, "affected_stores": 8},
                 {"issue": "配送车辆调度延误", "count": 12, "affected_routes": 5},
                 {"issue": "ECDC出货能力不足", "count": 8, "affected_ecdcs": 2}
-            ]
+            ],
+            "risk_factor_summary": service.get_risk_summary()
         }
     }
 
@@ -516,11 +543,10 @@ async def get_sla_statistics(
     """
     获取SLA统计数据
     """
-    orders = list(ORDERS.values())
+    summary = SLA_MONITOR.get_summary()
     alerts = list(ALERTS.values()) + [SLAAlertItem(**item) for item in get_forecasting_service().get_sla_alerts()]
     
-    completed = [o for o in orders if o.status == "completed"]
-    achieved = [o for o in completed if o.sla_achieved == True]
+    achievement_rate = summary["sla_achievement_rate"]
     
     resolved = [a for a in alerts if a.status == "resolved"]
     
@@ -528,10 +554,14 @@ async def get_sla_statistics(
         "success": True,
         "data": {
             "orders": {
-                "total": len(orders),
-                "completed": len(completed),
-                "sla_achievement_rate": round(len(achieved)/len(completed)*100, 1) if completed else 0
+                "total": summary["total_orders"],
+                "completed": summary["completed"],
+                "sla_achievement_rate": round(achievement_rate*100, 1) if achievement_rate is not None else 0,
+                "pending": summary["pending"],
+                "late": summary["late"],
+                "lead_time_minutes": summary["lead_time_minutes"]
             },
+            "hourly": SLA_MONITOR.get_hourly_stats(),
             "alerts": {
                 "total": len(alerts),
                 "pending": len([a for a in alerts if a.status == "pending"]),
@@ -16,9 +16,26 @@ from typing import Dict, List, Optional, Any, Tuple
 from functools import lru_cache
 import pandas as pd
 
+from src.core.data_schema import sla_metrics_records
+from src.api.services.order_index import IndexedOrderStore, field_getter
+
 logger = logging.getLogger(__name__)
 
 
+def _safe_int(val) -> int:
+    try:
+        return int(val) if val is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _safe_float(val) -> float:
+    try:
+        return float(val) if val is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
 class DataService:
     """
     统一数据服务 - 封装DFI数据加载器
@@ -159,17 +176,24 @@ class DataService:
                    store_codes: List[int] = None) -> List[Dict]:
         """获取订单列表"""
         try:
-            orders = self.data_loader.load_orders(start_date, end_date, store_codes)
+            columns = self.data_loader.load_order_columns(start_date, end_date, store_codes)
             return [
                 {
-                    "order_id": o.order_id,
-                    "date": o.dt.isoformat(),
-                    "store_code": o.fulfillment_store_code,
-                    "user_id": o.user_id,
-                    "sku_count": o.unique_sku_cnt,
-                    "total_quantity": o.total_quantity_cnt
+                    "order_id": order_id,
+                    "date": order_date,
+                    "store_code": store_code,
+                    "user_id": user_id,
+                    "sku_count": sku_count,
+                    "total_quantity": total_quantity
                 }
-                for o in orders
+                for order_id, order_date, store_code, user_id, sku_count, total_quantity in zip(
+                    columns["order_id"].tolist(),
+                    columns["dt"].astype(str).tolist(),
+                    columns["fulfillment_store_code"].tolist(),
+                    columns["user_id"].tolist(),
+                    columns["unique_sku_cnt"].tolist(),
+                    columns["total_quantity_cnt"].tolist(),
+                )
             ]
         except Exception as e:
             logger.error(f"Failed to load orders: {e}")
@@ -214,24 +238,88 @@ class DataService:
             logger.error(f"Failed to get daily orders: {e}")
             return []
     
+    def get_daily_demand_frame(self, store_code: int = None) -> pd.DataFrame:
+        """
+        门店 × 日 需求表（来自预聚合的日需求立方体，不做逐行字典转换）
+        列: dt, store_code, order_count, total_quantity, avg_sku_per_order, date(datetime64)
+        """
+        try:
+            return self.data_loader.get_daily_demand_frame(
+                store_codes=[store_code] if store_code else None, by_sku=False
+            )
+        except Exception as e:
+            logger.error(f"Failed to get daily demand frame: {e}")
+            return pd.DataFrame()
+    
+    def get_daily_order_index(self) -> IndexedOrderStore:
+        """
+        门店日订单的索引存储（按门店/状态/日期建二级索引），缓存期内复用
+        记录格式与 /api/orders/list 返回的订单行一致
+        """
+        cache_key = "daily_order_index"
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        index = IndexedOrderStore(
+            key=field_getter("order_id"),
+            indexes={"store_code": lambda row: str(row["store_code"]), "status": field_getter("status")},
+            date_key=field_getter("order_date"),
+        )
+        for order in self.get_daily_orders():
+            order_date = order.get("dt", "") or order.get("order_date", "")
+            store_code = order.get("store_code")
+            index.upsert({
+                "order_id": f"ORD-{order_date}-{store_code}",
+                "order_date": order_date,
+                "store_code": store_code,
+                "store_name": order.get("store_name", f"门店{store_code}"),
+                "district": order.get("district", ""),
+                "total_orders": _safe_int(order.get("order_count") or order.get("total_orders", 0)),
+                "total_quantity": _safe_int(order.get("total_quantity", 0)),
+                "avg_quantity": _safe_float(order.get("avg_sku_per_order") or order.get("avg_quantity_per_order", 0)),
+                "status": "completed"  # 历史订单默认完成
+            })
+        
+        self._set_cached(cache_key, index)
+        return index
+    
     # ==================== 履约/SLA数据 ====================
     
     def get_fulfillment_data(self, order_ids: List[str] = None) -> List[Dict]:
         """获取履约数据"""
         try:
-            fulfillments = self.data_loader.load_fulfillment(order_ids)
+            df = self.data_loader.load_fulfillment_frame()
+            metrics = self.data_loader.get_sla_metrics_frame()
+            if order_ids:
+                mask = df["order_id"].isin(order_ids)
+                df, metrics = df[mask], metrics[mask]
+
+            def iso(column: str) -> List[Optional[str]]:
+                if column not in df.columns:
+                    return [None] * len(df)
+                return [None if pd.isna(value) else value.isoformat() for value in df[column]]
+
             return [
                 {
-                    "order_id": f.order_id,
-                    "status": f.get_status().value,
-                    "order_create_time": f.order_create_time.isoformat() if f.order_create_time else None,
-                    "ready_for_pickup_time": f.ready_for_pickup_time.isoformat() if f.ready_for_pickup_time else None,
-                    "completed_time": f.completed_time.isoformat() if f.completed_time else None,
-                    "is_completed": f.completed_time is not None,
-                    "is_cancelled": f.cancel_time is not None,
-                    "sla_metrics": f.calculate_sla_metrics()
+                    "order_id": order_id,
+                    "status": status,
+                    "order_create_time": created,
+                    "ready_for_pickup_time": ready,
+                    "completed_time": completed,
+                    "is_completed": completed is not None,
+                    "is_cancelled": bool(cancelled),
+                    "sla_metrics": sla_metrics
                 }
-                for f in fulfillments
+                for order_id, status, created, ready, completed, cancelled, sla_metrics in zip(
+                    df["order_id"],
+                    metrics["status"],
+                    iso("order_create_time"),
+                    iso("ready_for_pickup_time"),
+                    iso("completed_time"),
+                    df["cancel_time"].notna() if "cancel_time" in df.columns else [False] * len(df),
+                    sla_metrics_records(metrics),
+                )
             ]
         except Exception as e:
             logger.error(f"Failed to load fulfillment data: {e}")
@@ -0,0 +1,155 @@
+"""
+Forecast result cache.
+Bounded LRU cache for forecast rows keyed by model version, scope and date window.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Hashable, List, Optional
+
+
+@dataclass
+class _CacheEntry:
+    start_date: date
+    end_date: date
+    rows: List[Dict[str, Any]]
+    row_dates: List[str]
+    date_sorted: bool
+
+
+class ForecastResultCache:
+    """
+    预测结果缓存
+
+    - 键: (模型版本, 粒度, 范围标识, 开始日期, 结束日期)
+    - 支持区间复用: 已缓存的14天结果可直接切出其中7天
+    - 内存上限: 同时限制条目数与缓存行总数，超出时按LRU淘汰
+    """
+
+    def __init__(self, max_entries: int = 64, max_rows: int = 250_000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self._row_count = 0
+        self._hits = 0
+        self._partial_hits = 0
+        self._misses = 0
+        self.lock = threading.Lock()
+
+    def get(
+        self,
+        model_version: Hashable,
+        granularity: str,
+        scope: Hashable,
+        start_date: date,
+        end_date: date,
+        allow_partial: bool = True,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取覆盖 [start_date, end_date] 的缓存行（返回副本，调用方可自由修改）
+
+        allow_partial=False 时只接受完全相同的日期窗口（结果依赖开始日期时使用）
+        """
+        with self.lock:
+            exact_key = (model_version, granularity, scope, start_date, end_date)
+            entry = self._entries.get(exact_key)
+            if entry is not None:
+                self._entries.move_to_end(exact_key)
+                self._hits += 1
+                return self._copy_rows(entry.rows)
+
+            partial_entries = reversed(self._entries.items()) if allow_partial else ()
+            for key, entry in partial_entries:
+                if key[:3] != exact_key[:3]:
+                    continue
+                if entry.start_date <= start_date and end_date <= entry.end_date:
+                    self._entries.move_to_end(key)
+                    self._partial_hits += 1
+                    return self._copy_rows(self._slice(entry, start_date, end_date))
+
+            self._misses += 1
+            return None
+
+    def put(
+        self,
+        model_version: Hashable,
+        granularity: str,
+        scope: Hashable,
+        start_date: date,
+        end_date: date,
+        rows: List[Dict[str, Any]],
+        date_field: str = "date",
+    ) -> None:
+        """缓存预测行；单个结果超过行数上限时不缓存"""
+        if len(rows) > self.max_rows:
+            return
+
+        row_dates = [str(row[date_field]) for row in rows]
+        entry = _CacheEntry(
+            start_date=start_date,
+            end_date=end_date,
+            rows=self._copy_rows(rows),
+            row_dates=row_dates,
+            date_sorted=all(a <= b for a, b in zip(row_dates, row_dates[1:])),
+        )
+        key = (model_version, granularity, scope, start_date, end_date)
+        with self.lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._row_count -= len(previous.rows)
+
+            self._entries[key] = entry
+            self._row_count += len(entry.rows)
+
+            # LRU淘汰策略
+            while self._entries and (len(self._entries) > self.max_entries or self._row_count > self.max_rows):
+                _, evicted = self._entries.popitem(last=False)
+                self._row_count -= len(evicted.rows)
+
+    def clear(self) -> None:
+        """清空缓存（模型重新加载或训练后调用）"""
+        with self.lock:
+            self._entries.clear()
+            self._row_count = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self.lock:
+            lookups = self._hits + self._partial_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "cached_rows": self._row_count,
+                "max_entries": self.max_entries,
+                "max_rows": self.max_rows,
+                "hits": self._hits,
+                "partial_hits": self._partial_hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits + self._partial_hits) / lookups if lookups else 0.0,
+            }
+
+    @staticmethod
+    def _copy_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """复制行字典及其中的列表字段（如 factors），避免调用方与缓存共享可变对象"""
+        return [
+            {key: list(value) if isinstance(value, list) else value for key, value in row.items()}
+            for row in rows
+        ]
+
+    @staticmethod
+    def _slice(entry: _CacheEntry, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        start_key = start_date.isoformat()
+        end_key = end_date.isoformat()
+        if entry.date_sorted:
+            lo = bisect_left(entry.row_dates, start_key)
+            hi = bisect_right(entry.row_dates, end_key)
+            return entry.rows[lo:hi]
+        return [
+            row
+            for row, row_date in zip(entry.rows, entry.row_dates)
+            if start_key <= row_date <= end_key
+        ]
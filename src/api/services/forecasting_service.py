@@ -6,18 +6,27 @@ Bridges forecasting modules with API routers using cached training data.
 from __future__ import annotations
 
 import logging
+import os
+import zlib
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 from src.api.services.data_service import get_data_service
+from src.api.services.forecast_cache import ForecastResultCache
+from src.api.services.inventory_projection import classify_stock_status, project_inventory
+from src.modules.forecasting.global_forecaster import GlobalDemandForecaster
 from src.modules.forecasting.prophet_forecaster import ProphetForecaster
+from src.modules.forecasting.reconciliation import ForecastHierarchy, HierarchicalReconciler
 from src.modules.forecasting.sla_predictor import MLSLAPredictor
 
 logger = logging.getLogger(__name__)
 
+# 需求预测模型: prophet（逐门店）/ global_gbm / global_ridge（全局模型）
+DEMAND_MODEL = os.getenv("DEMAND_MODEL", "prophet").lower()
+
 
 SKU_PROFILES: Dict[str, Dict[str, Any]] = {
     "SKU001": {"name": "维他命C 1000mg", "weight": 0.26, "base_stock": 180, "daily_arrival": 18},
@@ -33,6 +42,18 @@ ECDC_PROFILES: Dict[str, Dict[str, Any]] = {
 }
 
 
+def create_demand_forecaster(model_name: Optional[str] = None):
+    """按配置创建需求预测器（未知的全局模型类型记录警告并回退为逐门店Prophet）"""
+    model_name = (model_name or DEMAND_MODEL).lower()
+    if model_name.startswith("global"):
+        model_type = model_name.split("_", 1)[1] if "_" in model_name else "gbm"
+        try:
+            return GlobalDemandForecaster({"model_type": model_type})
+        except ValueError as e:
+            logger.warning(f"DEMAND_MODEL={model_name} 无效，回退为逐门店Prophet模型: {e}")
+    return ProphetForecaster()
+
+
 class ForecastingService:
     """Cached access layer for demand, ATP and SLA forecasts."""
 
@@ -48,11 +69,15 @@ class ForecastingService:
             return
 
         self.data_service = get_data_service()
-        self.forecaster = ProphetForecaster()
+        self.forecaster = create_demand_forecaster()
         self.sla_predictor = MLSLAPredictor()
         self._training_frame: Optional[pd.DataFrame] = None
         self._forecast_reference_date: Optional[date] = None
         self._store_name_cache: Dict[str, str] = {}  # 缓存门店名称
+        self._store_district_cache: Dict[str, str] = {}  # 缓存门店所属区域
+        self._factor_tables: Optional[Dict[str, Any]] = None  # 门店预测因子表
+        self._model_version = 0  # 模型重新加载/训练时递增
+        self._result_cache = ForecastResultCache()  # 预测结果缓存
         self._initialized = True
 
     def get_demand_forecasts(
@@ -65,121 +90,258 @@ class ForecastingService:
         self._ensure_models()
 
         training = self._get_training_frame()
-        stores = store_ids or sorted(training["fulfillment_store_code"].astype(str).unique().tolist())
+        stores = [str(s) for s in (store_ids or sorted(training["fulfillment_store_code"].astype(str).unique().tolist()))]
         skus = sku_ids or list(SKU_PROFILES.keys())
+        if start_date > end_date or not stores or not skus:
+            return []
+
+        scope = (tuple(stores), tuple(skus))
+        cached = self._result_cache.get(
+            self._model_version, "daily", scope, start_date, end_date, allow_partial=self._window_reuse_allowed()
+        )
+        if cached is not None:
+            return cached
+
+        results = self._compute_demand_forecasts(training, stores, skus, start_date, end_date)
+        self._result_cache.put(self._model_version, "daily", scope, start_date, end_date, results)
+        return results
+
+    def get_demand_trend(self, store_id: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        """按日期汇总单店全部SKU的预测与实际需求（用于趋势图）"""
+        self._ensure_models()
+
+        scope = (str(store_id),)
+        cached = self._result_cache.get(
+            self._model_version, "trend", scope, start_date, end_date, allow_partial=self._window_reuse_allowed()
+        )
+        if cached is not None:
+            return cached
+
+        trend_data: Dict[str, Dict[str, Any]] = {}
+        for row in self.get_demand_forecasts(start_date, end_date, [str(store_id)]):
+            point = trend_data.setdefault(row["date"], {"date": row["date"], "forecast": 0, "actual": 0})
+            point["forecast"] += row["forecast_demand"]
+            if row["actual_demand"]:
+                point["actual"] += row["actual_demand"]
+
+        results = list(trend_data.values())
+        self._result_cache.put(self._model_version, "trend", scope, start_date, end_date, results)
+        return results
+
+    def get_hierarchical_forecasts(
+        self,
+        start_date: date,
+        end_date: date,
+        store_ids: Optional[List[str]] = None,
+        levels: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        门店 → 区域 → 大区 → 全港的一致性需求预测
+
+        只使用门店级预测，各层级汇总值通过一次稀疏求和矩阵乘法得到（自下而上协调），
+        与 get_demand_forecasts / get_inventory_outlook 的数字保持一致。
+        """
+        self._ensure_models()
+
+        training = self._get_training_frame()
+        stores = [str(s) for s in (store_ids or sorted(training["fulfillment_store_code"].astype(str).unique().tolist()))]
+        levels = levels or ["total", "region", "district"]
+        if start_date > end_date or not stores:
+            return []
+
+        scope = (tuple(stores), tuple(levels))
+        cached = self._result_cache.get(
+            self._model_version, "hierarchy", scope, start_date, end_date, allow_partial=self._window_reuse_allowed()
+        )
+        if cached is not None:
+            return cached
+
+        dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        store_demand = self._pivot_store_demand(self.get_demand_forecasts(start_date, end_date, stores), stores, dates)
+        reconciler = HierarchicalReconciler(self._get_forecast_hierarchy(stores))
+        frame = reconciler.to_frame(reconciler.reconcile(store_demand), dates)
+        frame = frame[frame["level"].isin(levels)].sort_values("date", kind="stable")
+        frame["forecast"] = frame["forecast"].round(1)
+
+        results = frame.to_dict(orient="records")
+        self._result_cache.put(self._model_version, "hierarchy", scope, start_date, end_date, results)
+        return results
+
+    def get_next_day_demand_summary(self) -> Dict[str, Any]:
+        """次日全港及各大区预测需求（来自同一层级协调结果）"""
+        self._ensure_models()
+        forecast_date = (self._forecast_reference_date or date.today()) + timedelta(days=1)
+        rows = self.get_hierarchical_forecasts(forecast_date, forecast_date, levels=["total", "region"])
+        return {
+            "date": forecast_date.isoformat(),
+            "total": next((row["forecast"] for row in rows if row["level"] == "total"), 0.0),
+            "by_region": {row["node_id"]: row["forecast"] for row in rows if row["level"] == "region"},
+        }
+
+    def _window_reuse_allowed(self) -> bool:
+        """
+        是否允许从更长的缓存窗口切片
+
+        未确定预测基准日时以请求开始日期作为基准（决定哪些日期展示实际值），
+        不同开始日期的结果不可互相切片复用。
+        """
+        return self._forecast_reference_date is not None
+
+    def _compute_demand_forecasts(
+        self,
+        training: pd.DataFrame,
+        stores: List[str],
+        skus: List[str],
+        start_date: date,
+        end_date: date,
+    ) -> List[Dict[str, Any]]:
         reference_date = self._forecast_reference_date or start_date
 
-        forecast_map = self._build_forecast_lookup(stores, end_date)
-        actual_map = self._build_actual_lookup(training)
-        
         # 预加载门店名称缓存，避免循环中重复查询
         store_names = self._get_store_names_batch(stores)
-        
-        # 为没有专属模型的门店计算历史平均值作为回退预测
-        store_historical_avg = self._compute_historical_averages(training, stores)
 
-        results: List[Dict[str, Any]] = []
+        # 门店×日期智能预测（一次向量化计算）
+        grid = self._build_smart_forecast_grid(stores, start_date, end_date)
+
+        # 有模型预测的门店：保留模型预测值，只应用30%的智能调整
+        model_frame = self._build_forecast_frame(stores, end_date)
+        grid = grid.merge(model_frame, on=["store_id", "date"], how="left")
+        has_model = grid["model_predicted"].notna().to_numpy()
+        adj_factor = (grid["multiplier"].to_numpy() - 1.0) * 0.3 + 1.0
+        for column in ("predicted", "lower", "upper"):
+            grid[column] = np.where(
+                has_model,
+                np.round(grid[f"model_{column}"].to_numpy(dtype=float) * adj_factor, 1),
+                grid[column].to_numpy(),
+            )
+
+        grid = grid.merge(self._build_actual_frame(training), on=["store_id", "date"], how="left")
+
+        # 门店日聚合 × SKU权重
+        sku_frame = pd.DataFrame(
+            [
+                {
+                    "sku_id": sku_id,
+                    "sku_name": SKU_PROFILES.get(sku_id, {}).get("name", sku_id),
+                    "weight": float(SKU_PROFILES.get(sku_id, {}).get("weight", 1.0 / max(1, len(skus)))),
+                }
+                for sku_id in skus
+            ]
+        )
+        grid = grid.merge(sku_frame, how="cross")
+
+        weight = grid["weight"].to_numpy()
+        forecast_value = grid["predicted"].to_numpy() * weight
+        actual_value = grid["actual_total"].to_numpy(dtype=float) * weight
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deviation = np.where(forecast_value > 0, (actual_value - forecast_value) / forecast_value * 100, np.nan)
+        observed = (grid["date"] <= pd.Timestamp(reference_date)).to_numpy()
+        actual_value = np.where(observed, actual_value, np.nan)
+        deviation = np.where(observed, deviation, np.nan)
+
+        return [
+            {
+                "store_id": store_id,
+                "store_name": store_names.get(store_id, f"Store {store_id}"),
+                "sku_id": sku_id,
+                "sku_name": sku_name,
+                "date": day,
+                "forecast_demand": round(forecast, 1),
+                "actual_demand": None if np.isnan(actual) else round(actual, 1),
+                "deviation_rate": None if np.isnan(dev) else round(dev, 2),
+                "lower_bound": round(lower, 1),
+                "upper_bound": round(upper, 1),
+                "factors": factors,  # 影响因素
+                "multiplier": multiplier,  # 调整系数
+            }
+            for store_id, sku_id, sku_name, day, forecast, actual, dev, lower, upper, factors, multiplier in zip(
+                grid["store_id"].tolist(),
+                grid["sku_id"].tolist(),
+                grid["sku_name"].tolist(),
+                grid["date"].dt.strftime("%Y-%m-%d").tolist(),
+                forecast_value.tolist(),
+                actual_value.tolist(),
+                deviation.tolist(),
+                (grid["lower"].to_numpy() * weight).tolist(),
+                (grid["upper"].to_numpy() * weight).tolist(),
+                grid["factors"].tolist(),
+                grid["multiplier"].tolist(),
+            )
+        ]
+
+    def _build_factor_tables(self, training: pd.DataFrame) -> Dict[str, Any]:
+        """
+        预计算门店级预测因子表（模型加载时构建一次）
+
+        包括：
+        1. baseline - 门店历史平均需求（无历史数据回退为全局平均）
+        2. weekday - 门店星期因子（相对门店均值）
+        3. month - 门店月份因子
+        4. date_type - 门店同类型日期因子（至少3个数据点）
+        """
+        history = pd.DataFrame(
+            {
+                "store_id": training["fulfillment_store_code"].astype(str).to_numpy(),
+                "order_date": pd.to_datetime(training["order_date"]).dt.normalize().to_numpy(),
+                "quantity": pd.to_numeric(training["total_quantity"], errors="coerce").to_numpy(),
+            }
+        )
+
+        global_avg = history["quantity"].mean()
+        if pd.isna(global_avg):
+            global_avg = 10.0
+
+        # 日期分类只对去重后的日期计算一次
+        unique_dates = history["order_date"].drop_duplicates()
+        date_types = {ts: self._classify_date(ts.date()) for ts in unique_dates}
+        history["date_type"] = history["order_date"].map(date_types)
+        history["weekday"] = history["order_date"].dt.dayofweek
+        history["month"] = history["order_date"].dt.month
+
+        baseline = history.groupby("store_id")["quantity"].mean()
+        learnable = baseline[baseline > 0]
+        history = history[history["store_id"].isin(learnable.index)]
+        store_avg = history["store_id"].map(learnable)
+
+        def _ratio_table(key: str, name: str, min_count: int = 1) -> pd.DataFrame:
+            grouped = history.assign(ratio=history["quantity"] / store_avg).groupby(["store_id", key])
+            table = grouped.agg(**{name: ("ratio", "mean"), "samples": ("quantity", "count")}).reset_index()
+            table = table[table["samples"] >= min_count]
+            return table.drop(columns="samples")
+
+        return {
+            "global_avg": float(global_avg),
+            "baseline": baseline.fillna(float(global_avg)).rename("base_avg"),
+            "weekday": _ratio_table("weekday", "weekday_learned"),
+            "month": _ratio_table("month", "month_learned"),
+            "date_type": _ratio_table("date_type", "history_factor", min_count=3),
+        }
+
+    def _build_calendar_frame(self, start_date: date, end_date: date) -> pd.DataFrame:
+        """构建日期级因子（星期、月份、节假日、天气），每个日期只计算一次"""
+        rows: List[Dict[str, Any]] = []
         current = start_date
         while current <= end_date:
-            for store_id in stores:
-                store_name = store_names.get(store_id, f"Store {store_id}")
-                aggregate = forecast_map.get((store_id, current))
-                actual_total = actual_map.get((store_id, current))
-
-                # 如果没有模型预测，使用智能加权预测
-                if aggregate is None:
-                    hist_avg = store_historical_avg.get(store_id)
-                    if hist_avg is not None:
-                        # 使用智能预测而不是简单平均值
-                        aggregate = self._compute_smart_forecast(
-                            base_avg=hist_avg,
-                            forecast_date=current,
-                            training=training,
-                            store_id=store_id
-                        )
-                    elif actual_total is not None:
-                        aggregate = {
-                            "predicted": float(actual_total),
-                            "lower": max(0.0, actual_total * 0.9),
-                            "upper": actual_total * 1.1,
-                            "factors": [],
-                            "multiplier": 1.0,
-                        }
-                else:
-                    # 即使有模型预测，也应用智能调整因子
-                    hist_avg = aggregate.get("predicted", 10.0)
-                    smart = self._compute_smart_forecast(
-                        base_avg=hist_avg,
-                        forecast_date=current,
-                        training=training,
-                        store_id=store_id
-                    )
-                    # 保留模型预测值，但添加因素信息
-                    aggregate["factors"] = smart.get("factors", [])
-                    aggregate["multiplier"] = smart.get("multiplier", 1.0)
-                    # 应用智能调整（较小幅度）
-                    adj_factor = (smart["multiplier"] - 1.0) * 0.3 + 1.0  # 只应用30%的调整
-                    aggregate["predicted"] = round(aggregate["predicted"] * adj_factor, 1)
-                    aggregate["lower"] = round(aggregate.get("lower", aggregate["predicted"] * 0.8) * adj_factor, 1)
-                    aggregate["upper"] = round(aggregate.get("upper", aggregate["predicted"] * 1.2) * adj_factor, 1)
-
-                if aggregate is None:
-                    current += timedelta(days=0)
-                    continue
-
-                for sku_id in skus:
-                    profile = SKU_PROFILES.get(sku_id, {"name": sku_id, "weight": 1.0 / max(1, len(skus))})
-                    weight = float(profile["weight"])
-                    forecast_value = aggregate["predicted"] * weight
-                    lower = aggregate["lower"] * weight
-                    upper = aggregate["upper"] * weight
-                    actual_value = actual_total * weight if actual_total is not None else None
-                    deviation = None
-                    if actual_value is not None and forecast_value > 0:
-                        deviation = (actual_value - forecast_value) / forecast_value * 100
-
-                    results.append(
-                        {
-                            "store_id": store_id,
-                            "store_name": store_name,
-                            "sku_id": sku_id,
-                            "sku_name": profile["name"],
-                            "date": current.isoformat(),
-                            "forecast_demand": round(forecast_value, 1),
-                            "actual_demand": round(actual_value, 1) if actual_value is not None and current <= reference_date else None,
-                            "deviation_rate": round(deviation, 2) if deviation is not None and current <= reference_date else None,
-                            "lower_bound": round(lower, 1),
-                            "upper_bound": round(upper, 1),
-                            "factors": aggregate.get("factors", []),  # 影响因素
-                            "multiplier": aggregate.get("multiplier", 1.0),  # 调整系数
-                        }
-                    )
+            holiday_info = self._get_holiday_info(current)
+            rows.append(
+                {
+                    "date": pd.Timestamp(current),
+                    "ordinal": current.toordinal(),
+                    "weekday": current.weekday(),
+                    "month": current.month,
+                    "date_type": self._classify_date(current),
+                    "holiday_factor": float(holiday_info["factor"]),
+                    "holiday_name": holiday_info["name"],
+                    "weather_factor": float(self._get_weather_factor(current)),
+                }
+            )
             current += timedelta(days=1)
+        return pd.DataFrame(rows)
 
-        return results
-    
-    def _compute_historical_averages(self, training: pd.DataFrame, store_ids: List[str]) -> Dict[str, float]:
-        """计算门店的历史平均需求，用于没有模型的门店"""
-        averages = {}
-        # 计算全局平均值作为默认回退
-        global_avg = training["total_quantity"].mean()
-        if pd.isna(global_avg):
-            global_avg = 10.0
-        
-        for store_id in store_ids:
-            store_data = training[training["fulfillment_store_code"].astype(str) == str(store_id)]
-            if not store_data.empty:
-                avg = store_data["total_quantity"].mean()
-                averages[store_id] = float(avg) if pd.notna(avg) else float(global_avg)
-            else:
-                # 门店没有历史数据，使用全局平均值
-                averages[store_id] = float(global_avg)
-        return averages
-    
-    def _compute_smart_forecast(self, base_avg: float, forecast_date: date, training: pd.DataFrame, store_id: str) -> Dict[str, float]:
+    def _build_smart_forecast_grid(self, stores: List[str], start_date: date, end_date: date) -> pd.DataFrame:
         """
-        智能加权预测：考虑多种因素对需求的影响
-        
+        智能加权预测：门店×日期网格的向量化计算
+
         因素包括：
         1. 星期几效应 - 周末/工作日
         2. 节假日效应 - 公众假期
@@ -187,106 +349,86 @@ class ForecastingService:
         4. 天气效应 - 温度、降雨
         5. 历史数据学习 - 同类型日期的历史模式
         """
-        multiplier = 1.0
-        uncertainty = 0.15  # 基础不确定性 15%
-        factors = []
-        
-        # 获取日期类型分类
-        date_type = self._classify_date(forecast_date)
-        weekday = forecast_date.weekday()
-        weekday_names = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
-        
-        # 预设因子
-        weekday_factors = {
-            0: 0.95, 1: 0.98, 2: 1.00, 3: 1.02, 4: 1.08, 5: 1.15, 6: 1.10
-        }
-        month_factors = {
-            1: 1.05, 2: 1.08, 3: 1.00, 4: 0.98, 5: 1.02, 6: 1.05,
-            7: 1.08, 8: 1.10, 9: 1.05, 10: 1.02, 11: 1.00, 12: 1.12
-        }
-        
-        # ================== 从历史数据学习 ==================
-        store_data = training[training["fulfillment_store_code"].astype(str) == str(store_id)].copy()
-        learned_from_history = False
-        history_factor = 1.0
-        
-        if not store_data.empty and "order_date" in store_data.columns:
-            # 为历史数据添加日期分类
-            store_data["date_parsed"] = pd.to_datetime(store_data["order_date"])
-            store_data["date_type"] = store_data["date_parsed"].apply(lambda d: self._classify_date(d.date()))
-            store_data["weekday"] = store_data["date_parsed"].dt.dayofweek
-            store_data["month"] = store_data["date_parsed"].dt.month
-            
-            overall_avg = store_data["total_quantity"].mean()
-            
-            if overall_avg > 0:
-                # 学习同类型日期的历史模式
-                same_type_data = store_data[store_data["date_type"] == date_type]
-                if len(same_type_data) >= 3:  # 至少有3个同类型数据点
-                    type_avg = same_type_data["total_quantity"].mean()
-                    history_factor = type_avg / overall_avg
-                    learned_from_history = True
-                    factors.append(f"历史{date_type}模式")
-                
-                # 学习星期模式
-                weekday_avg = store_data.groupby("weekday")["total_quantity"].mean()
-                if weekday in weekday_avg.index:
-                    weekday_learned = weekday_avg[weekday] / overall_avg
-                    weekday_factors[weekday] = 0.5 * weekday_factors[weekday] + 0.5 * weekday_learned
-                
-                # 学习月份模式
-                month_avg = store_data.groupby("month")["total_quantity"].mean()
-                month = forecast_date.month
-                if month in month_avg.index:
-                    month_learned = month_avg[month] / overall_avg
-                    month_factors[month] = 0.5 * month_factors.get(month, 1.0) + 0.5 * month_learned
-        
-        # ================== 应用因子 ==================
-        # 1. 星期因子
-        weekday_mult = weekday_factors.get(weekday, 1.0)
-        if weekday in [5, 6]:
-            factors.append(f"{weekday_names[weekday]}+{int((weekday_mult-1)*100)}%")
-        multiplier *= weekday_mult
-        
-        # 2. 节假日因子
-        holiday_info = self._get_holiday_info(forecast_date)
-        if holiday_info["factor"] > 1.0:
-            multiplier *= holiday_info["factor"]
-            uncertainty += 0.1
-            factors.append(f"{holiday_info['name']}+{int((holiday_info['factor']-1)*100)}%")
-        
-        # 3. 月份因子
-        month_mult = month_factors.get(forecast_date.month, 1.0)
-        multiplier *= month_mult
-        
-        # 4. 天气因子
-        weather_factor = self._get_weather_factor(forecast_date)
-        if weather_factor > 1.0:
-            multiplier *= weather_factor
-            factors.append(f"季节性天气+{int((weather_factor-1)*100)}%")
-        
-        # 5. 应用历史学习因子
-        if learned_from_history:
-            # 混合预设因子和历史因子（60%历史 + 40%预设）
-            multiplier = 0.4 * multiplier + 0.6 * history_factor * (multiplier / max(0.5, history_factor))
-        
-        # 计算最终预测值
-        predicted = base_avg * multiplier
-        
-        # 添加随机波动（基于日期种子，确保可重复）
-        seed = int(forecast_date.toordinal()) + hash(store_id) % 1000
-        rng = np.random.default_rng(seed)
-        noise = rng.normal(0, predicted * 0.05)
-        predicted = max(0.1, predicted + noise)
-        
-        return {
-            "predicted": round(predicted, 1),
-            "lower": round(max(0.0, predicted * (1 - uncertainty)), 1),
-            "upper": round(predicted * (1 + uncertainty), 1),
-            "factors": factors,
-            "multiplier": round(multiplier, 2),
-        }
-    
+        tables = self._factor_tables or self._build_factor_tables(self._get_training_frame())
+        weekday_names = np.array(['周一', '周二', '周三', '周四', '周五', '周六', '周日'], dtype=object)
+
+        calendar = self._build_calendar_frame(start_date, end_date)
+        store_frame = pd.DataFrame({"store_id": stores})
+        grid = calendar.merge(store_frame, how="cross")
+        grid["base_avg"] = grid["store_id"].map(tables["baseline"]).fillna(tables["global_avg"])
+        grid = grid.merge(tables["weekday"], on=["store_id", "weekday"], how="left")
+        grid = grid.merge(tables["month"], on=["store_id", "month"], how="left")
+        grid = grid.merge(tables["date_type"], on=["store_id", "date_type"], how="left")
+
+        weekday = grid["weekday"].to_numpy()
+        preset_weekday = np.array([0.95, 0.98, 1.00, 1.02, 1.08, 1.15, 1.10])[weekday]
+        preset_month = np.array([1.0, 1.05, 1.08, 1.00, 0.98, 1.02, 1.05, 1.08, 1.10, 1.05, 1.02, 1.00, 1.12])[grid["month"].to_numpy()]
+
+        weekday_learned = grid["weekday_learned"].to_numpy(dtype=float)
+        weekday_mult = np.where(np.isnan(weekday_learned), preset_weekday, 0.5 * preset_weekday + 0.5 * weekday_learned)
+        month_learned = grid["month_learned"].to_numpy(dtype=float)
+        month_mult = np.where(np.isnan(month_learned), preset_month, 0.5 * preset_month + 0.5 * month_learned)
+
+        holiday_factor = grid["holiday_factor"].to_numpy()
+        weather_factor = grid["weather_factor"].to_numpy()
+        is_holiday = holiday_factor > 1.0
+        is_bad_weather = weather_factor > 1.0
+
+        multiplier = weekday_mult * np.where(is_holiday, holiday_factor, 1.0) * month_mult
+        multiplier = multiplier * np.where(is_bad_weather, weather_factor, 1.0)
+
+        # 混合预设因子和历史因子（60%历史 + 40%预设）
+        history_factor = grid["history_factor"].to_numpy(dtype=float)
+        learned = ~np.isnan(history_factor)
+        blended = 0.4 * multiplier + 0.6 * history_factor * (multiplier / np.maximum(0.5, history_factor))
+        multiplier = np.where(learned, blended, multiplier)
+
+        uncertainty = np.where(is_holiday, 0.25, 0.15)
+        predicted = grid["base_avg"].to_numpy() * multiplier
+        # 添加随机波动（基于日期与门店种子，确保可重复）
+        offsets = store_frame["store_id"].map(self._store_noise_offset)
+        seeds = grid["ordinal"].to_numpy() + grid["store_id"].map(dict(zip(stores, offsets))).to_numpy()
+        predicted = np.maximum(0.1, predicted + predicted * 0.05 * self._seeded_standard_normal(seeds))
+
+        grid["predicted"] = np.round(predicted, 1)
+        grid["lower"] = np.round(np.maximum(0.0, predicted * (1 - uncertainty)), 1)
+        grid["upper"] = np.round(predicted * (1 + uncertainty), 1)
+        grid["multiplier"] = np.round(multiplier, 2)
+
+        history_label = np.where(learned, "历史" + grid["date_type"].astype(str) + "模式", "")
+        weekend_label = np.where(
+            weekday >= 5,
+            weekday_names[weekday] + "+" + np.trunc((weekday_mult - 1) * 100).astype(int).astype(str) + "%",
+            "",
+        )
+        holiday_label = np.where(
+            is_holiday,
+            grid["holiday_name"] + "+" + np.trunc((holiday_factor - 1) * 100).astype(int).astype(str) + "%",
+            "",
+        )
+        weather_label = np.where(
+            is_bad_weather,
+            "季节性天气+" + np.trunc((weather_factor - 1) * 100).astype(int).astype(str) + "%",
+            "",
+        )
+        grid["factors"] = [
+            [label for label in labels if label]
+            for labels in zip(history_label, weekend_label, holiday_label, weather_label)
+        ]
+        return grid[["store_id", "date", "predicted", "lower", "upper", "multiplier", "factors"]]
+
+    @staticmethod
+    def _store_noise_offset(store_id: str) -> int:
+        """门店噪声种子偏移（跨进程稳定）"""
+        return zlib.crc32(str(store_id).encode("utf-8")) % 1000
+
+    @staticmethod
+    def _seeded_standard_normal(seeds: np.ndarray) -> np.ndarray:
+        """按种子生成标准正态噪声，每个唯一种子只构造一次生成器"""
+        unique_seeds, inverse = np.unique(seeds, return_inverse=True)
+        draws = np.array([np.random.default_rng(int(seed)).standard_normal() for seed in unique_seeds])
+        return draws[inverse]
+
     def _classify_date(self, d: date) -> str:
         """
         将日期分类为不同类型，用于历史数据学习
@@ -409,52 +551,64 @@ class ForecastingService:
         start = (self._forecast_reference_date or date.today()) + timedelta(days=1)
         end = start + timedelta(days=forecast_days - 1)
 
+        # 较短展望期是较长展望期的前缀，可直接复用缓存
+        scope = (tuple(ecdcs), tuple(skus))
+        cached = self._result_cache.get(self._model_version, "inventory", scope, start, end)
+        if cached is not None:
+            return cached
+
+        # 全港SKU日需求取层级汇总的total节点，与门店预测保持一致
         demand_rows = self.get_demand_forecasts(start, end, sku_ids=skus)
         daily_demand: Dict[tuple[str, date], float] = {}
-        for row in demand_rows:
-            key = (row["sku_id"], datetime.strptime(row["date"], "%Y-%m-%d").date())
-            daily_demand[key] = daily_demand.get(key, 0.0) + float(row["forecast_demand"])
+        if demand_rows:
+            store_sku_demand = pd.DataFrame(demand_rows).pivot_table(
+                index="store_id", columns=["sku_id", "date"], values="forecast_demand", aggfunc="sum", fill_value=0.0
+            )
+            stores = store_sku_demand.index.astype(str).tolist()
+            reconciler = HierarchicalReconciler(self._get_forecast_hierarchy(stores))
+            totals = reconciler.aggregate(store_sku_demand.to_numpy())[0]
+            for (sku_id, day), total in zip(store_sku_demand.columns, totals):
+                daily_demand[(sku_id, datetime.strptime(day, "%Y-%m-%d").date())] = float(total)
+
+        # (ECDC × SKU) × 天 数组一次推演，替代逐店逐日的库存循环
+        pairs = [(ecdc_id, sku_id) for ecdc_id in ecdcs for sku_id in skus]
+        dates = [start + timedelta(days=day_offset) for day_offset in range(forecast_days)]
+        shares = np.array([float(ECDC_PROFILES.get(ecdc_id, {"share": 0.5})["share"]) for ecdc_id, _ in pairs])
+        sku_demand = np.array([[daily_demand.get((sku_id, day), 0.0) for day in dates] for _, sku_id in pairs])
+        committed = sku_demand.reshape(len(pairs), forecast_days) * shares[:, None]
+
+        arrival_pattern = np.where(np.arange(forecast_days) % 3 == 0, 1.2, 0.8)
+        arrivals = np.array([float(SKU_PROFILES[sku_id]["daily_arrival"]) for _, sku_id in pairs])[:, None] * arrival_pattern
+        initial_stock = np.array([
+            float(SKU_PROFILES[sku_id]["base_stock"]
+                  + np.random.default_rng(sum(ord(ch) for ch in f"{ecdc_id}:{sku_id}")).integers(-20, 25))
+            for ecdc_id, sku_id in pairs
+        ])
+
+        projection = project_inventory(initial_stock, arrivals, committed)
+        statuses = classify_stock_status(projection.available, committed)
 
         results: List[Dict[str, Any]] = []
-        for ecdc_id in ecdcs:
-            ecdc_profile = ECDC_PROFILES.get(ecdc_id, {"name": ecdc_id, "share": 0.5})
-            for sku_id in skus:
-                sku_profile = SKU_PROFILES[sku_id]
-                seed = sum(ord(ch) for ch in f"{ecdc_id}:{sku_id}")
-                rng = np.random.default_rng(seed)
-                current_stock = float(sku_profile["base_stock"] + rng.integers(-20, 25))
-
-                for day_offset in range(forecast_days):
-                    forecast_date = start + timedelta(days=day_offset)
-                    committed_demand = daily_demand.get((sku_id, forecast_date), 0.0) * float(ecdc_profile["share"])
-                    expected_arrival = float(sku_profile["daily_arrival"] * (1.2 if day_offset % 3 == 0 else 0.8))
-                    safety_buffer = committed_demand * 0.25
-                    projected_available = max(0.0, current_stock + expected_arrival - committed_demand)
-
-                    if projected_available < safety_buffer:
-                        status = "shortage"
-                    elif projected_available > committed_demand * 2.2 + 40:
-                        status = "overstock"
-                    else:
-                        status = "normal"
-
-                    results.append(
-                        {
-                            "ecdc_id": ecdc_id,
-                            "ecdc_name": ecdc_profile["name"],
-                            "sku_id": sku_id,
-                            "sku_name": sku_profile["name"],
-                            "forecast_date": forecast_date.isoformat(),
-                            "current_stock": round(current_stock, 1),
-                            "expected_arrival": round(expected_arrival, 1),
-                            "committed_demand": round(committed_demand, 1),
-                            "projected_available": round(projected_available, 1),
-                            "stock_status": status,
-                        }
-                    )
-
-                    current_stock = projected_available
+        for row, (ecdc_id, sku_id) in enumerate(pairs):
+            ecdc_name = ECDC_PROFILES.get(ecdc_id, {"name": ecdc_id})["name"]
+            sku_name = SKU_PROFILES[sku_id]["name"]
+            for day_offset, forecast_date in enumerate(dates):
+                results.append(
+                    {
+                        "ecdc_id": ecdc_id,
+                        "ecdc_name": ecdc_name,
+                        "sku_id": sku_id,
+                        "sku_name": sku_name,
+                        "forecast_date": forecast_date.isoformat(),
+                        "current_stock": round(float(projection.opening[row, day_offset]), 1),
+                        "expected_arrival": round(float(arrivals[row, day_offset]), 1),
+                        "committed_demand": round(float(committed[row, day_offset]), 1),
+                        "projected_available": round(float(projection.available[row, day_offset]), 1),
+                        "stock_status": str(statuses[row, day_offset]),
+                    }
+                )
 
+        self._result_cache.put(self._model_version, "inventory", scope, start, end, results, date_field="forecast_date")
         return results
 
     def get_pickup_promise(self, store_id: str, sku_ids: List[str], order_time: Optional[datetime] = None) -> Dict[str, Any]:
@@ -495,19 +649,25 @@ class ForecastingService:
             "window_description": f"预计 {predicted_pickup_time.strftime('%H:%M')} 前可取",
         }
 
-    def get_sla_alerts(self, store_ids: Optional[List[str]] = None, forecast_days: int = 3, threshold: float = 0.92) -> List[Dict[str, Any]]:
+    def get_sla_alerts(
+        self,
+        store_ids: Optional[List[str]] = None,
+        forecast_days: int = 3,
+        threshold: float = 0.92,
+        top_k: Optional[int] = 50,
+    ) -> List[Dict[str, Any]]:
+        """全网门店一次性评估风险并返回最严重的前 top_k 条预警"""
         self._ensure_models()
 
-        training = self._get_training_frame()
-        stores = store_ids or sorted(training["fulfillment_store_code"].astype(str).unique().tolist())[:10]
-        forecasts = self.sla_predictor.predict(forecast_horizon=forecast_days, store_codes=stores)
-        alerts = self.sla_predictor.generate_sla_alerts(forecasts, threshold=threshold)
+        stores, forecast_dates = self._get_sla_window(store_ids, forecast_days)
+        alerts = self.sla_predictor.generate_sla_alert_frame(stores, forecast_dates, threshold=threshold, top_k=top_k)
+        now = datetime.now().isoformat()
         normalized: List[Dict[str, Any]] = []
-        for item in alerts:
+        for item in alerts.to_dict("records"):
             normalized.append(
                 {
                     "alert_id": f"ML-{hash((item['store_code'], item['forecast_date'], item['alert_type'])) & 0xFFFFFFFF:08X}",
-                    "alert_time": datetime.now().isoformat(),
+                    "alert_time": now,
                     "risk_level": item.get("severity", "medium"),
                     "affected_entity": item["store_code"],
                     "entity_type": "store",
@@ -518,29 +678,59 @@ class ForecastingService:
             )
         return normalized
 
+    def get_risk_summary(self, store_ids: Optional[List[str]] = None, forecast_days: int = 3) -> List[Dict[str, Any]]:
+        """各类风险因子在全网门店预测期内的触发统计"""
+        self._ensure_models()
+
+        stores, forecast_dates = self._get_sla_window(store_ids, forecast_days)
+        frame = self.sla_predictor.assess_risk_frame(stores, forecast_dates)
+        return self.sla_predictor.risk_engine.summarize(frame)
+
     def get_model_info(self) -> Dict[str, Any]:
         self._ensure_models()
         return {
             "demand_model": self.forecaster.get_model_info(),
             "sla_model": self.sla_predictor.get_model_info(),
             "training_samples": 0 if self._training_frame is None else len(self._training_frame),
+            "model_version": self._model_version,
+            "result_cache": self._result_cache.get_stats(),
         }
 
+    def reset_models(self) -> None:
+        """丢弃训练数据与模型，下次请求时重新加载并训练"""
+        self.forecaster = create_demand_forecaster()
+        self.sla_predictor = MLSLAPredictor()
+        self._training_frame = None
+        self._forecast_reference_date = None
+        self._factor_tables = None
+        self._result_cache.clear()
+
     def _ensure_models(self) -> None:
         training = self._get_training_frame()
+        reloaded = False
         if not self.forecaster.is_trained:
             self.forecaster.train(training.copy())
+            reloaded = True
         if not self.sla_predictor.is_trained:
             self.sla_predictor.train(training.copy())
+            reloaded = True
+        if self._factor_tables is None:
+            self._factor_tables = self._build_factor_tables(training)
+            reloaded = True
+
+        # 模型变化后旧的预测结果全部失效
+        if reloaded:
+            self._model_version += 1
+            self._result_cache.clear()
 
     def _get_training_frame(self) -> pd.DataFrame:
         if self._training_frame is not None:
             return self._training_frame
 
         try:
-            daily = pd.DataFrame(self.data_service.get_daily_orders())
+            daily = self.data_service.get_daily_demand_frame()
         except Exception as exc:
-            logger.warning("Failed to load daily orders from data service: %s", exc)
+            logger.warning("Failed to load daily demand from data service: %s", exc)
             daily = pd.DataFrame()
 
         if daily.empty:
@@ -548,8 +738,8 @@ class ForecastingService:
             self._forecast_reference_date = pd.to_datetime(self._training_frame["order_date"]).max().date()
             return self._training_frame
 
-        daily = daily.rename(columns={"dt": "order_date"})
-        daily["order_date"] = pd.to_datetime(daily["order_date"])
+        # 需求立方体已带解析好的 date 列，不再解析 dt 字符串
+        daily = daily.drop(columns="dt").rename(columns={"date": "order_date"})
         if "store_code" not in daily.columns:
             daily["store_code"] = "10001"
         daily["fulfillment_store_code"] = daily["store_code"].astype(str)
@@ -610,35 +800,58 @@ class ForecastingService:
 
         return data
 
-    def _build_forecast_lookup(self, stores: List[str], end_date: date) -> Dict[tuple[str, date], Dict[str, float]]:
-        lookup: Dict[tuple[str, date], Dict[str, float]] = {}
+    def _build_forecast_frame(self, stores: List[str], end_date: date) -> pd.DataFrame:
+        columns = ["store_id", "date", "model_predicted", "model_lower", "model_upper"]
         horizon = max(0, (end_date - (self._forecast_reference_date or end_date)).days)
         if horizon <= 0:
-            return lookup
+            return pd.DataFrame(columns=columns).astype({"date": "datetime64[ns]", "store_id": object})
 
         forecasts = self.forecaster.predict(forecast_horizon=horizon)
         # 将门店ID统一转为字符串进行比较
         stores_set = set(str(s) for s in stores)
-        for forecast in forecasts:
-            store_code_str = str(forecast.store_code)
-            if store_code_str not in stores_set:
-                continue
-            lookup[(store_code_str, forecast.forecast_date)] = {
-                "predicted": float(forecast.predicted_demand),
-                "lower": float(forecast.confidence_intervals.get("P10", forecast.predicted_demand)),
-                "upper": float(forecast.confidence_intervals.get("P90", forecast.predicted_demand)),
+        rows = [
+            (
+                str(forecast.store_code),
+                pd.Timestamp(forecast.forecast_date),
+                float(forecast.predicted_demand),
+                float(forecast.confidence_intervals.get("P10", forecast.predicted_demand)),
+                float(forecast.confidence_intervals.get("P90", forecast.predicted_demand)),
+            )
+            for forecast in forecasts
+            if str(forecast.store_code) in stores_set
+        ]
+        frame = pd.DataFrame(rows, columns=columns).astype({"date": "datetime64[ns]", "store_id": object})
+        return frame.drop_duplicates(["store_id", "date"], keep="last")
+
+    @staticmethod
+    def _build_actual_frame(training: pd.DataFrame) -> pd.DataFrame:
+        # 统一转为字符串类型
+        actuals = pd.DataFrame(
+            {
+                "store_id": training["fulfillment_store_code"].astype(str).to_numpy(),
+                "date": pd.to_datetime(training["order_date"]).dt.normalize().to_numpy(),
+                "actual_total": pd.to_numeric(training["total_quantity"], errors="coerce").astype(float).to_numpy(),
             }
-        return lookup
+        )
+        return actuals.drop_duplicates(["store_id", "date"], keep="last")
+
+    def _get_forecast_hierarchy(self, store_ids: List[str]) -> ForecastHierarchy:
+        """根据门店所属区域构建预测层级"""
+        if not self._store_district_cache:
+            self._load_store_names_cache()
+        return ForecastHierarchy.from_store_districts(
+            {sid: self._store_district_cache.get(sid, "Unknown") for sid in store_ids}
+        )
 
     @staticmethod
-    def _build_actual_lookup(training: pd.DataFrame) -> Dict[tuple[str, date], float]:
-        actuals: Dict[tuple[str, date], float] = {}
-        for row in training.itertuples(index=False):
-            # 统一转为字符串类型
-            store_code = str(row.fulfillment_store_code)
-            order_date = pd.to_datetime(row.order_date).date()
-            actuals[(store_code, order_date)] = float(row.total_quantity)
-        return actuals
+    def _pivot_store_demand(rows: List[Dict[str, Any]], stores: List[str], dates: List[date]) -> np.ndarray:
+        """汇总各SKU预测为 (门店数, 天数) 的需求矩阵"""
+        if not rows:
+            return np.zeros((len(stores), len(dates)))
+        frame = pd.DataFrame(rows)
+        pivot = frame.pivot_table(index="store_id", columns="date", values="forecast_demand", aggfunc="sum", fill_value=0.0)
+        pivot = pivot.reindex(index=stores, columns=[d.isoformat() for d in dates], fill_value=0.0)
+        return pivot.to_numpy(dtype=float)
 
     def _get_store_name(self, store_id: str) -> str:
         """Cached store name lookup"""
@@ -657,23 +870,30 @@ class ForecastingService:
         return {sid: self._store_name_cache.get(sid, f"Store {sid}") for sid in store_ids}
     
     def _load_store_names_cache(self) -> None:
-        """加载门店名称到缓存"""
-        if self._store_name_cache:
+        """加载门店名称与所属区域到缓存"""
+        if self._store_name_cache and self._store_district_cache:
             return
         
         try:
             stores = self.data_service.get_stores()
             for store in stores:
-                self._store_name_cache[str(store["store_code"])] = store["store_name"]
+                self._store_name_cache.setdefault(str(store["store_code"]), store["store_name"])
+                self._store_district_cache[str(store["store_code"])] = store.get("district") or "Unknown"
             logger.info(f"Cached {len(self._store_name_cache)} store names")
         except Exception as e:
             logger.warning(f"Failed to load store names: {e}")
 
+    def _get_sla_window(self, store_ids: Optional[List[str]], forecast_days: int) -> Tuple[List[str], List[date]]:
+        training = self._get_training_frame()
+        stores = [str(s) for s in (store_ids or sorted(training["fulfillment_store_code"].astype(str).unique().tolist()))]
+        reference = self.sla_predictor.reference_date
+        return stores, [reference + timedelta(days=offset) for offset in range(1, forecast_days + 1)]
+
     @staticmethod
     def _describe_alert(alert: Dict[str, Any]) -> str:
         if alert["alert_type"] == "sla_risk":
             return f"门店 {alert['store_code']} 预测SLA降至 {alert['predicted_sla']:.1%}"
-        high_risk = ", ".join(alert.get("high_risk_factors", {}).keys()) or "多项风险因子"
+        high_risk = ", ".join((alert.get("high_risk_factors") or {}).keys()) or "多项风险因子"
         return f"门店 {alert['store_code']} 出现高风险因子: {high_risk}"
 
 
@@ -0,0 +1,166 @@
+"""
+Inventory projection.
+Vectorized stock projection over (entity x day) arrays: cumulative sums replace the
+day-by-day stock walk, and searchsorted finds stockout / reorder days for every row at once.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+WEEKDAY_NAMES = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+
+@dataclass
+class InventoryProjection:
+    """
+    库存推演结果，所有数组形状为 (行数, 天数)
+
+    - opening: 每天期初库存
+    - available: 每天期末可用库存（不足时截断为0，缺货即损失）
+    - lost_sales: 截至当天的累计未满足需求
+    - stockout_day / reorder_day: 每行首次缺货 / 首次低于再订货点的天序号，未发生为天数
+    """
+
+    opening: np.ndarray
+    available: np.ndarray
+    lost_sales: np.ndarray
+    stockout_day: np.ndarray
+    reorder_day: np.ndarray
+
+
+def first_day_exceeding(cumulative: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """
+    每行单调不减序列首次严格超过阈值的位置
+
+    行间加互不重叠的偏移量后拼成一条有序数组，一次 searchsorted 完成全部行。
+    """
+    cumulative = np.asarray(cumulative, dtype=float)
+    rows, days = cumulative.shape
+    if rows == 0 or days == 0:
+        return np.full(rows, days, dtype=int)
+
+    thresholds = np.broadcast_to(np.asarray(thresholds, dtype=float), (rows,))
+    low = min(cumulative.min(), thresholds.min())
+    span = max(cumulative.max(), thresholds.max()) - low + 1.0
+    offsets = np.arange(rows) * span
+    flat = (cumulative - low + offsets[:, None]).ravel()
+    positions = np.searchsorted(flat, thresholds - low + offsets, side="right")
+    return positions - np.arange(rows) * days
+
+
+def project_inventory(
+    initial_stock: np.ndarray,
+    arrivals: np.ndarray,
+    demand: np.ndarray,
+    reorder_point: Optional[np.ndarray] = None,
+) -> InventoryProjection:
+    """
+    库存推演: available[t] = max(0, available[t-1] + arrivals[t] - demand[t])
+
+    截断递推等价于累计净流量减去其历史最低点（反射随机游走），整段期间一次 cumsum 算出；
+    累计缺货量单调不减，可直接 searchsorted 找首次缺货日。
+    """
+    initial_stock = np.asarray(initial_stock, dtype=float)
+    arrivals = np.asarray(arrivals, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+
+    walk = initial_stock[:, None] + np.cumsum(arrivals - demand, axis=1)
+    floor = np.minimum(np.minimum.accumulate(walk, axis=1), 0.0)
+    available = np.maximum(walk - floor, 0.0)
+    lost_sales = -floor
+    opening = np.column_stack([initial_stock, available[:, :-1]]) if demand.shape[1] else available
+
+    if reorder_point is None:
+        reorder_point = np.zeros_like(available)
+    shortfall = np.maximum.accumulate(np.asarray(reorder_point, dtype=float) - available, axis=1)
+
+    return InventoryProjection(
+        opening=opening,
+        available=available,
+        lost_sales=lost_sales,
+        stockout_day=first_day_exceeding(lost_sales, np.full(len(available), 1e-9)),
+        reorder_day=first_day_exceeding(shortfall, np.zeros(len(available))),
+    )
+
+
+def classify_stock_status(
+    available: np.ndarray,
+    demand: np.ndarray,
+    safety_ratio: float = 0.25,
+    overstock_ratio: float = 2.2,
+    overstock_margin: float = 40.0,
+) -> np.ndarray:
+    """低于安全缓冲为 shortage，高于需求倍数加余量为 overstock，否则 normal"""
+    return np.where(
+        available < demand * safety_ratio,
+        "shortage",
+        np.where(available > demand * overstock_ratio + overstock_margin, "overstock", "normal"),
+    )
+
+
+def forecast_store_replenishment(
+    daily: pd.DataFrame,
+    days_ahead: int,
+    start: Optional[date] = None,
+    history_days: int = 30,
+    weekend_factor: float = 1.2,
+    safety_z: float = 1.28,
+) -> Dict[str, object]:
+    """
+    基于每日订单汇总，为所有门店一次生成未来 days_ahead 天的补货建议
+
+    Args:
+        daily: DataFrame[dt, store_code, order_count, total_quantity]
+        start: 预测首日，默认明天
+
+    Returns:
+        dates、weekdays，以及按门店排列的 (门店 × 天) 数组:
+        predicted_orders、predicted_quantity、safety_stock，和每店的
+        days_of_cover / reorder_day（期初按首日安全库存备货时的覆盖天数与再订货日）
+    """
+    start = start or date.today() + timedelta(days=1)
+    dates = [start + timedelta(days=offset) for offset in range(days_ahead)]
+    weekend = np.array([1.0 if day.weekday() < 5 else weekend_factor for day in dates])
+
+    frame = daily.assign(dt=pd.to_datetime(daily["dt"]))
+    recent = frame[frame["dt"] > frame.groupby("store_code")["dt"].transform("max") - pd.Timedelta(days=history_days)]
+    stats = recent.groupby("store_code").agg(
+        avg_orders=("order_count", "mean"),
+        avg_quantity=("total_quantity", "mean"),
+        std_quantity=("total_quantity", lambda values: float(np.std(values))),
+    )
+
+    predicted_orders = np.floor(stats["avg_orders"].to_numpy()[:, None] * weekend)
+    predicted_quantity = np.floor(stats["avg_quantity"].to_numpy()[:, None] * weekend)
+    safety_stock = np.floor(predicted_quantity + safety_z * stats["std_quantity"].to_numpy()[:, None])
+
+    # 期初按首日安全库存备货、不再到货时，累计需求超过期初库存的那天即缺货
+    on_hand = safety_stock[:, 0] if days_ahead else np.zeros(len(stats))
+    cumulative_demand = np.cumsum(predicted_quantity, axis=1)
+    days_of_cover = first_day_exceeding(cumulative_demand, on_hand)
+    buffer = safety_stock[:, 0] - predicted_quantity[:, 0] if days_ahead else np.zeros(len(stats))
+    reorder_day = first_day_exceeding(cumulative_demand, on_hand - buffer)
+
+    return {
+        "store_codes": stats.index.tolist(),
+        "dates": dates,
+        "weekdays": [WEEKDAY_NAMES[day.weekday()] for day in dates],
+        "avg_orders": stats["avg_orders"].to_numpy(),
+        "avg_quantity": stats["avg_quantity"].to_numpy(),
+        "predicted_orders": predicted_orders,
+        "predicted_quantity": predicted_quantity,
+        "safety_stock": safety_stock,
+        "days_of_cover": days_of_cover,
+        "reorder_day": reorder_day,
+    }
+
+
+def day_to_date(dates: List[date], day_index: int) -> Optional[str]:
+    """天序号 → ISO 日期，超出展望期返回 None"""
+    return dates[day_index].isoformat() if day_index < len(dates) else None
@@ -0,0 +1,268 @@
+"""
+Indexed in-memory order store.
+Secondary indexes by store, status, date and SLA state with filter push-down and cursor pagination.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def field_getter(name: str) -> Callable[[Any], Any]:
+    """按名称取字段，兼容 dict 与对象（pydantic 模型 / dataclass）"""
+    def get(record: Any) -> Any:
+        return record[name] if isinstance(record, dict) else getattr(record, name)
+    return get
+
+
+class InvalidCursorError(ValueError):
+    """分页游标不是本存储返回的 next_cursor"""
+
+
+@dataclass
+class OrderPage:
+    """一页查询结果"""
+    items: List[Any]
+    total: int
+    next_cursor: Optional[str] = None
+
+
+class IndexedOrderStore:
+    """
+    带二级索引的内存订单存储
+
+    - 主键: 订单号 → 位置；记录按写入顺序占据位置 0..n-1，更新不改变位置
+    - 等值索引: 每个索引字段 值 → 递增的位置列表（即有序数组）
+    - 日期索引: 按日期键（YYYY-MM-DD）排序的位置数组，区间查询为两次二分 O(log n)
+    - 查询下推: 从最小的候选集出发，其余条件在候选位置上用 numpy 向量化过滤；
+      同一组条件的结果按数据版本缓存，翻页只是切片，与订单总数无关
+    - 游标: 上一页最后一条记录的位置，下一页在候选数组中二分定位
+    """
+
+    def __init__(
+        self,
+        key: Callable[[Any], Hashable],
+        indexes: Dict[str, Callable[[Any], Hashable]],
+        date_key: Callable[[Any], Optional[str]],
+        max_cached_queries: int = 64,
+    ):
+        self._key = key
+        self._index_funcs = indexes
+        self._date_key = date_key
+        self.max_cached_queries = max_cached_queries
+
+        self._records: List[Any] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._postings: Dict[str, Dict[Hashable, List[int]]] = {name: {} for name in indexes}
+        self._value_codes: Dict[str, Dict[Hashable, int]] = {name: {} for name in indexes}
+        self._codes: Dict[str, List[int]] = {name: [] for name in indexes}
+        self._dates: List[str] = []
+
+        self._version = 0
+        self._arrays: Optional[Tuple[int, Dict[str, np.ndarray], np.ndarray, np.ndarray, np.ndarray]] = None
+        self._query_cache: "OrderedDict[Tuple[Hashable, ...], np.ndarray]" = OrderedDict()
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, order_key: Hashable) -> bool:
+        return order_key in self._positions
+
+    # ==================== 写入 ====================
+
+    def upsert(self, record: Any) -> None:
+        """写入或按主键替换一条记录，同步维护全部索引"""
+        order_key = self._key(record)
+        date_value = str(self._date_key(record) or '')[:10]
+        with self.lock:
+            position = self._positions.get(order_key)
+            if position is None:
+                position = len(self._records)
+                self._positions[order_key] = position
+                self._records.append(record)
+                self._dates.append(date_value)
+                for name, func in self._index_funcs.items():
+                    value = func(record)
+                    self._postings[name].setdefault(value, []).append(position)
+                    self._codes[name].append(self._code(name, value))
+            else:
+                self._records[position] = record
+                self._dates[position] = date_value
+                for name, func in self._index_funcs.items():
+                    value = func(record)
+                    code = self._code(name, value)
+                    if self._codes[name][position] == code:
+                        continue
+                    old_value = self._decode(name, self._codes[name][position])
+                    old_posting = self._postings[name][old_value]
+                    del old_posting[bisect_left(old_posting, position)]
+                    insort(self._postings[name].setdefault(value, []), position)
+                    self._codes[name][position] = code
+            self._version += 1
+            self._query_cache.clear()
+
+    def extend(self, records: Iterable[Any]) -> None:
+        """批量写入"""
+        with self.lock:
+            for record in records:
+                self.upsert(record)
+
+    def get(self, order_key: Hashable) -> Optional[Any]:
+        """按主键取记录 O(1)"""
+        position = self._positions.get(order_key)
+        return self._records[position] if position is not None else None
+
+    # ==================== 查询 ====================
+
+    def query(
+        self,
+        filters: Optional[Dict[str, Hashable]] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        key_fragment: Optional[str] = None,
+    ) -> OrderPage:
+        """
+        条件查询并分页
+
+        Args:
+            filters: {索引字段: 值}，值为 None 的条件忽略
+            date_from / date_to: 日期闭区间（按前10位 YYYY-MM-DD 比较）
+            offset / limit: 偏移分页；给出 cursor 时忽略 offset
+            cursor: 上一页返回的 next_cursor，格式无效时抛出 InvalidCursorError
+            key_fragment: 订单号子串，在其余条件的候选集内匹配
+        """
+        with self.lock:
+            candidates = self._select(filters, date_from, date_to, key_fragment)
+            if cursor:
+                start = int(np.searchsorted(candidates, self._cursor_position(cursor), side='right'))
+            else:
+                start = max(offset, 0)
+            chunk = candidates[start:start + limit]
+            items = [self._records[position] for position in chunk.tolist()]
+            has_more = start + limit < len(candidates)
+            return OrderPage(items=items, total=len(candidates),
+                             next_cursor=str(int(chunk[-1])) if has_more and len(chunk) else None)
+
+    def count_by(
+        self,
+        name: str,
+        filters: Optional[Dict[str, Hashable]] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        key_fragment: Optional[str] = None,
+    ) -> Dict[Hashable, int]:
+        """满足条件的记录按某个索引字段计数"""
+        with self.lock:
+            candidates = self._select(filters, date_from, date_to, key_fragment)
+            codes, _, _, _ = self._materialize()
+            counts = np.bincount(codes[name][candidates], minlength=len(self._value_codes[name]))
+            return {
+                value: int(counts[code])
+                for value, code in self._value_codes[name].items() if counts[code]
+            }
+
+    def _select(
+        self,
+        filters: Optional[Dict[str, Hashable]],
+        date_from: Optional[str],
+        date_to: Optional[str],
+        key_fragment: Optional[str] = None,
+    ) -> np.ndarray:
+        """满足全部条件的位置数组（递增）"""
+        active = {name: value for name, value in (filters or {}).items() if value is not None}
+        date_from = date_from[:10] if date_from else None
+        date_to = date_to[:10] if date_to else None
+        cache_key = (tuple(sorted(active.items(), key=lambda item: item[0])), date_from, date_to, key_fragment)
+
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            self._query_cache.move_to_end(cache_key)
+            return cached
+
+        if key_fragment:
+            # 子串匹配：精确订单号只是其中一种情况，其他包含该片段的订单号同样返回
+            base = self._select(active, date_from, date_to)
+            keys = [str(self._key(self._records[position])) for position in base.tolist()]
+            matched = np.fromiter((key_fragment in key for key in keys), dtype=bool, count=len(keys))
+            return self._remember(cache_key, base[matched])
+
+        codes, dates, date_order, sorted_dates = self._materialize()
+        sources: List[Tuple[int, str]] = []
+        for name, value in active.items():
+            if name not in self._index_funcs:
+                raise KeyError(f"Unknown index: {name}")
+            posting = self._postings[name].get(value)
+            if not posting:
+                return self._remember(cache_key, np.empty(0, dtype=np.int64))
+            sources.append((len(posting), name))
+
+        date_range = None
+        if date_from or date_to:
+            lo = int(np.searchsorted(sorted_dates, date_from, side='left')) if date_from else 0
+            hi = int(np.searchsorted(sorted_dates, date_to, side='right')) if date_to else len(sorted_dates)
+            date_range = (lo, max(lo, hi))
+            sources.append((date_range[1] - date_range[0], '__date__'))
+
+        if not sources:
+            return self._remember(cache_key, np.arange(len(self._records), dtype=np.int64))
+
+        # 最小候选集作为起点，其余条件在候选位置上向量化过滤
+        _, first = min(sources)
+        if first == '__date__':
+            candidates = np.sort(date_order[date_range[0]:date_range[1]])
+        else:
+            candidates = np.asarray(self._postings[first][active[first]], dtype=np.int64)
+
+        mask = np.ones(len(candidates), dtype=bool)
+        for name, value in active.items():
+            if name != first:
+                mask &= codes[name][candidates] == self._value_codes[name][value]
+        if date_range is not None and first != '__date__':
+            candidate_dates = dates[candidates]
+            if date_from:
+                mask &= candidate_dates >= date_from
+            if date_to:
+                mask &= candidate_dates <= date_to
+        return self._remember(cache_key, candidates[mask])
+
+    @staticmethod
+    def _cursor_position(cursor: str) -> int:
+        try:
+            position = int(cursor)
+        except (TypeError, ValueError):
+            position = -1
+        if position < 0:
+            raise InvalidCursorError(f"无效的分页游标: {cursor!r}")
+        return position
+
+    def _remember(self, cache_key: Tuple[Hashable, ...], positions: np.ndarray) -> np.ndarray:
+        self._query_cache[cache_key] = positions
+        while len(self._query_cache) > self.max_cached_queries:
+            self._query_cache.popitem(last=False)
+        return positions
+
+    def _materialize(self) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, np.ndarray]:
+        """当前版本的列数组与日期排序（写入后首次查询时重建一次）"""
+        if self._arrays is None or self._arrays[0] != self._version:
+            codes = {name: np.asarray(values, dtype=np.int64) for name, values in self._codes.items()}
+            dates = np.asarray(self._dates, dtype='U10')
+            date_order = np.argsort(dates, kind='stable')
+            self._arrays = (self._version, codes, dates, date_order, dates[date_order])
+        _, codes, dates, date_order, sorted_dates = self._arrays
+        return codes, dates, date_order, sorted_dates
+
+    def _code(self, name: str, value: Hashable) -> int:
+        return self._value_codes[name].setdefault(value, len(self._value_codes[name]))
+
+    def _decode(self, name: str, code: int) -> Hashable:
+        return next(value for value, value_code in self._value_codes[name].items() if value_code == code)
@@ -10,7 +10,10 @@
 
 import pandas as pd
 import numpy as np
+import io
+import os
 import json
+import hashlib
 import logging
 import requests
 from datetime import datetime, date, timedelta
@@ -20,6 +23,7 @@ import schedule
 import time
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from pandas.api.types import union_categoricals
 
 try:
     from .data_schema import (
@@ -35,6 +39,19 @@ except ImportError:
     )
     from .interfaces import DataFetcher, DataProcessor, Logger
 
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 集成数据集的列式字段（订单 → 门店 → 日历）
+INTEGRATED_ORDER_COLUMNS = ['order_id', 'user_id', 'fulfillment_store_code', 'order_date',
+                            'total_quantity', 'unique_sku_count']
+INTEGRATED_STORE_COLUMNS = ['store_code', 'latitude', 'longitude', 'district', 'address', 'geocode_status']
+WEATHER_FEATURES = ['temperature_high', 'temperature_low', 'humidity', 'rainfall']
+INTEGRATED_MAX_PARTS = 32  # 增量分片数超过后整体重写一次集成数据集文件
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -66,6 +83,18 @@ class DataPipeline:
         # 缓存时间戳
         self._cache_timestamps = {}
         
+        # 变更检测: 本地文件签名、远程源 ETag/Last-Modified、远程数据摘要、订单水位线
+        self._file_signatures: Dict[str, Dict[str, Any]] = {}
+        self._cache_files: Dict[str, Path] = {}
+        self._remote_validators: Dict[str, Dict[str, str]] = {}
+        self._source_digests: Dict[str, str] = {}
+        self._order_watermark: Optional[pd.Timestamp] = None
+        self._watermark_order_ids: set = set()
+        self._orders_range: Tuple[Optional[date], Optional[date]] = (None, None)
+        self._orders_frame: Optional[pd.DataFrame] = None
+        self._new_order_frames: List[pd.DataFrame] = []
+        self._integrated_cache: Optional[pd.DataFrame] = None
+        
         # 数据质量统计
         self.quality_stats = {
             'last_update': None,
@@ -86,7 +115,13 @@ class DataPipeline:
             'batch_size': 1000,  # 批处理大小
             'max_workers': 4,    # 最大并发数
             'retry_attempts': 3,  # 重试次数
-            'timeout_seconds': 30  # 超时时间
+            'timeout_seconds': 30,  # 超时时间
+            'incremental_refresh_minutes': 30,  # 增量刷新间隔(分钟)
+            # 支持条件请求的远程数据源（交通为实时POST接口，不做探测）
+            'source_urls': {
+                'weather': 'https://data.weather.gov.hk/weatherAPI/opendata/weather.php?dataType=fnd&lang=en',
+                'holidays': 'https://www.1823.gov.hk/common/ical/en.json'
+            }
         }
     
     # ==================== 数据加载方法 ====================
@@ -110,6 +145,7 @@ class DataPipeline:
                 
                 self._store_locations_cache = locations
                 self._cache_timestamps[cache_key] = datetime.now()
+                self._remember_file(cache_key, enhanced_coords_file)
                 self.quality_stats['total_stores'] = len(locations)
                 
                 logger.info(f"✅ 成功加载 {len(locations)} 个门店位置")
@@ -139,20 +175,23 @@ class DataPipeline:
             # 加载订单详情
             order_file = self.raw_data_path / "case_study_order_detail-000000000000.csv"
             if order_file.exists():
-                df = pd.read_csv(order_file)
+                signature, content = self._read_with_signature(order_file)
+                df = pd.read_csv(io.BytesIO(content) if content is not None else order_file)
+                
+                # 水位线按整个文件计算，与本次的日期过滤无关
+                self._order_watermark, self._watermark_order_ids = None, set()
+                self._advance_order_watermark(df)
                 
                 # 日期过滤
-                if start_date or end_date:
-                    df['dt'] = pd.to_datetime(df['dt'])
-                    if start_date:
-                        df = df[df['dt'] >= pd.to_datetime(start_date)]
-                    if end_date:
-                        df = df[df['dt'] <= pd.to_datetime(end_date)]
+                df = self._filter_order_range(df, start_date, end_date)
                 
                 orders = dataframe_to_order_details(df)
                 
                 self._orders_cache = orders
+                self._orders_frame = self._order_frame(df)
+                self._orders_range = (start_date, end_date)
                 self._cache_timestamps[cache_key] = datetime.now()
+                self._remember_file(cache_key, order_file, signature)
                 self.quality_stats['total_orders'] = len(orders)
                 
                 logger.info(f"✅ 成功加载 {len(orders)} 个订单")
@@ -287,60 +326,11 @@ class DataPipeline:
             holidays = self.load_holiday_data()
             traffic = self.load_traffic_data()
             
-            # 转换为DataFrame
-            stores_df = pd.DataFrame([{
-                'store_code': s.store_code,
-                'latitude': s.latitude,
-                'longitude': s.longitude,
-                'district': s.district,
-                'address': s.address,
-                'geocode_status': s.geocode_status.value
-            } for s in stores])
-            
-            orders_df = pd.DataFrame([{
-                'order_id': o.order_id,
-                'user_id': o.user_id,
-                'fulfillment_store_code': o.fulfillment_store_code,
-                'order_date': o.order_date,
-                'total_quantity': o.total_quantity,
-                'unique_sku_count': o.unique_sku_count
-            } for o in orders])
-            
-            # 集成订单和门店数据
-            integrated_df = orders_df.merge(
-                stores_df,
-                left_on='fulfillment_store_code',
-                right_on='store_code',
-                how='left'
-            )
-            
-            # 添加时间特征
-            integrated_df['order_date'] = pd.to_datetime(integrated_df['order_date'])
-            integrated_df['weekday'] = integrated_df['order_date'].dt.dayofweek
-            integrated_df['is_weekend'] = integrated_df['weekday'].isin([5, 6])
-            
-            # 添加假期标记
-            holiday_dates = {h.date for h in holidays}
-            integrated_df['is_holiday'] = integrated_df['order_date'].dt.date.isin(holiday_dates)
-            
-            # 添加天气特征（简化处理）
-            if weather:
-                weather_dict = {w.date: {
-                    'temperature_high': w.temperature_high,
-                    'temperature_low': w.temperature_low,
-                    'humidity': w.humidity,
-                    'condition': w.condition.value,
-                    'rainfall': w.rainfall
-                } for w in weather}
-                
-                for col in ['temperature_high', 'temperature_low', 'humidity', 'rainfall']:
-                    integrated_df[f'weather_{col}'] = integrated_df['order_date'].dt.date.map(
-                        lambda x: weather_dict.get(x, {}).get(col, np.nan)
-                    )
-                
-                integrated_df['weather_condition'] = integrated_df['order_date'].dt.date.map(
-                    lambda x: weather_dict.get(x, {}).get('condition', 'unknown')
-                )
+            orders_df = self._orders_frame if self._orders_frame is not None else self._orders_to_frame(orders)
+            integrated_df = self._integrate_orders(orders_df, stores, weather, holidays)
+            self._integrated_cache = integrated_df
+            self._new_order_frames = []
+            self.save_integrated_dataset(integrated_df)
             
             logger.info(f"✅ 成功创建集成数据集，包含 {len(integrated_df)} 条记录")
             return integrated_df
@@ -350,6 +340,201 @@ class DataPipeline:
             self.quality_stats['error_count'] += 1
             return pd.DataFrame()
     
+    def get_integrated_dataset(self) -> pd.DataFrame:
+        """获取集成数据集（优先使用增量维护的缓存）"""
+        if self._integrated_cache is not None:
+            return self._integrated_cache
+        return self.create_integrated_dataset()
+    
+    @property
+    def integrated_artifact_path(self) -> Path:
+        """集成数据集的列式文件位置"""
+        return self.processed_data_path / ".columnar_cache" / "integrated_dataset.parquet"
+    
+    @property
+    def integrated_parts_path(self) -> Path:
+        """增量追加的分片目录（每次追加写一个 part 文件，读取时接在主文件之后）"""
+        return self.integrated_artifact_path.with_name("integrated_dataset.parts")
+    
+    def _integrated_part_files(self) -> List[Path]:
+        parts_path = self.integrated_parts_path
+        return sorted(parts_path.glob("part-*.parquet")) if parts_path.exists() else []
+    
+    @staticmethod
+    def _write_parquet_atomic(df: pd.DataFrame, path: Path) -> None:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    
+    def save_integrated_dataset(self, integrated_df: pd.DataFrame) -> Optional[Path]:
+        """
+        把集成数据集整体写为 Parquet（保留 category 类型），先写临时文件再原子替换
+        
+        整体重写时清空增量分片：先删分片再替换主文件，读取方不会看到重复行
+        """
+        if not PYARROW_AVAILABLE:
+            return None
+        
+        path = self.integrated_artifact_path
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            for part in self._integrated_part_files():
+                part.unlink()
+            self._write_parquet_atomic(integrated_df, path)
+            return path
+        except Exception as e:
+            logger.warning(f"写入集成数据集失败: {str(e)}")
+            return None
+    
+    def append_integrated_dataset(self, new_rows: pd.DataFrame) -> Optional[Path]:
+        """
+        只把新增行写成一个增量分片，不重写已有文件
+        
+        主文件不存在（尚未整体写过）或分片数超过 INTEGRATED_MAX_PARTS 时改为整体重写内存中的集成数据集。
+        """
+        if not PYARROW_AVAILABLE:
+            return None
+        
+        parts = self._integrated_part_files()
+        if not self.integrated_artifact_path.exists() or len(parts) >= INTEGRATED_MAX_PARTS:
+            if self._integrated_cache is None:
+                return None
+            return self.save_integrated_dataset(self._integrated_cache)
+        
+        try:
+            self.integrated_parts_path.mkdir(parents=True, exist_ok=True)
+            index = int(parts[-1].stem.split('-')[-1]) + 1 if parts else 1
+            part_path = self.integrated_parts_path / f"part-{index:05d}.parquet"
+            self._write_parquet_atomic(new_rows, part_path)
+            return part_path
+        except Exception as e:
+            logger.warning(f"追加集成数据集分片失败: {str(e)}")
+            return None
+    
+    def load_integrated_dataset(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        读取集成数据集，供需求预测与SLA训练使用
+        （ProphetForecaster / MLSLAPredictor 的 train() 直接接受该表结构）
+        
+        Args:
+            columns: 只读取这些列；None 读取全部
+        """
+        if self._integrated_cache is None and PYARROW_AVAILABLE and self.integrated_artifact_path.exists():
+            try:
+                integrated_df = pd.read_parquet(self.integrated_artifact_path, columns=columns)
+                # 按追加顺序接上增量分片，category 列与内存中的增量结果一致
+                for part in self._integrated_part_files():
+                    integrated_df = self._append_integrated(integrated_df, pd.read_parquet(part, columns=columns))
+                return integrated_df
+            except Exception as e:
+                logger.warning(f"读取集成数据集文件失败，重新构建: {str(e)}")
+        
+        integrated_df = self.get_integrated_dataset()
+        return integrated_df[columns] if columns is not None else integrated_df
+    
+    def _integrate_orders(self, orders_df: pd.DataFrame, stores: List[StoreLocation],
+                          weather: List[WeatherData], holidays: List[PublicHoliday]) -> pd.DataFrame:
+        """
+        订单与门店、日历特征做列式连接（全量构建与增量追加共用）
+        
+        - 订单 ⋈ 门店: 两侧门店编码统一为同一个 CategoricalDtype 后 left merge
+        - 日历: 星期/周末/假期/天气只在订单涉及的不重复日期上计算，再按 order_date 一次 merge
+        """
+        stores_df = pd.DataFrame({
+            'store_code': [s.store_code for s in stores],
+            'latitude': np.array([s.latitude for s in stores], dtype=float),
+            'longitude': np.array([s.longitude for s in stores], dtype=float),
+            'district': [s.district for s in stores],
+            'address': [s.address for s in stores],
+            'geocode_status': [getattr(s.geocode_status, 'value', s.geocode_status) for s in stores]
+        }, columns=INTEGRATED_STORE_COLUMNS)
+        
+        store_codes = pd.CategoricalDtype(
+            pd.Index(orders_df['fulfillment_store_code'].astype(str).unique())
+            .union(pd.Index(stores_df['store_code'].unique())).sort_values()
+        )
+        orders_df = orders_df[INTEGRATED_ORDER_COLUMNS].astype({
+            'user_id': 'category',
+            'fulfillment_store_code': store_codes,
+            'order_date': 'datetime64[ns]'
+        })
+        stores_df = stores_df.astype({
+            'store_code': store_codes,
+            'district': 'category',
+            'geocode_status': 'category'
+        })
+        
+        # 集成订单和门店数据
+        integrated_df = orders_df.merge(
+            stores_df,
+            left_on='fulfillment_store_code',
+            right_on='store_code',
+            how='left'
+        )
+        
+        # 日历特征按日期连接
+        calendar = self._calendar_frame(integrated_df['order_date'].drop_duplicates(), weather, holidays)
+        return integrated_df.merge(calendar, on='order_date', how='left')
+    
+    def _calendar_frame(self, order_dates: pd.Series, weather: List[WeatherData],
+                        holidays: List[PublicHoliday]) -> pd.DataFrame:
+        """不重复日期上的时间、假期、天气特征（每个日期一行）"""
+        dates = pd.DatetimeIndex(order_dates.sort_values())
+        calendar = pd.DataFrame({
+            'order_date': dates,
+            'weekday': dates.dayofweek,
+            'is_weekend': dates.dayofweek >= 5,
+            'is_holiday': dates.isin(pd.to_datetime([h.date for h in holidays]))
+        })
+        
+        # 添加天气特征（同一日期多条时以最后一条为准）
+        if weather:
+            weather_df = pd.DataFrame({
+                'order_date': pd.to_datetime([w.date for w in weather]),
+                **{
+                    f'weather_{col}': np.array([getattr(w, col) for w in weather], dtype=float)
+                    for col in WEATHER_FEATURES
+                },
+                'weather_condition': [w.weather_condition.value if w.weather_condition else 'unknown'
+                                      for w in weather]
+            }).drop_duplicates('order_date', keep='last')
+            calendar = calendar.merge(weather_df, on='order_date', how='left')
+            calendar['weather_condition'] = calendar['weather_condition'].fillna('unknown').astype('category')
+        
+        return calendar
+    
+    def _order_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """订单CSV → 集成用的列式订单表（字段与 dataframe_to_order_details 一致）"""
+        return pd.DataFrame({
+            'order_id': df['order_id'].astype(str).to_numpy(),
+            'user_id': df['user_id'].astype(str).to_numpy(),
+            'fulfillment_store_code': df['fulfillment_store_code'].astype(str).to_numpy(),
+            'order_date': pd.to_datetime(df['dt']).dt.normalize().to_numpy(dtype='datetime64[ns]'),
+            'total_quantity': df['total_quantity_cnt'].astype('int64').to_numpy(),
+            'unique_sku_count': df['unique_sku_cnt'].astype('int64').to_numpy()
+        }, columns=INTEGRATED_ORDER_COLUMNS)
+    
+    def _orders_to_frame(self, orders: List[OrderDetail]) -> pd.DataFrame:
+        """OrderDetail 列表 → 列式订单表（无原始CSV时使用）"""
+        return pd.DataFrame({
+            'order_id': [o.order_id for o in orders],
+            'user_id': [o.user_id for o in orders],
+            'fulfillment_store_code': [o.fulfillment_store_code for o in orders],
+            'order_date': pd.to_datetime([o.order_date for o in orders]).as_unit('ns'),
+            'total_quantity': np.array([o.total_quantity for o in orders], dtype='int64'),
+            'unique_sku_count': np.array([o.unique_sku_count for o in orders], dtype='int64')
+        }, columns=INTEGRATED_ORDER_COLUMNS)
+    
+    @staticmethod
+    def _append_integrated(integrated_df: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """追加新行，category 列合并类别后保持 category 类型"""
+        combined = pd.concat([integrated_df, new_rows], ignore_index=True)
+        for column in integrated_df.select_dtypes('category').columns:
+            combined[column] = union_categoricals(
+                [integrated_df[column], new_rows[column]], sort_categories=True
+            )
+        return combined
+    
     # ==================== 增强的数据质量检查 ====================
     
     def check_data_quality(self) -> Dict[str, Any]:
@@ -692,6 +877,9 @@ class DataPipeline:
         # 每15分钟更新交通数据
         schedule.every(15).minutes.do(lambda: self.load_traffic_data(force_refresh=True))
         
+        # 定时增量刷新：只重新读取有变化的数据源
+        schedule.every(self.config.get('incremental_refresh_minutes', 30)).minutes.do(self.incremental_refresh)
+        
         # 每天凌晨2点更新所有数据
         schedule.every().day.at("02:00").do(self.full_data_refresh)
         
@@ -741,24 +929,326 @@ class DataPipeline:
             self.quality_stats['last_update'] = datetime.now()
             self.quality_stats['data_completeness'] = results
             
+            # 集成数据集在下次使用时按新数据重建
+            self._integrated_cache = None
+            
             logger.info("✅ 全量数据刷新完成")
             
         except Exception as e:
             logger.error(f"全量数据刷新失败: {str(e)}")
             self.quality_stats['error_count'] += 1
     
+    # ==================== 增量刷新 ====================
+    
+    def incremental_refresh(self) -> Dict[str, Dict[str, Any]]:
+        """
+        增量数据刷新
+        
+        - 本地CSV: 比较 mtime/size，变化时再用内容哈希确认，未变化的文件不重新读取
+        - 订单: 文件只在末尾追加时只解析新增字节；被整体重写时按水位线（最大 dt）取新行
+        - 远程源: 用 ETag/Last-Modified 条件请求探测，取回后再比较数据摘要
+        - 集成数据集: 只有新订单时追加新行；门店/天气/假期变化时才整体重建
+        
+        Returns:
+            {数据源: {'status': 'unchanged'|'reload'|'append', 'rows': 行数, 'seconds': 耗时}}
+        """
+        logger.info("执行增量数据刷新...")
+        started = time.perf_counter()
+        
+        sources = {
+            'stores': self._refresh_store_locations,
+            'orders': self._refresh_orders,
+            'weather': lambda: self._refresh_remote('weather', self.load_weather_data, self._weather_cache),
+            'holidays': lambda: self._refresh_remote(
+                'holidays', lambda force_refresh: self.load_holiday_data(None, force_refresh), self._holidays_cache),
+            'traffic': lambda: self._refresh_remote('traffic', self.load_traffic_data, self._traffic_cache)
+        }
+        
+        report = {}
+        with ThreadPoolExecutor(max_workers=self.config['max_workers']) as executor:
+            futures = {executor.submit(self._timed_refresh, refresh): name for name, refresh in sources.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                report[name] = future.result()
+                logger.info(f"   {name}: {report[name]['status']}, {report[name]['rows']} 条, "
+                            f"耗时 {report[name]['seconds']:.3f}s")
+        
+        # 门店/天气/假期影响已有行的字段，只有这些源不变时才能只追加新订单
+        report['integrated'] = self._timed_refresh(lambda: self._refresh_integrated_dataset(
+            rebuild=any(report[name]['status'] != 'unchanged' for name in ('stores', 'weather', 'holidays'))
+                    or report['orders']['status'] == 'reload'
+        ))
+        logger.info(f"   integrated: {report['integrated']['status']}, {report['integrated']['rows']} 条, "
+                    f"耗时 {report['integrated']['seconds']:.3f}s")
+        
+        self.quality_stats['last_update'] = datetime.now()
+        self.quality_stats['data_completeness'] = {
+            name: len(cache) if cache else 0
+            for name, cache in (('stores', self._store_locations_cache), ('orders', self._orders_cache),
+                                ('weather', self._weather_cache), ('holidays', self._holidays_cache),
+                                ('traffic', self._traffic_cache))
+        }
+        
+        logger.info(f"✅ 增量数据刷新完成，总耗时 {time.perf_counter() - started:.3f}s")
+        return report
+    
+    def _timed_refresh(self, refresh) -> Dict[str, Any]:
+        """执行单个数据源的刷新并计时，失败时保留原缓存"""
+        started = time.perf_counter()
+        try:
+            status, rows = refresh()
+        except Exception as e:
+            logger.error(f"增量刷新失败: {str(e)}")
+            self.quality_stats['error_count'] += 1
+            status, rows = 'error', 0
+        return {'status': status, 'rows': rows, 'seconds': time.perf_counter() - started}
+    
+    def _refresh_store_locations(self) -> Tuple[str, int]:
+        """门店文件变化时重新读取"""
+        coords_file = self.processed_data_path / "store_coordinates_enhanced_v2.csv"
+        changed, _, _ = self._check_file(coords_file)
+        if not changed and self._store_locations_cache is not None:
+            return 'unchanged', len(self._store_locations_cache)
+        return 'reload', len(self.load_store_locations(force_refresh=True))
+    
+    def _refresh_orders(self) -> Tuple[str, int]:
+        """订单增量刷新：追加写入只解析新增部分，整体重写按水位线取新行"""
+        order_file = self.raw_data_path / "case_study_order_detail-000000000000.csv"
+        previous = self._file_signatures.get(str(order_file))
+        if self._orders_cache is None or previous is None:
+            start_date, end_date = self._orders_range
+            orders = self.load_order_data(start_date, end_date, force_refresh=True)
+            return 'reload', len(orders)
+        
+        changed, signature, prefix_digest = self._check_file(order_file)
+        if not changed:
+            return 'unchanged', 0
+        
+        if (prefix_digest == previous['sha1'] and signature['size'] > previous['size']
+                and previous['ends_with_newline']):
+            # 只在末尾追加：表头 + 新增字节
+            with open(order_file, 'rb') as f:
+                header = f.readline()
+                f.seek(previous['size'])
+                df = pd.read_csv(io.BytesIO(header + f.read()))
+        else:
+            # 文件被重写（例如新的全量导出）：只取水位线之后的行
+            df = self._rows_after_watermark(pd.read_csv(order_file))
+        
+        self._advance_order_watermark(df)
+        df = self._filter_order_range(df, *self._orders_range)
+        new_orders = dataframe_to_order_details(df)
+        new_frame = self._order_frame(df)
+        
+        self._orders_cache.extend(new_orders)
+        self._orders_frame = pd.concat([self._orders_frame, new_frame], ignore_index=True)
+        self._new_order_frames.append(new_frame)
+        self._file_signatures[str(order_file)] = signature
+        self.quality_stats['total_orders'] = len(self._orders_cache)
+        return 'append', len(new_orders)
+    
+    def _refresh_remote(self, source: str, loader, cache: Optional[List[Any]]) -> Tuple[str, int]:
+        """远程数据源：条件请求判断是否需要重新获取，获取后按数据摘要判断是否真的变化"""
+        changed, validators = self._probe_remote(source)
+        if not changed and cache is not None:
+            return 'unchanged', len(cache)
+        
+        data = loader(force_refresh=True)
+        digest = hashlib.sha1(repr(data).encode('utf-8')).hexdigest()
+        self._remote_validators[source] = validators
+        if self._source_digests.get(source) == digest:
+            return 'unchanged', len(data)
+        self._source_digests[source] = digest
+        return 'reload', len(data)
+    
+    def _probe_remote(self, source: str) -> Tuple[bool, Dict[str, str]]:
+        """
+        用 If-None-Match / If-Modified-Since 的 HEAD 请求探测远程数据是否更新
+        
+        Returns:
+            (是否可能变化, 最新的 ETag/Last-Modified)；没有配置地址或服务端不返回校验头时视为可能变化
+        """
+        url = self.config.get('source_urls', {}).get(source)
+        if not url:
+            return True, {}
+        
+        known = self._remote_validators.get(source, {})
+        headers = {}
+        if known.get('ETag'):
+            headers['If-None-Match'] = known['ETag']
+        if known.get('Last-Modified'):
+            headers['If-Modified-Since'] = known['Last-Modified']
+        
+        try:
+            response = requests.head(url, headers=headers, timeout=self.config['timeout_seconds'],
+                                     allow_redirects=True)
+        except requests.RequestException as e:
+            logger.warning(f"{source} 数据源探测失败: {e}")
+            return True, known
+        
+        if response.status_code == 304:
+            return False, known
+        validators = {name: response.headers[name] for name in ('ETag', 'Last-Modified')
+                      if response.headers.get(name)}
+        return not validators or validators != known, validators
+    
+    def _refresh_integrated_dataset(self, rebuild: bool) -> Tuple[str, int]:
+        """集成数据集：需要时整体重建，否则只追加新订单对应的行"""
+        new_frames, self._new_order_frames = self._new_order_frames, []
+        stores, weather, holidays = (self._store_locations_cache or [], self._weather_cache or [],
+                                     self._holidays_cache or [])
+        
+        # 各数据源此时已刷新，直接用缓存重建，不再触发加载
+        if rebuild or self._integrated_cache is None:
+            orders_df = (self._orders_frame if self._orders_frame is not None
+                         else self._orders_to_frame(self._orders_cache or []))
+            self._integrated_cache = self._integrate_orders(orders_df, stores, weather, holidays)
+            self.save_integrated_dataset(self._integrated_cache)
+            return 'reload', len(self._integrated_cache)
+        
+        if not new_frames:
+            return 'unchanged', len(self._integrated_cache)
+        
+        new_rows = self._integrate_orders(pd.concat(new_frames, ignore_index=True), stores, weather, holidays)
+        self._integrated_cache = self._append_integrated(self._integrated_cache, new_rows)
+        self.append_integrated_dataset(new_rows)
+        return 'append', len(new_rows)
+    
     # ==================== 辅助方法 ====================
     
     def _is_cache_valid(self, cache_key: str) -> bool:
-        """检查缓存是否有效"""
+        """检查缓存是否有效（本地文件缓存以文件是否变化为准，其余按TTL）"""
         if cache_key not in self._cache_timestamps:
             return False
         
+        if cache_key in self._cache_files:
+            path = self._cache_files[cache_key]
+            signature = self._file_signatures.get(str(path))
+            if signature is None or not path.exists():
+                return False
+            stat = path.stat()
+            return (stat.st_mtime_ns, stat.st_size) == (signature['mtime_ns'], signature['size'])
+        
         cache_time = self._cache_timestamps[cache_key]
         ttl_minutes = self.config['cache_ttl_minutes']
         
         return (datetime.now() - cache_time).total_seconds() < ttl_minutes * 60
     
+    def _file_signature(self, path: Path, prefix_size: int = 0) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        计算文件签名（mtime/size/SHA1），单次读取
+        
+        Returns:
+            (签名, 前 prefix_size 字节的 SHA1)；用于判断文件是否只在末尾追加
+        """
+        stat = path.stat()
+        digest = hashlib.sha1()
+        prefix_digest = None
+        last_byte = b''
+        with open(path, 'rb') as f:
+            remaining = prefix_size
+            while remaining > 0:
+                chunk = f.read(min(1 << 20, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                last_byte = chunk[-1:]
+                remaining -= len(chunk)
+            if prefix_size:
+                prefix_digest = digest.hexdigest()
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+                last_byte = chunk[-1:]
+        
+        signature = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha1': digest.hexdigest(),
+            'ends_with_newline': last_byte == b'\n'
+        }
+        return signature, prefix_digest
+    
+    def _read_with_signature(self, path: Path) -> Tuple[Dict[str, Any], Optional[bytes]]:
+        """
+        读取前先比对 mtime/size：未变时沿用已记录的签名，不读内容（返回 None，由调用方直接读文件）；
+        变化时一次读入全部字节，边读边算签名，调用方直接解析这份字节
+        """
+        previous = self._file_signatures.get(str(path))
+        stat = path.stat()
+        if previous and (stat.st_mtime_ns, stat.st_size) == (previous['mtime_ns'], previous['size']):
+            return previous, None
+        
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            content = f.read()
+        signature = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': len(content),
+            'sha1': hashlib.sha1(content).hexdigest(),
+            'ends_with_newline': content.endswith(b'\n')
+        }
+        return signature, content
+    
+    def _remember_file(self, cache_key: str, path: Path, signature: Optional[Dict[str, Any]] = None):
+        """记录缓存对应的文件及其签名"""
+        self._cache_files[cache_key] = path
+        self._file_signatures[str(path)] = signature or self._file_signature(path)[0]
+    
+    def _check_file(self, path: Path) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+        """
+        检测本地文件是否变化：mtime/size 相同直接判定未变，否则计算内容哈希确认
+        
+        Returns:
+            (是否变化, 当前签名, 旧长度前缀的哈希)
+        """
+        if not path.exists():
+            return False, None, None
+        
+        previous = self._file_signatures.get(str(path))
+        stat = path.stat()
+        if previous and (stat.st_mtime_ns, stat.st_size) == (previous['mtime_ns'], previous['size']):
+            return False, previous, None
+        
+        signature, prefix_digest = self._file_signature(path, previous['size'] if previous else 0)
+        if previous and signature['sha1'] == previous['sha1']:
+            # 只是 touch，内容未变
+            self._file_signatures[str(path)] = signature
+            return False, signature, None
+        return True, signature, prefix_digest
+    
+    def _filter_order_range(self, df: pd.DataFrame, start_date: Optional[date],
+                            end_date: Optional[date]) -> pd.DataFrame:
+        """按订单日期过滤"""
+        if start_date or end_date:
+            df = df.assign(dt=pd.to_datetime(df['dt']))
+            if start_date:
+                df = df[df['dt'] >= pd.to_datetime(start_date)]
+            if end_date:
+                df = df[df['dt'] <= pd.to_datetime(end_date)]
+        return df
+    
+    def _advance_order_watermark(self, df: pd.DataFrame):
+        """用新读入的订单推进水位线（最大 dt 及该日已见的订单号）"""
+        if df.empty:
+            return
+        dt = pd.to_datetime(df['dt'], errors='coerce')
+        latest = dt.max()
+        if pd.isna(latest):
+            return
+        latest_ids = set(df.loc[dt == latest, 'order_id'].astype(str))
+        if self._order_watermark is None or latest > self._order_watermark:
+            self._order_watermark, self._watermark_order_ids = latest, latest_ids
+        elif latest == self._order_watermark:
+            self._watermark_order_ids |= latest_ids
+    
+    def _rows_after_watermark(self, df: pd.DataFrame) -> pd.DataFrame:
+        """水位线之后的订单行；水位线当天只取尚未见过的订单号"""
+        if self._order_watermark is None:
+            return df
+        dt = pd.to_datetime(df['dt'], errors='coerce')
+        same_day_new = (dt == self._order_watermark) & ~df['order_id'].astype(str).isin(self._watermark_order_ids)
+        return df[(dt > self._order_watermark) | same_day_new]
+    
     def _validate_coordinates(self, lat: float, lng: float) -> bool:
         """验证坐标是否在香港范围内"""
         return 22.1 <= lat <= 22.6 and 113.8 <= lng <= 114.5
@@ -814,12 +1304,11 @@ class DataPipeline:
             
             hko_fetcher = HKOWeatherFetcher(timeout=self.config['timeout_seconds'])
             
-            # 获取9天天气预报
-            weather_data = hko_fetcher.fetch_weather_forecast(days=9)
+            # 9天天气预报与当前天气并发获取
+            weather_data, current = hko_fetcher.fetch_forecast_and_current(days=9)
             
-            # 获取当前天气并更新今天的数据
+            # 用当前天气更新今天的数据
             try:
-                current = hko_fetcher.fetch_current_weather()
                 today = date.today()
                 
                 # 如果今天的预报存在，更新实际数据
@@ -836,7 +1325,7 @@ class DataPipeline:
                     weather_data.insert(0, current)
                     
             except Exception as e:
-                logger.warning(f"获取当前天气失败: {e}")
+                logger.warning(f"合并当前天气失败: {e}")
             
             return weather_data
             
@@ -6,12 +6,19 @@ Author: 王晔宸 (Team Lead)
 Date: 2026-03-12
 """
 
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, fields
 from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime, date, time
 from enum import Enum
+import gc
+import logging
+import sys
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
 
 class GeocodeStatus(Enum):
     """地理编码状态枚举"""
@@ -88,9 +95,52 @@ class PromoType(Enum):
     HH_WARE = "hh_ware_periods"
 
 
+# ==================== 紧凑Schema工具 ====================
+
+def _slotted_getstate(self):
+    return [getattr(self, f.name) for f in fields(self)]
+
+
+def _slotted_setstate(self, state):
+    for f, value in zip(fields(self), state):
+        # frozen 实例不能走 __setattr__
+        object.__setattr__(self, f.name, value)
+
+
+def slotted_dataclass(cls=None, *, frozen: bool = False):
+    """
+    带 __slots__ 的 dataclass（等价于 Python 3.10 的 dataclass(slots=True)，兼容 3.9）
+
+    实例不再携带 __dict__，单个实例内存约为普通 dataclass 的一半；
+    不能再给实例动态添加属性，frozen=True 时字段只读且可哈希。
+    """
+    def wrap(cls):
+        cls = dataclass(cls, frozen=frozen)
+        cls_dict = dict(cls.__dict__)
+        field_names = tuple(f.name for f in fields(cls))
+        cls_dict['__slots__'] = field_names
+        for name in field_names:
+            # 默认值已记录在 __init__ 中，类属性会与同名 slot 冲突
+            cls_dict.pop(name, None)
+        cls_dict.pop('__dict__', None)
+        cls_dict.pop('__weakref__', None)
+        slotted = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+        slotted.__qualname__ = cls.__qualname__
+        slotted.__getstate__ = _slotted_getstate
+        slotted.__setstate__ = _slotted_setstate
+        return slotted
+    
+    return wrap if cls is None else wrap(cls)
+
+
+def intern_code(value: Any) -> Any:
+    """门店/SKU 等高重复编码字符串驻留，同值实例共享同一个 str 对象"""
+    return sys.intern(value) if type(value) is str else value
+
+
 # ==================== 核心数据Schema ====================
 
-@dataclass
+@slotted_dataclass
 class StoreSchema:
     """
     门店数据Schema
@@ -129,7 +179,7 @@ class StoreSchema:
         )
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class DateFeatureSchema:
     """
     日期特征Schema
@@ -202,7 +252,7 @@ class DateFeatureSchema:
         )
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class OrderDetailSchema:
     """
     订单明细Schema
@@ -231,7 +281,7 @@ class OrderDetailSchema:
         )
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class FulfillmentDetailSchema:
     """
     履约明细Schema - 订单全生命周期时间戳
@@ -357,6 +407,15 @@ class FulfillmentDetailSchema:
             retry_time=parse_datetime(row.get('retry_time')),
             retry_returned_time=parse_datetime(row.get('retry_returned_time'))
         )
+    
+    @classmethod
+    def from_parsed_record(cls, record: Dict[str, Any]) -> 'FulfillmentDetailSchema':
+        """从已解析时间列的记录创建实例（时间列为 Timestamp / NaT）"""
+        values = {}
+        for column in FULFILLMENT_TIME_COLUMNS:
+            value = record.get(column)
+            values[column] = None if value is None or pd.isna(value) else value.to_pydatetime()
+        return cls(order_id=record['order_id'], **values)
 
 
 # ==================== 外部数据Schema ====================
@@ -465,7 +524,7 @@ class DemandForecastSchema:
         return asdict(self)
 
 
-@dataclass
+@slotted_dataclass
 class RouteStopSchema:
     """路线停靠点Schema"""
     sequence: int                       # 停靠顺序 (0=起点/DC)
@@ -622,6 +681,207 @@ def validate_fulfillment_data(fulfillments: List[FulfillmentDetailSchema]) -> Di
     
     return report
 
+# ==================== 履约SLA列式计算 ====================
+
+FULFILLMENT_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+FULFILLMENT_TIME_COLUMNS = [
+    'order_create_time', 'ready_time', 'assigned_time', 'picking_time', 'picked_time',
+    'packed_time', 'shipped_time', 'in_transit_time', 'ready_for_pickup_time', 'completed_time',
+    'cancel_time', 'refund_time', 'rejected_time', 'rejected_returned_time',
+    'expired_time', 'expired_returned_time', 'retry_time', 'retry_returned_time'
+]
+
+# (指标名, 起始列, 结束列)，与 FulfillmentDetailSchema.calculate_sla_metrics 一致
+SLA_METRIC_STAGES = [
+    ('order_to_pickup_ready_min', 'order_create_time', 'ready_for_pickup_time'),
+    ('picking_duration_min', 'picking_time', 'picked_time'),
+    ('packing_duration_min', 'picked_time', 'packed_time'),
+    ('delivery_duration_min', 'shipped_time', 'ready_for_pickup_time'),
+    ('customer_pickup_duration_min', 'ready_for_pickup_time', 'completed_time'),
+]
+
+# get_status 的判定优先级
+_STATUS_PRIORITY = [
+    ('completed_time', OrderStatus.COMPLETED), ('cancel_time', OrderStatus.CANCELLED),
+    ('refund_time', OrderStatus.REFUNDED), ('rejected_time', OrderStatus.REJECTED),
+    ('expired_time', OrderStatus.EXPIRED), ('ready_for_pickup_time', OrderStatus.READY_FOR_PICKUP),
+    ('in_transit_time', OrderStatus.IN_TRANSIT), ('shipped_time', OrderStatus.SHIPPED),
+    ('packed_time', OrderStatus.PACKED), ('picked_time', OrderStatus.PICKED),
+    ('picking_time', OrderStatus.PICKING), ('assigned_time', OrderStatus.ASSIGNED),
+    ('ready_time', OrderStatus.READY),
+]
+
+
+def parse_fulfillment_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    一次性把履约表的时间列解析为 datetime64
+    
+    先按 CSV 标准格式解析，个别非标准格式的值再逐列推断；无法解析的为 NaT。
+    """
+    parsed = df.copy()
+    for column in FULFILLMENT_TIME_COLUMNS:
+        if column not in parsed.columns or pd.api.types.is_datetime64_any_dtype(parsed[column]):
+            continue
+        raw = parsed[column]
+        values = pd.to_datetime(raw, format=FULFILLMENT_DATETIME_FORMAT, errors='coerce')
+        retry = values.isna() & raw.notna() & (raw.astype(str).str.strip() != '')
+        if retry.any():
+            values[retry] = pd.to_datetime(raw[retry], errors='coerce')
+        parsed[column] = values
+    return parsed
+
+
+def calculate_sla_metrics_frame(df: pd.DataFrame, sla_target_minutes: float = 240.0) -> pd.DataFrame:
+    """
+    列式计算履约SLA指标
+    
+    Args:
+        df: 履约表（时间列未解析时自动解析）
+        sla_target_minutes: 下单至可提货的SLA目标
+    
+    Returns:
+        DataFrame[order_id, status, lead_time, {阶段}(timedelta), {指标}_min, sla_breached]
+        sla_breached 在缺少时间戳时为 <NA>
+    """
+    parsed = parse_fulfillment_frame(df)
+    result = pd.DataFrame({'order_id': parsed['order_id']}, index=parsed.index)
+    
+    missing = pd.Series(pd.NaT, index=parsed.index, dtype='datetime64[ns]')
+    times = {column: parsed[column] if column in parsed.columns else missing for column in FULFILLMENT_TIME_COLUMNS}
+    
+    result['status'] = np.select(
+        [times[column].notna().to_numpy() for column, _ in _STATUS_PRIORITY],
+        [status.value for _, status in _STATUS_PRIORITY],
+        OrderStatus.CREATED.value,
+    )
+    
+    for metric, start, end in SLA_METRIC_STAGES:
+        stage = metric[:-len('_min')]
+        result[stage] = times[end] - times[start]
+        result[metric] = result[stage].dt.total_seconds() / 60
+    
+    result['lead_time'] = result['order_to_pickup_ready']
+    result['sla_breached'] = (result['order_to_pickup_ready_min'] > sla_target_minutes).astype('boolean')
+    result.loc[result['order_to_pickup_ready_min'].isna(), 'sla_breached'] = pd.NA
+    return result
+
+
+def sla_metrics_records(metrics: pd.DataFrame) -> List[Dict[str, float]]:
+    """按行输出 calculate_sla_metrics 格式的字典（仅包含可计算的指标）"""
+    names = [metric for metric, _, _ in SLA_METRIC_STAGES]
+    values = metrics[names].to_numpy(dtype=float)
+    return [
+        {name: float(value) for name, value in zip(names, row) if not np.isnan(value)}
+        for row in values
+    ]
+
+# ==================== 列式批量转换 ====================
+
+ORDER_DATE_FORMAT = '%Y-%m-%d'
+
+# OrderDetailSchema 的字段顺序
+ORDER_FIELDS = ['dt', 'order_id', 'user_id', 'fulfillment_store_code', 'unique_sku_cnt', 'total_quantity_cnt']
+
+
+def _numeric_array(values: pd.Series) -> np.ndarray:
+    """任意列（含 category / string）→ float 数组，无法解析为 NaN"""
+    return pd.to_numeric(values.to_numpy(), errors='coerce').astype(float)
+
+
+def _pydatetime_array(values: pd.Series) -> np.ndarray:
+    """datetime64 列 → datetime 对象数组，NaT 为 None"""
+    out = np.empty(len(values), dtype=object)
+    mask = values.notna().to_numpy()
+    out[mask] = values.to_numpy()[mask].astype('datetime64[us]').tolist()
+    return out
+
+
+def order_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    订单表 → 列数组（与 OrderDetailSchema 字段同名）
+
+    先整列转换类型，dt / 门店 / SKU数 无法解析的行整行剔除（与逐行 from_csv_row 跳过失败行一致），
+    total_quantity_cnt 缺失保留为 NaN。
+    """
+    dt = pd.to_datetime(df['dt'], format=ORDER_DATE_FORMAT, errors='coerce').to_numpy()
+    store = _numeric_array(df['fulfillment_store_code'])
+    skus = _numeric_array(df['unique_sku_cnt'])
+    valid = ~(np.isnat(dt) | np.isnan(store) | np.isnan(skus))
+
+    skipped = len(df) - int(valid.sum())
+    if skipped:
+        logger.warning(f"Skipped {skipped} unparsable order rows")
+
+    return {
+        'dt': dt[valid].astype('datetime64[D]'),
+        'order_id': df['order_id'].to_numpy(dtype=object)[valid],
+        'user_id': df['user_id'].to_numpy(dtype=object)[valid],
+        'fulfillment_store_code': store[valid].astype(np.int32),
+        'unique_sku_cnt': skus[valid].astype(np.int32),
+        'total_quantity_cnt': _numeric_array(df['total_quantity_cnt'])[valid],
+    }
+
+
+@contextmanager
+def _gc_paused():
+    """批量创建大量实例期间暂停循环垃圾回收（新对象之间无引用环，回收只是白白扫描）"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _pooled_list(values: np.ndarray) -> list:
+    """列数组 → Python 对象列表，同值元素共享同一个对象（日期/门店/用户等低基数列）"""
+    if values.dtype == object:
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        uniques = [intern_code(value) for value in uniques.tolist()]
+    else:
+        uniques, codes = np.unique(values, return_inverse=True)
+        uniques = uniques.tolist()
+    pool = np.empty(len(uniques), dtype=object)
+    pool[:] = uniques
+    return pool[codes.reshape(-1)].tolist()
+
+
+def orders_from_frame(df: pd.DataFrame) -> List[OrderDetailSchema]:
+    """订单表批量构建 OrderDetailSchema（结果与逐行 from_csv_row 相同，重复值共享对象）"""
+    columns = order_columns(df)
+    values = [
+        columns[name].tolist() if name == 'order_id' else _pooled_list(columns[name])
+        for name in ORDER_FIELDS
+    ]
+    with _gc_paused():
+        return [OrderDetailSchema(*row) for row in zip(*values)]
+
+
+def fulfillment_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    履约表 → 列数组：order_id 与 18 个时间列（datetime 对象，缺失为 None）
+
+    时间列未解析时先按 parse_fulfillment_frame 解析；表中不存在的时间列全为 None。
+    """
+    parsed = parse_fulfillment_frame(df)
+    columns = {'order_id': parsed['order_id'].to_numpy(dtype=object)}
+    for column in FULFILLMENT_TIME_COLUMNS:
+        if column in parsed.columns:
+            columns[column] = _pydatetime_array(parsed[column])
+        else:
+            columns[column] = np.full(len(parsed), None, dtype=object)
+    return columns
+
+
+def fulfillments_from_frame(df: pd.DataFrame) -> List[FulfillmentDetailSchema]:
+    """履约表批量构建 FulfillmentDetailSchema（结果与逐行 from_parsed_record 相同）"""
+    columns = fulfillment_columns(df)
+    names = ['order_id'] + FULFILLMENT_TIME_COLUMNS
+    with _gc_paused():
+        return [FulfillmentDetailSchema(*values) for values in zip(*(columns[name].tolist() for name in names))]
+
 # ==================== Vehicle and Traffic Schemas ====================
 
 @dataclass
@@ -701,7 +961,7 @@ class SLAForecast:
 
 # ==================== Routing and Optimization Schemas ====================
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class OrderItem:
     """订单项目"""
     sku_id: str
@@ -709,11 +969,15 @@ class OrderItem:
     quantity: int
     unit_price: Optional[float] = None
     
+    def __post_init__(self):
+        object.__setattr__(self, 'sku_id', intern_code(self.sku_id))
+        object.__setattr__(self, 'sku_name', intern_code(self.sku_name))
+    
     def to_dict(self) -> Dict:
         return asdict(self)
 
 
-@dataclass
+@slotted_dataclass
 class OrderDetail:
     """订单详情"""
     order_id: str
@@ -726,11 +990,15 @@ class OrderDetail:
     total_amount: Optional[float] = None
     priority: int = 1
     
+    def __post_init__(self):
+        self.user_id = intern_code(self.user_id)
+        self.fulfillment_store_code = intern_code(self.fulfillment_store_code)
+    
     def to_dict(self) -> Dict:
         return asdict(self)
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class StoreLocation:
     """店铺位置信息"""
     store_code: str
@@ -741,6 +1009,10 @@ class StoreLocation:
     geocode_status: str
     accuracy_note: Optional[str] = None
     
+    def __post_init__(self):
+        for name in ('store_code', 'district', 'geocode_status'):
+            object.__setattr__(self, name, intern_code(getattr(self, name)))
+    
     def to_dict(self) -> Dict:
         return asdict(self)
 
@@ -791,7 +1063,7 @@ class RobustOptimizationResult:
         return asdict(self)
 
 
-@dataclass
+@slotted_dataclass
 class DemandForecast:
     """需求预测结果"""
     store_code: str
@@ -803,6 +1075,11 @@ class DemandForecast:
     model_version: str
     forecast_timestamp: datetime
     
+    def __post_init__(self):
+        self.store_code = intern_code(self.store_code)
+        self.sku_id = intern_code(self.sku_id)
+        self.model_version = intern_code(self.model_version)
+    
     def to_dict(self) -> Dict:
         return asdict(self)
 
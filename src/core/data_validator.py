@@ -10,7 +10,7 @@ import re
 import logging
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, date
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, is_dataclass
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +32,15 @@ HK_DISTRICTS = [
 ]
 
 
+def _as_record(obj: Any) -> Dict[str, Any]:
+    """对象 → 浅层字典；带 __slots__ 的 Schema 没有 __dict__，按字段读取"""
+    if isinstance(obj, dict):
+        return obj
+    if is_dataclass(obj):
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
+    return obj.__dict__
+
+
 # ==================== 验证结果数据类 ====================
 
 @dataclass
@@ -447,7 +456,7 @@ class DataValidator:
             result.add_error("门店列表为空")
         else:
             for i, store in enumerate(stores[:10]):  # 只检查前10个
-                store_dict = store if isinstance(store, dict) else store.__dict__
+                store_dict = _as_record(store)
                 s_result = self.validate_store(store_dict)
                 if not s_result.is_valid:
                     for err in s_result.errors:
@@ -456,7 +465,7 @@ class DataValidator:
         # 验证订单
         if orders:
             for i, order in enumerate(orders[:10]):
-                order_dict = order if isinstance(order, dict) else order.__dict__
+                order_dict = _as_record(order)
                 o_result = self.order_validator.validate_order(order_dict)
                 if not o_result.is_valid:
                     for err in o_result.errors:
@@ -470,13 +479,13 @@ class DataValidator:
         
         # 验证预测
         if forecasts:
-            forecast_dicts = [f if isinstance(f, dict) else f.__dict__ for f in forecasts[:10]]
+            forecast_dicts = [_as_record(f) for f in forecasts[:10]]
             result.merge(self.forecast_validator.validate_forecast_list(forecast_dicts))
         
         # 验证路径
         if routes:
             for i, route in enumerate(routes):
-                route_dict = route if isinstance(route, dict) else route.__dict__
+                route_dict = _as_record(route)
                 r_result = self.route_validator.validate_route_feasibility(route_dict)
                 if not r_result.is_valid:
                     for err in r_result.errors:
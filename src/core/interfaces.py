@@ -234,6 +234,24 @@ class WeatherDataFetcher(ABC):
         pass
 
 
+class TrafficDataFetcher(ABC):
+    """交通数据获取接口（兼容层）"""
+    
+    @abstractmethod
+    def fetch_current_traffic(self, region: str = "hong_kong") -> List[Any]:
+        """获取当前路况"""
+        pass
+
+
+class HolidayDataFetcher(ABC):
+    """假期数据获取接口（兼容层）"""
+    
+    @abstractmethod
+    def fetch_holidays(self, year: int) -> List[Any]:
+        """获取指定年份的公众假期"""
+        pass
+
+
 class IDistanceCalculator(ABC):
     """距离计算接口"""
     @abstractmethod
@@ -273,7 +291,8 @@ class IInventoryOptimizer(ABC):
         pass
     
     @abstractmethod
-    def optimize_inventory_allocation(self, current_inventory: Dict[str, float], demand_forecasts: List[DemandForecast], warehouse_capacity: Dict[str, float], costs: Dict[str, float]) -> Dict[str, Any]:
+    def optimize_inventory_allocation(self, current_inventory: Dict[Tuple[str, str], float], demand_forecasts: List[DemandForecast], warehouse_capacity: Dict[Any, float], costs: Dict[Any, float]) -> Dict[str, Any]:
+        """current_inventory 按 (store_id, sku_id) 给出门店现有库存；仅按 sku_id 的库存无法归属门店，应抛出 ValueError"""
         pass
     
     @abstractmethod
@@ -563,6 +563,7 @@ class SLAModuleAdapter(ISLAModule):
         self.config = config or {}
         self._ml_predictor = None
         self._prob_predictor = None
+        self._plan_estimator = None
         self.sla_target_hours = config.get('sla_target_hours', 4.0) if config else 4.0
     
     def _get_ml_predictor(self):
@@ -570,7 +571,7 @@ class SLAModuleAdapter(ISLAModule):
         if self._ml_predictor is None:
             try:
                 from src.modules.forecasting.sla_predictor import MLSLAPredictor
-                self._ml_predictor = MLSLAPredictor(self.config.get('ml_config'))
+                self._ml_predictor = MLSLAPredictor(self.config.get('ml_config'), seed=self.config.get('random_seed'))
                 logger.info("ML SLA Predictor initialized")
             except ImportError as e:
                 logger.warning(f"ML SLA Predictor not available: {e}")
@@ -658,6 +659,28 @@ class SLAModuleAdapter(ISLAModule):
             confidence_level=0.95
         )
     
+    def forecast_store_sla(self, store_codes: List[str], forecast_dates: List[date]) -> List[Any]:
+        """门店SLA预测（重复查询由预测器缓存直接返回）"""
+        ml_predictor = self._get_ml_predictor()
+        if ml_predictor is None:
+            return []
+        return ml_predictor.predict_sla_batch([str(code) for code in store_codes], forecast_dates)
+    
+    def estimate_plan_sla_risk(self, routes: List[List[int]], time_matrix: Any,
+                               deadline_minutes: Any, service_minutes: Any = 0.0,
+                               rng: Any = None) -> Any:
+        """整张配送方案的批量蒙特卡洛SLA风险（路线与时间矩阵直接取自优化器输出）"""
+        from src.modules.sla.implementations.probabilistic_sla_predictor import (
+            ProbabilisticSLAPredictor, build_plan_arrays
+        )
+        if self._plan_estimator is None:
+            self._plan_estimator = ProbabilisticSLAPredictor(
+                confidence_level=self.config.get('confidence_level', 0.95),
+                seed=self.config.get('random_seed')
+            )
+        plan = build_plan_arrays(routes, time_matrix, deadline_minutes, service_minutes)
+        return self._plan_estimator.estimate_plan_breach(plan, rng=rng)
+    
     def calculate_sla_probability(self, predicted_time: datetime, 
                                   promised_time: datetime) -> float:
         """计算SLA达成概率"""
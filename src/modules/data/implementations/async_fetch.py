@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+万宁SLA优化系统 - 外部数据源异步抓取层
+HKO 天气、TDAS 路况、1823 假期等外部请求共用一个 httpx.AsyncClient：
+
+- 连接池: 所有数据源共享，同一主机的 keep-alive 连接在多次刷新之间复用
+- 并发上限: 全局信号量限制同时在途的请求数
+- 主机限速: 每个主机一个令牌桶（速率 + 突发），避免并发请求打满公开API
+- 超时: 客户端默认超时，单个请求可覆盖
+- 响应缓存: cached_json() 经 FetchCache 落盘，按数据源 TTL 判断新鲜/过期；
+  过期可用期内先返回旧值并在后台刷新，同一请求键同时只有一个刷新在途
+- 事件循环: 客户端运行在自己的后台线程事件循环上，同步代码通过 run()
+  提交协程并等待，其他事件循环中的异步代码（FastAPI 路由）await run_async()
+
+测试时传入 httpx.MockTransport 即可完全离线运行。
+
+创建时间: 2026-10-19
+作者: Team ESGenius
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    from .fetch_cache import CacheEntry, FetchCache
+except ImportError:
+    from src.modules.data.implementations.fetch_cache import CacheEntry, FetchCache
+
+logger = logging.getLogger(__name__)
+
+# 各数据源主机的限速: (每秒请求数, 突发容量)
+DEFAULT_HOST_RATES = {
+    'data.weather.gov.hk': (5.0, 5),
+    'tdas-api.hkemobility.gov.hk': (10.0, 10),
+    'www.1823.gov.hk': (2.0, 2),
+}
+
+
+class HostRateLimiter:
+    """单个主机的令牌桶限速器"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        """取一个令牌，桶空时等待到下一个令牌生成"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncFetchClient:
+    """
+    共享的异步 HTTP 客户端
+
+    Args:
+        timeout: 默认请求超时（秒）
+        max_connections: 连接池大小
+        max_concurrency: 同时在途的请求数上限
+        host_rates: {主机: (每秒请求数, 突发容量)}，未列出的主机不限速
+        transport: 自定义传输层（测试用 httpx.MockTransport）
+        cache: 响应缓存；None 时 cached_json 每次都请求上游
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        max_concurrency: int = 10,
+        host_rates: Optional[Dict[str, tuple]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[FetchCache] = None,
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.host_rates = dict(DEFAULT_HOST_RATES if host_rates is None else host_rates)
+        self.transport = transport
+        self.cache = cache
+
+        self._limiters = {host: HostRateLimiter(rate, burst) for host, (rate, burst) in self.host_rates.items()}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    # ==================== 请求 ====================
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        """
+        发送请求：先占并发名额，再按主机限速
+
+        超时按单个请求从发出到读完计（不含排队与限速等待）；httpx 的超时只约束
+        连接/读/写的单个阶段，这里再加一层总时限，超时抛出 httpx.TimeoutException
+        """
+        client = self._get_client()
+        limiter = self._limiters.get(urlsplit(url).hostname or '')
+        limit = self.timeout if timeout is None else timeout
+        async with self._semaphore:
+            if limiter is not None:
+                await limiter.acquire()
+            try:
+                return await asyncio.wait_for(client.request(method, url, timeout=limit, **kwargs), limit)
+            except asyncio.TimeoutError:
+                raise httpx.TimeoutException(f"{method} {url} timed out after {limit}s") from None
+
+    async def get_json(self, url: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        """GET 并解析 JSON，非 2xx 抛出 httpx.HTTPStatusError"""
+        response = await self.request('GET', url, timeout=timeout, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    async def post_json(self, url: str, payload: Any, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        """POST JSON 请求体，返回原始响应（由调用方判断状态码）"""
+        return await self.request('POST', url, json=payload, timeout=timeout, **kwargs)
+
+    # ==================== 缓存请求 ====================
+
+    async def cached_json(self, source: str, url: str, method: str = 'GET', payload: Any = None,
+                          timeout: Optional[float] = None) -> CacheEntry:
+        """
+        带持久化缓存的 JSON 请求（stale-while-revalidate）
+
+        - 新鲜: 直接返回缓存
+        - 过期可用: 立即返回旧值，后台刷新
+        - 无缓存或过期太久: 等待刷新；上游失败时退回任意时长的旧值，没有旧值才抛出
+
+        Args:
+            source: 数据源名，决定缓存时效（见 fetch_cache.DEFAULT_SOURCE_POLICIES）
+            url: 请求地址
+            method: 'GET' 或 'POST'
+            payload: POST 的 JSON 请求体，参与缓存键
+            timeout: 单个请求超时
+        """
+        if self.cache is None:
+            return await self._fetch_entry(None, method, url, payload, timeout)
+
+        key = self.cache.key(source, method, url, payload)
+        entry = self.cache.get(key)
+        state = self.cache.state(source, entry)
+        if state == 'fresh':
+            self.cache.stats['hits'] += 1
+            return entry
+        if state == 'stale':
+            self.cache.stats['stale'] += 1
+            self._revalidate(key, method, url, payload, timeout)
+            return entry
+
+        self.cache.stats['misses'] += 1
+        try:
+            # shield: 调用方超时取消时，共享的刷新任务继续完成并写入缓存
+            return await asyncio.shield(self._revalidate(key, method, url, payload, timeout))
+        except Exception as e:
+            if entry is None:
+                raise
+            logger.warning(f"{source} 刷新失败，使用 {entry.age():.0f}s 前的缓存: {e}")
+            return entry
+
+    def _revalidate(self, key: str, method: str, url: str, payload: Any,
+                    timeout: Optional[float]) -> asyncio.Task:
+        """启动（或复用同键在途的）刷新任务"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_entry(key, method, url, payload, timeout))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_revalidate(key, done))
+        return task
+
+    def _finish_revalidate(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.cache.stats['errors'] += 1
+            logger.warning(f"后台刷新失败 {key}: {task.exception()}")
+
+    async def _fetch_entry(self, key: Optional[str], method: str, url: str, payload: Any,
+                           timeout: Optional[float]) -> CacheEntry:
+        """请求上游并（有缓存时）写入缓存"""
+        kwargs = {'json': payload} if payload is not None else {}
+        response = await self.request(method, url, timeout=timeout, **kwargs)
+        response.raise_for_status()
+        entry = CacheEntry(payload=response.json(), fetched_at=time.time())
+        if key is not None:
+            self.cache.stats['refreshes'] += 1
+            self.cache.put(key, entry)
+        return entry
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=self.transport,
+                follow_redirects=True,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    # ==================== 同步入口 ====================
+
+    def submit(self, coro: Awaitable[Any]) -> Future:
+        """把协程提交到客户端自己的事件循环，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """同步等待协程结果（供同步的 fetcher 方法与线程池调用）"""
+        return self.submit(coro).result(timeout)
+
+    async def run_async(self, coro: Awaitable[Any]) -> Any:
+        """在其他事件循环（如 FastAPI 路由）中等待协程在客户端循环上完成"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def close(self) -> None:
+        """关闭连接池并停止后台事件循环"""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    async def _shutdown(self) -> None:
+        """取消未完成的后台刷新并关闭连接池"""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='async-fetch', daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+
+_default_client: Optional[AsyncFetchClient] = None
+_default_lock = threading.Lock()
+
+
+def get_fetch_client() -> AsyncFetchClient:
+    """进程内共享的默认客户端（所有 fetcher 未显式传入 client 时使用）"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = AsyncFetchClient(cache=FetchCache())
+        return _default_client
+
+
+def set_fetch_client(client: Optional[AsyncFetchClient]) -> Optional[AsyncFetchClient]:
+    """替换默认客户端，返回原客户端（由调用方决定是否关闭）"""
+    global _default_client
+    with _default_lock:
+        previous, _default_client = _default_client, client
+        return previous
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+万宁SLA优化系统 - DFI 数据列式缓存
+CSV 源文件首次读取后按显式类型转换为 Parquet/Feather，之后按列投影直接读取
+
+- 失效判定：源文件的 mtime 与 size 写入同名 .meta.json，任一变化即重建
+- 类型：门店/SKU 编码为 category，时间戳列为 datetime64，标志位为 int8
+- 派生表：由源文件计算出的结果（如日需求立方体）同样按源文件的 mtime/size 失效
+- pyarrow 不可用时退化为带 usecols/dtype 的 read_csv
+
+创建时间: 2026-10-19
+作者: Team ESGenius
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logger.warning("pyarrow not available, DFI columnar cache disabled")
+
+CACHE_SCHEMA_VERSION = 1
+
+
+@dataclass
+class ColumnSpec:
+    """单个数据源的列类型约定"""
+    category: List[str] = field(default_factory=list)
+    datetime: List[str] = field(default_factory=list)
+    datetime_format: Optional[str] = None
+    int8: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'category': self.category, 'datetime': self.datetime,
+            'datetime_format': self.datetime_format, 'int8': self.int8,
+        }
+
+
+def apply_column_spec(df: pd.DataFrame, spec: ColumnSpec) -> pd.DataFrame:
+    """按约定转换列类型；不存在的列跳过，无法解析的时间为 NaT"""
+    converted = {}
+    for column in spec.category:
+        if column in df.columns:
+            converted[column] = df[column].astype('category')
+    for column in spec.datetime:
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            raw = df[column]
+            values = pd.to_datetime(raw, format=spec.datetime_format, errors='coerce')
+            retry = values.isna() & raw.notna() & (raw.astype(str).str.strip() != '')
+            if spec.datetime_format and retry.any():
+                values[retry] = pd.to_datetime(raw[retry], errors='coerce')
+            converted[column] = values
+    for column in spec.int8:
+        if column in df.columns and df[column].notna().all():
+            converted[column] = df[column].astype('int8')
+    return df.assign(**converted) if converted else df
+
+
+class ColumnarCache:
+    """
+    CSV → Parquet/Feather 列式缓存
+
+    缓存文件与元数据放在 cache_dir 下，以源文件名为基名；
+    写入先落临时文件再原子替换，多进程同时冷启动不会读到半截文件。
+    """
+
+    def __init__(self, cache_dir: Path, fmt: str = 'parquet'):
+        if fmt not in ('parquet', 'feather'):
+            raise ValueError(f"Unsupported cache format: {fmt}")
+        self.cache_dir = Path(cache_dir)
+        self.fmt = fmt
+        self.stats = {'hits': 0, 'rebuilds': 0, 'csv_fallbacks': 0}
+
+    def _paths(self, source: Path):
+        data_path = self.cache_dir / f"{source.stem}.{self.fmt}"
+        return data_path, data_path.with_suffix('.meta.json')
+
+    @staticmethod
+    def _fingerprint(source: Path, spec: ColumnSpec) -> Dict[str, object]:
+        stat = source.stat()
+        return {
+            'source': source.name,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'schema_version': CACHE_SCHEMA_VERSION,
+            'spec': spec.to_dict(),
+        }
+
+    def is_fresh(self, source: Path, spec: ColumnSpec) -> bool:
+        """缓存文件存在且与源文件的 mtime/size 及类型约定一致"""
+        data_path, meta_path = self._paths(source)
+        if not data_path.exists() or not meta_path.exists():
+            return False
+        try:
+            return json.loads(meta_path.read_text(encoding='utf-8')) == self._fingerprint(source, spec)
+        except (OSError, ValueError):
+            return False
+
+    def load(self, source: Path, spec: ColumnSpec,
+             columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        读取数据源（可按列投影）
+
+        Args:
+            source: CSV 源文件
+            spec: 列类型约定
+            columns: 只读取这些列；None 读取全部
+        """
+        source = Path(source)
+        columns = list(columns) if columns is not None else None
+        if not PYARROW_AVAILABLE:
+            self.stats['csv_fallbacks'] += 1
+            return apply_column_spec(pd.read_csv(source, usecols=columns), spec)
+
+        data_path, _ = self._paths(source)
+        if self.is_fresh(source, spec):
+            try:
+                self.stats['hits'] += 1
+                return self._read(data_path, columns)
+            except Exception as e:
+                logger.warning(f"Columnar cache unreadable, rebuilding {data_path}: {e}")
+
+        frame = self.rebuild(source, spec)
+        return frame[columns] if columns is not None else frame
+
+    def rebuild(self, source: Path, spec: ColumnSpec) -> pd.DataFrame:
+        """重新解析 CSV 并写入缓存，返回完整 DataFrame"""
+        logger.info(f"Building columnar cache for {source}")
+        frame = apply_column_spec(pd.read_csv(source), spec)
+        self.stats['rebuilds'] += 1
+
+        data_path, meta_path = self._paths(source)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = data_path.with_name(f".{data_path.name}.{os.getpid()}.tmp")
+            self._write(frame, tmp_path)
+            os.replace(tmp_path, data_path)
+            meta_path.write_text(json.dumps(self._fingerprint(source, spec)), encoding='utf-8')
+        except Exception as e:
+            logger.warning(f"Failed to write columnar cache {data_path}: {e}")
+        return frame
+
+    def load_derived(self, source: Path, name: str, build: Callable[[], pd.DataFrame],
+                     columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        读取由源文件派生的表；源文件未变时直接读缓存，否则调用 build 重新计算并落盘
+
+        Args:
+            source: 派生所依据的源文件
+            name: 派生表名称（缓存文件基名）
+            build: 重新计算派生表的函数
+            columns: 只读取这些列；None 读取全部
+        """
+        source = Path(source)
+        columns = list(columns) if columns is not None else None
+        data_path = self.cache_dir / f"{name}.{self.fmt}"
+        meta_path = data_path.with_suffix('.meta.json')
+        fingerprint = {**self._fingerprint(source, ColumnSpec()), 'derived': name}
+
+        if PYARROW_AVAILABLE and data_path.exists() and meta_path.exists():
+            try:
+                if json.loads(meta_path.read_text(encoding='utf-8')) == fingerprint:
+                    frame = self._read(data_path, columns)
+                    self.stats['hits'] += 1
+                    return frame
+            except Exception as e:
+                logger.warning(f"Derived cache unreadable, rebuilding {data_path}: {e}")
+
+        frame = build()
+        self.stats['rebuilds'] += 1
+        if PYARROW_AVAILABLE:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = data_path.with_name(f".{data_path.name}.{os.getpid()}.tmp")
+                self._write(frame, tmp_path)
+                os.replace(tmp_path, data_path)
+                meta_path.write_text(json.dumps(fingerprint), encoding='utf-8')
+            except Exception as e:
+                logger.warning(f"Failed to write derived cache {data_path}: {e}")
+        return frame[columns] if columns is not None else frame
+
+    def invalidate(self, source: Path) -> None:
+        """删除某个数据源的缓存"""
+        for path in self._paths(Path(source)):
+            if path.exists():
+                path.unlink()
+
+    def _read(self, path: Path, columns: Optional[List[str]]) -> pd.DataFrame:
+        if self.fmt == 'parquet':
+            return pd.read_parquet(path, columns=columns)
+        return pd.read_feather(path, columns=columns)
+
+    def _write(self, frame: pd.DataFrame, path: Path) -> None:
+        if self.fmt == 'parquet':
+            frame.to_parquet(path, index=False)
+        else:
+            frame.reset_index(drop=True).to_feather(path)
@@ -6,20 +6,47 @@ Author: 王晔宸 (Team Lead)
 Date: 2026-03-12
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Optional, Any, Tuple
+from typing import List, Dict, Optional, Any, Tuple, Iterator
 from datetime import date, datetime
 import logging
 
 from src.core.data_schema import (
     StoreSchema, DateFeatureSchema, OrderDetailSchema, 
     FulfillmentDetailSchema, DataLoaderInterface,
-    validate_store_data, validate_fulfillment_data
+    validate_store_data, validate_fulfillment_data,
+    parse_fulfillment_frame, calculate_sla_metrics_frame,
+    order_columns, orders_from_frame, ORDER_FIELDS, fulfillments_from_frame,
+    FULFILLMENT_DATETIME_FORMAT, FULFILLMENT_TIME_COLUMNS
+)
+from src.modules.data.implementations.columnar_cache import ColumnarCache, ColumnSpec
+from src.modules.data.implementations.chunked_loader import (
+    DEFAULT_CHUNKSIZE, ORDER_DTYPES, FULFILLMENT_DTYPES,
+    iter_csv_chunks, sum_daily_demand, with_average_skus, read_csv_columns, detect_sku_column
 )
 
 logger = logging.getLogger(__name__)
 
+# 各数据源的列类型约定：门店/SKU编码为category，时间戳为datetime64；
+# dt / calendar_date 等日期键保持原字符串，现有按字符串比较与解析的调用不受影响
+DFI_COLUMN_SPECS = {
+    'stores': ColumnSpec(category=['18 Districts']),
+    'dates': ColumnSpec(
+        category=['calendar_weekday'],
+        int8=['if_weekday', 'if_weekend', 'if_public_holiday', 'if_enjoycard_day', 'if_yuu_day',
+              'if_happy_hour', 'if_baby_fair', 'if_618_day', 'if_double11_day', 'if_38_day',
+              'if_anniversary_day', 'if_HH_ware_periods']
+    ),
+    'orders': ColumnSpec(category=['fulfillment_store_code', 'sku_code', 'sku_id']),
+    'fulfillment': ColumnSpec(
+        category=['fulfillment_store_code', 'store_code', 'sku_code', 'sku_id'],
+        datetime=FULFILLMENT_TIME_COLUMNS,
+        datetime_format=FULFILLMENT_DATETIME_FORMAT
+    ),
+}
+
 
 class DFIDataLoader(DataLoaderInterface):
     """
@@ -27,10 +54,21 @@ class DFIDataLoader(DataLoaderInterface):
     负责加载和解析Mannings提供的4张CSV数据表
     """
     
-    def __init__(self, data_path: str = "data/dfi/raw/"):
+    def __init__(self, data_path: str = "data/dfi/raw/", cache_dir: Optional[str] = None,
+                 use_columnar_cache: bool = True, cache_format: str = 'parquet',
+                 stream_threshold_mb: float = 512, stream_chunksize: int = DEFAULT_CHUNKSIZE):
         self.data_path = Path(data_path)
         self._cache = {}
         
+        # 超过阈值的订单/履约导出按块流式读取，不整表载入内存
+        self.stream_threshold_bytes = stream_threshold_mb * 1024 * 1024
+        self.stream_chunksize = stream_chunksize
+        
+        # CSV 首次解析后落盘为列式文件，之后冷启动直接按列读取
+        self.columnar_cache = ColumnarCache(
+            Path(cache_dir) if cache_dir else self.data_path / '.columnar_cache', cache_format
+        ) if use_columnar_cache else None
+        
         # 文件名映射
         self.file_mapping = {
             'stores': 'dim_store.csv',
@@ -46,23 +84,46 @@ class DFIDataLoader(DataLoaderInterface):
             raise ValueError(f"Unknown data key: {key}")
         return self.data_path / filename
     
-    def _load_csv(self, key: str, use_cache: bool = True) -> pd.DataFrame:
-        """加载CSV文件"""
+    def _load_csv(self, key: str, use_cache: bool = True,
+                  columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        加载数据源
+        
+        Args:
+            columns: 只加载这些列；已有完整数据时直接从内存切片，否则只从列式缓存读取所需列
+        """
         if use_cache and key in self._cache:
-            return self._cache[key]
+            return self._cache[key] if columns is None else self._cache[key][columns]
+        
+        projection_key = (key, tuple(columns)) if columns is not None else None
+        if use_cache and projection_key in self._cache:
+            return self._cache[projection_key]
         
         file_path = self._get_file_path(key)
         if not file_path.exists():
             raise FileNotFoundError(f"Data file not found: {file_path}")
         
         logger.info(f"Loading {key} from {file_path}")
-        df = pd.read_csv(file_path)
+        if self.columnar_cache is not None:
+            df = self.columnar_cache.load(file_path, DFI_COLUMN_SPECS[key], columns)
+        else:
+            df = pd.read_csv(file_path, usecols=columns)
         
         if use_cache:
-            self._cache[key] = df
+            self._cache[projection_key or key] = df
         
         return df
     
+    def _should_stream(self, key: str) -> bool:
+        """整表尚未载入内存且源文件超过阈值时走分块读取"""
+        if key in self._cache:
+            return False
+        file_path = self._get_file_path(key)
+        return file_path.exists() and file_path.stat().st_size >= self.stream_threshold_bytes
+    
+    def _iter_chunks(self, key: str, dtypes: Dict[str, str], **filters) -> Iterator[pd.DataFrame]:
+        return iter_csv_chunks(self._get_file_path(key), dtypes=dtypes, chunksize=self.stream_chunksize, **filters)
+    
     # ==================== 门店数据 ====================
     
     def load_stores_raw(self) -> pd.DataFrame:
@@ -102,7 +163,7 @@ class DFIDataLoader(DataLoaderInterface):
         """
         获取有订单数据的活跃门店代码列表
         """
-        orders_df = self._load_csv('orders')
+        orders_df = self._load_csv('orders', columns=['fulfillment_store_code'])
         return orders_df['fulfillment_store_code'].unique().tolist()
     
     # ==================== 日期特征 ====================
@@ -164,13 +225,18 @@ class DFIDataLoader(DataLoaderInterface):
     
     # ==================== 订单数据 ====================
     
-    def load_orders_raw(self) -> pd.DataFrame:
-        """加载原始订单数据"""
-        return self._load_csv('orders')
+    def load_orders_raw(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """加载原始订单数据（可只取部分列）"""
+        return self._load_csv('orders', columns=columns)
     
-    def load_orders(self, start_date: date = None, end_date: date = None,
-                    store_codes: Optional[List[int]] = None) -> List[OrderDetailSchema]:
-        """加载订单数据"""
+    def _iter_order_frames(self, start_date: date = None, end_date: date = None,
+                           store_codes: Optional[List[int]] = None) -> Iterator[pd.DataFrame]:
+        """按日期/门店过滤后的订单表；大文件分块读取并在块内过滤"""
+        if self._should_stream('orders'):
+            yield from self._iter_chunks('orders', ORDER_DTYPES, start_date=start_date, end_date=end_date,
+                                         store_codes=store_codes)
+            return
+        
         df = self.load_orders_raw()
         
         # 日期过滤
@@ -182,55 +248,162 @@ class DFIDataLoader(DataLoaderInterface):
         # 门店过滤
         if store_codes:
             df = df[df['fulfillment_store_code'].isin(store_codes)]
-        
-        orders = []
-        for _, row in df.iterrows():
-            try:
-                order = OrderDetailSchema.from_csv_row(row)
-                orders.append(order)
-            except Exception as e:
-                logger.warning(f"Failed to parse order row: {e}")
-                continue
-        
+        yield df
+    
+    def iter_orders(self, start_date: date = None, end_date: date = None,
+                    store_codes: Optional[List[int]] = None) -> Iterator[OrderDetailSchema]:
+        """按需逐条生成订单对象；每块整列转换类型后批量构建"""
+        for chunk in self._iter_order_frames(start_date, end_date, store_codes):
+            yield from orders_from_frame(chunk)
+    
+    def load_order_columns(self, start_date: date = None, end_date: date = None,
+                           store_codes: Optional[List[int]] = None) -> Dict[str, np.ndarray]:
+        """
+        订单的列式视图，不构建逐行对象
+        返回: {字段名: ndarray}，字段与 OrderDetailSchema 相同，dt 为 datetime64[D]
+        """
+        parts = [order_columns(chunk) for chunk in self._iter_order_frames(start_date, end_date, store_codes)]
+        if not parts:
+            return order_columns(pd.DataFrame(columns=ORDER_FIELDS))
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    
+    def load_orders(self, start_date: date = None, end_date: date = None,
+                    store_codes: Optional[List[int]] = None) -> List[OrderDetailSchema]:
+        """加载订单数据"""
+        orders = list(self.iter_orders(start_date, end_date, store_codes))
         logger.info(f"Loaded {len(orders)} orders")
         return orders
     
     def get_daily_order_summary(self, store_code: Optional[int] = None) -> pd.DataFrame:
         """
-        获取每日订单汇总
-        返回: DataFrame with columns [dt, store_code, order_count, total_quantity]
+        获取每日订单汇总（由日需求立方体上卷）
+        返回: DataFrame with columns [dt, store_code, order_count, total_quantity, avg_sku_per_order]
         """
-        df = self.load_orders_raw()
+        daily = self._daily_store_demand()
         
         if store_code:
-            df = df[df['fulfillment_store_code'] == store_code]
+            daily = daily[daily['store_code'] == store_code]
         
-        summary = df.groupby(['dt', 'fulfillment_store_code']).agg({
-            'order_id': 'count',
-            'total_quantity_cnt': 'sum',
-            'unique_sku_cnt': 'mean'
-        }).reset_index()
-        
-        summary.columns = ['dt', 'store_code', 'order_count', 'total_quantity', 'avg_sku_per_order']
-        return summary
+        summary = with_average_skus(daily)
+        return summary[['dt', 'store_code', 'order_count', 'total_quantity', 'avg_sku_per_order']].reset_index(drop=True)
     
-    def get_store_order_stats(self) -> pd.DataFrame:
-        """获取各门店订单统计"""
-        df = self.load_orders_raw()
+    def get_daily_demand_frame(self, start_date: date = None, end_date: date = None,
+                               store_codes: Optional[List[int]] = None, by_sku: bool = True) -> pd.DataFrame:
+        """
+        日 × 门店（× SKU）需求表，直接切自日需求立方体
+        
+        订单明细含 SKU 列且 by_sku=True 时按 SKU 细分，否则按 门店 × 日 汇总。
+        返回: DataFrame with columns [dt, store_code, (sku), order_count, total_quantity, avg_sku_per_order, date]
+        """
+        cube = self.get_demand_cube() if by_sku else self._daily_store_demand()
         
-        stats = df.groupby('fulfillment_store_code').agg({
-            'order_id': 'count',
-            'total_quantity_cnt': ['sum', 'mean'],
-            'unique_sku_cnt': 'mean',
-            'dt': ['min', 'max']
-        }).reset_index()
+        mask = np.ones(len(cube), dtype=bool)
+        if start_date:
+            mask &= (cube['date'] >= pd.Timestamp(start_date)).to_numpy()
+        if end_date:
+            mask &= (cube['date'] <= pd.Timestamp(end_date)).to_numpy()
+        if store_codes:
+            mask &= cube['store_code'].isin(store_codes).to_numpy()
         
-        stats.columns = [
+        frame = with_average_skus(cube[mask] if not mask.all() else cube)
+        return frame[[column for column in frame.columns if column != 'date'] + ['date']].reset_index(drop=True)
+    
+    def get_store_order_stats(self) -> pd.DataFrame:
+        """获取各门店订单统计（由日需求立方体上卷）"""
+        daily = self._daily_store_demand()
+        
+        stats = daily.groupby('store_code', observed=True).agg(
+            total_orders=('order_count', 'sum'),
+            total_quantity=('total_quantity', 'sum'),
+            sku_total=('sku_total', 'sum'),
+            first_order_date=('date', 'min'),
+            last_order_date=('date', 'max')
+        ).reset_index()
+        
+        for column in ('first_order_date', 'last_order_date'):
+            stats[column] = stats[column].dt.strftime('%Y-%m-%d')
+        orders = stats['total_orders'].where(stats['total_orders'] > 0)
+        stats['avg_quantity_per_order'] = stats['total_quantity'] / orders
+        stats['avg_sku_per_order'] = stats['sku_total'] / orders
+        return stats[[
             'store_code', 'total_orders', 'total_quantity', 
             'avg_quantity_per_order', 'avg_sku_per_order',
             'first_order_date', 'last_order_date'
-        ]
-        return stats
+        ]]
+    
+    # ==================== 日需求立方体 ====================
+    
+    def get_demand_cube(self) -> pd.DataFrame:
+        """
+        物化的 日 × 门店（× SKU）需求立方体
+        
+        订单源文件每变化一次只构建一次：进程内按源文件 mtime/size 复用，
+        启用列式缓存时落盘为 Parquet，重启后直接读取。日汇总、门店统计、
+        预测训练数据都由它上卷得到，不再各自扫描订单明细。
+        
+        返回: DataFrame with columns [date, dt, store_code, (sku), order_count, total_quantity, sku_total]
+              date 为 datetime64，dt 为 YYYY-MM-DD 字符串，sku_total 为 unique_sku_cnt 之和
+        """
+        source = self._get_file_path('orders')
+        if not source.exists():
+            raise FileNotFoundError(f"Data file not found: {source}")
+        
+        stat = source.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get('demand_cube')
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        if cached is not None:
+            # 源文件已变化：内存中的旧订单表（含列投影）一并失效
+            for key in [key for key in self._cache if key == 'orders' or (isinstance(key, tuple) and key[0] == 'orders')]:
+                del self._cache[key]
+        
+        if self.columnar_cache is not None:
+            cube = self.columnar_cache.load_derived(source, 'daily_demand_cube', self._build_demand_cube)
+        else:
+            cube = self._build_demand_cube()
+        
+        self._cache['demand_cube'] = (version, cube)
+        self._cache.pop('daily_store_demand', None)
+        return cube
+    
+    def _build_demand_cube(self) -> pd.DataFrame:
+        """从订单明细聚合需求立方体；大文件分块读取"""
+        file_path = self._get_file_path('orders')
+        header = read_csv_columns(file_path)
+        sku_column = detect_sku_column(header)
+        wanted = ['dt', 'fulfillment_store_code', 'total_quantity_cnt', 'unique_sku_cnt'] + ([sku_column] if sku_column else [])
+        columns = [column for column in wanted if column in header]
+        
+        if self._should_stream('orders'):
+            chunks = iter_csv_chunks(file_path, columns=columns, dtypes=ORDER_DTYPES, chunksize=self.stream_chunksize)
+        else:
+            chunks = [self.load_orders_raw(columns=columns)]
+        totals = sum_daily_demand(chunks, sku_column=sku_column)
+        
+        # 每个不同的日期只解析一次
+        days = pd.Categorical(totals['dt'])
+        parsed = pd.to_datetime(pd.Series(days.categories), format='%Y-%m-%d', errors='coerce')
+        totals.insert(0, 'date', parsed.to_numpy()[days.codes] if len(totals) else parsed.to_numpy())
+        
+        logger.info(f"Built daily demand cube: {len(totals)} rows"
+                    + (f" by {sku_column}" if sku_column else ""))
+        return totals
+    
+    def _daily_store_demand(self) -> pd.DataFrame:
+        """需求立方体上卷到 门店 × 日（无 SKU 列时即立方体本身）"""
+        cube = self.get_demand_cube()
+        if detect_sku_column(cube.columns) is None:
+            return cube
+        
+        if 'daily_store_demand' not in self._cache:
+            self._cache['daily_store_demand'] = cube.groupby(['dt', 'store_code'], observed=True).agg(
+                date=('date', 'first'),
+                order_count=('order_count', 'sum'),
+                total_quantity=('total_quantity', 'sum'),
+                sku_total=('sku_total', 'sum')
+            ).reset_index()[['date', 'dt', 'store_code', 'order_count', 'total_quantity', 'sku_total']]
+        return self._cache['daily_store_demand']
     
     # ==================== 履约数据 ====================
     
@@ -238,22 +411,38 @@ class DFIDataLoader(DataLoaderInterface):
         """加载原始履约数据"""
         return self._load_csv('fulfillment')
     
+    def load_fulfillment_frame(self) -> pd.DataFrame:
+        """加载履约数据，时间列只在首次加载时解析一次"""
+        if 'fulfillment_parsed' not in self._cache:
+            self._cache['fulfillment_parsed'] = parse_fulfillment_frame(self.load_fulfillment_raw())
+        return self._cache['fulfillment_parsed']
+    
+    def get_sla_metrics_frame(self, sla_target_minutes: float = 240.0) -> pd.DataFrame:
+        """
+        列式SLA指标：提货前置时间、超时标记与各阶段耗时
+        返回: DataFrame with columns [order_id, status, lead_time, sla_breached, 各阶段timedelta及分钟数]
+        """
+        key = ('sla_metrics', sla_target_minutes)
+        if key not in self._cache:
+            self._cache[key] = calculate_sla_metrics_frame(self.load_fulfillment_frame(), sla_target_minutes)
+        return self._cache[key]
+    
+    def iter_fulfillment(self, order_ids: Optional[List[str]] = None) -> Iterator[FulfillmentDetailSchema]:
+        """按需逐条生成履约对象；大文件分块读取，每块单独解析时间列后批量构建"""
+        if self._should_stream('fulfillment') and 'fulfillment_parsed' not in self._cache:
+            chunks = (parse_fulfillment_frame(chunk) for chunk in self._iter_chunks('fulfillment', FULFILLMENT_DTYPES))
+        else:
+            chunks = [self.load_fulfillment_frame()]
+        wanted = pd.Index(order_ids) if order_ids else None
+        
+        for df in chunks:
+            if wanted is not None:
+                df = df[df['order_id'].isin(wanted)]
+            yield from fulfillments_from_frame(df)
+    
     def load_fulfillment(self, order_ids: Optional[List[str]] = None) -> List[FulfillmentDetailSchema]:
         """加载履约数据"""
-        df = self.load_fulfillment_raw()
-        
-        if order_ids:
-            df = df[df['order_id'].isin(order_ids)]
-        
-        fulfillments = []
-        for _, row in df.iterrows():
-            try:
-                f = FulfillmentDetailSchema.from_csv_row(row)
-                fulfillments.append(f)
-            except Exception as e:
-                logger.warning(f"Failed to parse fulfillment row: {e}")
-                continue
-        
+        fulfillments = list(self.iter_fulfillment(order_ids))
         logger.info(f"Loaded {len(fulfillments)} fulfillment records")
         return fulfillments
     
@@ -262,18 +451,7 @@ class DFIDataLoader(DataLoaderInterface):
         获取SLA分析结果
         计算各时间段的平均耗时
         """
-        df = self.load_fulfillment_raw()
-        
-        # 转换时间戳
-        time_columns = [
-            'order_create_time', 'ready_time', 'assigned_time', 
-            'picking_time', 'picked_time', 'packed_time', 
-            'shipped_time', 'ready_for_pickup_time', 'completed_time'
-        ]
-        
-        for col in time_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
+        df = self.load_fulfillment_frame()
         
         analysis = {
             'total_orders': len(df),
@@ -281,6 +459,9 @@ class DFIDataLoader(DataLoaderInterface):
             'cancelled_orders': df['cancel_time'].notna().sum() if 'cancel_time' in df.columns else 0
         }
         
+        breached = self.get_sla_metrics_frame()['sla_breached'].dropna()
+        analysis['sla_breach_rate'] = float(breached.mean()) if len(breached) > 0 else None
+        
         # 计算各阶段耗时 (分钟)
         stages = [
             ('order_to_ready', 'order_create_time', 'ready_time'),
@@ -379,9 +560,9 @@ class DFIDataLoader(DataLoaderInterface):
         orders = self.get_daily_order_summary()
         dates_df = self.load_dates_raw()
         
-        # 转换日期格式
-        dates_df['dt'] = dates_df['calendar_date'].apply(
-            lambda x: datetime.strptime(x, '%Y/%m/%d').strftime('%Y-%m-%d')
+        # 转换日期格式（整列解析，不修改缓存中的原表）
+        dates_df = dates_df.assign(
+            dt=pd.to_datetime(dates_df['calendar_date'], format='%Y/%m/%d').dt.strftime('%Y-%m-%d')
         )
         
         # 合并
@@ -402,8 +583,8 @@ class DFIDataLoader(DataLoaderInterface):
         date_feature = self.get_date_feature(target_date)
         
         # 获取历史平均需求作为预测基准
-        orders_df = self.load_orders_raw()
-        store_avg = orders_df.groupby('fulfillment_store_code').agg({
+        orders_df = self.load_orders_raw(columns=['fulfillment_store_code', 'total_quantity_cnt'])
+        store_avg = orders_df.groupby('fulfillment_store_code', observed=True).agg({
             'total_quantity_cnt': 'mean'
         }).to_dict()['total_quantity_cnt']
         
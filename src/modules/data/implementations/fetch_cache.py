@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+万宁SLA优化系统 - 外部数据源响应的磁盘缓存
+HKO 天气、TDAS 路况、1823 假期的原始 JSON 响应按请求键落盘，所有 fetcher 共用：
+
+- 键: 数据源 + 方法 + URL + 请求体的 sha1，每个键一个 JSON 文件
+- 策略: 每个数据源一个 (ttl, stale_ttl)；ttl 内直接使用，之后 stale_ttl 内先返回旧值
+  并在后台刷新（stale-while-revalidate），超过两者之和才同步等待新数据
+- 上游失败时仍返回任意时长的旧值（stale-if-error）
+- 写入先落临时文件再原子替换；内存中保留一份，重复读取不访问磁盘
+- 重启后直接读取磁盘上的响应，不会因为进程重启集中重新请求上游
+
+刷新的调度（后台任务、同键请求合并）由 AsyncFetchClient.cached_json 完成。
+
+创建时间: 2026-10-19
+作者: Team ESGenius
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path("data") / "official" / ".fetch_cache"
+
+
+@dataclass(frozen=True)
+class SourcePolicy:
+    """单个数据源的缓存时效（秒）"""
+    ttl: float          # 新鲜期：直接使用缓存
+    stale_ttl: float    # 新鲜期之后的过期可用期：先返回旧值再后台刷新
+
+
+DEFAULT_SOURCE_POLICIES = {
+    'hko_current': SourcePolicy(ttl=600, stale_ttl=3600),           # 实时天气每10分钟更新
+    'hko_forecast': SourcePolicy(ttl=3600, stale_ttl=6 * 3600),     # 9天预报每天更新数次
+    'hko_warnings': SourcePolicy(ttl=300, stale_ttl=1800),          # 警告需要及时
+    'tdas': SourcePolicy(ttl=900, stale_ttl=3600),                  # 路况
+    'holidays': SourcePolicy(ttl=86400, stale_ttl=30 * 86400),      # 假期日历很少变化
+}
+FALLBACK_POLICY = SourcePolicy(ttl=300, stale_ttl=3600)
+
+
+@dataclass
+class CacheEntry:
+    """一条缓存的响应"""
+    payload: Any
+    fetched_at: float   # 取得时间（epoch 秒）
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.fetched_at
+
+
+class FetchCache:
+    """
+    外部请求的持久化响应缓存
+
+    Args:
+        cache_dir: 缓存目录
+        policies: {数据源: SourcePolicy}，未列出的数据源使用 FALLBACK_POLICY
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR,
+                 policies: Optional[Dict[str, SourcePolicy]] = None):
+        self.cache_dir = Path(cache_dir)
+        self.policies = {**DEFAULT_SOURCE_POLICIES, **(policies or {})}
+        self.stats = {'hits': 0, 'stale': 0, 'misses': 0, 'refreshes': 0, 'errors': 0}
+        self._memory: Dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def policy(self, source: str) -> SourcePolicy:
+        return self.policies.get(source, FALLBACK_POLICY)
+
+    @staticmethod
+    def key(source: str, method: str, url: str, payload: Any = None) -> str:
+        """请求键：数据源名 + 请求内容摘要"""
+        body = json.dumps(payload, sort_keys=True) if payload is not None else ''
+        digest = hashlib.sha1(f"{method.upper()} {url}\n{body}".encode('utf-8')).hexdigest()
+        return f"{source}-{digest[:20]}"
+
+    def state(self, source: str, entry: Optional[CacheEntry], now: Optional[float] = None) -> str:
+        """'fresh' | 'stale'（可先返回再刷新）| 'expired'（需同步刷新）"""
+        if entry is None:
+            return 'expired'
+        policy = self.policy(source)
+        age = entry.age(now)
+        if age < policy.ttl:
+            return 'fresh'
+        if age < policy.ttl + policy.stale_ttl:
+            return 'stale'
+        return 'expired'
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """读取缓存（先内存后磁盘），不判断时效"""
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None:
+            return entry
+
+        path = self.cache_dir / f"{key}.json"
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+            entry = CacheEntry(payload=data['payload'], fetched_at=float(data['fetched_at']))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Fetch cache unreadable, ignoring {path}: {e}")
+            return None
+
+        with self._lock:
+            self._memory.setdefault(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        """写入缓存：内存立即生效，磁盘原子替换（写盘失败只记录日志）"""
+        with self._lock:
+            self._memory[key] = entry
+
+        path = self.cache_dir / f"{key}.json"
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(json.dumps({'fetched_at': entry.fetched_at, 'payload': entry.payload},
+                                           ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write fetch cache {path}: {e}")
+
+    def invalidate(self, source: Optional[str] = None) -> None:
+        """删除某个数据源（None 为全部）的缓存"""
+        prefix = f"{source}-" if source else ''
+        with self._lock:
+            for key in [key for key in self._memory if key.startswith(prefix)]:
+                del self._memory[key]
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob(f"{prefix}*.json"):
+                path.unlink(missing_ok=True)
@@ -8,14 +8,15 @@ Created: 2026-03-17
 Author: Team ESGenius
 """
 
-import requests
+import asyncio
 import logging
 from datetime import datetime, date, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 try:
     from ...core.interfaces import WeatherDataFetcher
     from ...core.data_schema import WeatherData, WeatherCondition
+    from .async_fetch import AsyncFetchClient, get_fetch_client
 except ImportError:
     # For direct execution
     import sys
@@ -23,17 +24,18 @@ except ImportError:
     sys.path.append(str(Path(__file__).parent.parent.parent.parent))
     from src.core.interfaces import WeatherDataFetcher
     from src.core.data_schema import WeatherData, WeatherCondition
+    from src.modules.data.implementations.async_fetch import AsyncFetchClient, get_fetch_client
 
 logger = logging.getLogger(__name__)
 
 class HKOWeatherFetcher(WeatherDataFetcher):
     """Hong Kong Observatory Weather Data Fetcher"""
     
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: int = 10, client: Optional[AsyncFetchClient] = None):
         self.timeout = timeout
+        self.client = client or get_fetch_client()
         self.base_url = "https://data.weather.gov.hk/weatherAPI/opendata"
-        self._cache = {}
-        self._cache_ttl = 3600  # 1 hour cache
+        # Responses are cached by the shared client (sources 'hko_current' / 'hko_forecast')
         
         # Weather icon to condition mapping
         self.icon_mapping = {
@@ -46,8 +48,8 @@ class HKOWeatherFetcher(WeatherDataFetcher):
             61: WeatherCondition.CLOUDY,     # 密云
             62: WeatherCondition.RAINY,      # 微雨
             63: WeatherCondition.RAINY,      # 雨
-            64: WeatherCondition.STORMY,     # 大雨
-            65: WeatherCondition.STORMY,     # 雷暴
+            64: WeatherCondition.HEAVY_RAIN, # 大雨
+            65: WeatherCondition.HEAVY_RAIN, # 雷暴
             70: WeatherCondition.SUNNY,      # 天色良好
             71: WeatherCondition.SUNNY,      # 天色良好
             72: WeatherCondition.SUNNY,      # 天色良好
@@ -89,7 +91,7 @@ class HKOWeatherFetcher(WeatherDataFetcher):
         """Check if HKO API is available"""
         try:
             url = f"{self.base_url}/weather.php?dataType=rhrread&lang=en"
-            response = requests.get(url, timeout=5)
+            response = self.client.run(self.client.request('GET', url, timeout=5))
             return response.status_code == 200
         except:
             return False
@@ -98,10 +100,7 @@ class HKOWeatherFetcher(WeatherDataFetcher):
         """Get last update time from HKO"""
         try:
             url = f"{self.base_url}/weather.php?dataType=rhrread&lang=en"
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self.client.run(self.client.get_json(url, timeout=self.timeout))
             update_time_str = data.get('updateTime', '')
             
             if update_time_str:
@@ -112,43 +111,15 @@ class HKOWeatherFetcher(WeatherDataFetcher):
         return None
     
     def fetch_current_weather(self) -> WeatherData:
+        """Fetch current weather conditions"""
+        return self.client.run(self.fetch_current_weather_async())
+    
+    async def fetch_current_weather_async(self) -> WeatherData:
         """Fetch current weather conditions"""
         try:
             url = f"{self.base_url}/weather.php?dataType=rhrread&lang=en"
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Parse temperature (Hong Kong Observatory station)
-            temperature = 25.0  # default
-            for temp_item in data.get('temperature', {}).get('data', []):
-                if temp_item.get('place') == 'Hong Kong Observatory':
-                    temperature = float(temp_item.get('value', 25.0))
-                    break
-            
-            # Parse humidity
-            humidity_data = data.get('humidity', {}).get('data', [])
-            humidity = float(humidity_data[0].get('value', 70)) if humidity_data else 70.0
-            
-            # Parse weather icon
-            weather_icon = data.get('icon', [50])[0] if data.get('icon') else 50
-            condition = self.icon_mapping.get(weather_icon, WeatherCondition.CLOUDY)
-            
-            # Parse rainfall
-            rainfall_data = data.get('rainfall', {}).get('data', [])
-            rainfall = 0.0
-            if rainfall_data:
-                rainfall = float(rainfall_data[0].get('max', 0))
-            
-            return WeatherData(
-                date=date.today(),
-                temperature_high=temperature,
-                temperature_low=temperature,  # Current temp as both high/low
-                humidity=humidity,
-                condition=condition,
-                rainfall=rainfall
-            )
+            entry = await self.client.cached_json('hko_current', url, timeout=self.timeout)
+            return self._parse_current_weather(entry.payload)
             
         except Exception as e:
             logger.error(f"Failed to fetch current weather: {e}")
@@ -158,63 +129,121 @@ class HKOWeatherFetcher(WeatherDataFetcher):
                 temperature_high=25.0,
                 temperature_low=20.0,
                 humidity=70.0,
-                condition=WeatherCondition.CLOUDY,
+                weather_condition=WeatherCondition.CLOUDY,
                 rainfall=0.0
             )
     
+    def _parse_current_weather(self, data: Dict[str, Any]) -> WeatherData:
+        """Convert an HKO rhrread response to WeatherData"""
+        # Parse temperature (Hong Kong Observatory station)
+        temperature = 25.0  # default
+        for temp_item in data.get('temperature', {}).get('data', []):
+            if temp_item.get('place') == 'Hong Kong Observatory':
+                temperature = float(temp_item.get('value', 25.0))
+                break
+        
+        # Parse humidity
+        humidity_data = data.get('humidity', {}).get('data', [])
+        humidity = float(humidity_data[0].get('value', 70)) if humidity_data else 70.0
+        
+        # Parse weather icon
+        weather_icon = data.get('icon', [50])[0] if data.get('icon') else 50
+        condition = self.icon_mapping.get(weather_icon, WeatherCondition.CLOUDY)
+        
+        # Parse rainfall
+        rainfall_data = data.get('rainfall', {}).get('data', [])
+        rainfall = 0.0
+        if rainfall_data:
+            rainfall = float(rainfall_data[0].get('max', 0))
+        
+        return WeatherData(
+            date=date.today(),
+            temperature_high=temperature,
+            temperature_low=temperature,  # Current temp as both high/low
+            humidity=humidity,
+            weather_condition=condition,
+            rainfall=rainfall
+        )
+    
     def fetch_weather_forecast(self, days: int = 7) -> List[WeatherData]:
+        """Fetch weather forecast for specified days"""
+        return self.client.run(self.fetch_weather_forecast_async(days))
+    
+    async def fetch_weather_forecast_async(self, days: int = 7) -> List[WeatherData]:
         """Fetch weather forecast for specified days"""
         try:
             url = f"{self.base_url}/weather.php?dataType=fnd&lang=en"
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            data = response.json()
-            forecasts = []
-            
-            for item in data.get('weatherForecast', []):
-                try:
-                    # Parse date
-                    date_str = item.get('forecastDate', '')
-                    forecast_date = datetime.strptime(date_str, '%Y%m%d').date()
-                    
-                    # Parse temperatures
-                    temp_max = float(item.get('forecastMaxtemp', {}).get('value', 30))
-                    temp_min = float(item.get('forecastMintemp', {}).get('value', 20))
-                    
-                    # Parse humidity
-                    humidity_max = int(item.get('forecastMaxrh', {}).get('value', 90))
-                    humidity_min = int(item.get('forecastMinrh', {}).get('value', 60))
-                    humidity_avg = (humidity_max + humidity_min) / 2
-                    
-                    # Parse weather condition
-                    weather_icon = item.get('ForecastIcon', 50)
-                    condition = self.icon_mapping.get(weather_icon, WeatherCondition.CLOUDY)
-                    
-                    forecast = WeatherData(
-                        date=forecast_date,
-                        temperature_high=temp_max,
-                        temperature_low=temp_min,
-                        humidity=humidity_avg,
-                        condition=condition,
-                        rainfall=0.0  # HKO forecast doesn't include specific rainfall amounts
-                    )
-                    forecasts.append(forecast)
-                    
-                    # Limit to requested days
-                    if len(forecasts) >= days:
-                        break
-                        
-                except Exception as e:
-                    logger.warning(f"Failed to parse forecast item: {e}")
-                    continue
-            
-            return forecasts
+            entry = await self.client.cached_json('hko_forecast', url, timeout=self.timeout)
+            return self._parse_forecast(entry.payload, days)
             
         except Exception as e:
             logger.error(f"Failed to fetch weather forecast: {e}")
             return []
     
+    def fetch_forecast_and_current(self, days: int = 9) -> Tuple[List[WeatherData], WeatherData]:
+        """Fetch the forecast and current conditions concurrently"""
+        return self.client.run(self.fetch_forecast_and_current_async(days))
+    
+    async def fetch_forecast_and_current_async(self, days: int = 9) -> Tuple[List[WeatherData], WeatherData]:
+        """Fetch the forecast and current conditions concurrently"""
+        forecasts, current = await asyncio.gather(
+            self.fetch_weather_forecast_async(days), self.fetch_current_weather_async())
+        return forecasts, current
+    
+    def _parse_forecast(self, data: Dict[str, Any], days: int) -> List[WeatherData]:
+        """Convert an HKO fnd response to WeatherData, at most `days` items"""
+        forecasts = []
+        
+        for item in data.get('weatherForecast', []):
+            try:
+                # Parse date
+                date_str = item.get('forecastDate', '')
+                forecast_date = datetime.strptime(date_str, '%Y%m%d').date()
+                
+                # Parse temperatures
+                temp_max = float(item.get('forecastMaxtemp', {}).get('value', 30))
+                temp_min = float(item.get('forecastMintemp', {}).get('value', 20))
+                
+                # Parse humidity
+                humidity_max = int(item.get('forecastMaxrh', {}).get('value', 90))
+                humidity_min = int(item.get('forecastMinrh', {}).get('value', 60))
+                humidity_avg = (humidity_max + humidity_min) / 2
+                
+                # Parse weather condition
+                weather_icon = item.get('ForecastIcon', 50)
+                condition = self.icon_mapping.get(weather_icon, WeatherCondition.CLOUDY)
+                
+                forecast = WeatherData(
+                    date=forecast_date,
+                    temperature_high=temp_max,
+                    temperature_low=temp_min,
+                    humidity=humidity_avg,
+                    weather_condition=condition,
+                    rainfall=0.0  # HKO forecast doesn't include specific rainfall amounts
+                )
+                forecasts.append(forecast)
+                
+                # Limit to requested days
+                if len(forecasts) >= days:
+                    break
+                    
+            except Exception as e:
+                logger.warning(f"Failed to parse forecast item: {e}")
+                continue
+        
+        return forecasts
+    
+    def get_weather(self, target_date: date) -> Optional[Dict[str, Any]]:
+        """Weather for one forecast date as a dict (WeatherDataFetcher interface)"""
+        for forecast in self.fetch_weather_forecast(days=9):
+            if forecast.date == target_date:
+                return forecast.to_dict()
+        return None
+    
+    def get_forecast(self, days: int = 7) -> List[Dict[str, Any]]:
+        """Forecast as dicts (WeatherDataFetcher interface)"""
+        return [forecast.to_dict() for forecast in self.fetch_weather_forecast(days)]
+    
     def fetch_historical_weather(self, start_date: date, end_date: date) -> List[WeatherData]:
         """Fetch historical weather data (limited for HKO)"""
         logger.warning("HKO API does not provide historical weather data")
@@ -230,13 +259,13 @@ def test_hko_fetcher():
     
     # Test current weather
     current = fetcher.fetch_current_weather()
-    print(f"Current Weather: {current.temperature_high}°C, {current.condition.value}")
+    print(f"Current Weather: {current.temperature_high}°C, {current.weather_condition.value}")
     
     # Test forecast
     forecasts = fetcher.fetch_weather_forecast(days=5)
     print(f"Forecast ({len(forecasts)} days):")
     for f in forecasts:
-        print(f"  {f.date}: {f.temperature_low}-{f.temperature_high}°C, {f.condition.value}")
+        print(f"  {f.date}: {f.temperature_low}-{f.temperature_high}°C, {f.weather_condition.value}")
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -8,13 +8,16 @@ Date: 2026-03-12
 API文档: https://www.hko.gov.hk/en/abouthko/opendata_intro.htm
 """
 
-import requests
+import asyncio
 from datetime import date, datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 import logging
 
+import httpx
+
 from src.core.data_schema import WeatherDataSchema, WeatherCondition
+from src.modules.data.implementations.async_fetch import AsyncFetchClient, get_fetch_client
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +34,15 @@ API_ENDPOINTS = {
     'warning_info': f"{HKO_BASE_URL}/weather.php?dataType=warningInfo&lang=en",
 }
 
+# API 端点对应的缓存数据源（决定缓存时效）
+ENDPOINT_SOURCES = {
+    'current_weather': 'hko_current',
+    'forecast_9day': 'hko_forecast',
+    'forecast_local': 'hko_forecast',
+    'warning_summary': 'hko_warnings',
+    'warning_info': 'hko_warnings',
+}
+
 # 天气图标到天气状况映射
 WEATHER_ICON_MAPPING = {
     50: WeatherCondition.SUNNY,      # 阳光充沛
@@ -96,22 +108,24 @@ class HKOWeatherAPI:
     香港天文台开放数据API客户端
     """
     
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: int = 10, client: Optional[AsyncFetchClient] = None):
         self.timeout = timeout
-        self._cache = {}
-        self._cache_ttl = 3600  # 缓存1小时
+        self.client = client or get_fetch_client()
     
     def _make_request(self, endpoint_key: str) -> Dict:
         """发送API请求"""
+        return self.client.run(self._make_request_async(endpoint_key))
+    
+    async def _make_request_async(self, endpoint_key: str) -> Dict:
+        """发送API请求（在共享客户端的事件循环上执行，响应按端点的数据源缓存）"""
         url = API_ENDPOINTS.get(endpoint_key)
         if not url:
             raise ValueError(f"Unknown endpoint: {endpoint_key}")
         
         try:
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            entry = await self.client.cached_json(ENDPOINT_SOURCES[endpoint_key], url, timeout=self.timeout)
+            return entry.payload
+        except httpx.HTTPError as e:
             logger.error(f"HKO API request failed: {e}")
             raise
     
@@ -169,7 +183,11 @@ class HKOWeatherAPI:
         获取9天天气预报
         API: fnd (9-day Weather Forecast)
         """
-        data = self._make_request('forecast_9day')
+        return self.client.run(self.get_9day_forecast_async())
+    
+    async def get_9day_forecast_async(self) -> List[HKOForecast]:
+        """获取9天天气预报（异步）"""
+        data = await self._make_request_async('forecast_9day')
         
         forecasts = []
         for item in data.get('weatherForecast', []):
@@ -201,10 +219,13 @@ class HKOWeatherAPI:
         获取生效中的天气警告
         API: warnsum (Warning Summary)
         """
+        return self.client.run(self.get_weather_warnings_async())
+    
+    async def get_weather_warnings_async(self) -> Dict[str, Any]:
+        """获取生效中的天气警告（异步），失败时视为无警告"""
         try:
-            data = self._make_request('warning_summary')
-            return data
-        except:
+            return await self._make_request_async('warning_summary')
+        except Exception:
             return {}
     
     def has_active_warning(self, warning_type: str = None) -> bool:
@@ -222,9 +243,11 @@ class HKOWeatherAPI:
         
         return len(warnings) > 0
     
-    def to_weather_schema(self, forecast: HKOForecast) -> WeatherDataSchema:
+    def to_weather_schema(self, forecast: HKOForecast,
+                          warnings: Optional[Dict[str, Any]] = None) -> WeatherDataSchema:
         """
         将HKO预报转换为标准WeatherDataSchema
+        warnings: 已取得的警告摘要；不传时单独请求一次
         """
         # 映射天气图标到天气状况
         weather_condition = WEATHER_ICON_MAPPING.get(
@@ -233,7 +256,8 @@ class HKOWeatherAPI:
         )
         
         # 检查警告
-        warnings = self.get_weather_warnings()
+        if warnings is None:
+            warnings = self.get_weather_warnings()
         
         return WeatherDataSchema(
             date=forecast.forecast_date,
@@ -255,11 +279,16 @@ class HKOWeatherAPI:
         """
         获取指定日期的天气数据 (用于需求预测)
         """
-        forecasts = self.get_9day_forecast()
+        return self.client.run(self.get_weather_for_forecast_async(target_date))
+    
+    async def get_weather_for_forecast_async(self, target_date: date) -> Optional[WeatherDataSchema]:
+        """获取指定日期的天气数据：预报与警告并发请求"""
+        forecasts, warnings = await asyncio.gather(
+            self.get_9day_forecast_async(), self.get_weather_warnings_async())
         
         for forecast in forecasts:
             if forecast.forecast_date == target_date:
-                return self.to_weather_schema(forecast)
+                return self.to_weather_schema(forecast, warnings)
         
         # 如果目标日期不在9天预报范围内，返回None
         return None
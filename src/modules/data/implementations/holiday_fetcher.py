@@ -8,47 +8,45 @@ Created: 2026-03-17
 Author: Team ESGenius
 """
 
-import requests
 import json
 import logging
 from datetime import datetime, date
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
 from pathlib import Path
 
 try:
     from ...core.interfaces import HolidayDataFetcher
     from ...core.data_schema import PublicHoliday
+    from .async_fetch import AsyncFetchClient, get_fetch_client
 except ImportError:
     # For direct execution
     import sys
     sys.path.append(str(Path(__file__).parent.parent.parent.parent))
     from src.core.interfaces import HolidayDataFetcher
     from src.core.data_schema import PublicHoliday
+    from src.modules.data.implementations.async_fetch import AsyncFetchClient, get_fetch_client
 
 logger = logging.getLogger(__name__)
 
 class HKHolidayFetcher(HolidayDataFetcher):
     """Hong Kong Public Holiday Data Fetcher"""
     
-    def __init__(self, timeout: int = 10, cache_dir: str = "data/official"):
+    def __init__(self, timeout: int = 10, cache_dir: str = "data/official",
+                 client: Optional[AsyncFetchClient] = None):
         self.timeout = timeout
+        self.client = client or get_fetch_client()
         self.api_url = "https://www.1823.gov.hk/common/ical/en.json"
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self._cache = {}
-        self._cache_ttl = 86400  # 24 hours cache for holidays
+        # The calendar response is cached by the shared client (source 'holidays');
+        # public_holidays_{year}.json in cache_dir is a read-only offline fallback
     
     def fetch_data(self, start_date: date, end_date: date, **kwargs) -> List[PublicHoliday]:
         """Fetch holiday data for date range"""
         try:
-            # Get year range
-            start_year = start_date.year
-            end_year = end_date.year
-            
-            all_holidays = []
-            for year in range(start_year, end_year + 1):
-                year_holidays = self.fetch_holidays(year)
-                all_holidays.extend(year_holidays)
+            # Get year range (one calendar request covers all years)
+            by_year = self.client.run(self.fetch_holidays_async(range(start_date.year, end_date.year + 1)))
+            all_holidays = [holiday for holidays in by_year.values() for holiday in holidays]
             
             # Filter by date range
             filtered = []
@@ -64,7 +62,7 @@ class HKHolidayFetcher(HolidayDataFetcher):
     def is_available(self) -> bool:
         """Check if holiday API is available"""
         try:
-            response = requests.get(self.api_url, timeout=5)
+            response = self.client.run(self.client.request('GET', self.api_url, timeout=5))
             return response.status_code == 200
         except:
             return False
@@ -75,74 +73,63 @@ class HKHolidayFetcher(HolidayDataFetcher):
     
     def fetch_holidays(self, year: int) -> List[PublicHoliday]:
         """Fetch holidays for specific year"""
-        cache_key = f'holidays_{year}'
+        return self.client.run(self.fetch_holidays_async([year]))[year]
+    
+    async def fetch_holidays_async(self, years: Iterable[int]) -> Dict[int, List[PublicHoliday]]:
+        """Fetch holidays for several years with at most one API request"""
+        result = {}
         
-        # Check cache first
-        if cache_key in self._cache:
-            cache_time, holidays = self._cache[cache_key]
-            if (datetime.now() - cache_time).total_seconds() < self._cache_ttl:
-                return holidays
+        # Try online API (or its cached response) first
+        data = await self._fetch_online_calendar()
+        for year in years:
+            try:
+                holidays = self._parse_calendar(data, year) if data else []
+                
+                if holidays:
+                    logger.info(f"Successfully fetched {len(holidays)} holidays for {year}")
+                else:
+                    # Fallback to local calendar file
+                    holidays = self._load_cached_holidays(year)
+                
+                result[year] = holidays
+                
+            except Exception as e:
+                logger.error(f"Failed to fetch holidays for {year}: {e}")
+                result[year] = []
         
-        try:
-            # Try online API first
-            holidays = self._fetch_online_holidays(year)
-            
-            if not holidays:
-                # Fallback to local cache file
-                holidays = self._load_cached_holidays(year)
-            else:
-                # Save to local cache
-                self._save_holidays_cache(holidays, year)
-            
-            # Update memory cache
-            self._cache[cache_key] = (datetime.now(), holidays)
-            
-            return holidays
-            
-        except Exception as e:
-            logger.error(f"Failed to fetch holidays for {year}: {e}")
-            return []
+        return result
     
     def is_holiday(self, check_date: date) -> bool:
         """Check if specific date is a holiday"""
         holidays = self.fetch_holidays(check_date.year)
         return any(h.date == check_date for h in holidays)
     
-    def _fetch_online_holidays(self, year: int) -> List[PublicHoliday]:
-        """Fetch holidays from online API"""
+    async def _fetch_online_calendar(self) -> Optional[Dict[str, Any]]:
+        """Fetch the holiday calendar (all years) from online API"""
         try:
-            logger.info(f"Fetching holidays for {year} from online API...")
-            
-            response = requests.get(self.api_url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            data = response.json()
-            holidays = []
-            
-            if 'vcalendar' in data and len(data['vcalendar']) > 0:
-                events = data['vcalendar'][0].get('vevent', [])
-                
-                for event in events:
-                    if 'dtstart' in event and 'summary' in event:
-                        date_str = event['dtstart'][0]
-                        
-                        if len(date_str) == 8:  # YYYYMMDD format
-                            event_date = datetime.strptime(date_str, '%Y%m%d').date()
-                            
-                            if event_date.year == year:
-                                holiday = PublicHoliday(
-                                    date=event_date,
-                                    name=event['summary'],
-                                    type="public"
-                                )
-                                holidays.append(holiday)
-            
-            logger.info(f"Successfully fetched {len(holidays)} holidays for {year}")
-            return holidays
-            
+            logger.info("Fetching holidays from online API...")
+            entry = await self.client.cached_json('holidays', self.api_url, timeout=self.timeout)
+            return entry.payload
         except Exception as e:
             logger.error(f"Failed to fetch online holidays: {e}")
-            return []
+            return None
+    
+    def _parse_calendar(self, data: Dict[str, Any], year: int) -> List[PublicHoliday]:
+        """Extract one year's holidays from iCal-style JSON"""
+        holidays = []
+        if 'vcalendar' in data and len(data['vcalendar']) > 0:
+            events = data['vcalendar'][0].get('vevent', [])
+            
+            for event in events:
+                if 'dtstart' in event and 'summary' in event:
+                    date_str = event['dtstart'][0]
+                    
+                    if len(date_str) == 8:  # YYYYMMDD format
+                        event_date = datetime.strptime(date_str, '%Y%m%d').date()
+                        
+                        if event_date.year == year:
+                            holidays.append(PublicHoliday(date=event_date, name=event['summary']))
+        return holidays
     
     def _load_cached_holidays(self, year: int) -> List[PublicHoliday]:
         """Load holidays from local cache file"""
@@ -155,25 +142,7 @@ class HKHolidayFetcher(HolidayDataFetcher):
                 with open(cache_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                 
-                holidays = []
-                if 'vcalendar' in data and len(data['vcalendar']) > 0:
-                    events = data['vcalendar'][0].get('vevent', [])
-                    
-                    for event in events:
-                        if 'dtstart' in event and 'summary' in event:
-                            date_str = event['dtstart'][0]
-                            
-                            if len(date_str) == 8:
-                                event_date = datetime.strptime(date_str, '%Y%m%d').date()
-                                
-                                if event_date.year == year:
-                                    holiday = PublicHoliday(
-                                        date=event_date,
-                                        name=event['summary'],
-                                        type="public"
-                                    )
-                                    holidays.append(holiday)
-                
+                holidays = self._parse_calendar(data, year)
                 logger.info(f"Loaded {len(holidays)} holidays from cache")
                 return holidays
             else:
@@ -184,37 +153,6 @@ class HKHolidayFetcher(HolidayDataFetcher):
             logger.error(f"Failed to load cached holidays: {e}")
             return []
     
-    def _save_holidays_cache(self, holidays: List[PublicHoliday], year: int):
-        """Save holidays to local cache file"""
-        try:
-            cache_file = self.cache_dir / f"public_holidays_{year}.json"
-            
-            # Convert holidays back to iCal format for consistency
-            events = []
-            for holiday in holidays:
-                event = {
-                    'dtstart': [holiday.date.strftime('%Y%m%d')],
-                    'summary': holiday.name,
-                    'uid': f"holiday_{holiday.date.strftime('%Y%m%d')}@hk.gov"
-                }
-                events.append(event)
-            
-            data = {
-                'vcalendar': [{
-                    'vevent': events,
-                    'prodid': 'HK Government Holiday Calendar',
-                    'version': '2.0'
-                }]
-            }
-            
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"Saved {len(holidays)} holidays to cache: {cache_file}")
-            
-        except Exception as e:
-            logger.error(f"Failed to save holidays cache: {e}")
-    
     def get_holiday_summary(self, year: int) -> Dict[str, Any]:
         """Get holiday summary for a year"""
         holidays = self.fetch_holidays(year)
@@ -8,7 +8,7 @@ Created: 2026-03-17
 Author: Team ESGenius
 """
 
-import requests
+import asyncio
 import json
 import logging
 from datetime import datetime, date, timedelta
@@ -18,6 +18,7 @@ import numpy as np
 try:
     from ...core.interfaces import TrafficDataFetcher
     from ...core.data_schema import TrafficCondition
+    from .async_fetch import AsyncFetchClient, get_fetch_client
 except ImportError:
     # For direct execution
     import sys
@@ -25,17 +26,20 @@ except ImportError:
     sys.path.append(str(Path(__file__).parent.parent.parent.parent))
     from src.core.interfaces import TrafficDataFetcher
     from src.core.data_schema import TrafficCondition
+    from src.modules.data.implementations.async_fetch import AsyncFetchClient, get_fetch_client
 
 logger = logging.getLogger(__name__)
 
+FREE_FLOW_SPEED_KMH = 50.0  # 畅通车速，低于该车速时行程时间按比例放大
+
 class HKTrafficFetcher(TrafficDataFetcher):
     """Hong Kong Traffic Data Fetcher using TDAS API"""
     
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: int = 10, client: Optional[AsyncFetchClient] = None):
         self.timeout = timeout
+        self.client = client or get_fetch_client()
         self.tdas_url = "https://tdas-api.hkemobility.gov.hk/tdas/api/route"
-        self._cache = {}
-        self._cache_ttl = 900  # 15 minutes cache for traffic data
+        # Responses are cached per route by the shared client (source 'tdas')
         
         # Define major routes for monitoring
         self.major_routes = [
@@ -100,7 +104,7 @@ class HKTrafficFetcher(TrafficDataFetcher):
                 "type": "ST"
             }
             
-            response = requests.post(self.tdas_url, json=payload, timeout=5)
+            response = self.client.run(self.client.post_json(self.tdas_url, payload, timeout=5))
             return response.status_code == 200
         except:
             return False
@@ -111,32 +115,16 @@ class HKTrafficFetcher(TrafficDataFetcher):
     
     def fetch_current_traffic(self, region: str = "hong_kong") -> List[TrafficCondition]:
         """Fetch current traffic conditions"""
-        cache_key = f'current_traffic_{region}'
-        
-        # Check cache
-        if cache_key in self._cache:
-            cache_time, traffic_data = self._cache[cache_key]
-            if (datetime.now() - cache_time).total_seconds() < self._cache_ttl:
-                return traffic_data
-        
+        return self.client.run(self.fetch_current_traffic_async(region))
+    
+    async def fetch_current_traffic_async(self, region: str = "hong_kong") -> List[TrafficCondition]:
+        """Fetch current traffic conditions, all routes concurrently"""
         try:
             logger.info("Fetching current traffic conditions...")
             
-            traffic_data = []
-            
-            for route in self.major_routes:
-                try:
-                    condition = self._fetch_route_condition(route)
-                    if condition:
-                        traffic_data.append(condition)
-                except Exception as e:
-                    logger.warning(f"Failed to fetch traffic for {route['name']}: {e}")
-                    # Add fallback data
-                    fallback = self._generate_fallback_condition(route)
-                    traffic_data.append(fallback)
-            
-            # Update cache
-            self._cache[cache_key] = (datetime.now(), traffic_data)
+            # 各路段并发请求，总耗时取决于最慢的一个
+            conditions = await asyncio.gather(*(self._fetch_route_condition(route) for route in self.major_routes))
+            traffic_data = [condition for condition in conditions if condition]
             
             logger.info(f"Successfully fetched traffic data for {len(traffic_data)} routes")
             return traffic_data
@@ -150,7 +138,7 @@ class HKTrafficFetcher(TrafficDataFetcher):
         logger.warning("Traffic forecast not available, returning current conditions")
         return self.fetch_current_traffic()
     
-    def _fetch_route_condition(self, route: Dict[str, Any]) -> Optional[TrafficCondition]:
+    async def _fetch_route_condition(self, route: Dict[str, Any]) -> Optional[TrafficCondition]:
         """Fetch traffic condition for a specific route"""
         try:
             payload = {
@@ -167,46 +155,42 @@ class HKTrafficFetcher(TrafficDataFetcher):
                 "type": "ST"  # Shortest time
             }
             
-            response = requests.post(self.tdas_url, json=payload, timeout=self.timeout)
+            entry = await self.client.cached_json('tdas', self.tdas_url, method='POST', payload=payload,
+                                                  timeout=self.timeout)
+            return self._parse_route_condition(route, entry.payload, datetime.fromtimestamp(entry.fetched_at))
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Extract traffic information
-                speed = data.get('jSpeed', 40)  # Average speed (km/h)
-                eta_minutes = data.get('eta', 15)  # Estimated time (minutes)
-                distance = data.get('dist', 5)  # Distance (km)
-                
-                # Ensure numeric values
-                try:
-                    speed = float(speed) if speed is not None else 40.0
-                    eta_minutes = float(eta_minutes) if eta_minutes is not None else 15.0
-                except (ValueError, TypeError):
-                    speed = 40.0
-                    eta_minutes = 15.0
-                
-                # Calculate congestion level based on speed
-                congestion_level = self._calculate_congestion_level(speed)
-                
-                # Check for incidents (not directly available in TDAS)
-                incident_reported = False
-                
-                return TrafficCondition(
-                    timestamp=datetime.now(),
-                    road_segment=route["name"],
-                    speed_kmh=speed,
-                    congestion_level=congestion_level,
-                    travel_time_minutes=eta_minutes,
-                    incident_reported=incident_reported
-                )
-            else:
-                logger.warning(f"TDAS API returned status {response.status_code} for {route['name']}")
-                return None
-                
         except Exception as e:
             logger.error(f"Failed to fetch route condition for {route['name']}: {e}")
             return None
     
+    def _parse_route_condition(self, route: Dict[str, Any], data: Dict[str, Any],
+                               observed_at: Optional[datetime] = None) -> TrafficCondition:
+        """Convert a TDAS route response (fetched at observed_at) to TrafficCondition"""
+        # Extract traffic information
+        speed = data.get('jSpeed', 40)  # Average speed (km/h)
+        
+        # Ensure numeric values
+        try:
+            speed = float(speed) if speed is not None else 40.0
+        except (ValueError, TypeError):
+            speed = 40.0
+        
+        # Calculate congestion level based on speed
+        congestion_level = self._calculate_congestion_level(speed)
+        
+        return TrafficCondition(
+            timestamp=observed_at or datetime.now(),
+            road_segment=route["name"],
+            speed_kmh=speed,
+            congestion_level=congestion_level,
+            travel_time_factor=self._travel_time_factor(speed),
+            incident_reported=False  # Not directly available in TDAS
+        )
+    
+    def _travel_time_factor(self, speed_kmh: float) -> float:
+        """Travel time relative to free flow"""
+        return max(1.0, FREE_FLOW_SPEED_KMH / max(float(speed_kmh), 1.0))
+    
     def _calculate_congestion_level(self, speed_kmh: float) -> int:
         """Calculate congestion level based on speed"""
         # Ensure speed is a number
@@ -236,28 +220,24 @@ class HKTrafficFetcher(TrafficDataFetcher):
             # Rush hour - slower traffic
             speed = np.random.normal(25, 5)
             congestion = 4
-            travel_time = np.random.normal(20, 5)
         elif 22 <= current_hour or current_hour <= 6:
             # Night time - faster traffic
             speed = np.random.normal(50, 8)
             congestion = 1
-            travel_time = np.random.normal(10, 3)
         else:
             # Normal hours
             speed = np.random.normal(40, 8)
             congestion = 2
-            travel_time = np.random.normal(15, 4)
         
         # Ensure reasonable bounds
         speed = max(10, min(80, speed))
-        travel_time = max(5, travel_time)
         
         return TrafficCondition(
             timestamp=datetime.now(),
             road_segment=route["name"],
             speed_kmh=float(speed),
             congestion_level=congestion,
-            travel_time_minutes=float(travel_time),
+            travel_time_factor=self._travel_time_factor(speed),
             incident_reported=np.random.random() < 0.05  # 5% chance of incident
         )
     
@@ -284,7 +264,7 @@ class HKTrafficFetcher(TrafficDataFetcher):
                 'name': traffic.road_segment,
                 'speed_kmh': traffic.speed_kmh,
                 'congestion_level': traffic.congestion_level,
-                'travel_time_minutes': traffic.travel_time_minutes,
+                'travel_time_factor': traffic.travel_time_factor,
                 'status': self._get_traffic_status(traffic.congestion_level)
             }
             summary['routes'].append(route_info)
@@ -316,7 +296,7 @@ def test_traffic_fetcher():
     
     for traffic in traffic_data[:3]:  # Show first 3
         print(f"  {traffic.road_segment}: {traffic.speed_kmh:.1f} km/h, "
-              f"Level {traffic.congestion_level}, {traffic.travel_time_minutes:.1f} min")
+              f"Level {traffic.congestion_level}, x{traffic.travel_time_factor:.2f} travel time")
     
     # Test summary
     summary = fetcher.get_traffic_summary()
@@ -1,11 +1,24 @@
 """Forecasting module exports."""
 
 from .prophet_forecaster import ProphetForecaster, create_prophet_forecaster
+from .global_forecaster import GlobalDemandForecaster, compare_forecasters, create_global_forecaster
 from .sla_predictor import MLSLAPredictor, create_sla_predictor
+from .risk_engine import SLARiskEngine
+from .sla_monitor import StreamingSLAMonitor, create_sla_monitor
+from .reconciliation import ForecastHierarchy, HierarchicalReconciler, create_reconciler
 
 __all__ = [
     "ProphetForecaster",
+    "GlobalDemandForecaster",
     "MLSLAPredictor",
+    "SLARiskEngine",
+    "StreamingSLAMonitor",
+    "ForecastHierarchy",
+    "HierarchicalReconciler",
     "create_prophet_forecaster",
+    "create_global_forecaster",
+    "compare_forecasters",
     "create_sla_predictor",
+    "create_sla_monitor",
+    "create_reconciler",
 ]
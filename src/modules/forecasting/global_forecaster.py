@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+万宁SLA优化系统 - 全局需求预测模块
+所有门店共用一个回归模型（梯度提升树或岭回归），替代逐门店训练Prophet
+
+- 特征: 滞后(7/14/21/28天)、滚动均值/标准差、日历特征、门店嵌入(水平、波动、周内模式，只用滞后7天以前的数据)
+- 目标按门店水平归一化，使不同规模的门店共享同一模型
+- 最小滞后为7天，7天内的预测只需一次批量predict；更长的预测按周递推
+
+创建时间: 2026-10-19
+作者: Team ESGenius
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime, date
+from typing import List, Dict, Optional, Any, Iterable
+import logging
+import time
+from pathlib import Path
+
+try:
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+    logging.warning("Scikit-learn not available. Install with: pip install scikit-learn")
+
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+try:
+    from core.interfaces import DemandForecaster
+    from core.data_schema import DemandForecast
+except ImportError:
+    sys.path.append(str(project_root / "src"))
+    from core.interfaces import DemandForecaster
+    from core.data_schema import DemandForecast
+
+from .prophet_forecaster import ProphetForecaster, create_hk_holidays_dataframe
+
+logger = logging.getLogger(__name__)
+
+
+LAG_DAYS = (7, 14, 21, 28)
+MIN_LAG = min(LAG_DAYS)  # 预测块长度：块内所有特征均可由已知数据计算
+CALENDAR_FEATURES = [
+    'day_of_week', 'day_of_month', 'month', 'is_weekend',
+    'is_holiday', 'is_month_end', 'is_month_start',
+]
+STORE_FEATURES = ['store_level', 'store_cv', 'store_weekday_ratio']
+GLOBAL_MODEL_TYPES = ('gbm', 'ridge')
+
+
+class _NumpyRidge:
+    """sklearn不可用时的闭式岭回归"""
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.mean_ = None
+        self.scale_ = None
+        self.coef_ = None
+        self.intercept_ = 0.0
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.mean_ = X.mean(axis=0)
+        self.scale_ = np.where(X.std(axis=0) > 0, X.std(axis=0), 1.0)
+        Z = (X - self.mean_) / self.scale_
+        self.intercept_ = float(y.mean())
+        gram = Z.T @ Z + self.alpha * np.eye(Z.shape[1])
+        self.coef_ = np.linalg.solve(gram, Z.T @ (y - self.intercept_))
+        return self
+
+    def predict(self, X):
+        Z = (np.asarray(X, dtype=float) - self.mean_) / self.scale_
+        return Z @ self.coef_ + self.intercept_
+
+
+class GlobalDemandForecaster(DemandForecaster):
+    """跨门店全局需求预测器（一次训练、一次批量预测）"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = {**self._get_default_config(), **(config or {})}
+        if self.config['model_type'] not in GLOBAL_MODEL_TYPES:
+            raise ValueError(f"不支持的模型类型: {self.config['model_type']}，可选: {GLOBAL_MODEL_TYPES}")
+
+        self.model = None
+        self.is_trained = False
+        self.feature_columns = [f'lag_{lag}' for lag in LAG_DAYS] + [
+            'rolling_mean_7', 'rolling_mean_28', 'rolling_std_7',
+        ] + CALENDAR_FEATURES + STORE_FEATURES
+        self.store_profiles = pd.DataFrame()  # 门店嵌入快照: 水平、变异系数、周内各天比率
+        self.training_stats: Dict[str, Any] = {}
+        self._history = pd.DataFrame()  # 日期 × 门店 的需求宽表
+        self._fill_values = np.zeros(len(self.feature_columns))
+        self._residual_quantiles = (0.0, 0.0)
+        self._holiday_dates = set(create_hk_holidays_dataframe()['ds'].dt.normalize())
+        self.backend = "sklearn" if SKLEARN_AVAILABLE else "numpy"
+
+    def _get_default_config(self) -> Dict[str, Any]:
+        """获取默认配置"""
+        return {
+            'model_type': 'gbm',
+            'min_history_days': 30,
+            'max_iter': 200,
+            'learning_rate': 0.05,
+            'max_leaf_nodes': 31,
+            'ridge_alpha': 1.0,
+            'interval_quantiles': (0.1, 0.9),
+            'random_state': 42,
+        }
+
+    @property
+    def models(self) -> Dict[str, Any]:
+        """兼容逐门店模型接口：所有门店共享同一个模型"""
+        return {store_code: self.model for store_code in self.store_profiles.index} if self.is_trained else {}
+
+    @property
+    def model_version(self) -> str:
+        return f"global_{self.config['model_type']}_v1.0"
+
+    def train(self, training_data: pd.DataFrame, **kwargs) -> None:
+        """训练全局模型（所有门店一次拟合）"""
+        logger.info("开始训练全局需求预测模型...")
+        train_start = time.perf_counter()
+
+        panel = self._build_daily_panel(training_data)
+        history_days = panel.notna().sum()
+        eligible = history_days[history_days >= self.config['min_history_days']].index
+        skipped = len(panel.columns) - len(eligible)
+        if skipped:
+            logger.warning(f"{skipped} 个门店数据点不足{self.config['min_history_days']}天，跳过训练")
+        panel = panel[eligible]
+        if panel.empty:
+            logger.warning("没有满足最少历史天数的门店，全局模型未训练")
+            return
+
+        self.store_profiles = self._build_store_profiles(panel)
+        features = self._build_features(panel, panel.index)
+        features = features[features['target'].notna() & features['rolling_mean_7'].notna()]
+
+        X = features[self.feature_columns].to_numpy(dtype=float)
+        y = features['target'].to_numpy(dtype=float)
+        self._fill_values = np.nan_to_num(np.nanmedian(X, axis=0), nan=0.0)
+
+        self.model = self._create_model()
+        self.model.fit(self._prepare_matrix(X), y)
+
+        # 样本内残差分位数用于置信区间（归一化尺度）
+        residuals = y - self.model.predict(self._prepare_matrix(X))
+        low_q, high_q = self.config['interval_quantiles']
+        self._residual_quantiles = (
+            min(0.0, float(np.quantile(residuals, low_q))),
+            max(0.0, float(np.quantile(residuals, high_q))),
+        )
+
+        self._history = panel
+        self.is_trained = True
+        self.training_stats = {
+            'input_rows': len(training_data),
+            'training_rows': len(features),
+            'feature_count': len(self.feature_columns),
+            'stores_trained': len(panel.columns),
+            'train_seconds': round(time.perf_counter() - train_start, 4),
+        }
+        logger.info(
+            f"✅ 全局模型训练完成: {len(panel.columns)} 个门店, {len(features)} 条样本, "
+            f"耗时 {self.training_stats['train_seconds']:.2f}s"
+        )
+
+    def predict(self, forecast_horizon: int, **kwargs) -> List[DemandForecast]:
+        """预测所有门店未来 forecast_horizon 天的聚合需求"""
+        if not self.is_trained:
+            raise ValueError("模型尚未训练，请先调用train()方法")
+
+        last_date = self._history.index.max()
+        forecast_dates = pd.date_range(last_date + pd.Timedelta(days=1), periods=forecast_horizon, freq='D')
+        frame = self.predict_frame(self._history.columns.tolist(), forecast_dates)
+        forecasts = self._to_demand_forecasts(frame, ["aggregate"])
+        logger.info(f"✅ 预测完成，生成 {len(forecasts)} 个预测结果")
+        return forecasts
+
+    def predict_store_demand(self, store_code: str, sku_id: str, forecast_date: date) -> DemandForecast:
+        """预测单店单SKU需求"""
+        if str(store_code) not in self._history.columns:
+            raise ValueError(f"门店 {store_code} 的历史数据不存在")
+        return self.predict_batch_demand([store_code], [sku_id], [forecast_date])[0]
+
+    def predict_batch_demand(self, store_codes: List[str], sku_ids: List[str],
+                             forecast_dates: List[date]) -> List[DemandForecast]:
+        """批量预测需求（门店 × 日期一次predict，SKU共享门店聚合预测）"""
+        if not self.is_trained:
+            raise ValueError("模型尚未训练，请先调用train()方法")
+        frame = self.predict_frame(store_codes, forecast_dates)
+        return self._to_demand_forecasts(frame, sku_ids)
+
+    def predict_frame(self, store_codes: Iterable[Any], forecast_dates: Iterable[Any]) -> pd.DataFrame:
+        """
+        批量预测门店日需求
+
+        Returns:
+            DataFrame[store_code, ds, yhat, yhat_lower, yhat_upper]，按 ds、门店排序
+        """
+        columns = ['store_code', 'ds', 'yhat', 'yhat_lower', 'yhat_upper']
+        requested = [str(code) for code in store_codes]
+        stores = [code for code in dict.fromkeys(requested) if code in self._history.columns]
+        missing = set(requested) - set(stores)
+        if missing:
+            logger.warning(f"门店无历史数据，跳过预测: {sorted(missing)}")
+        dates = pd.DatetimeIndex(sorted({pd.Timestamp(d).normalize() for d in forecast_dates}))
+        if not stores or dates.empty:
+            return pd.DataFrame(columns=columns)
+
+        panel = self._history[stores]
+        last_date = panel.index.max()
+        parts = []
+
+        past_dates = dates[dates <= last_date]
+        if len(past_dates):
+            parts.append(self._predict_dates(panel, past_dates))
+
+        # 未来日期按 MIN_LAG 天分块递推，每块一次批量predict
+        future_end = dates.max()
+        if future_end > last_date:
+            panel = panel.reindex(pd.date_range(panel.index.min(), future_end, freq='D'))
+            block_start = last_date + pd.Timedelta(days=1)
+            while block_start <= future_end:
+                block_dates = pd.date_range(block_start, min(block_start + pd.Timedelta(days=MIN_LAG - 1), future_end))
+                block = self._predict_dates(panel, block_dates)
+                panel.loc[block_dates] = block['yhat'].to_numpy().reshape(len(block_dates), len(stores))
+                parts.append(block[block['ds'].isin(dates)])
+                block_start = block_dates[-1] + pd.Timedelta(days=1)
+
+        return pd.concat(parts, ignore_index=True)[columns]
+
+    def evaluate(self, test_data: pd.DataFrame) -> Dict[str, float]:
+        """评估模型性能（测试期使用真实滞后值）"""
+        if not self.is_trained:
+            raise ValueError("模型尚未训练")
+
+        test_panel = self._build_daily_panel(test_data)
+        stores = [code for code in test_panel.columns if code in self._history.columns]
+        if not stores:
+            return {'error': '测试数据中没有已训练的门店'}
+
+        combined = test_panel[stores].combine_first(self._history[stores])[stores]
+        test_dates = test_panel.index
+        predicted = self._predict_dates(combined, test_dates)
+        predicted['actual'] = test_panel[stores].to_numpy().ravel()
+        predicted = predicted[predicted['actual'].notna()]
+
+        metrics = {}
+        for store_code, group in predicted.groupby('store_code', sort=False):
+            metrics[store_code] = _accuracy_metrics(group)
+
+        overall_metrics = {
+            'overall_mape': np.mean([m['mape'] for m in metrics.values()]),
+            'overall_mae': np.mean([m['mae'] for m in metrics.values()]),
+            'overall_rmse': np.mean([m['rmse'] for m in metrics.values()]),
+            'overall_coverage': np.mean([m['coverage'] for m in metrics.values()]),
+            'store_metrics': metrics
+        }
+        logger.info(f"✅ 模型评估完成，总体MAPE: {overall_metrics['overall_mape']:.3f}")
+        return overall_metrics
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """获取模型元信息"""
+        return {
+            'backend': self.backend,
+            'model_type': self.config['model_type'],
+            'model_version': self.model_version,
+            'is_trained': self.is_trained,
+            'store_count': len(self.store_profiles),
+            'feature_columns': list(self.feature_columns),
+            'training_stats': dict(self.training_stats),
+            'config': self.config
+        }
+
+    def save_model(self, filepath: str) -> None:
+        """保存模型"""
+        import pickle
+
+        model_data = {
+            'model': self.model,
+            'config': self.config,
+            'is_trained': self.is_trained,
+            'store_profiles': self.store_profiles,
+            'history': self._history,
+            'fill_values': self._fill_values,
+            'residual_quantiles': self._residual_quantiles,
+        }
+
+        with open(filepath, 'wb') as f:
+            pickle.dump(model_data, f)
+
+        logger.info(f"✅ 模型已保存到 {filepath}")
+
+    def load_model(self, filepath: str) -> None:
+        """加载模型"""
+        import pickle
+
+        with open(filepath, 'rb') as f:
+            model_data = pickle.load(f)
+
+        self.model = model_data['model']
+        self.config = model_data['config']
+        self.is_trained = model_data['is_trained']
+        self.store_profiles = model_data['store_profiles']
+        self._history = model_data['history']
+        self._fill_values = model_data['fill_values']
+        self._residual_quantiles = model_data['residual_quantiles']
+
+        logger.info(f"✅ 模型已从 {filepath} 加载")
+
+    # ==================== 辅助方法 ====================
+
+    def _create_model(self):
+        if self.config['model_type'] == 'ridge':
+            if SKLEARN_AVAILABLE:
+                return make_pipeline(StandardScaler(), Ridge(alpha=self.config['ridge_alpha']))
+            return _NumpyRidge(alpha=self.config['ridge_alpha'])
+
+        if not SKLEARN_AVAILABLE:
+            logger.warning("Scikit-learn未安装，梯度提升模型回退为岭回归")
+            return _NumpyRidge(alpha=self.config['ridge_alpha'])
+        return HistGradientBoostingRegressor(
+            max_iter=self.config['max_iter'],
+            learning_rate=self.config['learning_rate'],
+            max_leaf_nodes=self.config['max_leaf_nodes'],
+            random_state=self.config['random_state'],
+        )
+
+    def _prepare_matrix(self, X: np.ndarray) -> np.ndarray:
+        """梯度提升树原生支持缺失值；线性模型用训练中位数填补"""
+        if self.config['model_type'] == 'gbm' and SKLEARN_AVAILABLE:
+            return X
+        return np.where(np.isnan(X), self._fill_values, X)
+
+    def _build_daily_panel(self, data: pd.DataFrame) -> pd.DataFrame:
+        """构建 日期 × 门店 需求宽表；门店首次出现之后的缺失日视为0需求"""
+        date_col = next((col for col in ('order_date', 'ds', 'dt') if col in data.columns), None)
+        if date_col is None:
+            raise ValueError("数据必须包含 'order_date' 或 'ds' 列")
+        store_col = next((col for col in ('store_code', 'fulfillment_store_code') if col in data.columns), None)
+        if store_col is None:
+            raise ValueError("数据必须包含门店代码列")
+        value_col = 'total_quantity' if 'total_quantity' in data.columns else 'y'
+
+        frame = pd.DataFrame({
+            'store_code': data[store_col].astype(str).to_numpy(),
+            'ds': pd.to_datetime(data[date_col]).dt.normalize().to_numpy(),
+            'y': pd.to_numeric(data[value_col], errors='coerce').fillna(0.0).to_numpy(dtype=float),
+        })
+        panel = frame.pivot_table(index='ds', columns='store_code', values='y', aggfunc='sum')
+        panel = panel.reindex(pd.date_range(panel.index.min(), panel.index.max(), freq='D'))
+        active = panel.notna().cummax()
+        panel = panel.fillna(0.0).where(active)
+        panel.index.name = 'ds'
+        panel.columns.name = 'store_code'
+        return panel
+
+    @staticmethod
+    def _build_store_profiles(panel: pd.DataFrame) -> pd.DataFrame:
+        """门店嵌入快照（训练窗口末尾）：需求水平、变异系数、周内各天相对水平；特征使用逐日版本"""
+        level = panel.mean().clip(lower=1.0)
+        profiles = pd.DataFrame({
+            'store_level': level,
+            'store_cv': (panel.std() / level).fillna(0.0),
+        })
+        weekday = panel.groupby(panel.index.dayofweek).mean().reindex(range(7))
+        weekday_ratio = (weekday / level).fillna(1.0).T
+        weekday_ratio.columns = [f'weekday_ratio_{day}' for day in range(7)]
+        return pd.concat([profiles, weekday_ratio], axis=1)
+
+    @staticmethod
+    def _point_in_time_profiles(panel: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        逐日门店嵌入（日期 × 门店）：第 t 天只用 t-MIN_LAG 及之前的数据
+
+        与滞后特征使用同一信息集，训练样本的嵌入不包含目标日本身及之后的需求。
+        历史最初 MIN_LAG 天没有可用数据，水平取门店第一个可用值（这些日期不进入训练样本）。
+        """
+        shifted = panel.shift(MIN_LAG)
+        level = shifted.expanding().mean().clip(lower=1.0).bfill()
+        # 平移 MIN_LAG(7) 天后星期不变：同星期分组的累计均值即 t 之前同一星期几的平均需求
+        weekday = shifted.groupby(shifted.index.dayofweek).transform(lambda col: col.expanding().mean())
+        return {
+            'store_level': level,
+            'store_cv': (shifted.expanding(min_periods=2).std() / level).fillna(0.0),
+            'store_weekday_ratio': (weekday / level).fillna(1.0),
+        }
+
+    def _build_features(self, panel: pd.DataFrame, target_dates: pd.DatetimeIndex) -> pd.DataFrame:
+        """为 target_dates × 门店 构建特征长表（行顺序: 日期优先、门店次之）"""
+        profiles = self._point_in_time_profiles(panel)
+        level = profiles['store_level']
+        shifted = panel.shift(MIN_LAG)
+
+        series = {f'lag_{lag}': panel.shift(lag) / level for lag in LAG_DAYS}
+        series['rolling_mean_7'] = shifted.rolling(7, min_periods=1).mean() / level
+        series['rolling_mean_28'] = shifted.rolling(28, min_periods=7).mean() / level
+        series['rolling_std_7'] = shifted.rolling(7, min_periods=2).std() / level
+        series['target'] = panel / level
+        series.update(profiles)
+
+        n_stores = len(panel.columns)
+        columns = {
+            'store_code': np.tile(panel.columns.to_numpy(), len(target_dates)),
+            'ds': np.repeat(target_dates.to_numpy(), n_stores),
+        }
+        for name, frame in series.items():
+            columns[name] = frame.reindex(target_dates).to_numpy(dtype=float).ravel()
+
+        calendar = self._calendar_features(target_dates)
+        for name in CALENDAR_FEATURES:
+            columns[name] = np.repeat(calendar[name], n_stores)
+
+        return pd.DataFrame(columns)
+
+    def _calendar_features(self, dates: pd.DatetimeIndex) -> Dict[str, np.ndarray]:
+        return {
+            'day_of_week': dates.dayofweek.to_numpy(),
+            'day_of_month': dates.day.to_numpy(),
+            'month': dates.month.to_numpy(),
+            'is_weekend': (dates.dayofweek >= 5).astype(int),
+            'is_holiday': dates.isin(self._holiday_dates).astype(int),
+            'is_month_end': (dates.day >= 28).astype(int),
+            'is_month_start': (dates.day <= 3).astype(int),
+        }
+
+    def _predict_dates(self, panel: pd.DataFrame, target_dates: pd.DatetimeIndex) -> pd.DataFrame:
+        """对 target_dates × 门店 执行一次批量预测（反归一化到原始尺度）"""
+        features = self._build_features(panel, target_dates)
+        X = features[self.feature_columns].to_numpy(dtype=float)
+        normalized = self.model.predict(self._prepare_matrix(X))
+        level = features['store_level'].to_numpy()
+        low_q, high_q = self._residual_quantiles
+
+        yhat = np.maximum(0.0, normalized * level)
+        return pd.DataFrame({
+            'store_code': features['store_code'],
+            'ds': features['ds'],
+            'yhat': yhat,
+            'yhat_lower': np.minimum(yhat, np.maximum(0.0, (normalized + low_q) * level)),
+            'yhat_upper': np.maximum(yhat, (normalized + high_q) * level),
+            'is_holiday': features['is_holiday'],
+            'is_weekend': features['is_weekend'],
+        })
+
+    def _to_demand_forecasts(self, frame: pd.DataFrame, sku_ids: List[str]) -> List[DemandForecast]:
+        timestamp = datetime.now()
+        records = frame.to_dict('records')
+        return [
+            DemandForecast(
+                store_code=row['store_code'],
+                sku_id=sku_id,
+                forecast_date=row['ds'].date(),
+                predicted_demand=float(row['yhat']),
+                confidence_intervals={
+                    'P10': float(row['yhat_lower']),
+                    'P50': float(row['yhat']),
+                    'P90': float(row['yhat_upper']),
+                },
+                external_factors={
+                    'holiday_impact': float(row.get('is_holiday', 0)),
+                    'weekend_impact': float(row.get('is_weekend', 0)),
+                },
+                model_version=self.model_version,
+                forecast_timestamp=timestamp,
+            )
+            for row in records
+            for sku_id in sku_ids
+        ]
+
+
+def _accuracy_metrics(frame: pd.DataFrame) -> Dict[str, float]:
+    actual = frame['actual'].to_numpy(dtype=float)
+    pred = frame['yhat'].to_numpy(dtype=float)
+    denom = np.maximum(np.abs(actual), 1.0)
+    metrics = {
+        'mape': float(np.mean(np.abs(actual - pred) / denom)),
+        'mae': float(np.mean(np.abs(actual - pred))),
+        'rmse': float(np.sqrt(np.mean((actual - pred) ** 2))),
+    }
+    if 'yhat_lower' in frame.columns:
+        metrics['coverage'] = float(np.mean((actual >= frame['yhat_lower']) & (actual <= frame['yhat_upper'])))
+    return metrics
+
+
+# ==================== 模型对比 ====================
+
+def compare_forecasters(
+    training_data: pd.DataFrame,
+    holdout_days: int = 14,
+    forecasters: Optional[Dict[str, DemandForecaster]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    留出最后 holdout_days 天，比较各预测器的准确率与耗时
+
+    仅在所有预测器都覆盖的门店上计算指标（Prophet默认只训练部分门店）。
+    """
+    if forecasters is None:
+        forecasters = {
+            'prophet': ProphetForecaster(),
+            'global_gbm': GlobalDemandForecaster({'model_type': 'gbm'}),
+            'global_ridge': GlobalDemandForecaster({'model_type': 'ridge'}),
+        }
+
+    date_col = 'order_date' if 'order_date' in training_data.columns else 'ds'
+    store_col = 'store_code' if 'store_code' in training_data.columns else 'fulfillment_store_code'
+    dates = pd.to_datetime(training_data[date_col]).dt.normalize()
+    cutoff = dates.max() - pd.Timedelta(days=holdout_days)
+
+    holdout = training_data[dates > cutoff]
+    actual = (
+        pd.DataFrame({
+            'store_code': holdout[store_col].astype(str).to_numpy(),
+            'ds': dates[dates > cutoff].to_numpy(),
+            'actual': pd.to_numeric(holdout['total_quantity'], errors='coerce').fillna(0.0).to_numpy(),
+        })
+        .groupby(['store_code', 'ds'], as_index=False)['actual'].sum()
+    )
+
+    predictions: Dict[str, pd.DataFrame] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    for name, forecaster in forecasters.items():
+        train_start = time.perf_counter()
+        forecaster.train(training_data[dates <= cutoff].copy())
+        predict_start = time.perf_counter()
+        forecasts = forecaster.predict(forecast_horizon=holdout_days)
+        predict_end = time.perf_counter()
+
+        predictions[name] = pd.DataFrame({
+            'store_code': [str(f.store_code) for f in forecasts],
+            'ds': [pd.Timestamp(f.forecast_date) for f in forecasts],
+            'yhat': [float(f.predicted_demand) for f in forecasts],
+        })
+        timings[name] = {
+            'train_seconds': round(predict_start - train_start, 4),
+            'predict_seconds': round(predict_end - predict_start, 4),
+        }
+
+    common_stores = set.intersection(*(set(frame['store_code']) for frame in predictions.values())) if predictions else set()
+    results = {}
+    for name, frame in predictions.items():
+        merged = actual.merge(frame, on=['store_code', 'ds'], how='inner')
+        merged = merged[merged['store_code'].isin(common_stores)]
+        metrics = _accuracy_metrics(merged) if not merged.empty else {}
+        results[name] = {
+            **metrics,
+            **timings[name],
+            'stores_forecast': int(frame['store_code'].nunique()),
+            'stores_compared': len(common_stores),
+            'points_compared': len(merged),
+        }
+    return results
+
+
+# ==================== 工厂函数 ====================
+
+def create_global_forecaster(config: Dict[str, Any] = None) -> GlobalDemandForecaster:
+    """创建全局需求预测器实例"""
+    return GlobalDemandForecaster(config)
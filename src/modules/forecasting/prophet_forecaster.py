@@ -13,6 +13,8 @@ import numpy as np
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Optional, Tuple, Any
 import logging
+import time
+import tracemalloc
 from pathlib import Path
 
 try:
@@ -121,6 +123,40 @@ class _FallbackProphetModel:
 
         return np.maximum(0.0, values)
 
+
+def create_hk_holidays_dataframe() -> pd.DataFrame:
+    """创建香港公共假期数据框（Prophet holidays格式）"""
+    holidays = []
+    
+    # 香港主要公共假期
+    years = [2025, 2026, 2027]
+    
+    for year in years:
+        # 固定日期假期
+        holidays.extend([
+            {'holiday': 'New Year', 'ds': f'{year}-01-01', 'lower_window': 0, 'upper_window': 1},
+            {'holiday': 'Labour Day', 'ds': f'{year}-05-01', 'lower_window': 0, 'upper_window': 0},
+            {'holiday': 'National Day', 'ds': f'{year}-10-01', 'lower_window': 0, 'upper_window': 2},
+            {'holiday': 'Christmas', 'ds': f'{year}-12-25', 'lower_window': -1, 'upper_window': 1},
+            {'holiday': 'Boxing Day', 'ds': f'{year}-12-26', 'lower_window': 0, 'upper_window': 0},
+        ])
+        
+        # 农历新年（近似日期）
+        if year == 2025:
+            holidays.append({'holiday': 'Chinese New Year', 'ds': '2025-01-29', 'lower_window': -1, 'upper_window': 3})
+        elif year == 2026:
+            holidays.append({'holiday': 'Chinese New Year', 'ds': '2026-02-17', 'lower_window': -1, 'upper_window': 3})
+        elif year == 2027:
+            holidays.append({'holiday': 'Chinese New Year', 'ds': '2027-02-06', 'lower_window': -1, 'upper_window': 3})
+    
+    if holidays:
+        holidays_df = pd.DataFrame(holidays)
+        holidays_df['ds'] = pd.to_datetime(holidays_df['ds'])
+        return holidays_df
+    else:
+        return pd.DataFrame(columns=['holiday', 'ds', 'lower_window', 'upper_window'])
+
+
 class ProphetForecaster(DemandForecaster):
     """基于Prophet的需求预测器"""
     
@@ -129,6 +165,7 @@ class ProphetForecaster(DemandForecaster):
         self.models = {}  # store_code -> model
         self.is_trained = False
         self.feature_columns = []
+        self.training_stats: Dict[str, Any] = {}
         self.backend = "prophet" if PROPHET_AVAILABLE else "fallback"
 
         if not PROPHET_AVAILABLE:
@@ -146,7 +183,8 @@ class ProphetForecaster(DemandForecaster):
             'changepoint_prior_scale': 0.05,
             'interval_width': 0.8,
             'uncertainty_samples': 1000,
-            'mcmc_samples': 0
+            'mcmc_samples': 0,
+            'profile_memory': False  # 训练时用 tracemalloc 测量预处理峰值内存（较慢）
         }
     
     def train(self, training_data: pd.DataFrame, **kwargs) -> None:
@@ -154,8 +192,27 @@ class ProphetForecaster(DemandForecaster):
         logger.info("开始训练Prophet预测模型...")
         
         try:
-            # 数据预处理
-            processed_data = self._preprocess_training_data(training_data)
+            # 数据预处理（记录耗时；峰值内存只在 profile_memory 开启时测量）
+            # tracemalloc 会拖慢所有内存分配，且已有外部追踪时不能重置其峰值，此时不测量
+            measure_memory = self.config.get('profile_memory', False) and not tracemalloc.is_tracing()
+            if measure_memory:
+                tracemalloc.start()
+            preprocess_start = time.perf_counter()
+            try:
+                processed_data = self._preprocess_training_data(training_data)
+                peak_bytes = tracemalloc.get_traced_memory()[1] if measure_memory else None
+            finally:
+                if measure_memory:
+                    tracemalloc.stop()
+            
+            self.training_stats = {
+                'input_rows': len(training_data),
+                'aggregated_rows': len(processed_data),
+                'feature_count': len(self.feature_columns),
+                'preprocess_seconds': round(time.perf_counter() - preprocess_start, 4),
+                'preprocess_peak_memory_mb': (round(peak_bytes / (1024 * 1024), 3)
+                                              if peak_bytes is not None else None),
+            }
             
             # 按门店分组训练
             store_codes = processed_data['store_code'].unique()
@@ -217,6 +274,7 @@ class ProphetForecaster(DemandForecaster):
                 self.models[store_code] = model
             
             self.is_trained = True
+            self.training_stats['stores_trained'] = len(self.models)
             logger.info(f"✅ 所有模型训练完成，共训练 {len(self.models)} 个门店模型")
             
         except Exception as e:
@@ -248,22 +306,7 @@ class ProphetForecaster(DemandForecaster):
                 # 提取预测结果
                 future_forecast = forecast.tail(forecast_horizon)
                 
-                for _, row in future_forecast.iterrows():
-                    demand_forecast = DemandForecast(
-                        store_code=store_code,
-                        sku_id="aggregate",  # 聚合预测
-                        forecast_date=row['ds'].date(),
-                        predicted_demand=max(0, row['yhat']),  # 确保非负
-                        confidence_intervals={
-                            'P10': max(0, row['yhat_lower']),
-                            'P50': max(0, row['yhat']),
-                            'P90': max(0, row['yhat_upper'])
-                        },
-                        external_factors=self._extract_external_factors(row),
-                        model_version="prophet_v1.0",
-                        forecast_timestamp=datetime.now()
-                    )
-                    forecasts.append(demand_forecast)
+                forecasts.extend(self._forecasts_from_frame(store_code, future_forecast))
             
             logger.info(f"✅ 预测完成，生成 {len(forecasts)} 个预测结果")
             return forecasts
@@ -423,6 +466,7 @@ class ProphetForecaster(DemandForecaster):
             'is_trained': self.is_trained,
             'store_count': len(self.models),
             'feature_columns': list(self.feature_columns),
+            'training_stats': dict(self.training_stats),
             'config': self.config
         }
     
@@ -459,30 +503,22 @@ class ProphetForecaster(DemandForecaster):
     # ==================== 辅助方法 ====================
     
     def _preprocess_training_data(self, data: pd.DataFrame) -> pd.DataFrame:
-        """预处理训练数据"""
-        processed = data.copy()
-        
+        """预处理训练数据（单次分组聚合，不复制原始数据）"""
         # 确保日期列存在
-        if 'order_date' in processed.columns:
-            processed['ds'] = pd.to_datetime(processed['order_date'])
-        elif 'ds' not in processed.columns:
+        if 'order_date' in data.columns:
+            ds = pd.to_datetime(data['order_date'])
+        elif 'ds' in data.columns:
+            ds = pd.to_datetime(data['ds'])
+        else:
             raise ValueError("数据必须包含 'order_date' 或 'ds' 列")
         
         # 按门店和日期聚合
-        if 'store_code' not in processed.columns:
-            if 'fulfillment_store_code' in processed.columns:
-                processed['store_code'] = processed['fulfillment_store_code']
-            else:
-                raise ValueError("数据必须包含门店代码列")
-        
-        # 聚合每日需求
-        agg_data = processed.groupby(['store_code', 'ds']).agg({
-            'total_quantity': 'sum',
-            'unique_sku_count': 'sum'
-        }).reset_index()
-        
-        # 重命名为Prophet格式
-        agg_data['y'] = agg_data['total_quantity']  # 目标变量
+        if 'store_code' in data.columns:
+            store_code = data['store_code']
+        elif 'fulfillment_store_code' in data.columns:
+            store_code = data['fulfillment_store_code']
+        else:
+            raise ValueError("数据必须包含门店代码列")
         
         # 添加外部特征
         feature_cols = [
@@ -491,27 +527,30 @@ class ProphetForecaster(DemandForecaster):
             'is_holiday', 'is_weekend', 'is_month_end', 'is_month_start',
             'traffic_congestion_level', 'traffic_speed_avg'
         ]
-        self.feature_columns = []
+        self.feature_columns = [col for col in feature_cols if col in data.columns]
         
-        for col in feature_cols:
-            if col in processed.columns:
-                # 按日期聚合特征
-                if col.startswith('weather_') or col.startswith('traffic_'):
-                    # 数值特征取平均值
-                    feature_data = processed.groupby(['store_code', 'ds'])[col].mean().reset_index()
-                else:
-                    # 布尔特征取最大值
-                    feature_data = processed.groupby(['store_code', 'ds'])[col].max().reset_index()
-                
-                agg_data = agg_data.merge(feature_data, on=['store_code', 'ds'], how='left')
-                self.feature_columns.append(col)
+        # 聚合每日需求，并按日期聚合特征：数值特征取平均值，布尔特征取最大值
+        aggregations = {
+            'total_quantity': ('total_quantity', 'sum'),
+            'unique_sku_count': ('unique_sku_count', 'sum'),
+        }
+        for col in self.feature_columns:
+            is_numeric_feature = col.startswith('weather_') or col.startswith('traffic_')
+            aggregations[col] = (col, 'mean' if is_numeric_feature else 'max')
+        
+        keys = [store_code.astype('category').rename('store_code'), ds.rename('ds')]
+        agg_data = data.groupby(keys, observed=True, sort=True).agg(**aggregations).reset_index()
+        
+        # 重命名为Prophet格式
+        agg_data['y'] = agg_data['total_quantity']  # 目标变量
         
         # 添加时间特征
-        agg_data['is_weekend'] = agg_data['ds'].dt.dayofweek.isin([5, 6]).astype(int)
-        agg_data['is_month_end'] = (agg_data['ds'].dt.day >= 28).astype(int)
-        agg_data['is_month_start'] = (agg_data['ds'].dt.day <= 3).astype(int)
-        agg_data['day_of_week'] = agg_data['ds'].dt.dayofweek
-        agg_data['month'] = agg_data['ds'].dt.month
+        ds_values = agg_data['ds'].dt
+        agg_data['is_weekend'] = ds_values.dayofweek.isin([5, 6]).astype(int)
+        agg_data['is_month_end'] = (ds_values.day >= 28).astype(int)
+        agg_data['is_month_start'] = (ds_values.day <= 3).astype(int)
+        agg_data['day_of_week'] = ds_values.dayofweek
+        agg_data['month'] = ds_values.month
         
         # 确保时间特征在feature_columns中
         time_features = ['is_weekend', 'is_month_end', 'is_month_start']
@@ -537,35 +576,7 @@ class ProphetForecaster(DemandForecaster):
     
     def _create_holidays_dataframe(self) -> pd.DataFrame:
         """创建假期数据框"""
-        holidays = []
-        
-        # 香港主要公共假期
-        years = [2025, 2026, 2027]
-        
-        for year in years:
-            # 固定日期假期
-            holidays.extend([
-                {'holiday': 'New Year', 'ds': f'{year}-01-01', 'lower_window': 0, 'upper_window': 1},
-                {'holiday': 'Labour Day', 'ds': f'{year}-05-01', 'lower_window': 0, 'upper_window': 0},
-                {'holiday': 'National Day', 'ds': f'{year}-10-01', 'lower_window': 0, 'upper_window': 2},
-                {'holiday': 'Christmas', 'ds': f'{year}-12-25', 'lower_window': -1, 'upper_window': 1},
-                {'holiday': 'Boxing Day', 'ds': f'{year}-12-26', 'lower_window': 0, 'upper_window': 0},
-            ])
-            
-            # 农历新年（近似日期）
-            if year == 2025:
-                holidays.append({'holiday': 'Chinese New Year', 'ds': '2025-01-29', 'lower_window': -1, 'upper_window': 3})
-            elif year == 2026:
-                holidays.append({'holiday': 'Chinese New Year', 'ds': '2026-02-17', 'lower_window': -1, 'upper_window': 3})
-            elif year == 2027:
-                holidays.append({'holiday': 'Chinese New Year', 'ds': '2027-02-06', 'lower_window': -1, 'upper_window': 3})
-        
-        if holidays:
-            holidays_df = pd.DataFrame(holidays)
-            holidays_df['ds'] = pd.to_datetime(holidays_df['ds'])
-            return holidays_df
-        else:
-            return pd.DataFrame(columns=['holiday', 'ds', 'lower_window', 'upper_window'])
+        return create_hk_holidays_dataframe()
     
     def _add_future_features(self, future_df: pd.DataFrame, store_code: str) -> pd.DataFrame:
         """为未来数据添加特征"""
@@ -626,6 +637,28 @@ class ProphetForecaster(DemandForecaster):
         
         return future_df
     
+    def _forecasts_from_frame(self, store_code: str, forecast: pd.DataFrame) -> List[DemandForecast]:
+        """预测结果表整列截断为非负后批量构建 DemandForecast"""
+        bounds = forecast[['yhat', 'yhat_lower', 'yhat_upper']].clip(lower=0)
+        records = forecast.assign(
+            _date=forecast['ds'].dt.date, _p10=bounds['yhat_lower'], _p50=bounds['yhat'], _p90=bounds['yhat_upper']
+        ).to_dict('records')
+        timestamp = datetime.now()
+        
+        return [
+            DemandForecast(
+                store_code=store_code,
+                sku_id="aggregate",  # 聚合预测
+                forecast_date=record['_date'],
+                predicted_demand=record['_p50'],
+                confidence_intervals={'P10': record['_p10'], 'P50': record['_p50'], 'P90': record['_p90']},
+                external_factors=self._extract_external_factors(record),
+                model_version="prophet_v1.0",
+                forecast_timestamp=timestamp
+            )
+            for record in records
+        ]
+    
     def _extract_external_factors(self, forecast_row) -> Dict[str, float]:
         """提取外部因子影响"""
         factors = {}
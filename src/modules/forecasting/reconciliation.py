@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+万宁SLA优化系统 - 层级预测协调模块
+基于稀疏求和矩阵的门店 → 区域 → 大区 → 全港预测协调
+
+只需门店级预测，通过一次稀疏矩阵乘法即可得到各层级一致的汇总值；
+若同时提供各层级的基础预测，可用 OLS / WLS / MinT 方法协调。
+
+创建时间: 2026-10-19
+作者: Team ESGenius
+"""
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Dict, Optional, Sequence
+import logging
+
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+logger = logging.getLogger(__name__)
+
+
+# 香港18区 → 三大区域（兼容DFI门店表中的写法）
+DISTRICT_REGIONS: Dict[str, str] = {
+    "Central and Western": "Hong Kong Island",
+    "Central & Western": "Hong Kong Island",
+    "Eastern": "Hong Kong Island",
+    "Southern": "Hong Kong Island",
+    "Wan Chai": "Hong Kong Island",
+    "Kowloon City": "Kowloon",
+    "Kwun Tong": "Kowloon",
+    "Sham Shui Po": "Kowloon",
+    "Wong Tai Sin": "Kowloon",
+    "Yau Tsim Mong": "Kowloon",
+    "Islands": "New Territories",
+    "Island": "New Territories",
+    "Kwai Tsing": "New Territories",
+    "North": "New Territories",
+    "Sai Kung": "New Territories",
+    "Sha Tin": "New Territories",
+    "Tai Po": "New Territories",
+    "Tsuen Wan": "New Territories",
+    "Tuen Mun": "New Territories",
+    "Yuen Long": "New Territories",
+}
+
+UNKNOWN_NODE = "Unknown"
+RECONCILIATION_METHODS = ("bottom_up", "ols", "wls_struct", "mint_diag", "mint_shrink")
+
+
+@dataclass
+class ForecastHierarchy:
+    """
+    预测层级结构
+
+    节点顺序: 全港 → 大区 → 区域 → 门店，summing_matrix 形状为 (节点数, 门店数)
+    """
+    store_ids: List[str]
+    node_ids: List[str]
+    node_levels: List[str]
+    summing_matrix: sp.csr_matrix
+
+    @property
+    def n_stores(self) -> int:
+        return len(self.store_ids)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @classmethod
+    def from_store_districts(
+        cls,
+        store_districts: Dict[str, str],
+        district_regions: Optional[Dict[str, str]] = None,
+    ) -> "ForecastHierarchy":
+        """根据门店→区域映射构建层级与稀疏求和矩阵"""
+        district_regions = district_regions or DISTRICT_REGIONS
+        store_ids = [str(store_id) for store_id in store_districts]
+        districts = [store_districts[store_id] or UNKNOWN_NODE for store_id in store_districts]
+        regions = [district_regions.get(district, UNKNOWN_NODE) for district in districts]
+
+        region_ids = sorted(set(regions))
+        district_ids = sorted(set(districts))
+        region_index = {region: i for i, region in enumerate(region_ids)}
+        district_index = {district: i for i, district in enumerate(district_ids)}
+
+        n_stores = len(store_ids)
+        store_cols = np.arange(n_stores)
+        region_offset = 1
+        district_offset = region_offset + len(region_ids)
+        store_offset = district_offset + len(district_ids)
+
+        rows = np.concatenate([
+            np.zeros(n_stores, dtype=int),
+            region_offset + np.array([region_index[r] for r in regions], dtype=int),
+            district_offset + np.array([district_index[d] for d in districts], dtype=int),
+            store_offset + store_cols,
+        ])
+        cols = np.tile(store_cols, 4)
+        n_nodes = store_offset + n_stores
+        summing_matrix = sp.csr_matrix(
+            (np.ones(len(rows), dtype=float), (rows, cols)),
+            shape=(n_nodes, n_stores),
+        )
+
+        node_ids = ["total"] + region_ids + district_ids + store_ids
+        node_levels = (
+            ["total"]
+            + ["region"] * len(region_ids)
+            + ["district"] * len(district_ids)
+            + ["store"] * n_stores
+        )
+        return cls(store_ids=store_ids, node_ids=node_ids, node_levels=node_levels, summing_matrix=summing_matrix)
+
+
+class HierarchicalReconciler:
+    """
+    层级预测协调器
+
+    - bottom_up: 仅使用门店预测，y = S · ŷ_store
+    - ols: W = I
+    - wls_struct: W = diag(S · 1)，按节点包含门店数加权
+    - mint_diag: W = diag(残差方差)
+    - mint_shrink: W = 残差协方差的 Schäfer-Strimmer 收缩估计
+    """
+
+    def __init__(self, hierarchy: ForecastHierarchy, method: str = "bottom_up"):
+        if method not in RECONCILIATION_METHODS:
+            raise ValueError(f"不支持的协调方法: {method}，可选: {RECONCILIATION_METHODS}")
+        self.hierarchy = hierarchy
+        self.method = method
+
+    def aggregate(self, store_forecasts: np.ndarray) -> np.ndarray:
+        """自下而上汇总：(门店数, T) → (节点数, T)"""
+        store_forecasts = np.asarray(store_forecasts, dtype=float)
+        if store_forecasts.shape[0] != self.hierarchy.n_stores:
+            raise ValueError(f"门店预测行数({store_forecasts.shape[0]})与层级门店数({self.hierarchy.n_stores})不一致")
+        return np.asarray(self.hierarchy.summing_matrix @ store_forecasts)
+
+    def reconcile(self, base_forecasts: np.ndarray, residuals: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        协调基础预测
+
+        Args:
+            base_forecasts: bottom_up 时为 (门店数, T)，否则为 (节点数, T) 的各层级基础预测
+            residuals: mint_* 方法所需的样本内残差 (节点数, 历史期数)
+
+        Returns:
+            各层级一致的预测 (节点数, T)
+        """
+        base_forecasts = np.asarray(base_forecasts, dtype=float)
+        squeeze = base_forecasts.ndim == 1
+        if squeeze:
+            base_forecasts = base_forecasts[:, None]
+
+        if self.method == "bottom_up":
+            if base_forecasts.shape[0] == self.hierarchy.n_nodes:
+                base_forecasts = base_forecasts[-self.hierarchy.n_stores:]
+            reconciled = self.aggregate(base_forecasts)
+        else:
+            if base_forecasts.shape[0] != self.hierarchy.n_nodes:
+                raise ValueError(f"{self.method} 需要全部 {self.hierarchy.n_nodes} 个节点的基础预测")
+            reconciled = self._reconcile_projection(base_forecasts, residuals)
+
+        return reconciled[:, 0] if squeeze else reconciled
+
+    def to_frame(self, reconciled: np.ndarray, dates: Sequence[date]) -> pd.DataFrame:
+        """转换为长表: level, node_id, date, forecast"""
+        reconciled = np.asarray(reconciled, dtype=float)
+        n_nodes, n_dates = reconciled.shape
+        return pd.DataFrame({
+            "level": np.repeat(self.hierarchy.node_levels, n_dates),
+            "node_id": np.repeat(self.hierarchy.node_ids, n_dates),
+            "date": np.tile([d.isoformat() for d in dates], n_nodes),
+            "forecast": reconciled.ravel(),
+        })
+
+    # ==================== 辅助方法 ====================
+
+    def _reconcile_projection(self, base_forecasts: np.ndarray, residuals: Optional[np.ndarray]) -> np.ndarray:
+        """ỹ = S (Sᵀ W⁻¹ S)⁻¹ Sᵀ W⁻¹ ŷ"""
+        S = self.hierarchy.summing_matrix
+
+        if self.method == "mint_shrink":
+            W = self._shrink_covariance(self._require_residuals(residuals))
+            weighted = np.linalg.solve(W, np.column_stack([S.toarray(), base_forecasts]))
+            w_inv_s, w_inv_y = weighted[:, :S.shape[1]], weighted[:, S.shape[1]:]
+            lhs = S.T @ w_inv_s
+            rhs = S.T @ w_inv_y
+            bottom = np.linalg.solve(lhs, rhs)
+            return np.asarray(S @ bottom)
+
+        if self.method == "ols":
+            weights = np.ones(S.shape[0])
+        elif self.method == "wls_struct":
+            weights = 1.0 / np.asarray(S.sum(axis=1)).ravel()
+        else:
+            variances = np.var(self._require_residuals(residuals), axis=1)
+            weights = 1.0 / np.maximum(variances, 1e-8)
+
+        W_inv = sp.diags(weights)
+        lhs = (S.T @ W_inv @ S).tocsc()
+        rhs = S.T @ (W_inv @ base_forecasts)
+        bottom = splu(lhs).solve(np.asarray(rhs))
+        return np.asarray(S @ bottom)
+
+    def _require_residuals(self, residuals: Optional[np.ndarray]) -> np.ndarray:
+        if residuals is None:
+            raise ValueError(f"{self.method} 需要样本内残差")
+        residuals = np.asarray(residuals, dtype=float)
+        if residuals.shape[0] != self.hierarchy.n_nodes:
+            raise ValueError("残差行数必须等于层级节点数")
+        return residuals
+
+    @staticmethod
+    def _shrink_covariance(residuals: np.ndarray) -> np.ndarray:
+        """Schäfer-Strimmer 收缩：向对角阵收缩样本协方差"""
+        n_obs = residuals.shape[1]
+        centered = residuals - residuals.mean(axis=1, keepdims=True)
+        sample_cov = centered @ centered.T / n_obs
+        std = np.sqrt(np.maximum(np.diag(sample_cov), 1e-8))
+        standardized = centered / std[:, None]
+        corr = standardized @ standardized.T / n_obs
+
+        # Var(r_ij) = n² / (n-1)³ · Var_k(x_ki · x_kj)，避免构造 (节点数, 节点数, n) 的乘积张量
+        off_diag = ~np.eye(len(corr), dtype=bool)
+        squared = standardized ** 2
+        product_var = squared @ squared.T / n_obs - corr ** 2
+        corr_var = n_obs ** 2 / (n_obs - 1) ** 3 * product_var if n_obs > 1 else np.zeros_like(corr)
+        denominator = np.sum(corr[off_diag] ** 2)
+        shrinkage = float(np.clip(np.sum(corr_var[off_diag]) / denominator, 0.0, 1.0)) if denominator > 0 else 1.0
+
+        shrunk_corr = (1 - shrinkage) * corr
+        np.fill_diagonal(shrunk_corr, 1.0)
+        return shrunk_corr * np.outer(std, std)
+
+
+# ==================== 工厂函数 ====================
+
+def create_reconciler(store_districts: Dict[str, str], method: str = "bottom_up") -> HierarchicalReconciler:
+    """创建层级预测协调器实例"""
+    return HierarchicalReconciler(ForecastHierarchy.from_store_districts(store_districts), method)
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+万宁SLA优化系统 - 列式SLA风险引擎
+在 门店 × 日期 的整张表上一次性评估七类风险规则；七类规则只在此处实现。
+评估结果同时带出模拟驱动因子，预测器的SLA调整与风险因子共用同一次评估
+
+- 每类规则输出一列风险分值和一列触发标记
+- 模拟随机因子使用计数器式哈希随机数：同一 (种子, 用途, 门店, 日期) 恒得同一值，
+  与调用顺序和批大小无关，整列评估与逐行评估结果一致
+- 预警按严重程度与SLA缺口通过 nlargest 取 Top-K
+
+创建时间: 2026-10-19
+作者: Team ESGenius
+"""
+
+import zlib
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# 风险族 → (风险因子名称, 触发阈值)，顺序与 identify_risk_factors 一致
+RISK_FAMILIES: Dict[str, Tuple[str, float]] = {
+    'demand': ('high_demand_risk', 0.1),
+    'weather': ('weather_risk', 0.05),
+    'traffic': ('traffic_risk', 0.05),
+    'capacity': ('capacity_constraint_risk', 0.1),
+    'temporal': ('temporal_risk', 0.05),
+    'historical': ('historical_performance_risk', 0.1),
+    'supply_chain': ('supply_chain_risk', 0.05),
+}
+HIGH_RISK_THRESHOLD = 0.2
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+DRIVER_COLUMNS = ('expected_demand', 'demand_volatility', 'capacity_utilization')
+
+# 门店特性（模拟）
+STORE_DEMAND_FACTORS = {'417': 1.2, '331': 0.9, '213': 1.1, '418': 0.8, '419': 1.3}
+STORE_LOCATION_RISK = {'417': 0.12, '331': 0.08, '213': 0.05, '418': 0.10, '419': 0.15}
+DEFAULT_STORE_BASELINES = {'417': 0.94, '331': 0.92, '213': 0.96, '418': 0.93, '419': 0.91}
+SEASONAL_DEMAND_FACTORS = {
+    1: 1.1, 2: 1.2, 3: 1.0, 4: 0.9, 5: 0.95, 6: 1.05,
+    7: 1.1, 8: 1.05, 9: 0.9, 10: 1.0, 11: 1.15, 12: 1.3
+}
+
+
+# ==================== 确定性随机数 ====================
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 混合函数（uint64 溢出按模 2^64 回绕）"""
+    with np.errstate(over='ignore'):
+        z = values + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def hashed_uniform(
+    seed: int,
+    stream: str,
+    store_codes: Optional[Sequence[Any]] = None,
+    ordinals: Optional[Sequence[int]] = None,
+) -> np.ndarray:
+    """
+    计数器式均匀随机数 [0, 1)
+
+    同一 (种子, 用途, 门店, 日期序数) 恒得同一值，与调用顺序和批大小无关。
+    """
+    key = (int(seed) & 0xFFFFFFFF) << 32 | zlib.crc32(stream.encode('utf-8'))
+    hashed = _mix64(np.array([key], dtype=np.uint64))
+
+    if store_codes is not None:
+        codes, uniques = pd.factorize(pd.Index([str(code) for code in store_codes]))
+        store_keys = np.array([zlib.crc32(code.encode('utf-8')) for code in uniques], dtype=np.uint64)
+        hashed = _mix64(hashed ^ store_keys[codes])
+    if ordinals is not None:
+        hashed = _mix64(hashed ^ np.asarray(ordinals, dtype=np.uint64))
+
+    return (hashed >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def uniform_from(u: np.ndarray, low: float, high: float) -> np.ndarray:
+    return low + (high - low) * u
+
+
+def exponential_from(u: np.ndarray, scale: float) -> np.ndarray:
+    return -scale * np.log1p(-u)
+
+
+# ==================== 风险引擎 ====================
+
+class SLARiskEngine:
+    """
+    列式SLA风险引擎
+
+    依赖预测器提供: seed、_get_historical_baseline_sla、_is_holiday、_get_special_shopping_dates
+    """
+
+    def __init__(self, predictor: Any):
+        self.predictor = predictor
+
+    def assess_grid(self, store_codes: Iterable[Any], forecast_dates: Iterable[date]) -> pd.DataFrame:
+        """评估 门店 × 日期 全组合（门店优先、日期次之）"""
+        store_codes = list(store_codes)
+        forecast_dates = list(forecast_dates)
+        return self.assess(
+            np.repeat(np.array(store_codes, dtype=object), len(forecast_dates)),
+            np.tile(np.array(forecast_dates, dtype=object), len(store_codes)),
+        )
+
+    def drivers(self, store_codes: Sequence[Any], forecast_dates: Sequence[date],
+                seed: Optional[int] = None) -> pd.DataFrame:
+        """
+        逐行模拟风险驱动因子（需求与容量规则、预测器的SLA需求调整共用）
+
+        Returns:
+            DataFrame[store_code, forecast_date, expected_demand, demand_volatility, capacity_utilization]
+        """
+        frame = self._base_frame(store_codes, forecast_dates)
+        if frame.empty:
+            return pd.DataFrame(columns=['store_code', 'forecast_date'] + list(DRIVER_COLUMNS))
+        for column, values in self._simulate_drivers(self._calendar(frame), seed).items():
+            frame[column] = values
+        return frame
+
+    def assess(self, store_codes: Sequence[Any], forecast_dates: Sequence[date],
+               seed: Optional[int] = None) -> pd.DataFrame:
+        """
+        逐行评估七类风险（单条评估即一行调用，MLSLAPredictor.identify_risk_factors 亦经此处）
+
+        Args:
+            seed: 模拟随机因子的种子，为空时使用预测器的种子
+
+        Returns:
+            DataFrame[store_code, forecast_date, {族}_risk, {族}_flag..., risk_score, risk_count,
+                      expected_demand, demand_volatility, capacity_utilization]
+        """
+        seed = self.predictor.seed if seed is None else seed
+        frame = self._base_frame(store_codes, forecast_dates)
+        if frame.empty:
+            return self._empty_frame()
+
+        calendar = self._calendar(frame)
+        stores, ordinals = calendar['stores'], calendar['ordinals']
+        weekday, month = calendar['weekday'], calendar['month']
+        is_weekend, is_month_end = calendar['is_weekend'], calendar['is_month_end']
+        is_holiday = calendar['is_holiday']
+        drivers = self._simulate_drivers(calendar, seed)
+
+        special_dates = self.predictor._get_special_shopping_dates()
+        is_special = frame['forecast_date'].isin(list(special_dates)).to_numpy()
+        baseline_map = {code: self.predictor._get_historical_baseline_sla(code) for code in stores.unique()}
+        baseline = stores.map(baseline_map).to_numpy(dtype=float)
+
+        # 1. 需求风险
+        expected_demand, volatility = drivers['expected_demand'], drivers['demand_volatility']
+        demand_risk = np.where(
+            expected_demand > 1.3,
+            np.minimum(0.4, 0.1 + (expected_demand - 1.0) * 0.2),
+            np.where(volatility > 0.4, np.minimum(0.3, volatility * 0.5), 0.0),
+        )
+
+        # 2. 天气风险：台风季(6-11月)与雨季(5-9月)
+        seasonal_risk = np.isin(month, [6, 7, 8, 9, 10, 11]) * 0.1 + np.isin(month, [5, 6, 7, 8, 9]) * 0.05
+        weather_risk = np.minimum(
+            0.3, seasonal_risk + exponential_from(hashed_uniform(seed, 'weather_risk', None, ordinals), 0.05)
+        )
+
+        # 3. 交通风险
+        traffic_risk = np.minimum(
+            0.25,
+            np.where(weekday < 5, 0.08, 0.0) + is_month_end * 0.03
+            + stores.map(STORE_LOCATION_RISK).fillna(0.08).to_numpy(dtype=float),
+        )
+
+        # 4. 容量约束风险
+        utilization = drivers['capacity_utilization']
+        capacity_risk = np.where(
+            utilization > 0.85,
+            np.minimum(0.4, (utilization - 0.85) * 2.0),
+            np.where(utilization > 0.75, (utilization - 0.75) * 0.5, 0.0),
+        )
+
+        # 5. 时间相关风险
+        temporal_risk = np.minimum(
+            0.3, is_weekend * 0.1 + is_month_end * 0.08 + is_holiday * 0.15 + is_special * 0.12
+        )
+
+        # 6. 历史表现风险
+        historical_risk = np.where(
+            baseline < 0.90,
+            np.minimum(0.3, (0.95 - baseline) * 2.0),
+            np.where(baseline < 0.93, (0.95 - baseline) * 1.0, 0.0),
+        )
+
+        # 7. 供应链风险
+        inventory_risk = uniform_from(hashed_uniform(seed, 'inventory_risk', stores, ordinals), 0.0, 0.15)
+        supply_chain_risk = np.minimum(
+            0.25,
+            np.where(inventory_risk > 0.1, inventory_risk, 0.0)
+            + uniform_from(hashed_uniform(seed, 'supplier_risk', stores, ordinals), 0.0, 0.1)
+            + uniform_from(hashed_uniform(seed, 'logistics_risk', stores, ordinals), 0.0, 0.08),
+        )
+
+        scores = {
+            'demand': demand_risk,
+            'weather': weather_risk,
+            'traffic': traffic_risk,
+            'capacity': capacity_risk,
+            'temporal': temporal_risk,
+            'historical': historical_risk,
+            'supply_chain': supply_chain_risk,
+        }
+        for family, (_, threshold) in RISK_FAMILIES.items():
+            frame[f'{family}_risk'] = scores[family]
+            frame[f'{family}_flag'] = scores[family] > threshold
+
+        flags = frame[[f'{family}_flag' for family in RISK_FAMILIES]].to_numpy()
+        values = frame[[f'{family}_risk' for family in RISK_FAMILIES]].to_numpy()
+        frame['risk_score'] = np.where(flags, values, 0.0).sum(axis=1)
+        frame['risk_count'] = flags.sum(axis=1)
+        for column in DRIVER_COLUMNS:
+            frame[column] = drivers[column]
+        return frame
+
+    @staticmethod
+    def to_risk_factors(frame: pd.DataFrame) -> List[Dict[str, float]]:
+        """转换为 identify_risk_factors 格式的字典列表（仅包含触发的风险）"""
+        names = [name for name, _ in RISK_FAMILIES.values()]
+        values = frame[[f'{family}_risk' for family in RISK_FAMILIES]].to_numpy(dtype=float)
+        flags = frame[[f'{family}_flag' for family in RISK_FAMILIES]].to_numpy(dtype=bool)
+        return [
+            {name: float(value) for name, value, flag in zip(names, row_values, row_flags) if flag}
+            for row_values, row_flags in zip(values, flags)
+        ]
+
+    @staticmethod
+    def build_alerts(
+        frame: pd.DataFrame,
+        threshold: float = 0.90,
+        top_k: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        基于 predicted_sla 与风险列生成预警
+
+        Args:
+            frame: 含 store_code、forecast_date、predicted_sla 以及 assess() 风险列的表
+            top_k: 按严重程度、SLA缺口和风险分值取前K条
+
+        Returns:
+            DataFrame[store_code, forecast_date, alert_type, severity, predicted_sla, threshold,
+                      high_risk_factors, priority]
+        """
+        columns = ['store_code', 'forecast_date', 'alert_type', 'severity', 'predicted_sla',
+                   'threshold', 'high_risk_factors', 'severity_rank', 'priority']
+        if frame.empty:
+            return pd.DataFrame(columns=columns)
+
+        predicted = frame['predicted_sla'].to_numpy(dtype=float)
+        gap = threshold - predicted
+        sla_mask = predicted < threshold
+        sla_alerts = pd.DataFrame({
+            'row': np.flatnonzero(sla_mask),
+            'type_order': 0,
+            'alert_type': 'sla_risk',
+            'severity': np.select(
+                [gap[sla_mask] > 0.1, gap[sla_mask] > 0.05, gap[sla_mask] > 0.02],
+                ['critical', 'high', 'medium'],
+                'low',
+            ),
+            'priority': gap[sla_mask],
+        })
+
+        values = frame[[f'{family}_risk' for family in RISK_FAMILIES]].to_numpy(dtype=float)
+        flags = frame[[f'{family}_flag' for family in RISK_FAMILIES]].to_numpy(dtype=bool)
+        high = flags & (values > HIGH_RISK_THRESHOLD)
+        high_mask = high.any(axis=1)
+        high_alerts = pd.DataFrame({
+            'row': np.flatnonzero(high_mask),
+            'type_order': 1,
+            'alert_type': 'high_risk_factors',
+            'severity': 'medium',
+            'priority': np.where(high, values, 0.0).sum(axis=1)[high_mask],
+        })
+
+        alerts = pd.concat([sla_alerts, high_alerts], ignore_index=True)
+        alerts['severity_rank'] = alerts['severity'].map(SEVERITY_RANK).astype(int)
+        if top_k is not None:
+            alerts = alerts.nlargest(top_k, ['severity_rank', 'priority'])
+        else:
+            alerts = alerts.sort_values(['row', 'type_order'], kind='stable')
+
+        names = np.array([name for name, _ in RISK_FAMILIES.values()], dtype=object)
+        rows = alerts['row'].to_numpy()
+        alerts['store_code'] = frame['store_code'].to_numpy()[rows]
+        alerts['forecast_date'] = frame['forecast_date'].to_numpy()[rows]
+        alerts['predicted_sla'] = predicted[rows]
+        alerts['threshold'] = threshold
+        alerts['high_risk_factors'] = [
+            {name: float(value) for name, value in zip(names[high[row]], values[row][high[row]])}
+            if alert_type == 'high_risk_factors' else None
+            for row, alert_type in zip(rows, alerts['alert_type'])
+        ]
+        return alerts[columns].reset_index(drop=True)
+
+    @staticmethod
+    def summarize(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """各风险族的触发次数、受影响门店数和平均分值（按触发次数降序）"""
+        summary = []
+        for family, (name, _) in RISK_FAMILIES.items():
+            flagged = frame[frame[f'{family}_flag']]
+            summary.append({
+                'risk_factor': name,
+                'count': int(len(flagged)),
+                'affected_stores': int(flagged['store_code'].nunique()),
+                'avg_score': round(float(flagged[f'{family}_risk'].mean()), 4) if len(flagged) else 0.0,
+            })
+        return sorted(summary, key=lambda item: item['count'], reverse=True)
+
+    @staticmethod
+    def _base_frame(store_codes: Sequence[Any], forecast_dates: Sequence[date]) -> pd.DataFrame:
+        return pd.DataFrame({
+            'store_code': np.asarray(store_codes, dtype=object),
+            'forecast_date': np.asarray(forecast_dates, dtype=object),
+        })
+
+    def _calendar(self, frame: pd.DataFrame) -> Dict[str, Any]:
+        """逐行的门店与日历属性（假期只对唯一日期判断一次）"""
+        dates = pd.DatetimeIndex(pd.to_datetime(frame['forecast_date']))
+        weekday = dates.dayofweek.to_numpy()
+        holiday_map = {d: self.predictor._is_holiday(d) for d in pd.unique(frame['forecast_date'])}
+        return {
+            'stores': frame['store_code'].astype(str),
+            'ordinals': np.asarray([d.toordinal() for d in frame['forecast_date']], dtype=np.int64),
+            'weekday': weekday,
+            'month': dates.month.to_numpy(),
+            'is_weekend': weekday >= 5,
+            'is_month_end': dates.day.to_numpy() >= 28,
+            'is_holiday': frame['forecast_date'].map(holiday_map).to_numpy(dtype=bool),
+        }
+
+    def _simulate_drivers(self, calendar: Dict[str, Any], seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        seed = self.predictor.seed if seed is None else seed
+        stores, ordinals = calendar['stores'], calendar['ordinals']
+        is_weekend, is_holiday = calendar['is_weekend'], calendar['is_holiday']
+
+        time_factor = np.where(is_holiday, 1.25, np.where(is_weekend, 1.15, 1.0))
+        expected_demand = (
+            stores.map(STORE_DEMAND_FACTORS).fillna(1.0).to_numpy(dtype=float)
+            * time_factor
+            * pd.Series(calendar['month']).map(SEASONAL_DEMAND_FACTORS).fillna(1.0).to_numpy(dtype=float)
+            * uniform_from(hashed_uniform(seed, 'demand_level', stores, ordinals), 0.9, 1.1)
+        )
+        utilization = np.minimum(
+            1.0,
+            0.7 + is_weekend * 0.1 + is_holiday * 0.15
+            + uniform_from(hashed_uniform(seed, 'capacity_utilization', stores, ordinals), -0.1, 0.1),
+        )
+        return {
+            'expected_demand': expected_demand,
+            'demand_volatility': uniform_from(hashed_uniform(seed, 'demand_volatility', stores), 0.1, 0.5),
+            'capacity_utilization': utilization,
+        }
+
+    @staticmethod
+    def _empty_frame() -> pd.DataFrame:
+        columns = ['store_code', 'forecast_date']
+        for family in RISK_FAMILIES:
+            columns += [f'{family}_risk', f'{family}_flag']
+        return pd.DataFrame(columns=columns + ['risk_score', 'risk_count'] + list(DRIVER_COLUMNS))
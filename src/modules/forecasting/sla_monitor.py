@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+万宁SLA优化系统 - 流式实时SLA监控
+按事件增量维护门店与小时级聚合，查询直接读取聚合结果，不再遍历全部订单
+
+- 下单 / 备货完成 / 取货完成 / 取消 四类事件，每个事件 O(1) 更新计数
+- 每个门店维护在途订单的下单时间队列，超时订单在查询时从队首摊还移出
+- 备货时长写入定长环形缓冲区，分位数计算代价与订单量无关
+- 小时桶为定长滚动窗口，按事件时间水位线淘汰过期小时
+
+创建时间: 2026-10-19
+作者: Team ESGenius
+"""
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 小时桶计数列
+HOURLY_COLUMNS = ('orders', 'fulfilled', 'completed', 'on_time', 'late', 'cancelled')
+_ORDERS, _FULFILLED, _COMPLETED, _ON_TIME, _LATE, _CANCELLED = range(len(HOURLY_COLUMNS))
+
+
+def _to_timestamp(value: Any) -> float:
+    """datetime / ISO字符串 / 时间戳 → 秒级时间戳"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    return float(value)
+
+
+class RingBuffer:
+    """定长环形缓冲区，保留最近 capacity 个样本"""
+
+    def __init__(self, capacity: int = 512):
+        self._values = np.zeros(capacity, dtype=float)
+        self._position = 0
+        self._size = 0
+
+    def append(self, value: float) -> None:
+        self._values[self._position] = value
+        self._position = (self._position + 1) % len(self._values)
+        self._size = min(self._size + 1, len(self._values))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def percentiles(self, quantiles: Tuple[float, ...] = (50, 90, 95)) -> Dict[str, Optional[float]]:
+        if not self._size:
+            return {f'p{int(q)}': None for q in quantiles}
+        values = np.percentile(self._values[:self._size], quantiles)
+        return {f'p{int(q)}': float(v) for q, v in zip(quantiles, values)}
+
+
+@dataclass
+class StoreSLACounters:
+    """单门店累计计数"""
+    total_orders: int = 0
+    pending_orders: int = 0
+    ready_orders: int = 0
+    completed_orders: int = 0
+    cancelled_orders: int = 0
+    on_time_orders: int = 0
+    late_orders: int = 0
+    overdue_orders: int = 0
+    pending_time_sum: float = 0.0
+    # 在途订单 (下单时间, 订单号)，按下单时间递增
+    pending_queue: Deque[Tuple[float, Hashable]] = field(default_factory=deque)
+    lead_times: RingBuffer = field(default_factory=RingBuffer)
+
+
+@dataclass
+class _OrderState:
+    store_code: str
+    order_ts: float
+    promised_ts: Optional[float]
+    hour: int
+    status: str = 'pending'
+    ready_ts: Optional[float] = None
+    overdue: bool = False
+
+
+class StreamingSLAMonitor:
+    """
+    事件驱动的实时SLA监控器
+
+    调用方通过 record_* 事件显式维护订单状态；MLSLAPredictor.monitor_real_time_sla_performance
+    仍只统计每次传入的订单，不写入本监控器。在途订单的超时判定与其一致：
+    下单至今超过 sla_target_hours 视为延误。查询时间需单调不减。
+    """
+
+    def __init__(self, sla_target_hours: float = 24.0, window_hours: int = 24, percentile_buffer: int = 512):
+        self.sla_target_hours = sla_target_hours
+        self.window_hours = window_hours
+        self.percentile_buffer = percentile_buffer
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """清空全部聚合（例如每日切换时）"""
+        self._stores: Dict[str, StoreSLACounters] = {}
+        self._orders: Dict[Hashable, _OrderState] = {}
+        self._status_counts = {'pending': 0, 'ready': 0, 'completed': 0, 'cancelled': 0}
+        self._on_time = 0
+        self._late = 0
+        self._hour_slots = np.full(self.window_hours, -1, dtype=np.int64)
+        self._hour_counts = np.zeros((self.window_hours, len(HOURLY_COLUMNS)), dtype=np.int64)
+        self._watermark_hour = -1
+        self._lead_times = RingBuffer(self.percentile_buffer)
+
+    # ==================== 事件 ====================
+
+    def record_order(self, order_id: Hashable, store_code: Any, order_time: Any,
+                     promised_time: Any = None) -> bool:
+        """下单事件；重复的订单号忽略，返回是否新增"""
+        order_ts = _to_timestamp(order_time)
+        with self._lock:
+            if order_id in self._orders:
+                return False
+            store_code = str(store_code)
+            state = _OrderState(
+                store_code=store_code,
+                order_ts=order_ts,
+                promised_ts=None if promised_time is None else _to_timestamp(promised_time),
+                hour=int(order_ts // 3600),
+            )
+            self._orders[order_id] = state
+
+            counters = self._store(store_code)
+            counters.total_orders += 1
+            counters.pending_orders += 1
+            counters.pending_time_sum += order_ts
+            queue = counters.pending_queue
+            if not queue or queue[-1][0] <= order_ts:
+                queue.append((order_ts, order_id))
+            else:
+                # 乱序到达的订单较少，按下单时间插入
+                position = len(queue)
+                while position > 0 and queue[position - 1][0] > order_ts:
+                    position -= 1
+                queue.insert(position, (order_ts, order_id))
+
+            self._status_counts['pending'] += 1
+            self._bump_hour(state.hour, _ORDERS)
+            return True
+
+    def record_ready(self, order_id: Hashable, ready_time: Any) -> None:
+        """备货完成事件：订单离开在途队列，记录备货时长"""
+        ready_ts = _to_timestamp(ready_time)
+        with self._lock:
+            state = self._orders.get(order_id)
+            if state is None or state.status != 'pending':
+                return
+            counters = self._stores[state.store_code]
+            self._leave_pending(state, counters)
+            state.status = 'ready'
+            state.ready_ts = ready_ts
+            counters.ready_orders += 1
+            self._status_counts['ready'] += 1
+
+            lead_minutes = (ready_ts - state.order_ts) / 60
+            counters.lead_times.append(lead_minutes)
+            self._lead_times.append(lead_minutes)
+            self._bump_hour(state.hour, _FULFILLED)
+
+    def record_completion(self, order_id: Hashable, sla_achieved: Optional[bool] = None,
+                          ready_time: Any = None) -> None:
+        """取货完成事件：结算SLA达成情况（未给出时按备货时间与承诺时间比较）"""
+        if ready_time is not None:
+            self.record_ready(order_id, ready_time)
+        with self._lock:
+            state = self._orders.pop(order_id, None)
+            if state is None or state.status not in ('pending', 'ready'):
+                return
+            counters = self._stores[state.store_code]
+            self._leave_status(state, counters)
+            counters.completed_orders += 1
+            self._status_counts['completed'] += 1
+            self._bump_hour(state.hour, _COMPLETED)
+
+            if sla_achieved is None and state.ready_ts is not None and state.promised_ts is not None:
+                sla_achieved = state.ready_ts <= state.promised_ts
+            if sla_achieved is None:
+                return
+            if sla_achieved:
+                counters.on_time_orders += 1
+                self._on_time += 1
+                self._bump_hour(state.hour, _ON_TIME)
+            else:
+                counters.late_orders += 1
+                self._late += 1
+                self._bump_hour(state.hour, _LATE)
+
+    def record_cancellation(self, order_id: Hashable) -> None:
+        """取消事件"""
+        with self._lock:
+            state = self._orders.pop(order_id, None)
+            if state is None:
+                return
+            counters = self._stores[state.store_code]
+            self._leave_status(state, counters)
+            counters.cancelled_orders += 1
+            self._status_counts['cancelled'] += 1
+            self._bump_hour(state.hour, _CANCELLED)
+
+    # ==================== 查询 ====================
+
+    def get_active_order_metrics(self, now: Optional[datetime] = None) -> Dict[str, float]:
+        """
+        在途订单的SLA指标（与 monitor_real_time_sla_performance 输出格式一致）
+
+        Returns:
+            {门店_sla_rate, 门店_avg_time, overall_sla_rate, total_active_orders}，单位小时
+        """
+        now_ts = _to_timestamp(now or datetime.now())
+        metrics: Dict[str, float] = {}
+        total_active = 0
+        total_on_time = 0
+        with self._lock:
+            for store_code, counters in self._stores.items():
+                self._advance_overdue(counters, now_ts)
+                if counters.pending_orders == 0:
+                    continue
+                on_time = counters.pending_orders - counters.overdue_orders
+                avg_age = now_ts - counters.pending_time_sum / counters.pending_orders
+                metrics[f'{store_code}_sla_rate'] = on_time / counters.pending_orders
+                metrics[f'{store_code}_avg_time'] = avg_age / 3600
+                total_active += counters.pending_orders
+                total_on_time += on_time
+
+        if total_active > 0:
+            metrics['overall_sla_rate'] = total_on_time / total_active
+            metrics['total_active_orders'] = total_active
+        return metrics
+
+    def get_store_stats(self, store_code: Any, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """单门店累计计数与备货时长分位数"""
+        now_ts = _to_timestamp(now or datetime.now())
+        with self._lock:
+            counters = self._stores.get(str(store_code))
+            if counters is None:
+                return {}
+            self._advance_overdue(counters, now_ts)
+            settled = counters.on_time_orders + counters.late_orders
+            return {
+                'store_code': str(store_code),
+                'total_orders': counters.total_orders,
+                'pending_orders': counters.pending_orders,
+                'overdue_orders': counters.overdue_orders,
+                'ready_orders': counters.ready_orders,
+                'completed_orders': counters.completed_orders,
+                'cancelled_orders': counters.cancelled_orders,
+                'on_time_orders': counters.on_time_orders,
+                'late_orders': counters.late_orders,
+                'sla_achievement_rate': counters.on_time_orders / settled if settled else None,
+                'lead_time_minutes': counters.lead_times.percentiles(),
+            }
+
+    def get_hourly_stats(self) -> List[Dict[str, Any]]:
+        """滚动窗口内各小时（按下单时间）的计数，按时间升序"""
+        with self._lock:
+            valid = (self._hour_slots >= 0) & (self._hour_slots > self._watermark_hour - self.window_hours)
+            hours = self._hour_slots[valid]
+            counts = self._hour_counts[valid]
+        order = np.argsort(hours)
+        return [
+            {
+                'hour': datetime.fromtimestamp(int(hours[i]) * 3600).isoformat(),
+                **{column: int(counts[i, j]) for j, column in enumerate(HOURLY_COLUMNS)},
+            }
+            for i in order
+        ]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """全网汇总计数"""
+        with self._lock:
+            total = sum(counters.total_orders for counters in self._stores.values())
+            settled = self._on_time + self._late
+            return {
+                'total_orders': total,
+                'stores': len(self._stores),
+                **self._status_counts,
+                'on_time': self._on_time,
+                'late': self._late,
+                'sla_achievement_rate': self._on_time / settled if settled else None,
+                'lead_time_minutes': self._lead_times.percentiles(),
+            }
+
+    # ==================== 内部方法 ====================
+
+    def _store(self, store_code: str) -> StoreSLACounters:
+        counters = self._stores.get(store_code)
+        if counters is None:
+            counters = StoreSLACounters(lead_times=RingBuffer(self.percentile_buffer))
+            self._stores[store_code] = counters
+        return counters
+
+    def _leave_pending(self, state: _OrderState, counters: StoreSLACounters) -> None:
+        # 队列中的条目延迟删除：推进超时指针时跳过已离开的订单
+        counters.pending_orders -= 1
+        counters.pending_time_sum -= state.order_ts
+        if state.overdue:
+            counters.overdue_orders -= 1
+        self._status_counts['pending'] -= 1
+
+    def _leave_status(self, state: _OrderState, counters: StoreSLACounters) -> None:
+        if state.status == 'pending':
+            self._leave_pending(state, counters)
+        elif state.status == 'ready':
+            counters.ready_orders -= 1
+            self._status_counts['ready'] -= 1
+        state.status = 'closed'
+
+    def _advance_overdue(self, counters: StoreSLACounters, now_ts: float) -> None:
+        """把下单时间早于 now - SLA目标 的在途订单移出队列并计为延误（摊还 O(1)）"""
+        cutoff = now_ts - self.sla_target_hours * 3600
+        queue = counters.pending_queue
+        while queue and queue[0][0] < cutoff:
+            _, order_id = queue.popleft()
+            state = self._orders.get(order_id)
+            if state is not None and state.status == 'pending' and not state.overdue:
+                state.overdue = True
+                counters.overdue_orders += 1
+        if counters.pending_orders == 0:
+            counters.pending_time_sum = 0.0
+
+    def _bump_hour(self, hour: int, column: int) -> None:
+        if hour <= self._watermark_hour - self.window_hours:
+            return
+        self._watermark_hour = max(self._watermark_hour, hour)
+        slot = hour % self.window_hours
+        if self._hour_slots[slot] != hour:
+            if self._hour_slots[slot] > hour:
+                return
+            self._hour_slots[slot] = hour
+            self._hour_counts[slot] = 0
+        self._hour_counts[slot, column] += 1
+
+
+# ==================== 工厂函数 ====================
+
+def create_sla_monitor(config: Dict[str, Any] = None) -> StreamingSLAMonitor:
+    """创建流式SLA监控器"""
+    config = config or {}
+    return StreamingSLAMonitor(
+        sla_target_hours=config.get('sla_time_window_hours', 24),
+        window_hours=config.get('monitor_window_hours', 24),
+        percentile_buffer=config.get('monitor_percentile_buffer', 512),
+    )
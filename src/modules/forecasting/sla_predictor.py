@@ -10,9 +10,14 @@
 
 import pandas as pd
 import numpy as np
+from dataclasses import replace
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Union
+from collections import OrderedDict
+import hashlib
 import logging
+import threading
+import zlib
 from pathlib import Path
 
 try:
@@ -107,12 +112,67 @@ except ImportError:
     from core.interfaces import SLAPredictor
     from core.data_schema import SLAForecast, WeatherData, TrafficCondition
 
+from .risk_engine import (
+    DEFAULT_STORE_BASELINES, SEVERITY_RANK, SLARiskEngine, hashed_uniform, uniform_from,
+)
+
 logger = logging.getLogger(__name__)
 
+RandomSource = Union[int, np.random.Generator]
+
+
+class SLAPredictionCache:
+    """SLA预测结果LRU缓存，键为 (模型版本, 门店, 日期, 特征哈希)"""
+    
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Any, ...], SLAForecast]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key: Tuple[Any, ...]) -> Optional[SLAForecast]:
+        """返回缓存预测的副本，避免调用方修改共享对象"""
+        with self.lock:
+            forecast = self._entries.get(key)
+            if forecast is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return replace(
+            forecast,
+            risk_factors=dict(forecast.risk_factors),
+            improvement_recommendations=list(forecast.improvement_recommendations),
+        )
+    
+    def put(self, key: Tuple[Any, ...], forecast: SLAForecast) -> None:
+        with self.lock:
+            self._entries[key] = forecast
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self.lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+            }
+
+
 class MLSLAPredictor(SLAPredictor):
     """基于机器学习的SLA预测器"""
     
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Dict[str, Any] = None, seed: Optional[int] = None):
         self.config = config or self._get_default_config()
         self.model = None
         self.scaler = StandardScaler()
@@ -122,6 +182,10 @@ class MLSLAPredictor(SLAPredictor):
         self.feature_importance = {}
         self.reference_date = date.today()
         self.store_baseline_map: Dict[str, float] = {}
+        self.seed = int(self.config.get('random_state', 42)) if seed is None else int(seed)
+        self.model_version = 0  # 训练或加载模型时递增，用于缓存失效
+        self.prediction_cache = SLAPredictionCache(self.config.get('prediction_cache_size', 4096))
+        self.risk_engine = SLARiskEngine(self)
         
         if not SKLEARN_AVAILABLE:
             logger.warning("Scikit-learn不可用，将使用简化的预测方法")
@@ -210,6 +274,7 @@ class MLSLAPredictor(SLAPredictor):
                 ))
             
             self.is_trained = True
+            self._bump_model_version()
             
             logger.info(f"✅ SLA预测模型训练完成")
             logger.info(f"   训练集R²: {train_score:.3f}")
@@ -227,19 +292,13 @@ class MLSLAPredictor(SLAPredictor):
         
         logger.info(f"开始预测未来 {forecast_horizon} 天的SLA表现...")
         
-        forecasts = []
-        
         try:
             # 获取门店列表
             store_codes = kwargs.get('store_codes', ['417', '331', '213'])  # 默认门店
+            forecast_dates = [self.reference_date + timedelta(days=days_ahead) for days_ahead in range(1, forecast_horizon + 1)]
             
-            for store_code in store_codes:
-                for days_ahead in range(1, forecast_horizon + 1):
-                    forecast_date = self.reference_date + timedelta(days=days_ahead)
-                    
-                    # 预测单店SLA
-                    sla_forecast = self.predict_sla_performance(store_code, forecast_date)
-                    forecasts.append(sla_forecast)
+            # 门店 × 预测期一次性批量预测
+            forecasts = self.predict_sla_batch(store_codes, forecast_dates, kwargs.get('seed'))
             
             logger.info(f"✅ SLA预测完成，生成 {len(forecasts)} 个预测结果")
             return forecasts
@@ -248,11 +307,25 @@ class MLSLAPredictor(SLAPredictor):
             logger.error(f"SLA预测失败: {str(e)}")
             raise
     
-    def predict_sla_performance(self, store_code: str, forecast_date: date) -> SLAForecast:
-        """预测SLA表现"""
+    def predict_sla_performance(self, store_code: str, forecast_date: date,
+                                seed: Optional[RandomSource] = None) -> SLAForecast:
+        """
+        预测SLA表现（模拟因子按 (种子, 门店, 日期) 确定，结果可缓存）
+        
+        Args:
+            seed: 本次调用的种子或 np.random.Generator（从中抽取一个种子）；为空时使用构造时的种子
+        """
         try:
+            seed = self._resolve_seed(seed)
             # 创建预测特征
             features = self._create_prediction_features(store_code, forecast_date)
+            cache_key = self._prediction_cache_key(store_code, forecast_date, features, seed)
+            cached = self.prediction_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            # 一次风险评估，SLA调整与风险因子共用
+            risk = self.risk_engine.assess([store_code], [forecast_date], seed)
             
             if self.is_trained and SKLEARN_AVAILABLE:
                 # 使用训练好的模型预测
@@ -264,15 +337,17 @@ class MLSLAPredictor(SLAPredictor):
                 
             else:
                 # 使用增强的预测方法
-                predicted_sla, confidence_interval = self._enhanced_sla_prediction(store_code, forecast_date)
+                predicted_sla, confidence_interval = self._enhanced_sla_prediction(
+                    store_code, forecast_date, seed, risk.iloc[0]
+                )
             
             # 识别风险因子
-            risk_factors = self.identify_risk_factors(store_code, forecast_date)
+            risk_factors = self.risk_engine.to_risk_factors(risk)[0]
             
             # 生成改进建议
             recommendations = self._generate_recommendations(predicted_sla, risk_factors)
             
-            return SLAForecast(
+            forecast = SLAForecast(
                 store_code=store_code,
                 forecast_date=forecast_date,
                 predicted_sla_rate=max(0.0, min(1.0, predicted_sla)),
@@ -280,57 +355,118 @@ class MLSLAPredictor(SLAPredictor):
                 risk_factors=risk_factors,
                 improvement_recommendations=recommendations
             )
+            self.prediction_cache.put(cache_key, forecast)
+            return forecast
             
         except Exception as e:
             logger.error(f"SLA预测失败 {store_code}-{forecast_date}: {str(e)}")
             # 返回默认预测
             return self._create_default_forecast(store_code, forecast_date)
     
-    def identify_risk_factors(self, store_code: str, forecast_date: date) -> Dict[str, float]:
-        """识别风险因子"""
-        risk_factors = {}
+    def predict_sla_batch(self, store_codes: List[str], forecast_dates: List[date],
+                          seed: Optional[RandomSource] = None) -> List[SLAForecast]:
+        """
+        批量预测SLA表现
+        
+        一次构建 门店 × 日期 的完整特征矩阵，执行一次 transform 与一次 predict，
+        再按门店拆分为 SLAForecast（顺序: 门店优先、日期次之，与逐个预测一致）。
+        命中缓存的行直接复用，只对未命中的行执行模型预测，风险因子由列式引擎一次性评估。
+        seed 同 predict_sla_performance，整批共用一个种子。
+        """
+        return self._predict_sla_grid(store_codes, forecast_dates, self._resolve_seed(seed))
+    
+    def _predict_sla_grid(self, store_codes: List[str], forecast_dates: List[date], seed: int,
+                          risk_frame: Optional[pd.DataFrame] = None) -> List[SLAForecast]:
+        """批量预测；risk_frame 为同一网格、同一种子已评估的风险表时直接复用"""
+        store_codes = list(store_codes)
+        forecast_dates = list(forecast_dates)
+        if not store_codes or not forecast_dates:
+            return []
         
+        pairs = [(store_code, forecast_date) for store_code in store_codes for forecast_date in forecast_dates]
+        forecasts: List[Optional[SLAForecast]] = [None] * len(pairs)
+        trained = self.is_trained and SKLEARN_AVAILABLE
         try:
-            # 1. 需求风险评估
-            demand_risk = self._assess_demand_risk(store_code, forecast_date)
-            if demand_risk > 0.1:
-                risk_factors['high_demand_risk'] = demand_risk
-            
-            # 2. 天气风险评估
-            weather_risk = self._assess_weather_risk(forecast_date)
-            if weather_risk > 0.05:
-                risk_factors['weather_risk'] = weather_risk
-            
-            # 3. 交通风险评估
-            traffic_risk = self._assess_traffic_risk(store_code, forecast_date)
-            if traffic_risk > 0.05:
-                risk_factors['traffic_risk'] = traffic_risk
-            
-            # 4. 容量约束风险
-            capacity_risk = self._assess_capacity_risk(store_code, forecast_date)
-            if capacity_risk > 0.1:
-                risk_factors['capacity_constraint_risk'] = capacity_risk
-            
-            # 5. 时间相关风险
-            temporal_risk = self._assess_temporal_risk(forecast_date)
-            if temporal_risk > 0.05:
-                risk_factors['temporal_risk'] = temporal_risk
-            
-            # 6. 历史表现风险
-            historical_risk = self._assess_historical_performance_risk(store_code)
-            if historical_risk > 0.1:
-                risk_factors['historical_performance_risk'] = historical_risk
-            
-            # 7. 供应链风险
-            supply_chain_risk = self._assess_supply_chain_risk(store_code, forecast_date)
-            if supply_chain_risk > 0.05:
-                risk_factors['supply_chain_risk'] = supply_chain_risk
-            
+            features = self._create_prediction_feature_matrix(store_codes, forecast_dates)
+            cache_keys = [
+                self._prediction_cache_key(store_code, forecast_date, features[row], seed)
+                for row, (store_code, forecast_date) in enumerate(pairs)
+            ]
+            for row, cache_key in enumerate(cache_keys):
+                forecasts[row] = self.prediction_cache.get(cache_key)
+            
+            pending = [row for row, forecast in enumerate(forecasts) if forecast is None]
+            if pending:
+                if risk_frame is not None:
+                    risk = risk_frame.iloc[pending]
+                else:
+                    risk = self.risk_engine.assess(
+                        [pairs[row][0] for row in pending], [pairs[row][1] for row in pending], seed
+                    )
+                pending_risks = self.risk_engine.to_risk_factors(risk)
+                if trained:
+                    features_scaled = self.scaler.transform(features[pending])
+                    predicted = np.asarray(self.model.predict(features_scaled), dtype=float)
+                    intervals = self._calculate_confidence_intervals_batch(predicted, features_scaled)
+                else:
+                    enhanced = [
+                        self._enhanced_sla_prediction(pairs[row][0], pairs[row][1], seed, risk_row)
+                        for row, risk_row in zip(pending, risk.to_dict('records'))
+                    ]
+                    predicted = np.array([sla for sla, _ in enhanced], dtype=float)
+                    intervals = np.array([interval for _, interval in enhanced], dtype=float)
         except Exception as e:
-            logger.warning(f"风险因子识别失败: {str(e)}")
-            risk_factors['assessment_error_risk'] = 0.15
+            logger.warning(f"SLA批量预测失败，回退为逐个预测: {str(e)}")
+            return [self.predict_sla_performance(store_code, forecast_date, seed) for store_code, forecast_date in pairs]
+        
+        for i, row in enumerate(pending):
+            store_code, forecast_date = pairs[row]
+            predicted_sla = float(predicted[i])
+            risk_factors = pending_risks[i]
+            forecast = SLAForecast(
+                store_code=store_code,
+                forecast_date=forecast_date,
+                predicted_sla_rate=max(0.0, min(1.0, predicted_sla)),
+                confidence_interval=(float(intervals[i, 0]), float(intervals[i, 1])),
+                risk_factors=risk_factors,
+                improvement_recommendations=self._generate_recommendations(predicted_sla, risk_factors)
+            )
+            self.prediction_cache.put(cache_keys[row], forecast)
+            forecasts[row] = forecast
         
-        return risk_factors
+        return forecasts
+    
+    def assess_risk_frame(self, store_codes: List[str], forecast_dates: List[date]) -> pd.DataFrame:
+        """门店 × 日期 全网风险评估（列式）"""
+        return self.risk_engine.assess_grid(store_codes, forecast_dates)
+    
+    def generate_sla_alert_frame(self, store_codes: List[str], forecast_dates: List[date],
+                                 threshold: float = 0.90, top_k: Optional[int] = None) -> pd.DataFrame:
+        """
+        全网一次性生成SLA预警表
+        
+        Args:
+            top_k: 只保留严重程度与SLA缺口最大的前K条
+        
+        Returns:
+            DataFrame[store_code, forecast_date, alert_type, severity, predicted_sla, threshold,
+                      high_risk_factors, severity_rank, priority]
+        """
+        # 风险表只评估一次，批量预测直接复用
+        frame = self.assess_risk_frame(store_codes, forecast_dates)
+        forecasts = self._predict_sla_grid(store_codes, forecast_dates, self.seed, risk_frame=frame)
+        frame['predicted_sla'] = [forecast.predicted_sla_rate for forecast in forecasts]
+        return self.risk_engine.build_alerts(frame, threshold=threshold, top_k=top_k)
+    
+    def identify_risk_factors(self, store_code: str, forecast_date: date,
+                              seed: Optional[RandomSource] = None) -> Dict[str, float]:
+        """识别风险因子（风险引擎的单行评估，相同请求与种子结果一致）"""
+        try:
+            seed = self._resolve_seed(seed)
+            return self.risk_engine.to_risk_factors(self.risk_engine.assess([store_code], [forecast_date], seed))[0]
+        except Exception as e:
+            logger.warning(f"风险因子识别失败: {str(e)}")
+            return {'assessment_error_risk': 0.15}
     
     def evaluate(self, test_data: pd.DataFrame) -> Dict[str, float]:
         """评估模型性能"""
@@ -380,6 +516,9 @@ class MLSLAPredictor(SLAPredictor):
             'feature_columns': list(self.feature_columns),
             'reference_date': self.reference_date.isoformat() if isinstance(self.reference_date, date) else None,
             'feature_importance': self.feature_importance,
+            'seed': self.seed,
+            'model_version': self.model_version,
+            'prediction_cache': self.prediction_cache.get_stats(),
         }
 
     def predict_pickup_time(self, order_info: Dict[str, Any], route_plan: Any, store_processing_time_model: Any = None) -> Dict[str, Any]:
@@ -452,11 +591,52 @@ class MLSLAPredictor(SLAPredictor):
         self.config = model_data['config']
         self.is_trained = model_data['is_trained']
         self.feature_importance = model_data.get('feature_importance', {})
+        self._bump_model_version()
         
         logger.info(f"✅ SLA预测模型已从 {filepath} 加载")
     
     # ==================== 私有方法 ====================
     
+    def _derive_rng(self, *key: Any) -> np.random.Generator:
+        """按 (种子, 键) 派生独立的随机数生成器，与调用顺序无关"""
+        entropy = [self.seed] + [zlib.crc32(str(part).encode('utf-8')) for part in key]
+        return np.random.default_rng(entropy)
+    
+    def _resolve_seed(self, seed: Optional[RandomSource]) -> int:
+        """单次调用的种子：为空取构造时的种子，Generator 抽取一个 32 位种子"""
+        if seed is None:
+            return self.seed
+        if isinstance(seed, np.random.Generator):
+            return int(seed.integers(0, 2 ** 32))
+        return int(seed)
+    
+    def _draw_uniform(self, low: float, high: float, stream: str,
+                      store_code: Any = None, forecast_date: Optional[date] = None,
+                      seed: Optional[int] = None) -> float:
+        """确定性均匀随机数，与列式风险引擎共享同一哈希序列"""
+        store_codes = None if store_code is None else [store_code]
+        ordinals = None if forecast_date is None else [forecast_date.toordinal()]
+        seed = self.seed if seed is None else seed
+        return float(uniform_from(hashed_uniform(seed, stream, store_codes, ordinals)[0], low, high))
+    
+    def _risk_row(self, store_code: Any, forecast_date: date, seed: Optional[int] = None) -> pd.Series:
+        """单个 门店 × 日期 的风险引擎评估结果"""
+        return self.risk_engine.assess([store_code], [forecast_date], seed).iloc[0]
+    
+    def _driver_row(self, store_code: Any, forecast_date: date, seed: Optional[int] = None) -> pd.Series:
+        """单个 门店 × 日期 的模拟驱动因子（需求水平、需求波动、容量利用率）"""
+        return self.risk_engine.drivers([store_code], [forecast_date], seed).iloc[0]
+    
+    def _prediction_cache_key(self, store_code: str, forecast_date: date, features: Any,
+                              seed: Optional[int] = None) -> Tuple[Any, ...]:
+        """缓存键: (模型版本, 种子, 门店, 日期, 特征哈希)"""
+        feature_hash = hashlib.blake2b(np.asarray(features, dtype=float).tobytes(), digest_size=8).hexdigest()
+        return (self.model_version, self.seed if seed is None else seed, str(store_code), forecast_date, feature_hash)
+    
+    def _bump_model_version(self) -> None:
+        self.model_version += 1
+        self.prediction_cache.clear()
+    
     def _preprocess_training_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """预处理训练数据"""
         processed = data.copy()
@@ -471,7 +651,7 @@ class MLSLAPredictor(SLAPredictor):
         # 计算SLA指标（简化）
         if 'sla_rate' not in processed.columns:
             # 模拟SLA计算
-            processed['sla_rate'] = 0.95 + np.random.normal(0, 0.05, len(processed))
+            processed['sla_rate'] = 0.95 + self._derive_rng('training_sla').normal(0, 0.05, len(processed))
         processed['sla_rate'] = processed['sla_rate'].clip(0, 1)
         
         return processed
@@ -516,7 +696,8 @@ class MLSLAPredictor(SLAPredictor):
         weather_features = ['weather_temperature_high', 'weather_humidity', 'weather_rainfall']
         for feature in weather_features:
             if feature not in features_df.columns:
-                features_df[feature] = np.random.normal(25, 5) if 'temperature' in feature else np.random.normal(70, 10)
+                feature_rng = self._derive_rng('training_weather', feature)
+                features_df[feature] = feature_rng.normal(25, 5) if 'temperature' in feature else feature_rng.normal(70, 10)
         
         # 假期特征
         if 'is_holiday' not in features_df.columns:
@@ -543,7 +724,7 @@ class MLSLAPredictor(SLAPredictor):
             y = features_df['sla_rate'].clip(0, 1).values
         else:
             # 如果没有真实SLA数据，生成模拟数据
-            y = 0.95 + np.random.normal(0, 0.05, len(X))
+            y = 0.95 + self._derive_rng('training_target').normal(0, 0.05, len(X))
             y = np.clip(y, 0, 1)
         
         return X, y
@@ -593,8 +774,47 @@ class MLSLAPredictor(SLAPredictor):
         
         return features
     
-    def _enhanced_sla_prediction(self, store_code: str, forecast_date: date) -> Tuple[float, Tuple[float, float]]:
-        """增强的SLA预测方法"""
+    def _create_prediction_feature_matrix(self, store_codes: List[str], forecast_dates: List[date]) -> np.ndarray:
+        """批量创建预测特征矩阵（列顺序与 _create_prediction_features 一致）"""
+        dates = pd.DatetimeIndex(pd.to_datetime(list(forecast_dates)))
+        weekday = dates.dayofweek.to_numpy()
+        holiday = np.array([1 if self._is_holiday(forecast_date) else 0 for forecast_date in forecast_dates])
+        n_dates = len(dates)
+        
+        date_block = np.column_stack([
+            weekday,                          # weekday
+            dates.month.to_numpy(),           # month
+            dates.day.to_numpy(),             # day_of_month
+            (weekday >= 5).astype(int),       # is_weekend
+            holiday,                          # is_holiday
+            np.full(n_dates, 5.0),            # order_size (预测平均值)
+            np.full(n_dates, 2.5),            # sku_diversity (预测平均值)
+        ]).astype(float)
+        
+        store_encoded = np.repeat(self._encode_store_codes(store_codes), n_dates)
+        weather = np.tile([25.0, 70.0, 2.0], (len(store_codes) * n_dates, 1))  # 温度、湿度、降雨
+        
+        return np.column_stack([np.tile(date_block, (len(store_codes), 1)), store_encoded, weather])
+    
+    def _encode_store_codes(self, store_codes: List[str]) -> np.ndarray:
+        """批量编码门店代码（未知门店为 -1）"""
+        encoder = self.label_encoders.get('fulfillment_store_code')
+        if encoder is None:
+            return np.zeros(len(store_codes), dtype=float)
+        
+        codes = np.asarray([str(store_code) for store_code in store_codes])
+        known = np.isin(codes, encoder.classes_)
+        encoded = np.full(len(codes), -1.0)
+        if known.any():
+            encoded[known] = encoder.transform(codes[known])
+        return encoded
+    
+    def _enhanced_sla_prediction(self, store_code: str, forecast_date: date, seed: Optional[int] = None,
+                                 risk_row: Optional[Dict[str, Any]] = None) -> Tuple[float, Tuple[float, float]]:
+        """增强的SLA预测方法（risk_row 为风险引擎对该 门店 × 日期 的评估行，为空时现场评估）"""
+        if risk_row is None:
+            risk_row = self._risk_row(store_code, forecast_date, seed)
+        
         # 基础SLA率（基于历史表现）
         base_sla = self._get_historical_baseline_sla(store_code)
         
@@ -602,17 +822,17 @@ class MLSLAPredictor(SLAPredictor):
         time_adjustment = self._calculate_time_adjustment(forecast_date)
         
         # 需求因子调整
-        demand_adjustment = self._calculate_demand_adjustment(store_code, forecast_date)
+        demand_adjustment = self._calculate_demand_adjustment(float(risk_row['expected_demand']))
         
         # 外部因子调整
-        external_adjustment = self._calculate_external_factors_adjustment(forecast_date)
+        external_adjustment = self._calculate_external_factors_adjustment(forecast_date, seed)
         
         # 综合预测
         predicted_sla = base_sla + time_adjustment + demand_adjustment + external_adjustment
         predicted_sla = max(0.7, min(0.99, predicted_sla))
         
         # 计算不确定性
-        uncertainty = self._calculate_prediction_uncertainty(store_code, forecast_date)
+        uncertainty = self._calculate_prediction_uncertainty(float(risk_row['demand_volatility']), forecast_date)
         
         # 置信区间
         confidence_interval = (
@@ -629,14 +849,7 @@ class MLSLAPredictor(SLAPredictor):
             return max(0.0, min(1.0, baseline))
 
         # 模拟基于门店的历史表现
-        store_baselines = {
-            '417': 0.94,
-            '331': 0.92,
-            '213': 0.96,
-            '418': 0.93,
-            '419': 0.91
-        }
-        return store_baselines.get(store_code, 0.93)
+        return DEFAULT_STORE_BASELINES.get(store_code, 0.93)
     
     def _calculate_time_adjustment(self, forecast_date: date) -> float:
         """计算时间相关调整"""
@@ -656,11 +869,8 @@ class MLSLAPredictor(SLAPredictor):
         
         return adjustment
     
-    def _calculate_demand_adjustment(self, store_code: str, forecast_date: date) -> float:
-        """计算需求相关调整"""
-        # 预测需求水平
-        expected_demand = self._estimate_demand_level(store_code, forecast_date)
-        
+    def _calculate_demand_adjustment(self, expected_demand: float) -> float:
+        """计算需求相关调整（expected_demand 为相对平均需求的倍数）"""
         # 需求过高时SLA下降
         if expected_demand > 1.2:  # 比平均高20%
             return -0.03 * (expected_demand - 1.0)
@@ -669,189 +879,65 @@ class MLSLAPredictor(SLAPredictor):
         
         return 0.0
     
-    def _calculate_external_factors_adjustment(self, forecast_date: date) -> float:
+    def _calculate_external_factors_adjustment(self, forecast_date: date, seed: Optional[int] = None) -> float:
         """计算外部因子调整"""
         adjustment = 0.0
         
         # 天气影响（模拟）
-        weather_severity = np.random.uniform(0, 1)
+        weather_severity = self._draw_uniform(0, 1, 'external_weather', None, forecast_date, seed)
         if weather_severity > 0.7:  # 恶劣天气
             adjustment -= 0.02 * weather_severity
         
         # 交通影响
-        traffic_congestion = np.random.uniform(0.5, 1.5)
+        traffic_congestion = self._draw_uniform(0.5, 1.5, 'external_traffic', None, forecast_date, seed)
         if traffic_congestion > 1.2:
             adjustment -= 0.015 * (traffic_congestion - 1.0)
         
         return adjustment
     
-    def _calculate_prediction_uncertainty(self, store_code: str, forecast_date: date) -> float:
-        """计算预测不确定性"""
+    def _calculate_prediction_uncertainty(self, volatility: float, forecast_date: date) -> float:
+        """计算预测不确定性（volatility 为门店需求波动性）"""
         base_uncertainty = 0.03
         
         # 门店历史波动性
-        volatility = self._calculate_demand_volatility(store_code)
         uncertainty_adjustment = volatility * 0.02
         
-        # 预测时间距离
-        days_ahead = (forecast_date - date.today()).days
+        # 预测时间距离（相对模型基准日期，保证相同请求结果一致）
+        days_ahead = (forecast_date - self.reference_date).days
         time_uncertainty = min(0.02, days_ahead * 0.002)
         
         return base_uncertainty + uncertainty_adjustment + time_uncertainty
     
+    # 七类风险规则只在 SLARiskEngine 中实现；以下单项入口各做一次单行评估，仅供调试与测试，
+    # 预测、批量预测与预警路径都直接使用整表评估结果
+    
     def _assess_demand_risk(self, store_code: str, forecast_date: date) -> float:
         """评估需求风险"""
-        try:
-            # 预测需求水平
-            expected_demand = self._estimate_demand_level(store_code, forecast_date)
-            
-            # 需求波动性
-            demand_volatility = self._calculate_demand_volatility(store_code)
-            
-            # 高需求风险
-            if expected_demand > 1.3:  # 比平均高30%
-                return min(0.4, 0.1 + (expected_demand - 1.0) * 0.2)
-            
-            # 需求不确定性风险
-            if demand_volatility > 0.4:
-                return min(0.3, demand_volatility * 0.5)
-            
-            return 0.0
-        except Exception:
-            return 0.1
+        return float(self._risk_row(store_code, forecast_date)['demand_risk'])
     
     def _assess_weather_risk(self, forecast_date: date) -> float:
         """评估天气风险"""
-        try:
-            # 模拟天气风险评估
-            # 实际应用中应该调用天气API
-            
-            # 季节性风险
-            month = forecast_date.month
-            seasonal_risk = 0.0
-            
-            # 台风季节 (6-11月)
-            if month in [6, 7, 8, 9, 10, 11]:
-                seasonal_risk = 0.1
-            
-            # 雨季风险 (5-9月)
-            if month in [5, 6, 7, 8, 9]:
-                seasonal_risk += 0.05
-            
-            # 随机天气事件
-            random_weather_risk = np.random.exponential(0.05)
-            
-            return min(0.3, seasonal_risk + random_weather_risk)
-        except Exception:
-            return 0.05
+        return float(self._risk_row(None, forecast_date)['weather_risk'])
     
     def _assess_traffic_risk(self, store_code: str, forecast_date: date) -> float:
         """评估交通风险"""
-        try:
-            base_risk = 0.0
-            
-            # 工作日交通风险更高
-            if forecast_date.weekday() < 5:
-                base_risk = 0.08
-            
-            # 月末交通风险
-            if forecast_date.day >= 28:
-                base_risk += 0.03
-            
-            # 门店位置风险（模拟）
-            location_risk_map = {
-                '417': 0.12,  # 旺角区域，交通拥堵
-                '331': 0.08,  # 中等拥堵区域
-                '213': 0.05,  # 较少拥堵区域
-                '418': 0.10,
-                '419': 0.15   # 高拥堵区域
-            }
-            
-            location_risk = location_risk_map.get(store_code, 0.08)
-            
-            return min(0.25, base_risk + location_risk)
-        except Exception:
-            return 0.08
+        return float(self._risk_row(store_code, forecast_date)['traffic_risk'])
     
     def _assess_capacity_risk(self, store_code: str, forecast_date: date) -> float:
         """评估容量约束风险"""
-        try:
-            # 预测容量利用率
-            capacity_utilization = self._estimate_capacity_utilization(store_code, forecast_date)
-            
-            # 高利用率风险
-            if capacity_utilization > 0.85:
-                return min(0.4, (capacity_utilization - 0.85) * 2.0)
-            elif capacity_utilization > 0.75:
-                return (capacity_utilization - 0.75) * 0.5
-            
-            return 0.0
-        except Exception:
-            return 0.1
+        return float(self._risk_row(store_code, forecast_date)['capacity_risk'])
     
     def _assess_temporal_risk(self, forecast_date: date) -> float:
         """评估时间相关风险"""
-        try:
-            risk = 0.0
-            
-            # 周末风险
-            if forecast_date.weekday() in [5, 6]:
-                risk += 0.1
-            
-            # 月末风险
-            if forecast_date.day >= 28:
-                risk += 0.08
-            
-            # 假期风险
-            if self._is_holiday(forecast_date):
-                risk += 0.15
-            
-            # 特殊日期风险（如情人节、母亲节等）
-            special_dates = self._get_special_shopping_dates()
-            if forecast_date in special_dates:
-                risk += 0.12
-            
-            return min(0.3, risk)
-        except Exception:
-            return 0.05
+        return float(self._risk_row(None, forecast_date)['temporal_risk'])
     
     def _assess_historical_performance_risk(self, store_code: str) -> float:
         """评估历史表现风险"""
-        try:
-            # 获取历史SLA表现
-            historical_sla = self._get_historical_baseline_sla(store_code)
-            
-            # 历史表现差的门店风险更高
-            if historical_sla < 0.90:
-                return min(0.3, (0.95 - historical_sla) * 2.0)
-            elif historical_sla < 0.93:
-                return (0.95 - historical_sla) * 1.0
-            
-            return 0.0
-        except Exception:
-            return 0.1
+        return float(self._risk_row(store_code, self.reference_date)['historical_risk'])
     
     def _assess_supply_chain_risk(self, store_code: str, forecast_date: date) -> float:
         """评估供应链风险"""
-        try:
-            risk = 0.0
-            
-            # 库存风险（模拟）
-            inventory_risk = np.random.uniform(0, 0.15)
-            if inventory_risk > 0.1:
-                risk += inventory_risk
-            
-            # 供应商风险
-            supplier_risk = np.random.uniform(0, 0.1)
-            risk += supplier_risk
-            
-            # 物流风险
-            logistics_risk = np.random.uniform(0, 0.08)
-            risk += logistics_risk
-            
-            return min(0.25, risk)
-        except Exception:
-            return 0.05
+        return float(self._risk_row(store_code, forecast_date)['supply_chain_risk'])
     
     def _get_special_shopping_dates(self) -> set:
         """获取特殊购物日期"""
@@ -891,6 +977,24 @@ class MLSLAPredictor(SLAPredictor):
         
         return (lower, upper)
     
+    def _calculate_confidence_intervals_batch(self, predicted: np.ndarray, features_scaled: np.ndarray) -> np.ndarray:
+        """批量计算置信区间，返回 (样本数, 2)；每棵树只对整个矩阵预测一次"""
+        if self.is_trained and SKLEARN_AVAILABLE and hasattr(self.model, 'estimators_'):
+            try:
+                tree_predictions = np.stack([tree.predict(features_scaled) for tree in self.model.estimators_])
+                std_error = tree_predictions.std(axis=0)
+            except Exception:
+                std_error = np.full(len(predicted), 0.03)
+        else:
+            std_error = np.clip(predicted * (1 - predicted) * 0.3, 0.02, 0.05)
+        
+        # 95%置信区间
+        margin = 1.96 * std_error
+        return np.column_stack([
+            np.maximum(0.0, predicted - margin),
+            np.minimum(1.0, predicted + margin),
+        ])
+    
     def monitor_real_time_sla_performance(self, active_orders: List[Any]) -> Dict[str, float]:
         """监控实时SLA表现"""
         try:
@@ -970,8 +1074,9 @@ class MLSLAPredictor(SLAPredictor):
             logger.warning(f"计算订单SLA状态失败: {str(e)}")
             return 12.0, True  # 默认值
     
-    def generate_sla_alerts(self, sla_forecasts: List[SLAForecast], threshold: float = 0.90) -> List[Dict[str, Any]]:
-        """生成SLA预警"""
+    def generate_sla_alerts(self, sla_forecasts: List[SLAForecast], threshold: float = 0.90,
+                            top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """生成SLA预警（top_k 不为空时按严重程度与SLA缺口取前K条）"""
         alerts = []
         
         try:
@@ -1004,6 +1109,17 @@ class MLSLAPredictor(SLAPredictor):
                     }
                     alerts.append(alert)
             
+            if top_k is not None and len(alerts) > top_k:
+                ranking = pd.DataFrame({
+                    'severity_rank': [SEVERITY_RANK[alert['severity']] for alert in alerts],
+                    'priority': [
+                        threshold - alert['predicted_sla'] if alert['alert_type'] == 'sla_risk'
+                        else sum(alert['high_risk_factors'].values())
+                        for alert in alerts
+                    ],
+                })
+                alerts = [alerts[row] for row in ranking.nlargest(top_k, ['severity_rank', 'priority']).index]
+            
             return alerts
             
         except Exception as e:
@@ -1023,24 +1139,13 @@ class MLSLAPredictor(SLAPredictor):
         else:
             return 'low'
     
-    def _calculate_demand_volatility(self, store_code: str) -> float:
-        """计算需求波动性"""
-        # 简化的需求波动性计算
-        return np.random.uniform(0.1, 0.5)
+    def _calculate_demand_volatility(self, store_code: str, seed: Optional[int] = None) -> float:
+        """计算需求波动性（仅与门店有关）"""
+        return float(self._driver_row(store_code, self.reference_date, seed)['demand_volatility'])
     
     def _estimate_capacity_utilization(self, store_code: str, forecast_date: date) -> float:
         """估算容量利用率"""
-        # 简化的容量利用率估算
-        base_utilization = 0.7
-        
-        # 周末和假期利用率更高
-        if forecast_date.weekday() in [5, 6]:
-            base_utilization += 0.1
-        
-        if self._is_holiday(forecast_date):
-            base_utilization += 0.15
-        
-        return min(1.0, base_utilization + np.random.uniform(-0.1, 0.1))
+        return float(self._driver_row(store_code, forecast_date)['capacity_utilization'])
     
     def _generate_recommendations(self, predicted_sla: float, risk_factors: Dict[str, float]) -> List[str]:
         """生成改进建议"""
@@ -1112,46 +1217,9 @@ class MLSLAPredictor(SLAPredictor):
         except Exception:
             return False
     
-    def _estimate_demand_level(self, store_code: str, forecast_date: date) -> float:
-        """估算需求水平"""
-        try:
-            # 基础需求水平
-            base_demand = 1.0
-            
-            # 门店特性调整
-            store_demand_factors = {
-                '417': 1.2,  # 高需求门店
-                '331': 0.9,  # 中等需求门店
-                '213': 1.1,  # 较高需求门店
-                '418': 0.8,  # 较低需求门店
-                '419': 1.3   # 最高需求门店
-            }
-            
-            store_factor = store_demand_factors.get(store_code, 1.0)
-            
-            # 时间因子
-            time_factor = 1.0
-            if forecast_date.weekday() in [5, 6]:  # 周末
-                time_factor = 1.15
-            
-            if self._is_holiday(forecast_date):  # 假期
-                time_factor = 1.25
-            
-            # 季节性因子
-            month = forecast_date.month
-            seasonal_factors = {
-                1: 1.1, 2: 1.2, 3: 1.0, 4: 0.9, 5: 0.95, 6: 1.05,
-                7: 1.1, 8: 1.05, 9: 0.9, 10: 1.0, 11: 1.15, 12: 1.3
-            }
-            seasonal_factor = seasonal_factors.get(month, 1.0)
-            
-            # 随机波动
-            random_factor = np.random.uniform(0.9, 1.1)
-            
-            return base_demand * store_factor * time_factor * seasonal_factor * random_factor
-            
-        except Exception:
-            return 1.0
+    def _estimate_demand_level(self, store_code: str, forecast_date: date, seed: Optional[int] = None) -> float:
+        """估算需求水平（相对平均需求的倍数）"""
+        return float(self._driver_row(store_code, forecast_date, seed)['expected_demand'])
     
     def _create_default_forecast(self, store_code: str, forecast_date: date) -> SLAForecast:
         """创建默认预测"""
@@ -1,89 +1,447 @@
 """
 安全库存优化器
+
+门店 × SKU 全网格的安全库存、再订货点与补货量按列一次算出：
+需求均值/标准差一次 groupby，服务水平对应的 z 值查缓存分位数表。
+配送中心库存不足时，用最小费用流在全网门店之间分配。
 """
+import logging
+import time
+from functools import lru_cache
+from statistics import NormalDist
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
 import numpy as np
-from typing import Dict, Any, List
-from ...interfaces import IInventoryOptimizer
+import pandas as pd
+from ..interfaces import IInventoryOptimizer
 from src.core.interfaces import DemandForecast
 
+logger = logging.getLogger(__name__)
+
+try:
+    from ortools.graph.python import min_cost_flow
+    ORTOOLS_AVAILABLE = True
+except ImportError:
+    ORTOOLS_AVAILABLE = False
+    logger.warning("OR-Tools not available, inventory allocation falls back to greedy fill")
+
+GRID_KEYS = ['store_id', 'sku_id']
+DEFAULT_DC = 'DC'
+COST_SCALE = 100  # 单位运输成本放大为整数
+SERVICE_LEVEL_EPS = 1e-9  # 0 与 1 的服务水平截断到开区间，z 值约为 ±6
+
+
+@lru_cache(maxsize=4096)
+def service_level_z(service_level: float) -> float:
+    """服务水平 → 标准正态分位数（缓存）；0 与 1 截断到 (1e-9, 1-1e-9)，区间外抛出 ValueError"""
+    if not 0.0 <= service_level <= 1.0:
+        raise ValueError(f"服务水平必须在 [0, 1] 之间: {service_level}")
+    return NormalDist().inv_cdf(min(max(service_level, SERVICE_LEVEL_EPS), 1.0 - SERVICE_LEVEL_EPS))
+
+
+def service_level_z_scores(service_levels: Union[float, Sequence[float], np.ndarray]) -> np.ndarray:
+    """批量查表：只对不同的服务水平求一次分位数"""
+    levels = np.asarray(service_levels, dtype=float)
+    unique, inverse = np.unique(levels, return_inverse=True)
+    table = np.array([service_level_z(float(level)) for level in unique])
+    return table[inverse].reshape(levels.shape)
+
+
+def forecasts_to_frame(demand_forecasts: Union[List[DemandForecast], pd.DataFrame]) -> pd.DataFrame:
+    """DemandForecast 列表 → DataFrame[store_id, sku_id, date, forecast_demand]"""
+    if isinstance(demand_forecasts, pd.DataFrame):
+        return demand_forecasts
+    return pd.DataFrame({
+        'store_id': [f.store_id for f in demand_forecasts],
+        'sku_id': [f.sku_id for f in demand_forecasts],
+        'date': [f.date for f in demand_forecasts],
+        'forecast_demand': np.array([f.forecast_demand for f in demand_forecasts], dtype=float),
+    })
+
+
 class SafetyStockOptimizer(IInventoryOptimizer):
     """安全库存优化器"""
-    
-    def __init__(self, default_service_level: float = 0.95):
+
+    def __init__(self, default_service_level: float = 0.95, default_min_order_qty: float = 10,
+                 default_batch_size: float = 25):
         self.default_service_level = default_service_level
-    
-    def calculate_safety_stock(self, demand_forecasts: List[DemandForecast], 
-                              service_level: float = 0.95, 
+        self.default_min_order_qty = default_min_order_qty
+        self.default_batch_size = default_batch_size
+
+    def calculate_safety_stock(self, demand_forecasts: List[DemandForecast],
+                              service_level: float = 0.95,
                               lead_time_days: int = 2) -> Dict[str, float]:
-        """计算安全库存"""
-        import scipy.stats as stats
-        
-        # 按SKU分组
-        sku_demands = {}
-        for forecast in demand_forecasts:
-            key = forecast.sku_id
-            if key not in sku_demands:
-                sku_demands[key] = []
-            sku_demands[key].append(forecast.forecast_demand)
-        
-        safety_stocks = {}
-        z_score = stats.norm.ppf(service_level)
-        
-        for sku_id, demands in sku_demands.items():
-            mean_demand = np.mean(demands)
-            std_demand = np.std(demands)
-            
-            # 安全库存公式
-            safety_stock = z_score * std_demand * np.sqrt(lead_time_days)
-            safety_stocks[sku_id] = max(0, safety_stock)
-        
-        return safety_stocks
+        """计算安全库存（按SKU汇总各门店预测）"""
+        frame = self.calculate_safety_stock_frame(
+            demand_forecasts, service_level, lead_time_days, group_keys=['sku_id']
+        )
+        return dict(zip(frame['sku_id'], frame['safety_stock'].astype(float)))
+
+    def calculate_safety_stock_frame(self, demand_forecasts: Union[List[DemandForecast], pd.DataFrame],
+                                     service_level: Union[float, Dict[str, float], None] = None,
+                                     lead_time_days: Union[float, Dict[str, float]] = 2,
+                                     group_keys: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        门店 × SKU 安全库存（列式）
+
+        Args:
+            service_level: 统一服务水平或 {sku_id: 服务水平}
+            lead_time_days: 统一提前期或 {sku_id: 天数}
+            group_keys: 分组键，默认 门店 × SKU
+
+        Returns:
+            DataFrame[分组键..., mean_demand, std_demand, service_level, z_score,
+                      lead_time_days, safety_stock, reorder_point]
+        """
+        group_keys = group_keys or GRID_KEYS
+        forecasts = forecasts_to_frame(demand_forecasts)
+
+        # 一次 groupby 得到均值与总体标准差（与 np.std 一致，ddof=0）
+        stats = self._demand_stats(forecasts, group_keys)
+
+        stats['service_level'] = self._per_sku(stats, service_level, self.default_service_level)
+        stats['z_score'] = service_level_z_scores(stats['service_level'].to_numpy())
+        stats['lead_time_days'] = self._per_sku(stats, lead_time_days, 2)
+
+        sqrt_lead = np.sqrt(stats['lead_time_days'].to_numpy(dtype=float))
+        stats['safety_stock'] = np.maximum(0.0, stats['z_score'].to_numpy() * stats['std_demand'].to_numpy() * sqrt_lead)
+        stats['reorder_point'] = stats['mean_demand'] * stats['lead_time_days'] + stats['safety_stock']
+        return stats
+
+    def optimize_inventory_allocation(self, current_inventory: Dict[Tuple[str, str], float],
+                                     demand_forecasts: List[DemandForecast],
+                                     warehouse_capacity: Dict[Any, float],
+                                     costs: Dict[Any, float]) -> Dict[str, Any]:
+        """
+        全网库存分配：把有限的配送中心库存分给各门店
+        
+        Args:
+            current_inventory: {(store_id, sku_id): 门店现有库存}；键不是 (门店, SKU) 元组时抛出 ValueError
+            warehouse_capacity: {sku_id: 配送中心可用库存} 或 {(dc_id, sku_id): 可用库存}
+            costs: {store_id: 单位运输成本} 或 {(dc_id, store_id): 单位运输成本}
+        
+        Returns:
+            status、total_cost（运输成本）、inventory_allocation {(store_id, sku_id): 分配后库存}、
+            shipments、shortages {sku_id: 未满足需求}、fill_rate
+        """
+        result = self.allocate_inventory_frame(demand_forecasts, warehouse_capacity, current_inventory, costs)
+        positions = result['positions']
+        shortages = positions.groupby('sku_id')['demand_shortage'].sum()
+        total_need = float(positions['need_demand'].sum())
+        
+        return {
+            'status': result['status'],
+            'total_cost': result['total_cost'],
+            'inventory_allocation': dict(zip(
+                zip(positions['store_id'], positions['sku_id']),
+                (positions['current'] + positions['allocated']).astype(float)
+            )),
+            'shipments': result['shipments'].to_dict(orient='records'),
+            'shortages': {sku: float(qty) for sku, qty in shortages.items() if qty > 0},
+            'fill_rate': 1.0 if total_need == 0 else 1.0 - float(positions['demand_shortage'].sum()) / total_need,
+            'solve_seconds': result['solve_seconds']
+        }
     
-    def optimize_inventory_allocation(self, current_inventory: Dict[str, float], 
-                                     demand_forecasts: List[DemandForecast], 
-                                     warehouse_capacity: Dict[str, float], 
-                                     costs: Dict[str, float]) -> Dict[str, Any]:
-        """优化库存分配"""
-        # 简化实现
+    def allocate_inventory_frame(self, demand_forecasts: Union[List[DemandForecast], pd.DataFrame],
+                                 dc_stock: Dict[Any, float],
+                                 current_inventory: Union[Dict[Any, float], pd.Series, pd.DataFrame, None] = None,
+                                 transport_costs: Optional[Dict[Any, float]] = None,
+                                 service_level: Union[float, Dict[str, float], None] = None,
+                                 lead_time_days: Union[float, Dict[str, float]] = 2) -> Dict[str, Any]:
+        """
+        最小费用流库存分配（列式）
+        
+        每个 门店×SKU 的需求分两档：提前期内的预测需求缺口（日均预测 × 提前期）优先，
+        其次补足安全库存；同档内运输成本低者优先。库存充足时全部满足，不足时缺口集中在成本高、优先级低的门店。
+        
+        Args:
+            current_inventory: {(store_id, sku_id): 库存}、(store_id, sku_id) 二级索引的 Series，
+                               或含 store_id、sku_id、current 列的 DataFrame；仅按 SKU 给出时抛出 ValueError
+        
+        Returns:
+            {'status', 'positions': DataFrame[store_id, sku_id, demand, safety_stock, current,
+             need_demand, need_safety, allocated, demand_shortage, safety_shortage],
+             'shipments': DataFrame[dc_id, store_id, sku_id, quantity, unit_cost],
+             'total_cost', 'solve_seconds'}
+        """
+        start = time.time()
+        positions = self._allocation_needs(demand_forecasts, current_inventory, service_level, lead_time_days)
+        supply = self._dc_supply(dc_stock)
+        
+        if ORTOOLS_AVAILABLE:
+            status, shipments = self._solve_min_cost_flow(positions, supply, transport_costs)
+        else:
+            status, shipments = self._greedy_allocation(positions, supply, transport_costs)
+        
+        allocated = shipments.groupby(['store_id', 'sku_id'])['quantity'].sum()
+        positions['allocated'] = allocated.reindex(
+            pd.MultiIndex.from_frame(positions[GRID_KEYS])
+        ).fillna(0.0).to_numpy()
+        positions['demand_shortage'] = np.maximum(0.0, positions['need_demand'] - positions['allocated'])
+        positions['safety_shortage'] = np.maximum(
+            0.0, positions['need_demand'] + positions['need_safety'] - positions['allocated']
+        ) - positions['demand_shortage']
+        
         return {
-            'status': 'optimized',
-            'total_cost': sum(costs.values()),
-            'inventory_allocation': current_inventory.copy()
+            'status': status,
+            'positions': positions,
+            'shipments': shipments,
+            'total_cost': float((shipments['quantity'] * shipments['unit_cost']).sum()),
+            'solve_seconds': time.time() - start,
         }
     
-    def generate_replenishment_plan(self, safety_stocks: Dict[str, float], 
-                                   current_inventory: Dict[str, float], 
-                                   min_order_qty: Dict[str, float], 
+    def generate_replenishment_plan(self, safety_stocks: Dict[str, float],
+                                   current_inventory: Dict[str, float],
+                                   min_order_qty: Dict[str, float],
                                    batch_sizes: Dict[str, float]) -> Dict[str, Any]:
         """生成补货计划"""
-        plan = {}
-        
-        for sku_id, safety_stock in safety_stocks.items():
-            current = current_inventory.get(sku_id, 0)
-            min_qty = min_order_qty.get(sku_id, 10)
-            batch = batch_sizes.get(sku_id, 25)
-            
-            if current < safety_stock:
-                # 需要补货
-                deficit = safety_stock - current
-                order_qty = max(min_qty, np.ceil(deficit / batch) * batch)
-                
-                plan[sku_id] = {
-                    'current': current,
-                    'safety_stock': safety_stock,
-                    'order_quantity': order_qty,
-                    'status': 'needs_reorder'
-                }
-            else:
-                plan[sku_id] = {
-                    'current': current,
-                    'safety_stock': safety_stock,
-                    'order_quantity': 0,
-                    'status': 'sufficient'
-                }
-        
+        frame = pd.DataFrame({
+            'sku_id': list(safety_stocks.keys()),
+            'safety_stock': np.array(list(safety_stocks.values()), dtype=float),
+        })
+        frame = self.generate_replenishment_frame(frame, current_inventory, min_order_qty, batch_sizes,
+                                                  keys=['sku_id'])
+
+        plan = {
+            sku_id: {
+                'current': current,
+                'safety_stock': safety_stock,
+                'order_quantity': order_quantity,
+                'status': status
+            }
+            for sku_id, current, safety_stock, order_quantity, status in zip(
+                frame['sku_id'], frame['current'], frame['safety_stock'],
+                frame['order_quantity'], frame['status']
+            )
+        }
+
         return {
             'replenishment_plan': plan,
             'total_skus': len(plan),
-            'skus_needing_reorder': sum(1 for p in plan.values() if p['status'] == 'needs_reorder')
+            'skus_needing_reorder': int((frame['status'] == 'needs_reorder').sum())
         }
+
+    def generate_replenishment_frame(self, stock_frame: pd.DataFrame,
+                                     current_inventory: Union[Dict[Any, float], pd.Series, pd.DataFrame, None] = None,
+                                     min_order_qty: Union[Dict[Any, float], float, None] = None,
+                                     batch_sizes: Union[Dict[Any, float], float, None] = None,
+                                     keys: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        全网补货量（列式）
+
+        当前库存低于安全库存时补货：补足缺口并向上取整到批量，且不少于最小起订量。
+
+        Args:
+            stock_frame: calculate_safety_stock_frame 的结果（至少含 keys 与 safety_stock）
+            current_inventory: {键: 库存}（多键时键为元组）、以 keys 为索引的 Series，
+                               或含 keys 与 current 列的 DataFrame；缺失视为 0
+            min_order_qty / batch_sizes: 标量或 {sku_id: 值}
+
+        Returns:
+            stock_frame 附加 current、order_quantity、status 列
+        """
+        keys = keys or GRID_KEYS
+        frame = stock_frame.copy()
+        frame['current'] = self._lookup(frame, keys, current_inventory, 0.0)
+        min_qty = self._per_sku(frame, min_order_qty, self.default_min_order_qty)
+        batch = self._per_sku(frame, batch_sizes, self.default_batch_size)
+
+        current = frame['current'].to_numpy(dtype=float)
+        safety = frame['safety_stock'].to_numpy(dtype=float)
+        needs = current < safety
+        order_qty = np.maximum(min_qty, np.ceil((safety - current) / batch) * batch)
+        frame['order_quantity'] = np.where(needs, order_qty, 0.0)
+        frame['status'] = np.where(needs, 'needs_reorder', 'sufficient')
+        return frame
+
+    def delivery_demand_frame(self, replenishment_frame: pd.DataFrame,
+                              store_key: str = 'store_id') -> pd.DataFrame:
+        """
+        门店级弹性配送需求向量，供补货-配送联合规划使用
+
+        - min_qty: 补足安全库存的最低量（必须送达）
+        - target_qty: 按批量/起订量取整后的建议补货量
+        - max_qty: 补到再订货点的上限（车辆有余量时可多送）
+
+        Args:
+            replenishment_frame: generate_replenishment_frame 的结果（需含 reorder_point 才有上浮空间）
+
+        Returns:
+            DataFrame[store_id, min_qty, target_qty, max_qty]，只保留需要送货的门店
+        """
+        current = replenishment_frame['current'].to_numpy(dtype=float)
+        min_qty = np.ceil(np.maximum(0.0, replenishment_frame['safety_stock'].to_numpy(dtype=float) - current) - 1e-9)
+        target_qty = np.maximum(min_qty, replenishment_frame['order_quantity'].to_numpy(dtype=float))
+        max_qty = target_qty
+        if 'reorder_point' in replenishment_frame.columns:
+            cover = np.ceil(np.maximum(0.0, replenishment_frame['reorder_point'].to_numpy(dtype=float) - current) - 1e-9)
+            max_qty = np.maximum(target_qty, cover)
+
+        demand = pd.DataFrame({
+            store_key: replenishment_frame[store_key].to_numpy(),
+            'min_qty': min_qty, 'target_qty': target_qty, 'max_qty': max_qty,
+        }).groupby(store_key, as_index=False, sort=True).sum()
+        return demand[demand['max_qty'] > 0].reset_index(drop=True)
+
+    # ==================== 内部方法 ====================
+    
+    def _allocation_needs(self, demand_forecasts, current_inventory, service_level, lead_time_days) -> pd.DataFrame:
+        """门店×SKU 的提前期需求、安全库存与两档整数缺口（两档合计即补到再订货点）"""
+        positions = self.calculate_safety_stock_frame(demand_forecasts, service_level, lead_time_days)
+        # 提前期需求 = 日均预测 × 提前期，与 reorder_point 一致；预测期超出提前期的部分不参与本次分配
+        positions['demand'] = positions['mean_demand'] * positions['lead_time_days']
+        self._check_store_sku_keys(current_inventory)
+        positions['current'] = self._lookup(positions, GRID_KEYS, current_inventory, 0.0)
+        
+        target = positions['demand'] + positions['safety_stock']
+        need_total = np.ceil(np.maximum(0.0, target - positions['current']) - 1e-9)
+        positions['need_demand'] = np.minimum(
+            need_total, np.ceil(np.maximum(0.0, positions['demand'] - positions['current']) - 1e-9)
+        )
+        positions['need_safety'] = need_total - positions['need_demand']
+        return positions[GRID_KEYS + ['demand', 'safety_stock', 'current', 'need_demand', 'need_safety']]
+    
+    @staticmethod
+    def _check_store_sku_keys(current_inventory: Any) -> None:
+        """门店库存必须按 (store_id, sku_id) 给出，否则 reindex 后会被当作 0 静默丢弃"""
+        if isinstance(current_inventory, dict):
+            bad = [key for key in current_inventory if not (isinstance(key, tuple) and len(key) == 2)]
+        elif isinstance(current_inventory, pd.Series):
+            bad = [] if current_inventory.index.nlevels == 2 else list(current_inventory.index[:1])
+        else:
+            return
+        if bad:
+            raise ValueError(f"current_inventory 需按 (store_id, sku_id) 给出门店库存，收到键: {bad[0]!r}")
+    
+    @staticmethod
+    def _dc_supply(dc_stock: Dict[Any, float]) -> pd.DataFrame:
+        """{sku_id: 库存} 或 {(dc_id, sku_id): 库存} → DataFrame[dc_id, sku_id, supply]（取整）"""
+        rows = [
+            (key[0], key[1], qty) if isinstance(key, tuple) else (DEFAULT_DC, key, qty)
+            for key, qty in dc_stock.items()
+        ]
+        supply = pd.DataFrame(rows, columns=['dc_id', 'sku_id', 'supply'])
+        supply['supply'] = np.floor(supply['supply'].astype(float) + 1e-9)
+        return supply[supply['supply'] > 0].reset_index(drop=True)
+    
+    @staticmethod
+    def _unit_costs(dc_ids: pd.Series, store_ids: pd.Series, costs: Optional[Dict[Any, float]]) -> np.ndarray:
+        if not costs:
+            return np.ones(len(store_ids))
+        if isinstance(next(iter(costs)), tuple):
+            series = pd.Series(costs, dtype=float)
+            index = pd.MultiIndex.from_arrays([dc_ids.to_numpy(), store_ids.to_numpy()])
+            return series.reindex(index).fillna(1.0).to_numpy()
+        return store_ids.map(costs).fillna(1.0).to_numpy(dtype=float)
+    
+    def _candidate_arcs(self, positions: pd.DataFrame, supply: pd.DataFrame,
+                        costs: Optional[Dict[Any, float]]) -> pd.DataFrame:
+        """配送中心 → 有缺口的门店×SKU 候选边（只连接同一SKU）"""
+        needs = positions[['store_id', 'sku_id', 'need_demand', 'need_safety']].reset_index(names='row')
+        needs = needs[needs['need_demand'] + needs['need_safety'] > 0]
+        arcs = supply.reset_index(names='dc_node').merge(needs, on='sku_id')
+        arcs['unit_cost'] = self._unit_costs(arcs['dc_id'], arcs['store_id'], costs)
+        return arcs
+    
+    def _solve_min_cost_flow(self, positions: pd.DataFrame, supply: pd.DataFrame,
+                             costs: Optional[Dict[Any, float]]) -> Tuple[str, pd.DataFrame]:
+        """
+        最小费用最大流：配送中心SKU节点 → 门店SKU节点 → 汇点（需求档 / 安全库存档两条平行边）
+        
+        先最大化分配总量，再优先满足需求档，最后最小化运输成本。
+        """
+        arcs = self._candidate_arcs(positions, supply, costs)
+        if arcs.empty:
+            return 'optimal', self._empty_shipments()
+        
+        rows = np.sort(arcs['row'].unique())
+        row_node = pd.Series(np.arange(len(rows)), index=rows)
+        dc_nodes = len(rows) + arcs['dc_node'].to_numpy()
+        store_nodes = row_node[arcs['row']].to_numpy()
+        sink = len(rows) + len(supply)
+        
+        scaled_cost = np.rint(arcs['unit_cost'].to_numpy() * COST_SCALE).astype(np.int64)
+        safety_penalty = int(scaled_cost.max(initial=0)) * 2 + 1
+        need_demand = positions['need_demand'].to_numpy()[rows].astype(np.int64)
+        need_safety = positions['need_safety'].to_numpy()[rows].astype(np.int64)
+        
+        tails = np.concatenate([dc_nodes, np.arange(len(rows)), np.arange(len(rows))])
+        heads = np.concatenate([store_nodes, np.full(2 * len(rows), sink)])
+        capacities = np.concatenate([(need_demand + need_safety)[store_nodes], need_demand, need_safety])
+        unit_costs = np.concatenate([scaled_cost, np.zeros(len(rows), dtype=np.int64),
+                                     np.full(len(rows), safety_penalty, dtype=np.int64)])
+        
+        solver = min_cost_flow.SimpleMinCostFlow()
+        solver.add_arcs_with_capacity_and_unit_cost(tails, heads, capacities, unit_costs)
+        supplies = np.zeros(sink + 1, dtype=np.int64)
+        supplies[len(rows):sink] = supply['supply'].to_numpy(dtype=np.int64)
+        supplies[sink] = -supplies.sum()
+        solver.set_nodes_supplies(np.arange(sink + 1), supplies)
+        
+        status = solver.solve_max_flow_with_min_cost()
+        if status != solver.OPTIMAL:
+            logger.warning(f"库存分配最小费用流求解失败: {status}")
+            return 'failed', self._empty_shipments()
+        
+        flows = solver.flows(np.arange(len(arcs)))
+        shipped = arcs.assign(quantity=flows.astype(float))
+        shipped = shipped[shipped['quantity'] > 0]
+        return 'optimal', shipped[['dc_id', 'store_id', 'sku_id', 'quantity', 'unit_cost']].reset_index(drop=True)
+    
+    def _greedy_allocation(self, positions: pd.DataFrame, supply: pd.DataFrame,
+                           costs: Optional[Dict[Any, float]]) -> Tuple[str, pd.DataFrame]:
+        """无 OR-Tools 时的贪心分配：每个门店只从最便宜的配送中心取货，按 档位→成本 顺序依次填满"""
+        arcs = self._candidate_arcs(positions, supply, costs)
+        if arcs.empty:
+            return 'greedy', self._empty_shipments()
+        arcs = arcs.sort_values('unit_cost', kind='stable').drop_duplicates('row')
+        sku_supply = supply.groupby('sku_id')['supply'].sum()
+        
+        tiers = pd.concat([
+            arcs.assign(tier=0, need=arcs['need_demand']),
+            arcs.assign(tier=1, need=arcs['need_safety']),
+        ]).sort_values(['sku_id', 'tier', 'unit_cost'], kind='stable')
+        filled_before = tiers.groupby('sku_id')['need'].cumsum() - tiers['need']
+        available = tiers['sku_id'].map(sku_supply).to_numpy() - filled_before.to_numpy()
+        tiers['quantity'] = np.clip(available, 0.0, tiers['need'].to_numpy())
+        
+        shipped = tiers.groupby(['dc_id', 'store_id', 'sku_id', 'unit_cost'], as_index=False)['quantity'].sum()
+        shipped = shipped[shipped['quantity'] > 0]
+        return 'greedy', shipped[['dc_id', 'store_id', 'sku_id', 'quantity', 'unit_cost']].reset_index(drop=True)
+    
+    @staticmethod
+    def _empty_shipments() -> pd.DataFrame:
+        return pd.DataFrame({
+            'dc_id': pd.Series(dtype=object), 'store_id': pd.Series(dtype=object),
+            'sku_id': pd.Series(dtype=object), 'quantity': pd.Series(dtype=float),
+            'unit_cost': pd.Series(dtype=float),
+        })
+
+    @staticmethod
+    def _demand_stats(forecasts: pd.DataFrame, group_keys: List[str]) -> pd.DataFrame:
+        grouped = forecasts.groupby(group_keys, sort=True)['forecast_demand']
+        stats = grouped.agg(['mean', 'count']).rename(columns={'mean': 'mean_demand'})
+        # 总体标准差：样本标准差 × sqrt((n-1)/n)，单元素组为 0
+        sample_std = grouped.std(ddof=1).fillna(0.0)
+        count = stats.pop('count').to_numpy(dtype=float)
+        stats['std_demand'] = sample_std.to_numpy() * np.sqrt((count - 1) / count)
+        return stats.reset_index()
+
+    @staticmethod
+    def _per_sku(frame: pd.DataFrame, values: Union[Dict[str, float], float, None], default: float) -> np.ndarray:
+        """标量或 {sku_id: 值} → 与 frame 等长的数组"""
+        if values is None:
+            return np.full(len(frame), float(default))
+        if isinstance(values, dict):
+            return frame['sku_id'].map(values).fillna(default).to_numpy(dtype=float)
+        return np.full(len(frame), float(values))
+
+    @staticmethod
+    def _lookup(frame: pd.DataFrame, keys: List[str], values: Any, default: float) -> np.ndarray:
+        if values is None:
+            return np.full(len(frame), float(default))
+        if isinstance(values, pd.DataFrame):
+            values = values.set_index(keys)['current']
+        elif isinstance(values, dict):
+            values = pd.Series(values, dtype=float)
+        index = pd.MultiIndex.from_frame(frame[keys]) if len(keys) > 1 else pd.Index(frame[keys[0]])
+        return values.reindex(index).fillna(default).to_numpy(dtype=float)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+万宁SLA优化系统 - 补货与配送联合规划
+一次 OR-Tools 求解同时决定各门店送多少、由哪辆车按什么顺序送
+
+每个门店在 [最低量, 上限] 之间按批量展开为若干候选送货量节点，同店节点放进同一个
+析取约束(disjunction, 最多选一个)：选中哪个节点即决定送多少，少送部分按件计入节点的
+出弧成本，整店不送则付放弃惩罚。车辆容量不够时求解器自行取舍送货量与路径，
+不必在库存与路径模块间反复调用。
+
+创建时间: 2026-10-19
+作者: Team ESGenius
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    from ortools.constraint_solver import routing_enums_pb2
+    from ortools.constraint_solver import pywrapcp
+    ORTOOLS_AVAILABLE = True
+except (ImportError, OSError) as e:
+    ORTOOLS_AVAILABLE = False
+    logger.warning(f"OR-Tools not available: {str(e)}. Joint replenishment planning disabled.")
+
+DEMAND_COLUMNS = ['store_id', 'min_qty', 'target_qty', 'max_qty']
+
+
+class JointReplenishmentPlanner:
+    """补货量与配送路径联合规划器"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = {**self._get_default_config(), **(config or {})}
+        self.last_stats: Dict[str, Any] = {}
+
+    def _get_default_config(self) -> Dict[str, Any]:
+        """获取默认配置"""
+        return {
+            'num_vehicles': 5,
+            'vehicle_capacity': 100,
+            'chunk_size': 10,  # 候选送货量的步长（件）
+            'distance_scale': 100,  # 公里 → 整数成本
+            'min_qty_penalty': 10_000_000,  # 放弃最低补货量的惩罚（近似硬约束）
+            'target_unit_penalty': 500,  # 少送建议量部分，每件惩罚
+            'upside_unit_penalty': 20,  # 少送上浮部分，每件惩罚
+            'service_time': 15,  # 每店服务时间（分钟）
+            'max_route_time': 8 * 60,  # 路径最长时长（分钟）
+            'time_limit_seconds': 10,
+            'first_solution_strategy': 'PATH_CHEAPEST_ARC',
+            'local_search_metaheuristic': 'GUIDED_LOCAL_SEARCH',
+        }
+
+    # ==================== 节点构建 ====================
+
+    def build_nodes(self, demand: pd.DataFrame) -> pd.DataFrame:
+        """
+        门店需求向量 → 候选送货量节点表（向量化展开）
+
+        候选量为 最低量 + k×步长，另加建议量与上限；最低量为0时不含“送0件”（即不送）。
+
+        Returns:
+            DataFrame[node, store_pos, store_id, quantity, shortfall_cost]，node 从 1 开始（0 为配送中心）
+        """
+        demand = demand[DEMAND_COLUMNS].reset_index(drop=True)
+        min_qty = np.floor(demand['min_qty'].to_numpy(dtype=float) + 1e-9)
+        target_qty = np.maximum(min_qty, np.floor(demand['target_qty'].to_numpy(dtype=float) + 1e-9))
+        max_qty = np.maximum(target_qty, np.floor(demand['max_qty'].to_numpy(dtype=float) + 1e-9))
+
+        chunk = max(1, int(self.config['chunk_size']))
+        counts = np.ceil((max_qty - min_qty) / chunk).astype(int)
+        steps = np.repeat(np.arange(len(demand)), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        stores = np.arange(len(demand))
+        nodes = pd.DataFrame({
+            'store_pos': np.concatenate([steps, stores, stores]),
+            'quantity': np.concatenate([min_qty[steps] + within * chunk, target_qty, max_qty]),
+        })
+        nodes = nodes[nodes['quantity'] > 0].drop_duplicates().sort_values(['store_pos', 'quantity'])
+        nodes = nodes.reset_index(drop=True)
+
+        position = nodes['store_pos'].to_numpy()
+        nodes['node'] = np.arange(1, len(nodes) + 1)
+        nodes['store_id'] = demand['store_id'].to_numpy()[position]
+        nodes['quantity'] = nodes['quantity'].astype(np.int64)
+        nodes['shortfall_cost'] = self._shortfall_cost(
+            nodes['quantity'].to_numpy(dtype=float), target_qty[position], max_qty[position]
+        )
+        return nodes[['node', 'store_pos', 'store_id', 'quantity', 'shortfall_cost']]
+
+    def _shortfall_cost(self, quantity: np.ndarray, target_qty: np.ndarray, max_qty: np.ndarray) -> np.ndarray:
+        """少送成本：建议量内每件 target_unit_penalty，建议量到上限之间每件 upside_unit_penalty"""
+        below_target = np.maximum(0.0, target_qty - quantity)
+        below_max = max_qty - np.maximum(quantity, target_qty)
+        return np.rint(
+            below_target * self.config['target_unit_penalty'] + below_max * self.config['upside_unit_penalty']
+        ).astype(np.int64)
+
+    # ==================== 求解 ====================
+
+    def plan(self, demand: pd.DataFrame, distance_matrix: np.ndarray,
+             time_matrix: Optional[np.ndarray] = None,
+             time_windows: Optional[Dict[Any, Tuple[int, int]]] = None) -> Dict[str, Any]:
+        """
+        一次求解补货量与配送路径
+
+        Args:
+            demand: DataFrame[store_id, min_qty, target_qty, max_qty]
+                    （SafetyStockOptimizer.delivery_demand_frame 的输出）
+            distance_matrix: (门店数+1) 方阵，单位公里，第0行为配送中心，其余与 demand 行序一致
+            time_matrix: 同形状的行驶时间（分钟），提供时启用时长/时间窗约束
+            time_windows: {store_id: (最早分钟, 最晚分钟)}
+
+        Returns:
+            status、routes、allocations（每店计划量与所在车辆）、dropped_stores、
+            total_distance_km、objective、solve_seconds
+        """
+        if not ORTOOLS_AVAILABLE:
+            raise RuntimeError("OR-Tools is required for joint replenishment planning")
+
+        start = time.time()
+        nodes = self.build_nodes(demand)
+        num_vehicles = int(self.config['num_vehicles'])
+
+        # 节点 → 位置（0 为配送中心，门店 i 为 i+1），距离矩阵按节点展开一次
+        locations = np.concatenate([[0], nodes['store_pos'].to_numpy() + 1])
+        scaled = np.rint(np.asarray(distance_matrix, dtype=float) * self.config['distance_scale']).astype(np.int64)
+        node_distance = scaled[np.ix_(locations, locations)]
+        node_cost = (node_distance + np.concatenate([[0], nodes['shortfall_cost'].to_numpy()])[:, None]).tolist()
+        node_distance = node_distance.tolist()
+        quantities = [0] + nodes['quantity'].tolist()
+
+        manager = pywrapcp.RoutingIndexManager(len(locations), num_vehicles, 0)
+        routing = pywrapcp.RoutingModel(manager)
+
+        # 弧成本 = 距离 + 出发节点的少送成本（每个被选中的候选节点恰好出发一次）
+        def cost_callback(from_index, to_index):
+            return node_cost[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+        routing.SetArcCostEvaluatorOfAllVehicles(routing.RegisterTransitCallback(cost_callback))
+
+        def demand_callback(from_index):
+            return quantities[manager.IndexToNode(from_index)]
+
+        routing.AddDimensionWithVehicleCapacity(
+            routing.RegisterUnaryTransitCallback(demand_callback),
+            0,
+            [int(self.config['vehicle_capacity'])] * num_vehicles,
+            True,
+            'Capacity'
+        )
+
+        if time_matrix is not None:
+            self._add_time_dimension(routing, manager, nodes, locations, time_matrix, time_windows or {})
+
+        self._add_quantity_choices(routing, manager, nodes, demand)
+
+        solution = routing.SolveWithParameters(self._search_parameters())
+        if solution is None:
+            logger.warning("联合规划未找到可行解")
+            return {'status': 'no_solution', 'routes': [], 'allocations': [], 'dropped_stores': [],
+                    'total_distance_km': 0.0, 'objective': None, 'solve_seconds': time.time() - start}
+
+        result = self._parse_solution(routing, manager, solution, nodes, demand, node_distance, num_vehicles)
+        result['solve_seconds'] = time.time() - start
+        self.last_stats = {
+            'num_stores': len(demand),
+            'num_nodes': len(nodes),
+            'solve_seconds': result['solve_seconds'],
+            'objective': result['objective'],
+        }
+        logger.info(f"联合规划完成: {len(demand)} 店 / {len(nodes)} 节点, 用时 {result['solve_seconds']:.2f}s")
+        return result
+
+    def _add_time_dimension(self, routing, manager, nodes: pd.DataFrame, locations: np.ndarray,
+                            time_matrix: np.ndarray, time_windows: Dict[Any, Tuple[int, int]]) -> None:
+        """行驶时间 + 门店服务时间；同店候选节点共用该店时间窗"""
+        service = np.where(locations > 0, int(self.config['service_time']), 0)
+        travel = np.rint(np.asarray(time_matrix, dtype=float)).astype(np.int64)[np.ix_(locations, locations)]
+        node_time = (travel + service[:, None]).tolist()
+
+        def time_callback(from_index, to_index):
+            return node_time[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+        horizon = int(self.config['max_route_time'])
+        routing.AddDimension(routing.RegisterTransitCallback(time_callback), horizon, horizon, True, 'Time')
+        time_dimension = routing.GetDimensionOrDie('Time')
+
+        for node, store_id in zip(nodes['node'], nodes['store_id']):
+            window = time_windows.get(store_id)
+            if window:
+                time_dimension.CumulVar(manager.NodeToIndex(int(node))).SetRange(int(window[0]), int(window[1]))
+
+    def _add_quantity_choices(self, routing, manager, nodes: pd.DataFrame, demand: pd.DataFrame) -> None:
+        """
+        每店一个析取约束：候选节点最多选一个；一个都不选时付放弃惩罚
+        （整店少送成本，若有必须送达的最低量再加 min_qty_penalty）
+        """
+        min_qty = demand['min_qty'].to_numpy(dtype=float)
+        target_qty = np.maximum(min_qty, demand['target_qty'].to_numpy(dtype=float))
+        max_qty = np.maximum(target_qty, demand['max_qty'].to_numpy(dtype=float))
+        drop_penalty = self._shortfall_cost(np.zeros(len(demand)), np.floor(target_qty + 1e-9), np.floor(max_qty + 1e-9))
+        drop_penalty = drop_penalty + np.where(min_qty > 0, int(self.config['min_qty_penalty']), 0)
+
+        for store_pos, group in nodes.groupby('store_pos', sort=True)['node']:
+            indices = [manager.NodeToIndex(int(node)) for node in group]
+            routing.AddDisjunction(indices, int(drop_penalty[store_pos]), 1)
+
+    def _search_parameters(self):
+        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+        search_parameters.first_solution_strategy = getattr(
+            routing_enums_pb2.FirstSolutionStrategy, self.config['first_solution_strategy']
+        )
+        search_parameters.local_search_metaheuristic = getattr(
+            routing_enums_pb2.LocalSearchMetaheuristic, self.config['local_search_metaheuristic']
+        )
+        search_parameters.time_limit.FromMilliseconds(int(float(self.config['time_limit_seconds']) * 1000))
+        return search_parameters
+
+    def _parse_solution(self, routing, manager, solution, nodes: pd.DataFrame, demand: pd.DataFrame,
+                        node_distance: List[List[int]], num_vehicles: int) -> Dict[str, Any]:
+        """解析路径与每店计划量"""
+        scale = float(self.config['distance_scale'])
+        store_ids = nodes['store_id'].to_numpy()
+        quantities = nodes['quantity'].to_numpy()
+        planned = np.zeros(len(demand))
+        store_vehicle = np.full(len(demand), -1)
+        store_pos = nodes['store_pos'].to_numpy()
+        routes: List[Dict[str, Any]] = []
+        total_distance = 0
+
+        for vehicle_id in range(num_vehicles):
+            index = routing.Start(vehicle_id)
+            stops: List[Any] = []
+            load = 0
+            distance = 0
+            while not routing.IsEnd(index):
+                node = manager.IndexToNode(index)
+                if node > 0:
+                    stops.append(store_ids[node - 1])
+                    load += int(quantities[node - 1])
+                    planned[store_pos[node - 1]] = quantities[node - 1]
+                    store_vehicle[store_pos[node - 1]] = vehicle_id
+                next_index = solution.Value(routing.NextVar(index))
+                distance += node_distance[node][manager.IndexToNode(next_index)]
+                index = next_index
+            if stops:
+                routes.append({
+                    'vehicle_id': vehicle_id,
+                    'stores': stops,
+                    'load': load,
+                    'distance_km': round(distance / scale, 3),
+                })
+                total_distance += distance
+
+        allocations = [
+            {
+                'store_id': store_id,
+                'min_qty': float(min_qty),
+                'target_qty': float(target_qty),
+                'max_qty': float(max_qty),
+                'planned_qty': float(qty),
+                'vehicle_id': int(vehicle) if vehicle >= 0 else None,
+            }
+            for store_id, min_qty, target_qty, max_qty, qty, vehicle in zip(
+                demand['store_id'], demand['min_qty'], demand['target_qty'], demand['max_qty'],
+                planned, store_vehicle
+            )
+        ]
+
+        return {
+            'status': 'success',
+            'routes': routes,
+            'allocations': allocations,
+            'dropped_stores': [item['store_id'] for item in allocations if item['planned_qty'] < item['min_qty']],
+            'total_planned_qty': float(planned.sum()),
+            'total_distance_km': round(total_distance / scale, 3),
+            'objective': solution.ObjectiveValue(),
+        }
+
+
+# ==================== 工厂函数 ====================
+
+def create_joint_planner(config: Dict[str, Any] = None) -> JointReplenishmentPlanner:
+    """创建补货-配送联合规划器"""
+    return JointReplenishmentPlanner(config)
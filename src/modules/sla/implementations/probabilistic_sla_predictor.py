@@ -1,18 +1,213 @@
 """
 概率SLA预测器
+
+整张配送方案的SLA风险用蒙特卡洛批量估计：
+行程与服务时间噪声一次采样为 (样本数 × 停靠点数) 矩阵，
+沿每条路线用累积和传播到达时间，所有停靠点的超时概率一次得出。
 """
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Union
 import numpy as np
-from ...interfaces import ISLAPredictor
+from ..interfaces import ISLAPredictor
 from src.core.interfaces import RoutePlan
 
+
+@dataclass
+class PlanArrays:
+    """
+    配送方案的扁平数组表示（按路线依次拼接所有停靠点）
+    
+    时间单位均为分钟，以方案开始时刻为 0。
+    """
+    stop_ids: List[Any]
+    route_starts: np.ndarray        # 每条路线第一个停靠点的位置 (R,)
+    leg_minutes: np.ndarray         # 上一站（或出发点）到本站的名义行程时间 (N,)
+    service_minutes: np.ndarray     # 本站名义服务时间 (N,)
+    deadline_minutes: np.ndarray    # 本站SLA截止时间 (N,)
+    departure_minutes: np.ndarray   # 每条路线的出发时间 (R,)
+    route_ids: Optional[List[Any]] = None
+    
+    @property
+    def n_stops(self) -> int:
+        return len(self.leg_minutes)
+    
+    @property
+    def route_index(self) -> np.ndarray:
+        """每个停靠点所属路线的序号 (N,)"""
+        lengths = np.diff(np.append(self.route_starts, self.n_stops))
+        return np.repeat(np.arange(len(self.route_starts)), lengths)
+
+
+@dataclass
+class PlanSLARisk:
+    """方案级SLA风险估计结果"""
+    stop_ids: List[Any]
+    route_index: np.ndarray
+    breach_probability: np.ndarray      # 各停靠点超时概率 (N,)
+    expected_ready_minutes: np.ndarray  # 各停靠点完成时间均值 (N,)
+    p90_ready_minutes: np.ndarray       # 各停靠点完成时间P90 (N,)
+    route_breach_probability: np.ndarray  # 各路线至少一站超时的概率 (R,)
+    plan_breach_probability: float      # 方案至少一站超时的概率
+    expected_breaches: float            # 期望超时站数
+    n_samples: int
+    
+    def to_records(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                'stop_id': stop_id,
+                'route_index': int(route),
+                'breach_probability': float(prob),
+                'sla_probability': float(1.0 - prob),
+                'expected_ready_minutes': float(mean),
+                'p90_ready_minutes': float(p90),
+            }
+            for stop_id, route, prob, mean, p90 in zip(
+                self.stop_ids, self.route_index, self.breach_probability,
+                self.expected_ready_minutes, self.p90_ready_minutes
+            )
+        ]
+
+
+def build_plan_arrays(routes: Sequence[Sequence[int]], time_matrix: np.ndarray,
+                      deadline_minutes: Union[float, Sequence[float], Dict[int, float]],
+                      service_minutes: Union[float, Sequence[float], Dict[int, float]] = 0.0,
+                      depot: int = 0, departure_minutes: Union[float, Sequence[float]] = 0.0) -> PlanArrays:
+    """
+    由优化器输出（路线节点序列 + 时间矩阵）构建方案数组
+    
+    Args:
+        routes: 每条路线的节点序号（不含仓库），如 OptimizationResult.routes
+        time_matrix: 优化器的时间矩阵（分钟）
+        deadline_minutes / service_minutes: 标量、与停靠点等长的序列或 {节点: 值}
+    """
+    routes = [list(route) for route in routes if len(route) > 0]
+    nodes = np.array([node for route in routes for node in route], dtype=int)
+    lengths = np.array([len(route) for route in routes], dtype=int)
+    route_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(int) if len(routes) else np.zeros(0, dtype=int)
+    
+    previous = np.empty_like(nodes)
+    if len(nodes):
+        previous[1:] = nodes[:-1]
+        previous[route_starts] = depot
+    time_matrix = np.asarray(time_matrix, dtype=float)
+    
+    def per_stop(values) -> np.ndarray:
+        if isinstance(values, dict):
+            return np.array([values[node] for node in nodes], dtype=float)
+        return np.broadcast_to(np.asarray(values, dtype=float), nodes.shape).copy()
+    
+    return PlanArrays(
+        stop_ids=nodes.tolist(),
+        route_starts=route_starts,
+        leg_minutes=time_matrix[previous, nodes] if len(nodes) else np.zeros(0),
+        service_minutes=per_stop(service_minutes),
+        deadline_minutes=per_stop(deadline_minutes),
+        departure_minutes=np.broadcast_to(np.asarray(departure_minutes, dtype=float), route_starts.shape).copy(),
+    )
+
+
+def plan_arrays_from_route_plans(route_plans: Sequence[RoutePlan], promised_times: Dict[str, str],
+                                 speed_kmh: float = 25.0) -> PlanArrays:
+    """
+    由 RoutePlan 列表构建方案数组（时间为 "HH:MM"）
+    
+    路线出发时间按第一段距离与平均车速倒推。
+    """
+    def minutes(value: str) -> float:
+        hours, mins = value.split(':')[:2]
+        return int(hours) * 60 + int(mins)
+    
+    stop_ids, route_starts, legs, services, deadlines, departures = [], [], [], [], [], []
+    for plan in route_plans:
+        if not plan.store_sequence:
+            continue
+        arrivals = [minutes(t) for t in plan.arrival_times]
+        leaves = [minutes(t) for t in plan.departure_times]
+        first_leg = plan.distances_km[0] / speed_kmh * 60 if plan.distances_km else 0.0
+        route_starts.append(len(stop_ids))
+        departures.append(arrivals[0] - first_leg)
+        legs.extend([first_leg] + [arrivals[i] - leaves[i - 1] for i in range(1, len(arrivals))])
+        services.extend(leave - arrive for arrive, leave in zip(arrivals, leaves))
+        deadlines.extend(minutes(promised_times[store]) for store in plan.store_sequence)
+        stop_ids.extend(plan.store_sequence)
+    
+    return PlanArrays(
+        stop_ids=stop_ids,
+        route_starts=np.array(route_starts, dtype=int),
+        leg_minutes=np.array(legs, dtype=float),
+        service_minutes=np.array(services, dtype=float),
+        deadline_minutes=np.array(deadlines, dtype=float),
+        departure_minutes=np.array(departures, dtype=float),
+        route_ids=[plan.route_id for plan in route_plans if plan.store_sequence],
+    )
+
+
 class ProbabilisticSLAPredictor(ISLAPredictor):
     """概率SLA预测器"""
     
-    def __init__(self, confidence_level: float = 0.95, include_weather_impact: bool = True):
+    def __init__(self, confidence_level: float = 0.95, include_weather_impact: bool = True,
+                 travel_cv: float = 0.15, service_cv: float = 0.25, n_samples: int = 2000,
+                 seed: Optional[int] = None):
         self.confidence_level = confidence_level
         self.include_weather_impact = include_weather_impact
+        self.travel_cv = travel_cv
+        self.service_cv = service_cv
+        self.n_samples = n_samples
+        self.seed = seed
+    
+    def estimate_plan_breach(self, plan: PlanArrays, n_samples: Optional[int] = None,
+                             rng: Optional[np.random.Generator] = None,
+                             weather_delay_factor: float = 1.0) -> PlanSLARisk:
+        """
+        蒙特卡洛估计整张方案每个停靠点的SLA超时概率
+        
+        完成时间 = 出发时间 + 累积行程 + 之前各站服务 + 本站服务，超过截止时间即超时。
+        
+        Args:
+            rng: 与优化器/场景生成共用的随机数生成器；为空时按 seed 创建
+            weather_delay_factor: 行程时间整体放大系数（include_weather_impact 时生效）
+        """
+        n_samples = n_samples or self.n_samples
+        rng = rng if rng is not None else np.random.default_rng(self.seed)
+        n_routes = len(plan.route_starts)
+        if plan.n_stops == 0:
+            return PlanSLARisk([], np.zeros(0, dtype=int), np.zeros(0), np.zeros(0), np.zeros(0),
+                               np.zeros(n_routes), 0.0, 0.0, n_samples)
+        
+        # 均值为1的对数正态行程噪声、Gamma服务时间噪声：(S × N)
+        travel_sigma = np.sqrt(np.log1p(self.travel_cv ** 2))
+        travel = plan.leg_minutes * rng.lognormal(-travel_sigma ** 2 / 2, travel_sigma, (n_samples, plan.n_stops))
+        if self.include_weather_impact:
+            travel *= weather_delay_factor
+        if self.service_cv > 0:
+            shape = 1.0 / self.service_cv ** 2
+            service = plan.service_minutes * rng.gamma(shape, 1.0 / shape, (n_samples, plan.n_stops))
+        else:
+            # 变异系数为0：服务时间取确定值
+            service = np.broadcast_to(plan.service_minutes, (n_samples, plan.n_stops))
+        
+        # 全局累积和减去各路线起点之前的部分，得到路线内累积
+        elapsed = np.cumsum(travel + service, axis=1)
+        route_index = plan.route_index
+        offsets = np.zeros((n_samples, n_routes))
+        offsets[:, 1:] = elapsed[:, plan.route_starts[1:] - 1]
+        ready = elapsed - offsets[:, route_index] + plan.departure_minutes[route_index]
+        
+        breached = ready > plan.deadline_minutes
+        route_breached = np.logical_or.reduceat(breached, plan.route_starts, axis=1)
+        
+        return PlanSLARisk(
+            stop_ids=list(plan.stop_ids),
+            route_index=route_index,
+            breach_probability=breached.mean(axis=0),
+            expected_ready_minutes=ready.mean(axis=0),
+            p90_ready_minutes=np.percentile(ready, 90, axis=0),
+            route_breach_probability=route_breached.mean(axis=0),
+            plan_breach_probability=float(breached.any(axis=1).mean()),
+            expected_breaches=float(breached.sum(axis=1).mean()),
+            n_samples=n_samples,
+        )
     
     def predict_pickup_time(self, order_info: Dict[str, Any], 
                            route_plan: RoutePlan,
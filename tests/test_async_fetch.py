@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the async external fetch layer (offline, stub transport)
+"""
+
+import asyncio
+import time
+import pytest
+import httpx
+from datetime import date
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.modules.data.implementations.async_fetch import AsyncFetchClient
+from src.modules.data.implementations.fetch_cache import FetchCache
+from src.modules.data.implementations.traffic_fetcher import HKTrafficFetcher
+from src.modules.data.implementations.hko_fetcher import HKOWeatherFetcher
+from src.modules.data.implementations.hko_weather_api import HKOWeatherAPI
+from src.modules.data.implementations.holiday_fetcher import HKHolidayFetcher
+from src.core.data_schema import WeatherCondition
+
+PAYLOADS = {
+    'fnd': {'weatherForecast': [
+        {'forecastDate': '20261019', 'week': 'Monday', 'ForecastIcon': 62,
+         'forecastMaxtemp': {'value': 28}, 'forecastMintemp': {'value': 23},
+         'forecastMaxrh': {'value': 90}, 'forecastMinrh': {'value': 70}},
+        {'forecastDate': '20261020', 'week': 'Tuesday', 'ForecastIcon': 50,
+         'forecastMaxtemp': {'value': 29}, 'forecastMintemp': {'value': 24},
+         'forecastMaxrh': {'value': 85}, 'forecastMinrh': {'value': 65}},
+    ]},
+    'rhrread': {'temperature': {'data': [{'place': 'Hong Kong Observatory', 'value': 27}]},
+                'humidity': {'data': [{'value': 80}]}, 'icon': [60], 'rainfall': {'data': [{'max': 3}]}},
+    'warnsum': {'WRAIN': {'name': 'Amber Rainstorm Warning Signal'}},
+    'tdas': {'jSpeed': 25, 'eta': 12},
+    'ical': {'vcalendar': [{'vevent': [
+        {'dtstart': ['20251225'], 'summary': 'Christmas Day'},
+        {'dtstart': ['20260101'], 'summary': 'The first day of January'},
+    ]}]},
+}
+
+class StubServer:
+    """Offline stand-in for HKO, TDAS and 1823: canned JSON after a fixed delay per request"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+
+    async def __call__(self, request):
+        self.requests.append((request.url.host, request.url.params.get('dataType')))
+        self.started.append(time.perf_counter())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if request.url.host == 'tdas-api.hkemobility.gov.hk':
+            return httpx.Response(200, json=PAYLOADS['tdas'])
+        if request.url.host == 'www.1823.gov.hk':
+            return httpx.Response(200, json=PAYLOADS['ical'])
+        return httpx.Response(200, json=PAYLOADS[request.url.params['dataType']])
+
+async def fetch_many(client, url, count):
+    return await asyncio.gather(*(client.get_json(url) for _ in range(count)))
+
+class TestAsyncFetch:
+
+    @pytest.fixture
+    def server(self):
+        return StubServer(delay=0.2)
+
+    @pytest.fixture
+    def client(self, server, tmp_path):
+        client = AsyncFetchClient(transport=httpx.MockTransport(server), cache=FetchCache(tmp_path / 'fetch'))
+        yield client
+        client.close()
+
+    def test_refresh_takes_the_slowest_call(self, client, server, tmp_path):
+        """Test traffic routes, weather and holidays overlap instead of running back to back"""
+        traffic = HKTrafficFetcher(client=client)
+        weather = HKOWeatherFetcher(client=client)
+        holidays = HKHolidayFetcher(cache_dir=str(tmp_path), client=client)
+
+        async def refresh():
+            return await asyncio.gather(traffic.fetch_current_traffic_async(),
+                                        weather.fetch_forecast_and_current_async(days=9),
+                                        holidays.fetch_holidays_async([2025, 2026]))
+
+        started = time.perf_counter()
+        routes, (forecast, current), by_year = client.run(refresh())
+        elapsed = time.perf_counter() - started
+
+        assert len(server.requests) == len(traffic.major_routes) + 3
+        assert server.max_in_flight == len(server.requests)
+        assert elapsed < 2 * server.delay
+
+        assert [r.road_segment for r in routes] == [r['name'] for r in traffic.major_routes]
+        assert (routes[0].congestion_level, routes[0].travel_time_factor) == (4, 2.0)
+        assert [(f.date, f.weather_condition) for f in forecast] == [
+            (date(2026, 10, 19), WeatherCondition.RAINY), (date(2026, 10, 20), WeatherCondition.SUNNY)]
+        assert (current.temperature_high, current.humidity, current.rainfall) == (27.0, 80.0, 3.0)
+        assert [h.name for h in by_year[2025]] == ['Christmas Day']
+        assert [h.name for h in by_year[2026]] == ['The first day of January']
+
+    def test_sync_entry_points_share_one_request(self, client, server, tmp_path):
+        """Test sync wrappers: one calendar request for a multi-year range, forecast + warnings together"""
+        holidays = HKHolidayFetcher(cache_dir=str(tmp_path), client=client)
+        assert [h.date for h in holidays.fetch_data(date(2025, 12, 1), date(2026, 1, 31))] == [
+            date(2025, 12, 25), date(2026, 1, 1)]
+        assert holidays.fetch_holidays(2026)[0].name == 'The first day of January'
+        assert len(server.requests) == 1
+
+        server.requests.clear()
+        started = time.perf_counter()
+        schema = HKOWeatherAPI(client=client).get_weather_for_forecast(date(2026, 10, 19))
+        assert time.perf_counter() - started < 2 * server.delay
+        assert sorted(data_type for _, data_type in server.requests) == ['fnd', 'warnsum']
+        assert schema.has_rainstorm_warning and not schema.has_typhoon_signal
+
+    def test_concurrency_rate_limit_and_timeout(self, server):
+        """Test the global in-flight cap, per-host token bucket and per-request deadline"""
+        url = 'https://data.weather.gov.hk/weatherAPI/opendata/weather.php?dataType=fnd&lang=en'
+
+        capped = AsyncFetchClient(max_concurrency=2, host_rates={}, transport=httpx.MockTransport(server))
+        try:
+            capped.run(fetch_many(capped, url, 6))
+        finally:
+            capped.close()
+        assert server.max_in_flight == 2
+
+        server.delay, server.started = 0.0, []
+        limited = AsyncFetchClient(host_rates={'data.weather.gov.hk': (20.0, 2)},
+                                   transport=httpx.MockTransport(server))
+        try:
+            limited.run(fetch_many(limited, url, 6))
+        finally:
+            limited.close()
+        # burst of 2, then one request every 1/20 s
+        assert server.started[-1] - server.started[0] >= 4 / 20 * 0.9
+
+        server.delay = 1.0
+        slow = AsyncFetchClient(timeout=0.1, transport=httpx.MockTransport(server))
+        try:
+            with pytest.raises(httpx.TimeoutException):
+                slow.run(slow.get_json(url))
+            assert HKOWeatherFetcher(timeout=0.1, client=slow).fetch_weather_forecast(days=9) == []
+        finally:
+            slow.close()
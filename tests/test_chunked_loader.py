@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for chunked DFI loaders
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import date
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.modules.data.implementations.chunked_loader import aggregate_daily_demand, iter_csv_chunks
+from src.modules.data.implementations.dfi_data_loader import DFIDataLoader
+
+class TestChunkedLoader:
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        """2,000 synthetic orders over 20 days and 12 stores"""
+        rng = np.random.default_rng(2)
+        n = 2000
+        pd.DataFrame({
+            'dt': (pd.Timestamp('2025-03-01') + pd.to_timedelta(rng.integers(0, 20, n), 'D')).strftime('%Y-%m-%d'),
+            'order_id': [f'O{i}' for i in range(n)],
+            'user_id': [f'U{i % 97}' for i in range(n)],
+            'fulfillment_store_code': rng.integers(1, 13, n),
+            'unique_sku_cnt': rng.integers(1, 5, n),
+            'total_quantity_cnt': rng.integers(1, 9, n),
+        }).to_csv(tmp_path / 'case_study_order_detail-000000000000.csv', index=False)
+        pd.DataFrame({
+            'order_id': [f'O{i}' for i in range(n)],
+            'order_create_time': (pd.Timestamp('2025-03-01 09:00') + pd.to_timedelta(np.arange(n), 'min')).strftime('%Y-%m-%d %H:%M:%S'),
+        }).to_csv(tmp_path / 'fufillment_detail-000000000000.csv', index=False)
+        return tmp_path
+
+    def test_chunk_filters_push_down(self, data_dir):
+        """Test date range and store subset are applied inside every chunk"""
+        source = data_dir / 'case_study_order_detail-000000000000.csv'
+        chunks = list(iter_csv_chunks(source, columns=['total_quantity_cnt'], chunksize=300,
+                                      start_date=date(2025, 3, 5), end_date=date(2025, 3, 9), store_codes=[2, 3]))
+        frame = pd.concat(chunks)
+        full = pd.read_csv(source)
+        expected = full[full['dt'].between('2025-03-05', '2025-03-09') & full['fulfillment_store_code'].isin([2, 3])]
+
+        assert all(len(chunk) <= 300 for chunk in chunks)
+        assert set(frame.columns) == {'dt', 'fulfillment_store_code', 'total_quantity_cnt'}
+        assert len(frame) == len(expected)
+        assert frame['total_quantity_cnt'].sum() == expected['total_quantity_cnt'].sum()
+
+    def test_streaming_summary_matches_in_memory(self, data_dir):
+        """Test chunked daily aggregation equals the whole-frame groupby"""
+        in_memory = DFIDataLoader(str(data_dir), use_columnar_cache=False)
+        streaming = DFIDataLoader(str(data_dir), stream_threshold_mb=0, stream_chunksize=250)
+
+        pd.testing.assert_frame_equal(
+            streaming.get_daily_order_summary().reset_index(drop=True),
+            in_memory.get_daily_order_summary().reset_index(drop=True),
+            check_dtype=False,
+        )
+        assert streaming.load_orders(date(2025, 3, 2), date(2025, 3, 4), [7]) == in_memory.load_orders(date(2025, 3, 2), date(2025, 3, 4), [7])
+        assert streaming.load_fulfillment(['O5', 'O1999']) == in_memory.load_fulfillment(['O5', 'O1999'])
+        assert 'orders' not in streaming._cache
+
+    def test_aggregate_by_sku(self):
+        """Test store x sku daily cube accumulates across chunks"""
+        chunk = pd.DataFrame({
+            'dt': ['2025-03-01', '2025-03-01', '2025-03-02'],
+            'fulfillment_store_code': [1, 1, 1],
+            'sku_id': ['A', 'B', 'A'],
+            'total_quantity_cnt': [2.0, 3.0, 4.0],
+            'unique_sku_cnt': [1, 1, 1],
+        })
+        cube = aggregate_daily_demand([chunk, chunk], sku_column='sku_id', compact_every=1)
+
+        assert cube[['dt', 'sku_id', 'order_count', 'total_quantity']].values.tolist() == [
+            ['2025-03-01', 'A', 2, 4.0], ['2025-03-01', 'B', 2, 6.0], ['2025-03-02', 'A', 2, 8.0]
+        ]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for DFI columnar cache
+"""
+
+import os
+import pytest
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.modules.data.implementations.columnar_cache import ColumnarCache, ColumnSpec
+from src.modules.data.implementations.dfi_data_loader import DFIDataLoader
+
+class TestColumnarCache:
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        """Small DFI order and fulfillment CSVs"""
+        pd.DataFrame({
+            'dt': ['2025-01-01', '2025-01-01', '2025-01-02'],
+            'order_id': ['O1', 'O2', 'O3'],
+            'user_id': [1, 2, 3],
+            'fulfillment_store_code': [417, 331, 417],
+            'unique_sku_cnt': [1, 2, 3],
+            'total_quantity_cnt': [2, 4, 6],
+        }).to_csv(tmp_path / 'case_study_order_detail-000000000000.csv', index=False)
+        pd.DataFrame({
+            'order_id': ['O1', 'O2', 'O3'],
+            'order_create_time': ['2025-01-01 09:00:00', '2025-01-01 10:00:00', '2025/01/02 11:00'],
+            'ready_for_pickup_time': ['2025-01-01 12:00:00', '', '2025-01-02 13:30:00'],
+        }).to_csv(tmp_path / 'fufillment_detail-000000000000.csv', index=False)
+        return tmp_path
+
+    def test_typed_columns_and_projection(self, data_dir):
+        """Test cache applies explicit dtypes and loads only requested columns"""
+        loader = DFIDataLoader(str(data_dir))
+        orders = loader.load_orders_raw()
+        fulfillment = loader.load_fulfillment_raw()
+
+        assert isinstance(orders['fulfillment_store_code'].dtype, pd.CategoricalDtype)
+        assert orders['dt'].tolist() == ['2025-01-01', '2025-01-01', '2025-01-02']
+        assert pd.api.types.is_datetime64_any_dtype(fulfillment['order_create_time'])
+        assert fulfillment['order_create_time'].iloc[2] == pd.Timestamp('2025-01-02 11:00')
+        assert pd.isna(fulfillment['ready_for_pickup_time'].iloc[1])
+
+        cold = DFIDataLoader(str(data_dir))
+        projected = cold.load_orders_raw(columns=['fulfillment_store_code', 'total_quantity_cnt'])
+        assert projected.columns.tolist() == ['fulfillment_store_code', 'total_quantity_cnt']
+        assert cold.columnar_cache.stats['hits'] == 1
+        assert cold.columnar_cache.stats['rebuilds'] == 0
+
+    def test_loader_results_match_plain_csv(self, data_dir):
+        """Test cached loader answers match the uncached CSV loader"""
+        cached = DFIDataLoader(str(data_dir))
+        plain = DFIDataLoader(str(data_dir), use_columnar_cache=False)
+
+        assert sorted(cached.get_active_store_codes()) == sorted(plain.get_active_store_codes())
+        pd.testing.assert_frame_equal(
+            cached.get_daily_order_summary().astype({'store_code': int}),
+            plain.get_daily_order_summary(),
+        )
+        assert cached.get_sla_metrics_frame()['sla_breached'].tolist() == plain.get_sla_metrics_frame()['sla_breached'].tolist()
+
+    def test_invalidated_by_source_change(self, data_dir):
+        """Test a changed source mtime or size rebuilds the cache"""
+        source = data_dir / 'case_study_order_detail-000000000000.csv'
+        cache = ColumnarCache(data_dir / '.columnar_cache')
+        spec = ColumnSpec(category=['fulfillment_store_code'])
+
+        cache.load(source, spec)
+        assert cache.is_fresh(source, spec)
+
+        os.utime(source, (1, 1))
+        assert not cache.is_fresh(source, spec)
+        with open(source, 'a') as f:
+            f.write('2025-01-03,O4,4,213,1,1\n')
+        frame = cache.load(source, spec)
+
+        assert len(frame) == 4
+        assert cache.stats['rebuilds'] == 2
+        assert cache.is_fresh(source, spec)
+        assert not cache.is_fresh(source, ColumnSpec())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the materialized daily demand cube
+"""
+
+import os
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import date
+from types import SimpleNamespace
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.modules.data.implementations.dfi_data_loader import DFIDataLoader
+from src.api.services.forecasting_service import ForecastingService
+
+ORDER_FILE = 'case_study_order_detail-000000000000.csv'
+
+class TestDemandCube:
+
+    @pytest.fixture
+    def orders(self):
+        """1,500 order lines over 10 days, 6 stores and 4 SKUs"""
+        rng = np.random.default_rng(11)
+        n = 1500
+        return pd.DataFrame({
+            'dt': (pd.Timestamp('2025-02-01') + pd.to_timedelta(rng.integers(0, 10, n), 'D')).strftime('%Y-%m-%d'),
+            'order_id': [f'O{i}' for i in range(n)],
+            'user_id': rng.integers(0, 50, n),
+            'fulfillment_store_code': rng.integers(1, 7, n),
+            'sku_id': rng.choice(['A', 'B', 'C', 'D'], n),
+            'unique_sku_cnt': rng.integers(1, 5, n),
+            'total_quantity_cnt': rng.integers(1, 9, n),
+        })
+
+    @pytest.fixture
+    def data_dir(self, tmp_path, orders):
+        orders.to_csv(tmp_path / ORDER_FILE, index=False)
+        pd.DataFrame({
+            'calendar_date': [f'2025/2/{day}' for day in range(1, 11)],
+            'calendar_weekday': ['Sat', 'Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun', 'Mon'],
+            'if_public_holiday': [0] * 10,
+        }).to_csv(tmp_path / 'dim_date.csv', index=False)
+        return tmp_path
+
+    def test_rollups_match_raw_aggregation(self, data_dir, orders):
+        """Test summary, store stats and sku slices equal direct groupbys of the order lines"""
+        loader = DFIDataLoader(str(data_dir))
+        cube = loader.get_demand_cube()
+
+        assert len(cube) == len(orders.groupby(['dt', 'fulfillment_store_code', 'sku_id']))
+        assert pd.api.types.is_datetime64_any_dtype(cube['date'])
+
+        expected = orders.groupby(['dt', 'fulfillment_store_code']).agg(
+            order_count=('order_id', 'count'), total_quantity=('total_quantity_cnt', 'sum'),
+            avg_sku_per_order=('unique_sku_cnt', 'mean')).reset_index()
+        summary = loader.get_daily_order_summary()
+        assert summary['dt'].tolist() == expected['dt'].tolist()
+        assert summary['store_code'].astype(int).tolist() == expected['fulfillment_store_code'].tolist()
+        np.testing.assert_allclose(summary[['order_count', 'total_quantity', 'avg_sku_per_order']].to_numpy(float),
+                                   expected[['order_count', 'total_quantity', 'avg_sku_per_order']].to_numpy(float))
+        assert len(loader.get_daily_order_summary(store_code=3)) == (expected['fulfillment_store_code'] == 3).sum()
+
+        stats = loader.get_store_order_stats().set_index('store_code')
+        store = orders[orders['fulfillment_store_code'] == 2]
+        assert stats.loc[2, 'total_orders'] == len(store)
+        assert stats.loc[2, 'avg_quantity_per_order'] == pytest.approx(store['total_quantity_cnt'].mean())
+        assert (stats.loc[2, 'first_order_date'], stats.loc[2, 'last_order_date']) == (store['dt'].min(), store['dt'].max())
+
+        sliced = loader.get_daily_demand_frame(date(2025, 2, 3), date(2025, 2, 4), store_codes=[1])
+        lines = orders[orders['dt'].between('2025-02-03', '2025-02-04') & (orders['fulfillment_store_code'] == 1)]
+        assert sliced['order_count'].sum() == len(lines)
+        assert set(sliced['sku_id']) == set(lines['sku_id'])
+
+    def test_built_once_per_source_version(self, data_dir, orders):
+        """Test a new process reads the persisted cube and a changed export rebuilds it"""
+        DFIDataLoader(str(data_dir)).get_demand_cube()
+
+        warm = DFIDataLoader(str(data_dir))
+        warm.get_daily_order_summary()
+        warm.get_store_order_stats()
+        assert warm.columnar_cache.stats == {**warm.columnar_cache.stats, 'hits': 1, 'rebuilds': 0}
+        assert 'orders' not in warm._cache
+
+        source = data_dir / ORDER_FILE
+        for day in ('2025-02-20', '2025-02-21'):
+            orders.iloc[:10].assign(dt=day).to_csv(source, mode='a', header=False, index=False)
+            os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 10**9))
+            assert warm.get_daily_order_summary()['dt'].iloc[-1] == day
+        assert warm.columnar_cache.stats['rebuilds'] == 4
+
+    def test_training_inputs_read_the_cube(self, data_dir):
+        """Test forecast training data and ForecastingService use the cube's parsed dates"""
+        loader = DFIDataLoader(str(data_dir), use_columnar_cache=False)
+        training = loader.prepare_forecast_training_data()
+
+        assert 'dt' not in loader.load_dates_raw().columns
+        assert training['calendar_weekday'].iloc[0] == 'Sat' and training['dt'].iloc[0] == '2025-02-01'
+
+        ForecastingService._instance = None
+        try:
+            service = ForecastingService()
+            service.data_service = SimpleNamespace(
+                get_daily_demand_frame=lambda: loader.get_daily_demand_frame(by_sku=False))
+            frame = service._get_training_frame()
+        finally:
+            ForecastingService._instance = None
+
+        assert pd.api.types.is_datetime64_any_dtype(frame['order_date'])
+        assert service._forecast_reference_date == date(2025, 2, 10)
+        assert frame['total_quantity'].sum() == loader.get_daily_order_summary()['total_quantity'].sum()
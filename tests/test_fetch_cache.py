@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the persistent external fetch cache (stale-while-revalidate)
+"""
+
+import asyncio
+import time
+import pytest
+import httpx
+from datetime import datetime
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.modules.data.implementations.async_fetch import AsyncFetchClient
+from src.modules.data.implementations.fetch_cache import CacheEntry, FetchCache, SourcePolicy
+from src.modules.data.implementations.traffic_fetcher import HKTrafficFetcher
+from src.modules.data.implementations.hko_fetcher import HKOWeatherFetcher
+
+FORECAST_URL = 'https://data.weather.gov.hk/weatherAPI/opendata/weather.php?dataType=fnd&lang=en'
+
+class Upstream:
+    """Stub upstream returning a versioned payload, optionally slow or failing"""
+
+    def __init__(self):
+        self.version = 1
+        self.delay = 0.0
+        self.status = 200
+        self.calls = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return httpx.Response(self.status)
+        return httpx.Response(200, json={'version': self.version, 'jSpeed': 20 * self.version,
+                                         'weatherForecast': []})
+
+class TestFetchCache:
+
+    @pytest.fixture
+    def upstream(self):
+        return Upstream()
+
+    @pytest.fixture
+    def make_client(self, upstream, tmp_path):
+        clients = []
+
+        def make(**policies):
+            client = AsyncFetchClient(host_rates={}, transport=httpx.MockTransport(upstream),
+                                      cache=FetchCache(tmp_path / 'fetch', policies))
+            clients.append(client)
+            return client
+
+        yield make
+        for client in clients:
+            client.close()
+
+    @staticmethod
+    def age_entry(client, seconds):
+        """Backdate the cached forecast entry on disk and in memory"""
+        key = client.cache.key('hko_forecast', 'GET', FORECAST_URL)
+        entry = client.cache.get(key)
+        client.cache.put(key, CacheEntry(entry.payload, entry.fetched_at - seconds))
+
+    def test_restart_reads_disk_instead_of_refetching(self, make_client, upstream, tmp_path):
+        """Test a new process serves fresh entries from disk without calling upstream"""
+        first = make_client()
+        assert first.run(first.cached_json('hko_forecast', FORECAST_URL)).payload['version'] == 1
+        assert first.run(first.cached_json('hko_forecast', FORECAST_URL)).payload['version'] == 1
+        assert upstream.calls == 1 and first.cache.stats['hits'] == 1
+        assert len(list((tmp_path / 'fetch').glob('hko_forecast-*.json'))) == 1
+
+        upstream.status = 503
+        restarted = make_client()
+        assert restarted.run(restarted.cached_json('hko_forecast', FORECAST_URL)).payload['version'] == 1
+        assert upstream.calls == 1
+
+    def test_stale_value_served_while_refreshing(self, make_client, upstream):
+        """Test stale entries return immediately and concurrent callers share one background refresh"""
+        client = make_client(hko_forecast=SourcePolicy(ttl=60, stale_ttl=600))
+        client.run(client.cached_json('hko_forecast', FORECAST_URL))
+        self.age_entry(client, 120)
+        upstream.version, upstream.delay = 2, 0.5
+
+        async def readers():
+            return await asyncio.gather(*(client.cached_json('hko_forecast', FORECAST_URL) for _ in range(5)))
+
+        started = time.perf_counter()
+        entries = client.run(readers())
+        assert time.perf_counter() - started < upstream.delay / 2
+        assert [entry.payload['version'] for entry in entries] == [1] * 5
+
+        time.sleep(upstream.delay * 1.5)
+        assert upstream.calls == 2
+        assert client.run(client.cached_json('hko_forecast', FORECAST_URL)).payload['version'] == 2
+        assert client.cache.stats == {**client.cache.stats, 'stale': 5, 'refreshes': 2}
+
+    def test_expired_entries_and_upstream_errors(self, make_client, upstream):
+        """Test expired entries wait for upstream, and a failing upstream falls back to any old value"""
+        client = make_client(hko_forecast=SourcePolicy(ttl=60, stale_ttl=60))
+        client.run(client.cached_json('hko_forecast', FORECAST_URL))
+        self.age_entry(client, 300)
+
+        upstream.version = 2
+        assert client.run(client.cached_json('hko_forecast', FORECAST_URL)).payload['version'] == 2
+
+        self.age_entry(client, 300)
+        upstream.status = 503
+        assert client.run(client.cached_json('hko_forecast', FORECAST_URL)).payload['version'] == 2
+        assert client.cache.stats['errors'] == 1
+
+        client.cache.invalidate('hko_forecast')
+        with pytest.raises(httpx.HTTPStatusError):
+            client.run(client.cached_json('hko_forecast', FORECAST_URL))
+        assert HKOWeatherFetcher(client=client).fetch_weather_forecast() == []
+
+    def test_traffic_uses_cache_per_route(self, make_client, upstream):
+        """Test each TDAS route is cached under its own key and stamped with its fetch time"""
+        client = make_client()
+        fetcher = HKTrafficFetcher(client=client)
+        routes = fetcher.fetch_current_traffic()
+        assert upstream.calls == len(fetcher.major_routes)
+
+        upstream.version = 2
+        again = fetcher.fetch_current_traffic()
+        assert upstream.calls == len(fetcher.major_routes)
+        assert [r.speed_kmh for r in again] == [20.0] * len(fetcher.major_routes)
+        assert [r.timestamp for r in again] == [r.timestamp for r in routes]
+        assert all(r.timestamp <= datetime.now() for r in again)
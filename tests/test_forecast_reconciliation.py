@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for hierarchical forecast reconciliation
+"""
+
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add src to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from modules.forecasting.reconciliation import ForecastHierarchy, HierarchicalReconciler, RECONCILIATION_METHODS
+
+class TestHierarchicalReconciler:
+
+    @pytest.fixture
+    def hierarchy(self):
+        """Create a small store -> district -> region hierarchy"""
+        return ForecastHierarchy.from_store_districts({
+            '417': 'Wong Tai Sin',
+            '331': 'Sha Tin',
+            '332': 'Sha Tin',
+            '213': 'Central & Western',
+            '999': '',
+        })
+
+    @pytest.fixture
+    def store_forecasts(self):
+        return np.random.default_rng(3).uniform(10, 50, size=(5, 4))
+
+    def test_summing_matrix_structure(self, hierarchy):
+        """Test summing matrix rows map every level onto stores"""
+        S = hierarchy.summing_matrix
+        assert S.shape == (hierarchy.n_nodes, 5)
+        assert S.nnz == 4 * 5
+        assert hierarchy.node_ids[0] == 'total'
+        assert hierarchy.node_levels.count('region') == 4  # 3 regions + Unknown
+        assert hierarchy.node_ids[-5:] == ['417', '331', '332', '213', '999']
+
+        sha_tin = hierarchy.node_ids.index('Sha Tin')
+        assert S[sha_tin].toarray().ravel().tolist() == [0, 1, 1, 0, 0]
+
+    def test_bottom_up_aggregation(self, hierarchy, store_forecasts):
+        """Test bottom-up reconciliation sums store forecasts per node"""
+        reconciled = HierarchicalReconciler(hierarchy).reconcile(store_forecasts)
+
+        assert reconciled.shape == (hierarchy.n_nodes, 4)
+        np.testing.assert_allclose(reconciled[0], store_forecasts.sum(axis=0))
+        np.testing.assert_allclose(reconciled[-5:], store_forecasts)
+        kowloon = hierarchy.node_ids.index('Kowloon')
+        np.testing.assert_allclose(reconciled[kowloon], store_forecasts[0])
+
+    @pytest.mark.parametrize('method', RECONCILIATION_METHODS[1:])
+    def test_projection_methods_are_coherent(self, hierarchy, store_forecasts, method):
+        """Test OLS/WLS/MinT reconcile incoherent base forecasts into coherent ones"""
+        rng = np.random.default_rng(11)
+        base = hierarchy.summing_matrix @ store_forecasts + rng.normal(0, 2, size=(hierarchy.n_nodes, 4))
+        residuals = rng.normal(0, 1, size=(hierarchy.n_nodes, 60))
+
+        reconciled = HierarchicalReconciler(hierarchy, method).reconcile(base, residuals=residuals)
+
+        np.testing.assert_allclose(hierarchy.summing_matrix @ reconciled[-5:], reconciled, atol=1e-8)
+
+    def test_coherent_forecasts_unchanged(self, hierarchy, store_forecasts):
+        """Test reconciliation is a projection: coherent input is returned as-is"""
+        coherent = hierarchy.summing_matrix @ store_forecasts
+        reconciled = HierarchicalReconciler(hierarchy, 'ols').reconcile(coherent)
+        np.testing.assert_allclose(reconciled, coherent, atol=1e-8)
+
+    def test_mint_requires_residuals(self, hierarchy):
+        """Test MinT methods validate residual input"""
+        reconciler = HierarchicalReconciler(hierarchy, 'mint_diag')
+        with pytest.raises(ValueError, match="残差"):
+            reconciler.reconcile(np.ones((hierarchy.n_nodes, 2)))
+
+    def test_invalid_method(self, hierarchy):
+        """Test unknown method is rejected"""
+        with pytest.raises(ValueError, match="不支持的协调方法"):
+            HierarchicalReconciler(hierarchy, 'top_down')
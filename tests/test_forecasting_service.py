@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for ForecastingService
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import date, timedelta
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.api.services.forecast_cache import ForecastResultCache
+from src.api.services.forecasting_service import ForecastingService, SKU_PROFILES, create_demand_forecaster
+from src.modules.forecasting.global_forecaster import GlobalDemandForecaster
+from src.modules.forecasting.prophet_forecaster import ProphetForecaster
+
+class TestForecastingService:
+
+    @pytest.fixture
+    def training_frame(self):
+        """Create daily store training data"""
+        dates = pd.date_range(start='2025-10-01', end='2025-12-31', freq='D')
+        stores = ['417', '331', '213']
+        return pd.DataFrame({
+            'order_date': np.tile(dates, len(stores)),
+            'fulfillment_store_code': np.repeat(stores, len(dates)),
+            'total_quantity': np.random.default_rng(7).poisson(50, len(dates) * len(stores)).astype(float),
+        })
+
+    @pytest.fixture
+    def service(self, training_frame):
+        """Create service with preloaded training data and no trained store models"""
+        ForecastingService._instance = None
+        service = ForecastingService()
+        service._training_frame = training_frame
+        service._forecast_reference_date = date(2025, 12, 31)
+        service._store_name_cache = {'417': 'Mannings 417'}
+        service._store_district_cache = {'417': 'Wong Tai Sin', '331': 'Sha Tin', '213': 'Tai Po'}
+        service.forecaster.is_trained = True
+        service.sla_predictor.is_trained = True
+        yield service
+        ForecastingService._instance = None
+
+    def test_factor_tables_built_once(self, service):
+        """Test factor tables are built at model load and reused"""
+        service._ensure_models()
+        tables = service._factor_tables
+        assert tables is not None
+        assert set(tables['baseline'].index) == {'417', '331', '213'}
+        assert set(tables['weekday']['weekday']) == set(range(7))
+
+        service.get_demand_forecasts(date(2025, 12, 1), date(2025, 12, 7))
+        assert service._factor_tables is tables
+
+    def test_demand_forecast_grid(self, service):
+        """Test store x date x sku grid shape, order and bounds"""
+        rows = service.get_demand_forecasts(date(2025, 12, 24), date(2026, 1, 2), ['417', '999'])
+
+        assert len(rows) == 10 * 2 * len(SKU_PROFILES)
+        assert [row['date'] for row in rows[:2 * len(SKU_PROFILES)]] == ['2025-12-24'] * (2 * len(SKU_PROFILES))
+        assert rows[0]['store_name'] == 'Mannings 417'
+        assert rows[len(SKU_PROFILES)]['store_name'] == 'Store 999'
+
+        for row in rows:
+            assert row['lower_bound'] <= row['forecast_demand'] <= row['upper_bound']
+            if row['date'] > '2025-12-31' or row['store_id'] == '999':
+                assert row['actual_demand'] is None
+                assert row['deviation_rate'] is None
+
+        christmas = [row for row in rows if row['date'] == '2025-12-25' and row['store_id'] == '417']
+        assert any('圣诞节' in factor for factor in christmas[0]['factors'])
+
+    def test_demand_forecast_matches_actuals_scale(self, service, training_frame):
+        """Test sku weights split the daily store total"""
+        rows = service.get_demand_forecasts(date(2025, 12, 10), date(2025, 12, 10), ['417'])
+        actual = training_frame[
+            (training_frame['fulfillment_store_code'] == '417')
+            & (training_frame['order_date'] == pd.Timestamp('2025-12-10'))
+        ]['total_quantity'].iloc[0]
+
+        assert sum(row['actual_demand'] for row in rows) == pytest.approx(actual, abs=0.3)
+
+    def test_demand_forecast_is_deterministic(self, service):
+        """Test repeated requests return identical forecasts"""
+        first = service.get_demand_forecasts(date(2026, 1, 1), date(2026, 1, 7), ['331'])
+        second = service.get_demand_forecasts(date(2026, 1, 1), date(2026, 1, 7), ['331'])
+        assert first == second
+
+    def test_partial_range_served_from_cache(self, service):
+        """Test a 7-day window is sliced from a cached 14-day result"""
+        full = service.get_demand_forecasts(date(2025, 12, 1), date(2025, 12, 14), ['417'])
+        week = service.get_demand_forecasts(date(2025, 12, 3), date(2025, 12, 9), ['417'])
+
+        assert week == [row for row in full if '2025-12-03' <= row['date'] <= '2025-12-09']
+        stats = service.get_model_info()['result_cache']
+        assert stats['partial_hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_window_without_reference_date_matches_fresh_result(self, service):
+        """Test windows are not sliced when the reference date falls back to the request start"""
+        service._ensure_models()
+        service._forecast_reference_date = None
+        service.get_demand_forecasts(date(2025, 12, 1), date(2025, 12, 14), ['417'])
+        week = service.get_demand_forecasts(date(2025, 12, 3), date(2025, 12, 9), ['417'])
+
+        service._result_cache.clear()
+        assert week == service.get_demand_forecasts(date(2025, 12, 3), date(2025, 12, 9), ['417'])
+        assert service.get_model_info()['result_cache']['partial_hits'] == 0
+
+    def test_inventory_outlook_prefix_reuse(self, service):
+        """Test shorter inventory outlook reuses the longer projection"""
+        long_outlook = service.get_inventory_outlook(forecast_days=14)
+        short_outlook = service.get_inventory_outlook(forecast_days=7)
+
+        last_day = (date(2025, 12, 31) + timedelta(days=7)).isoformat()
+        assert short_outlook == [row for row in long_outlook if row['forecast_date'] <= last_day]
+
+    def test_cache_invalidated_on_model_reload(self, service, training_frame):
+        """Test model reload bumps the version and clears cached results"""
+        service.get_demand_forecasts(date(2025, 12, 1), date(2025, 12, 7), ['417'])
+        version = service.get_model_info()['model_version']
+        assert service.get_model_info()['result_cache']['entries'] > 0
+
+        service._factor_tables = None
+        service._ensure_models()
+
+        info = service.get_model_info()
+        assert info['model_version'] == version + 1
+        assert info['result_cache']['entries'] == 0
+
+    def test_hierarchy_levels_are_consistent(self, service):
+        """Test district, region and total forecasts sum from store forecasts"""
+        rows = service.get_hierarchical_forecasts(
+            date(2025, 12, 1), date(2025, 12, 3), levels=['total', 'region', 'district', 'store']
+        )
+        day = [row for row in rows if row['date'] == '2025-12-02']
+        by_level = {}
+        for row in day:
+            by_level.setdefault(row['level'], {})[row['node_id']] = row['forecast']
+
+        assert by_level['total']['total'] == pytest.approx(sum(by_level['store'].values()), abs=0.2)
+        assert by_level['total']['total'] == pytest.approx(sum(by_level['region'].values()), abs=0.2)
+        assert by_level['region']['New Territories'] == pytest.approx(
+            by_level['district']['Sha Tin'] + by_level['district']['Tai Po'], abs=0.2
+        )
+
+        demand = service.get_demand_forecasts(date(2025, 12, 2), date(2025, 12, 2), ['417'])
+        assert by_level['store']['417'] == pytest.approx(sum(row['forecast_demand'] for row in demand), abs=0.1)
+
+    def test_sla_alerts_cover_whole_network(self, service):
+        """Test alerts are ranked across every store and capped at top_k"""
+        alerts = service.get_sla_alerts(forecast_days=3, threshold=1.0, top_k=None)
+        assert {alert['affected_entity'] for alert in alerts} == {'417', '331', '213'}
+
+        top = service.get_sla_alerts(forecast_days=3, threshold=1.0, top_k=2)
+        assert len(top) == 2
+
+        summary = service.get_risk_summary(forecast_days=3)
+        assert [item['count'] for item in summary] == sorted((item['count'] for item in summary), reverse=True)
+
+
+class TestDemandForecasterFactory:
+
+    def test_global_model_types(self):
+        """Test global_* names select the shared model and its type"""
+        assert create_demand_forecaster('global_ridge').config['model_type'] == 'ridge'
+        assert isinstance(create_demand_forecaster('global'), GlobalDemandForecaster)
+        assert isinstance(create_demand_forecaster('prophet'), ProphetForecaster)
+
+    def test_unknown_global_model_falls_back_to_prophet(self):
+        """Test a misconfigured DEMAND_MODEL does not break service construction"""
+        assert isinstance(create_demand_forecaster('global_xgb'), ProphetForecaster)
+
+
+class TestForecastResultCache:
+
+    def test_lru_eviction_respects_row_budget(self):
+        """Test cache evicts least recently used entries beyond the row budget"""
+        cache = ForecastResultCache(max_entries=10, max_rows=5)
+        rows = [{'date': '2025-12-01'}, {'date': '2025-12-02'}, {'date': '2025-12-03'}]
+        cache.put(1, 'daily', ('a',), date(2025, 12, 1), date(2025, 12, 3), rows)
+        cache.put(1, 'daily', ('b',), date(2025, 12, 1), date(2025, 12, 3), rows)
+
+        assert cache.get(1, 'daily', ('a',), date(2025, 12, 1), date(2025, 12, 3)) is None
+        assert cache.get(1, 'daily', ('b',), date(2025, 12, 2), date(2025, 12, 2)) == rows[1:2]
+        assert cache.get(2, 'daily', ('b',), date(2025, 12, 1), date(2025, 12, 3)) is None
+        assert cache.get_stats()['cached_rows'] == 3
+
+    def test_cached_rows_are_copies(self):
+        """Test callers mutating returned rows or factors cannot corrupt the cache"""
+        cache = ForecastResultCache()
+        rows = [{'date': '2025-12-01', 'factors': ['周末']}, {'date': '2025-12-02', 'factors': []}]
+        cache.put(1, 'daily', ('a',), date(2025, 12, 1), date(2025, 12, 2), rows)
+        rows[0]['factors'].append('put')
+
+        for start in (date(2025, 12, 1), date(2025, 12, 2)):
+            got = cache.get(1, 'daily', ('a',), start, date(2025, 12, 2))
+            got[0]['factors'].append('get')
+            got[0]['date'] = 'changed'
+
+        assert cache.get(1, 'daily', ('a',), date(2025, 12, 1), date(2025, 12, 2)) == [
+            {'date': '2025-12-01', 'factors': ['周末']}, {'date': '2025-12-02', 'factors': []}
+        ]
+
+    def test_partial_reuse_requires_matching_window(self):
+        """Test allow_partial=False only serves the exact cached window"""
+        cache = ForecastResultCache()
+        rows = [{'date': '2025-12-01'}, {'date': '2025-12-02'}]
+        cache.put(1, 'daily', ('a',), date(2025, 12, 1), date(2025, 12, 2), rows)
+
+        assert cache.get(1, 'daily', ('a',), date(2025, 12, 2), date(2025, 12, 2), allow_partial=False) is None
+        assert cache.get(1, 'daily', ('a',), date(2025, 12, 1), date(2025, 12, 2), allow_partial=False) == rows
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for columnar fulfillment SLA metrics
+"""
+
+import pytest
+import pandas as pd
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.data_schema import (
+    FulfillmentDetailSchema, calculate_sla_metrics_frame, parse_fulfillment_frame, sla_metrics_records
+)
+from src.modules.data.implementations.dfi_data_loader import DFIDataLoader
+
+class TestFulfillmentSLAMetrics:
+
+    @pytest.fixture
+    def fulfillment_csv(self, tmp_path):
+        """Write a small fulfillment table with missing and cancelled stages"""
+        df = pd.DataFrame({
+            'order_id': ['A', 'B', 'C', 'D'],
+            'order_create_time': ['2025-10-01 09:00:00', '2025-10-01 10:00:00', '2025-10-01 11:00:00', None],
+            'picking_time': ['2025-10-01 09:30:00', '2025-10-01 10:20:00', None, None],
+            'picked_time': ['2025-10-01 09:45:00', '2025-10-01 10:50:00', None, None],
+            'packed_time': ['2025-10-01 10:00:00', '2025-10-01 11:00:00', None, None],
+            'shipped_time': ['2025-10-01 10:30:00', '2025-10-01 12:00:00', None, None],
+            'ready_for_pickup_time': ['2025-10-01 12:00:00', '2025-10-01 15:30:00', None, None],
+            'completed_time': ['2025-10-01 18:00:00', None, None, None],
+            'cancel_time': [None, None, '2025-10-01 11:10:00', None],
+        })
+        df.to_csv(tmp_path / 'fufillment_detail-000000000000.csv', index=False)
+        return tmp_path
+
+    def test_frame_matches_per_record_metrics(self, fulfillment_csv):
+        """Test columnar metrics and status equal the dataclass methods"""
+        raw = pd.read_csv(fulfillment_csv / 'fufillment_detail-000000000000.csv')
+        records = [FulfillmentDetailSchema.from_csv_row(row) for _, row in raw.iterrows()]
+        metrics = calculate_sla_metrics_frame(raw)
+
+        assert sla_metrics_records(metrics) == [record.calculate_sla_metrics() for record in records]
+        assert metrics['status'].tolist() == [record.get_status().value for record in records]
+
+    def test_lead_time_and_breach_flags(self, fulfillment_csv):
+        """Test lead time is a timedelta column and breach is NA without timestamps"""
+        metrics = calculate_sla_metrics_frame(
+            pd.read_csv(fulfillment_csv / 'fufillment_detail-000000000000.csv'), sla_target_minutes=240
+        )
+
+        assert pd.api.types.is_timedelta64_dtype(metrics['lead_time'])
+        assert metrics['lead_time'].iloc[0] == pd.Timedelta(hours=3)
+        assert metrics['sla_breached'].tolist()[:2] == [False, True]
+        assert metrics['sla_breached'].isna().tolist()[2:] == [True, True]
+
+    def test_loader_parses_datetimes_once(self, fulfillment_csv):
+        """Test repeated analysis reuses the parsed frame"""
+        loader = DFIDataLoader(str(fulfillment_csv))
+        with patch('src.modules.data.implementations.dfi_data_loader.parse_fulfillment_frame',
+                   wraps=parse_fulfillment_frame) as parse:
+            first = loader.get_sla_analysis()
+            second = loader.get_sla_analysis()
+            loader.get_sla_metrics_frame()
+
+        assert parse.call_count == 1
+        assert first['stage_durations'].keys() == second['stage_durations'].keys()
+        assert first['sla_breach_rate'] == pytest.approx(0.5)
+        assert first['stage_durations']['total_fulfillment']['sample_size'] == 2
+
+    def test_records_produced_on_demand(self, fulfillment_csv):
+        """Test objects built from the parsed frame equal CSV-row parsing"""
+        loader = DFIDataLoader(str(fulfillment_csv))
+        raw = loader.load_fulfillment_raw()
+        expected = [FulfillmentDetailSchema.from_csv_row(row) for _, row in raw.iterrows()]
+
+        iterator = loader.iter_fulfillment(['B', 'C'])
+        assert next(iterator) == expected[1]
+        assert loader.load_fulfillment() == expected
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for Global Demand Forecaster
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import date, timedelta
+import sys
+from pathlib import Path
+
+# Add src to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from modules.forecasting.global_forecaster import GlobalDemandForecaster, compare_forecasters
+from core.data_schema import DemandForecast
+
+class TestGlobalDemandForecaster:
+
+    @pytest.fixture
+    def sample_training_data(self):
+        """Create multi-store daily data with store-specific scale and weekly pattern"""
+        dates = pd.date_range(start='2025-06-01', end='2025-12-31', freq='D')
+        rng = np.random.default_rng(11)
+        frames = []
+        for idx, store in enumerate(['417', '331', '213', '418']):
+            level = 30 + 20 * idx
+            demand = level * (1 + 0.3 * (dates.dayofweek >= 5)) + rng.normal(0, level * 0.05, len(dates))
+            frames.append(pd.DataFrame({
+                'order_date': dates,
+                'fulfillment_store_code': store,
+                'total_quantity': np.maximum(demand, 0),
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    @pytest.fixture(params=['gbm', 'ridge'])
+    def trained_forecaster(self, request, sample_training_data):
+        """Create and train forecaster for each model type"""
+        forecaster = GlobalDemandForecaster({'model_type': request.param})
+        forecaster.train(sample_training_data)
+        return forecaster
+
+    def test_single_fit_covers_all_stores(self, trained_forecaster):
+        """Test one model is shared by every store"""
+        assert trained_forecaster.is_trained
+        assert set(trained_forecaster.models) == {'417', '331', '213', '418'}
+        assert len({id(model) for model in trained_forecaster.models.values()}) == 1
+        assert trained_forecaster.get_model_info()['training_stats']['stores_trained'] == 4
+
+    def test_predict_horizon(self, trained_forecaster):
+        """Test predict returns one aggregate forecast per store and day"""
+        forecasts = trained_forecaster.predict(forecast_horizon=10)
+
+        assert len(forecasts) == 4 * 10
+        assert forecasts[0].forecast_date == date(2026, 1, 1)
+        for forecast in forecasts:
+            assert isinstance(forecast, DemandForecast)
+            assert forecast.sku_id == 'aggregate'
+            assert forecast.confidence_intervals['P10'] <= forecast.predicted_demand <= forecast.confidence_intervals['P90']
+
+    def test_batch_prediction_is_single_predict_within_block(self, trained_forecaster):
+        """Test a 7-day batch over all stores uses one model.predict call"""
+        calls = []
+        original_predict = trained_forecaster.model.predict
+
+        def counting_predict(X):
+            calls.append(len(X))
+            return original_predict(X)
+
+        trained_forecaster.model.predict = counting_predict
+        dates = [date(2026, 1, 1) + timedelta(days=i) for i in range(7)]
+        forecasts = trained_forecaster.predict_batch_demand(['417', '331', '999'], ['SKU001', 'SKU002'], dates)
+
+        assert calls == [2 * 7]
+        assert len(forecasts) == 2 * 2 * 7
+
+    def test_store_scale_and_weekly_pattern(self, trained_forecaster):
+        """Test store level and weekend uplift are learned across stores"""
+        frame = trained_forecaster.predict_frame(['417', '418'], pd.date_range('2026-01-05', periods=7))
+        weekly = frame.pivot(index='ds', columns='store_code', values='yhat')
+
+        assert weekly['418'].mean() > 2 * weekly['417'].mean()
+        weekend = weekly.index.dayofweek >= 5
+        assert weekly.loc[weekend, '418'].mean() > weekly.loc[~weekend, '418'].mean()
+
+    def test_evaluate(self, trained_forecaster, sample_training_data):
+        """Test evaluation metrics on the last month"""
+        test_data = sample_training_data[sample_training_data['order_date'] >= '2025-12-01']
+        metrics = trained_forecaster.evaluate(test_data)
+
+        assert set(metrics['store_metrics']) == {'417', '331', '213', '418'}
+        assert metrics['overall_mape'] < 0.2
+
+    def test_store_embedding_excludes_target_period(self, sample_training_data):
+        """Test training features for a day do not depend on that day's or later demand"""
+        changed = sample_training_data.copy()
+        december = changed['order_date'] >= '2025-12-01'
+        changed.loc[december, 'total_quantity'] *= 3
+
+        dates = pd.date_range('2025-12-01', periods=7)
+        features = []
+        for data in (sample_training_data, changed):
+            forecaster = GlobalDemandForecaster({'model_type': 'ridge'})
+            forecaster.train(data)
+            features.append(forecaster._build_features(forecaster._history, dates))
+
+        columns = features[0].columns.drop('target')
+        pd.testing.assert_frame_equal(features[0][columns], features[1][columns])
+        assert not np.allclose(features[0]['target'], features[1]['target'])
+
+    def test_prediction_without_training(self):
+        """Test prediction without training raises error"""
+        with pytest.raises(ValueError, match="模型尚未训练"):
+            GlobalDemandForecaster().predict(forecast_horizon=7)
+
+    def test_compare_forecasters(self, sample_training_data):
+        """Test holdout comparison reports accuracy and timings"""
+        results = compare_forecasters(
+            sample_training_data,
+            holdout_days=7,
+            forecasters={'ridge': GlobalDemandForecaster({'model_type': 'ridge'})},
+        )
+
+        assert results['ridge']['points_compared'] == 4 * 7
+        assert results['ridge']['mape'] < 0.2
+        assert results['ridge']['train_seconds'] >= 0
+
+    def test_model_persistence(self, trained_forecaster, tmp_path):
+        """Test model saving and loading"""
+        model_path = tmp_path / "global_model.pkl"
+        trained_forecaster.save_model(str(model_path))
+
+        new_forecaster = GlobalDemandForecaster()
+        new_forecaster.load_model(str(model_path))
+        expected = trained_forecaster.predict(forecast_horizon=3)
+        loaded = new_forecaster.predict(forecast_horizon=3)
+
+        assert [f.predicted_demand for f in loaded] == [f.predicted_demand for f in expected]
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the columnar integrated dataset
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import date
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.data_pipeline import DataPipeline, PYARROW_AVAILABLE
+from src.core.data_schema import (
+    StoreLocation, WeatherData, WeatherCondition, PublicHoliday, dataframe_to_order_details
+)
+
+class TestIntegratedDataset:
+
+    @pytest.fixture
+    def orders_df(self):
+        """Orders over a holiday, a weekend and a day without weather"""
+        return pd.DataFrame({
+            'dt': ['2025-01-01', '2025-01-04', '2025-01-06', '2025-01-04'],
+            'order_id': ['O1', 'O2', 'O3', 'O4'],
+            'user_id': ['U1', 'U2', 'U1', 'U3'],
+            'fulfillment_store_code': [417, 213, 999, 417],
+            'unique_sku_cnt': [1, 2, 3, 1],
+            'total_quantity_cnt': [2, 4, 6, 1],
+        })
+
+    @pytest.fixture
+    def sources(self):
+        stores = [StoreLocation('417', 22.34, 114.20, 'Wong Tai Sin', 'A', 'SUCCESS_CSDI'),
+                  StoreLocation('213', 22.38, 114.19, 'Sha Tin', 'B', 'SUCCESS_CSDI')]
+        weather = [WeatherData(date(2025, 1, 1), 20.0, 15.0, 70.0, 0.0, WeatherCondition.SUNNY),
+                   WeatherData(date(2025, 1, 4), 18.0, 12.0, 80.0, 5.0, None),
+                   WeatherData(date(2025, 1, 4), 19.0, 13.0, 85.0, 6.0, WeatherCondition.RAINY)]
+        holidays = [PublicHoliday(date(2025, 1, 1), 'The first day of January')]
+        return stores, weather, holidays
+
+    def test_joins_match_row_lookups(self, orders_df, sources):
+        """Test merged features equal per-order lookups and keep input order"""
+        stores, weather, holidays = sources
+        integrated = DataPipeline()._integrate_orders(DataPipeline()._order_frame(orders_df), stores, weather, holidays)
+
+        assert integrated['order_id'].tolist() == ['O1', 'O2', 'O3', 'O4']
+        assert integrated['district'].astype(object).tolist()[:2] == ['Wong Tai Sin', 'Sha Tin']
+        assert integrated['latitude'].isna().tolist() == [False, False, True, False]
+        assert integrated['weekday'].tolist() == [2, 5, 0, 5]
+        assert integrated['is_weekend'].tolist() == [False, True, False, True]
+        assert integrated['is_holiday'].tolist() == [True, False, False, False]
+        assert integrated['weather_condition'].astype(str).tolist() == ['sunny', 'rainy', 'unknown', 'rainy']
+        np.testing.assert_array_equal(integrated['weather_temperature_high'], [20.0, 19.0, np.nan, 19.0])
+
+        for column in ('user_id', 'fulfillment_store_code', 'store_code', 'district', 'weather_condition'):
+            assert isinstance(integrated[column].dtype, pd.CategoricalDtype), column
+        assert integrated['fulfillment_store_code'].dtype == integrated['store_code'].dtype
+
+    def test_frame_matches_order_objects(self, orders_df):
+        """Test the CSV order frame equals the frame built from OrderDetail objects"""
+        pipeline = DataPipeline()
+        pd.testing.assert_frame_equal(
+            pipeline._order_frame(orders_df),
+            pipeline._orders_to_frame(dataframe_to_order_details(orders_df))
+        )
+
+    @pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow not installed")
+    def test_artifact_round_trip(self, tmp_path, orders_df, sources):
+        """Test the Parquet artifact keeps categoricals and supports column projection"""
+        stores, weather, holidays = sources
+        pipeline = DataPipeline()
+        pipeline.processed_data_path = tmp_path
+        integrated = pipeline._integrate_orders(pipeline._order_frame(orders_df), stores, weather, holidays)
+
+        assert pipeline.save_integrated_dataset(integrated) == tmp_path / '.columnar_cache' / 'integrated_dataset.parquet'
+        loaded = DataPipeline()
+        loaded.processed_data_path = tmp_path
+        pd.testing.assert_frame_equal(loaded.load_integrated_dataset(), integrated)
+        projected = loaded.load_integrated_dataset(columns=['fulfillment_store_code', 'order_date', 'total_quantity'])
+        assert list(projected.columns) == ['fulfillment_store_code', 'order_date', 'total_quantity']
+        assert isinstance(projected['fulfillment_store_code'].dtype, pd.CategoricalDtype)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for vectorized inventory projection
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import date
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.api.services.inventory_projection import (
+    classify_stock_status, first_day_exceeding, forecast_store_replenishment, project_inventory
+)
+
+class TestInventoryProjection:
+
+    @pytest.fixture
+    def arrays(self):
+        """Random stock, arrivals and demand for 50 rows x 14 days"""
+        rng = np.random.default_rng(11)
+        return (
+            rng.uniform(0, 60, 50),
+            rng.uniform(0, 20, (50, 14)),
+            rng.uniform(0, 35, (50, 14)),
+        )
+
+    def test_projection_matches_sequential_walk(self, arrays):
+        """Test cumulative-sum projection equals the clamped day-by-day loop"""
+        initial, arrivals, demand = arrays
+        projection = project_inventory(initial, arrivals, demand, reorder_point=demand * 0.5)
+
+        for row in range(len(initial)):
+            stock, stockout, reorder = initial[row], 14, 14
+            for day in range(14):
+                assert projection.opening[row, day] == pytest.approx(stock)
+                available = stock + arrivals[row, day] - demand[row, day]
+                if available < 0 and stockout == 14:
+                    stockout = day
+                stock = max(0.0, available)
+                if stock < demand[row, day] * 0.5 and reorder == 14:
+                    reorder = day
+                assert projection.available[row, day] == pytest.approx(stock)
+            assert projection.stockout_day[row] == stockout
+            assert projection.reorder_day[row] == reorder
+
+    def test_first_day_exceeding_matches_row_searchsorted(self):
+        """Test batched searchsorted equals per-row searchsorted"""
+        cumulative = np.cumsum(np.random.default_rng(5).integers(0, 10, (20, 9)), axis=1).astype(float)
+        thresholds = np.linspace(-5, 80, 20)
+
+        expected = [np.searchsorted(row, value, side='right') for row, value in zip(cumulative, thresholds)]
+        assert first_day_exceeding(cumulative, thresholds).tolist() == expected
+
+    def test_stock_status_thresholds(self):
+        """Test shortage / overstock bands"""
+        status = classify_stock_status(np.array([[1.0, 50.0, 100.0]]), np.array([[10.0, 10.0, 10.0]]))
+        assert status.tolist() == [['shortage', 'normal', 'overstock']]
+
+    def test_store_replenishment_grid(self):
+        """Test every store gets a weekend-adjusted plan with days of cover"""
+        dates = pd.date_range('2025-12-01', periods=40, freq='D')
+        daily = pd.DataFrame({
+            'dt': np.tile(dates.strftime('%Y-%m-%d'), 2),
+            'store_code': np.repeat([417, 331], 40),
+            'order_count': np.repeat([10.0, 4.0], 40),
+            'total_quantity': np.concatenate([np.full(40, 20.0), np.tile([10.0, 30.0], 20)]),
+        })
+        plan = forecast_store_replenishment(daily, 7, start=date(2026, 1, 9))
+
+        assert plan['store_codes'] == [331, 417]
+        assert plan['weekdays'][1] == '周六'
+        assert plan['predicted_quantity'][1].tolist() == [20, 24, 24, 20, 20, 20, 20]
+        assert plan['safety_stock'][0][0] == np.floor(20 + 1.28 * 10)
+        assert plan['days_of_cover'].tolist() == [1, 1]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for joint replenishment and routing planner
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.modules.routing.distance_matrix import create_distance_matrix, create_time_matrix
+from src.modules.routing.joint_planner import JointReplenishmentPlanner
+
+class TestJointReplenishmentPlanner:
+
+    @pytest.fixture
+    def demand(self):
+        """Six stores with min / target / max delivery quantities"""
+        return pd.DataFrame({
+            'store_id': [f'S{i}' for i in range(6)],
+            'min_qty': [10, 5, 0, 20, 10, 5],
+            'target_qty': [30, 25, 20, 40, 20, 15],
+            'max_qty': [50, 40, 30, 60, 30, 25],
+        })
+
+    @pytest.fixture
+    def distance_matrix(self):
+        rng = np.random.default_rng(0)
+        locations = [(22.35, 114.13)] + [(22.3 + rng.uniform(0, 0.1), 114.1 + rng.uniform(0, 0.1)) for _ in range(6)]
+        return create_distance_matrix(locations, use_euclidean=False)
+
+    def plan(self, demand, distance_matrix, capacity):
+        planner = JointReplenishmentPlanner({'num_vehicles': 2, 'vehicle_capacity': capacity, 'time_limit_seconds': 1})
+        return planner.plan(demand, distance_matrix, create_time_matrix(distance_matrix))
+
+    def test_candidate_quantities(self, demand):
+        """Test each store expands to min + steps, target and max"""
+        nodes = JointReplenishmentPlanner({'chunk_size': 10}).build_nodes(demand)
+        s1 = nodes[nodes['store_id'] == 'S1']
+        s2 = nodes[nodes['store_id'] == 'S2']
+
+        assert s1['quantity'].tolist() == [5, 15, 25, 35, 40]
+        assert s2['quantity'].tolist() == [10, 20, 30]
+        assert s1['shortfall_cost'].tolist() == [20 * 500 + 15 * 20, 10 * 500 + 15 * 20, 15 * 20, 5 * 20, 0]
+        assert nodes['node'].tolist() == list(range(1, len(nodes) + 1))
+
+    def test_ample_capacity_delivers_max(self, demand, distance_matrix):
+        """Test every store receives its upper bound when trucks have room"""
+        result = self.plan(demand, distance_matrix, 300)
+
+        assert [item['planned_qty'] for item in result['allocations']] == demand['max_qty'].tolist()
+        assert result['dropped_stores'] == []
+
+    def test_tight_capacity_keeps_minimums_and_targets(self, demand, distance_matrix):
+        """Test scarce capacity trims upside first, then target, never the minimum"""
+        for capacity, floor in ((100, 'target_qty'), (50, 'min_qty')):
+            result = self.plan(demand, distance_matrix, capacity)
+            planned = np.array([item['planned_qty'] for item in result['allocations']])
+
+            assert (planned >= demand[floor].to_numpy()).all()
+            assert all(route['load'] <= capacity for route in result['routes'])
+            assert planned.sum() == sum(route['load'] for route in result['routes'])
+            assert result['dropped_stores'] == []
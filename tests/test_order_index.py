@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the indexed in-memory order store
+"""
+
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.api.services.order_index import IndexedOrderStore, InvalidCursorError, field_getter
+
+class TestIndexedOrderStore:
+
+    @pytest.fixture
+    def orders(self):
+        """3,000 orders over 5 stores, 3 statuses and 30 days"""
+        rng = np.random.default_rng(5)
+        return [
+            {
+                'order_id': f'ORD{i:05d}',
+                'store_id': str(rng.integers(1, 6)),
+                'status': ['pending', 'ready', 'completed'][rng.integers(0, 3)],
+                'sla_achieved': [True, False, None][rng.integers(0, 3)],
+                'order_time': f'2025-01-{rng.integers(1, 31):02d}T10:00:00',
+            }
+            for i in range(3000)
+        ]
+
+    @pytest.fixture
+    def store(self, orders):
+        index = IndexedOrderStore(
+            key=field_getter('order_id'),
+            indexes={name: field_getter(name) for name in ('store_id', 'status', 'sla_achieved')},
+            date_key=field_getter('order_time'),
+        )
+        index.extend(orders)
+        return index
+
+    def test_query_matches_list_filter(self, store, orders):
+        """Test push-down filters and date range equal a plain list scan"""
+        expected = [
+            o for o in orders
+            if o['store_id'] == '3' and o['sla_achieved'] is False and '2025-01-05' <= o['order_time'][:10] <= '2025-01-12'
+        ]
+        page = store.query({'store_id': '3', 'sla_achieved': False, 'status': None},
+                           date_from='2025-01-05', date_to='2025-01-12', offset=5, limit=10)
+
+        assert page.total == len(expected)
+        assert page.items == expected[5:15]
+        assert store.count_by('status', {'store_id': '3'}) == {
+            status: sum(o['store_id'] == '3' and o['status'] == status for o in orders)
+            for status in ('pending', 'ready', 'completed')
+        }
+
+    def test_cursor_pagination_walks_all_rows(self, store, orders):
+        """Test following next_cursor returns each matching order exactly once, in order"""
+        seen, cursor = [], None
+        while True:
+            page = store.query({'status': 'ready'}, limit=37, cursor=cursor)
+            seen.extend(o['order_id'] for o in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert seen == [o['order_id'] for o in orders if o['status'] == 'ready']
+
+    def test_upsert_reindexes_and_key_search(self, store, orders):
+        """Test replacing an order moves it between index postings"""
+        updated = dict(orders[0], status='completed', store_id='9')
+        store.upsert(updated)
+
+        assert len(store) == 3000
+        assert store.query({'store_id': '9'}).items == [updated]
+        assert orders[0]['order_id'] not in [o['order_id'] for o in store.query({'store_id': orders[0]['store_id']}, limit=3000).items]
+        assert store.query(key_fragment='ORD00000').items == [updated]
+        assert store.query(key_fragment='ORD0000').total == 10
+        assert store.query({'store_id': '1'}, key_fragment='ORD00000').total == 0
+
+    def test_key_search_is_substring_even_on_exact_match(self, store, orders):
+        """Test an exact order id still returns every id containing it, and filters apply to all of them"""
+        extra = dict(orders[1], order_id='ORD00001-R', store_id='7')
+        store.upsert(extra)
+
+        assert [o['order_id'] for o in store.query(key_fragment='ORD00001', limit=20).items] == [
+            o['order_id'] for o in orders + [extra] if 'ORD00001' in o['order_id']
+        ]
+        assert store.query({'store_id': '7'}, key_fragment='ORD00001').items == [extra]
+
+    def test_invalid_cursor_rejected(self, store):
+        """Test a malformed cursor raises InvalidCursorError and /sla/orders answers 400"""
+        for cursor in ('abc', '-3', '1.5'):
+            with pytest.raises(InvalidCursorError):
+                store.query({'status': 'ready'}, cursor=cursor)
+
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from src.api.routers import sla
+
+        app = FastAPI()
+        app.include_router(sla.router, prefix='/sla')
+        client = TestClient(app)
+        assert client.get('/sla/orders', params={'cursor': 'abc'}).status_code == 400
+        assert client.get('/sla/orders', params={'page_size': 5}).status_code == 200
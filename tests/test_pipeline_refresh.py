@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for incremental data pipeline refresh
+"""
+
+import os
+import pytest
+import pandas as pd
+from datetime import date
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.data_pipeline import DataPipeline, PYARROW_AVAILABLE
+from src.core.data_schema import WeatherData, WeatherCondition, PublicHoliday
+
+ORDER_FILE = 'case_study_order_detail-000000000000.csv'
+STORE_FILE = 'store_coordinates_enhanced_v2.csv'
+
+class TestIncrementalRefresh:
+
+    @pytest.fixture
+    def pipeline(self, tmp_path, monkeypatch):
+        """Pipeline over temporary CSVs with fixed external sources"""
+        (tmp_path / 'raw').mkdir()
+        (tmp_path / 'processed').mkdir()
+        pd.DataFrame({
+            'store_code': [417, 213],
+            'district': ['Wong Tai Sin', 'Sha Tin'],
+            'address': ['A', 'B'],
+            'latitude': [22.34, 22.38],
+            'longitude': [114.20, 114.19],
+            'geocode_status': ['SUCCESS_CSDI', 'SUCCESS_CSDI'],
+        }).to_csv(tmp_path / 'processed' / STORE_FILE, index=False)
+        self.write_orders(tmp_path, [('2025-01-01', 'O1', 417), ('2025-01-02', 'O2', 213)])
+
+        pipeline = DataPipeline()
+        pipeline.raw_data_path = tmp_path / 'raw'
+        pipeline.processed_data_path = tmp_path / 'processed'
+        pipeline.calls = []
+        weather = [WeatherData(date(2025, 1, 2), temperature_high=20.0, temperature_low=15.0,
+                               weather_condition=WeatherCondition.SUNNY)]
+        holidays = [PublicHoliday(date(2025, 1, 1), "The first day of January")]
+
+        def fetched(name, data):
+            def fetch(*args):
+                pipeline.calls.append(name)
+                return list(data)
+            return fetch
+
+        monkeypatch.setattr(pipeline, '_fetch_hko_weather_data', fetched('weather', weather))
+        monkeypatch.setattr(pipeline, '_enhance_holiday_data_loading', fetched('holidays', holidays))
+        monkeypatch.setattr(pipeline, '_fetch_real_traffic_data', fetched('traffic', []))
+        monkeypatch.setattr(pipeline, '_probe_remote', lambda source: (source == 'traffic', {}))
+        return pipeline
+
+    @staticmethod
+    def write_orders(tmp_path, rows, mode='w'):
+        frame = pd.DataFrame(rows, columns=['dt', 'order_id', 'fulfillment_store_code'])
+        frame['user_id'] = 'U1'
+        frame['unique_sku_cnt'] = 1
+        frame['total_quantity_cnt'] = 2
+        frame.to_csv(tmp_path / 'raw' / ORDER_FILE, index=False, mode=mode, header=(mode == 'w'))
+
+    def test_unchanged_sources_are_skipped(self, pipeline, tmp_path):
+        """Test a second refresh re-reads nothing and a touch without edits is not a change"""
+        first = pipeline.incremental_refresh()
+        assert {name: report['status'] for name, report in first.items()} == {
+            'stores': 'reload', 'orders': 'reload', 'weather': 'reload',
+            'holidays': 'reload', 'traffic': 'reload', 'integrated': 'reload',
+        }
+        assert first['integrated']['rows'] == 2
+        assert pipeline.get_integrated_dataset()['latitude'].notna().all()
+
+        store_file = tmp_path / 'processed' / STORE_FILE
+        os.utime(store_file, ns=(store_file.stat().st_atime_ns, store_file.stat().st_mtime_ns + 10**9))
+        pipeline.calls.clear()
+        second = pipeline.incremental_refresh()
+
+        assert all(report['status'] == 'unchanged' for report in second.values())
+        assert pipeline.calls == ['traffic']
+        assert all(report['seconds'] >= 0 for report in second.values())
+        assert pipeline._is_cache_valid('store_locations')
+
+    def test_order_reload_hashes_only_changed_files(self, pipeline, tmp_path, monkeypatch):
+        """Test reloading an unchanged export skips the content hash and a changed one is hashed from the read bytes"""
+        pipeline.load_order_data(force_refresh=True)
+        order_file = tmp_path / 'raw' / ORDER_FILE
+        monkeypatch.setattr(pipeline, '_file_signature', lambda *args: pytest.fail('export hashed twice'))
+
+        assert len(pipeline.load_order_data(force_refresh=True)) == 2
+        assert pipeline._read_with_signature(order_file)[1] is None
+        self.write_orders(tmp_path, [('2025-01-03', 'O3', 417)], mode='a')
+        assert len(pipeline.load_order_data(force_refresh=True)) == 3
+
+        signature = pipeline._file_signatures[str(order_file)]
+        monkeypatch.undo()
+        assert signature == pipeline._file_signature(order_file)[0]
+
+    def test_appended_orders_extend_integrated_dataset(self, pipeline, tmp_path):
+        """Test appended rows are parsed alone and match a full rebuild"""
+        pipeline.incremental_refresh()
+        integrated = pipeline.get_integrated_dataset()
+        self.write_orders(tmp_path, [('2025-01-02', 'O3', 417), ('2025-01-03', 'O4', 999)], mode='a')
+
+        report = pipeline.incremental_refresh()
+
+        assert report['orders'] == {**report['orders'], 'status': 'append', 'rows': 2}
+        assert report['integrated']['status'] == 'append'
+        assert report['stores']['status'] == 'unchanged'
+        appended = pipeline.get_integrated_dataset()
+        pd.testing.assert_frame_equal(appended.iloc[:2], integrated, check_categorical=False)
+        assert [o.order_id for o in pipeline._orders_cache] == ['O1', 'O2', 'O3', 'O4']
+
+        rebuilt = pipeline._integrate_orders(pipeline._orders_frame, pipeline._store_locations_cache,
+                                             pipeline._weather_cache, pipeline._holidays_cache)
+        pd.testing.assert_frame_equal(appended, rebuilt)
+
+    @pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow not installed")
+    def test_append_writes_part_instead_of_rewriting(self, pipeline, tmp_path):
+        """Test an incremental append leaves the Parquet artifact alone and adds one part file"""
+        pipeline.incremental_refresh()
+        artifact = pipeline.integrated_artifact_path
+        base_mtime = artifact.stat().st_mtime_ns
+        self.write_orders(tmp_path, [('2025-01-03', 'O3', 417)], mode='a')
+
+        pipeline.incremental_refresh()
+
+        assert artifact.stat().st_mtime_ns == base_mtime
+        assert [part.name for part in pipeline._integrated_part_files()] == ['part-00001.parquet']
+        reader = DataPipeline()
+        reader.processed_data_path = pipeline.processed_data_path
+        pd.testing.assert_frame_equal(reader.load_integrated_dataset(), pipeline.get_integrated_dataset())
+
+        pipeline.save_integrated_dataset(pipeline.get_integrated_dataset())
+        assert pipeline._integrated_part_files() == []
+
+    def test_rewritten_export_uses_watermark(self, pipeline, tmp_path):
+        """Test a rewritten order file only contributes rows past the watermark"""
+        pipeline.incremental_refresh()
+        self.write_orders(tmp_path, [('2025-01-02', 'O2', 213), ('2025-01-01', 'O1', 417),
+                                     ('2025-01-02', 'O5', 213), ('2025-01-04', 'O6', 417)])
+
+        report = pipeline.incremental_refresh()
+
+        assert report['orders']['status'] == 'append' and report['orders']['rows'] == 2
+        assert [o.order_id for o in pipeline._orders_cache] == ['O1', 'O2', 'O5', 'O6']
+        assert pipeline._order_watermark == pd.Timestamp('2025-01-04')
+        assert pipeline.incremental_refresh()['orders']['status'] == 'unchanged'
+
+        pd.DataFrame({
+            'store_code': [417], 'district': ['Kowloon City'], 'address': ['C'],
+            'latitude': [22.33], 'longitude': [114.17], 'geocode_status': ['SUCCESS_CSDI'],
+        }).to_csv(tmp_path / 'processed' / STORE_FILE, index=False)
+        report = pipeline.incremental_refresh()
+        assert report['stores']['status'] == 'reload' and report['integrated']['status'] == 'reload'
+        assert pipeline.get_integrated_dataset()['district'].tolist()[0] == 'Kowloon City'
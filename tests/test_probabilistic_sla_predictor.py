@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for batched Monte-Carlo plan SLA estimation
+"""
+
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.interfaces import RoutePlan
+from src.modules.sla.implementations.probabilistic_sla_predictor import (
+    ProbabilisticSLAPredictor, build_plan_arrays, plan_arrays_from_route_plans
+)
+
+class TestPlanBreachEstimation:
+
+    @pytest.fixture
+    def time_matrix(self):
+        """Depot plus four stores, 10 minutes between every pair"""
+        matrix = np.full((5, 5), 10.0)
+        np.fill_diagonal(matrix, 0.0)
+        return matrix
+
+    @pytest.fixture
+    def predictor(self):
+        return ProbabilisticSLAPredictor(n_samples=4000, seed=7)
+
+    def test_arrays_follow_routes(self, time_matrix):
+        """Test legs start from the depot on each route"""
+        time_matrix[0, 3] = 25.0
+        plan = build_plan_arrays([[1, 2], [3, 4]], time_matrix, {1: 30, 2: 60, 3: 40, 4: 90}, service_minutes=5)
+
+        assert plan.stop_ids == [1, 2, 3, 4]
+        assert plan.route_starts.tolist() == [0, 2]
+        assert plan.leg_minutes.tolist() == [10.0, 10.0, 25.0, 10.0]
+        assert plan.deadline_minutes.tolist() == [30.0, 60.0, 40.0, 90.0]
+        assert plan.route_index.tolist() == [0, 0, 1, 1]
+
+    def test_deterministic_plan_without_noise(self, time_matrix):
+        """Test zero noise reproduces nominal cumulative arrival times per route"""
+        predictor = ProbabilisticSLAPredictor(travel_cv=1e-9, service_cv=1e-6, n_samples=10, seed=0)
+        plan = build_plan_arrays([[1, 2], [3, 4]], time_matrix, [16, 25, 100, 31], service_minutes=5)
+        risk = predictor.estimate_plan_breach(plan)
+
+        assert risk.expected_ready_minutes == pytest.approx([15, 30, 15, 30], abs=1e-3)
+        assert risk.breach_probability.tolist() == [0.0, 1.0, 0.0, 0.0]
+        assert risk.route_breach_probability.tolist() == [1.0, 0.0]
+        assert risk.expected_breaches == pytest.approx(1.0)
+
+    def test_zero_cv_is_deterministic(self, time_matrix):
+        """Test service_cv=0 and travel_cv=0 give exact nominal times instead of failing"""
+        predictor = ProbabilisticSLAPredictor(travel_cv=0.0, service_cv=0.0, n_samples=10, seed=0)
+        risk = predictor.estimate_plan_breach(build_plan_arrays([[1, 2]], time_matrix, [16, 25], service_minutes=5))
+
+        assert risk.expected_ready_minutes.tolist() == [15.0, 30.0]
+        assert risk.breach_probability.tolist() == [0.0, 1.0]
+
+    def test_breach_probability_is_monotonic_in_deadline(self, predictor, time_matrix):
+        """Test tighter deadlines give higher breach probability and shared rng is reproducible"""
+        routes = [[1, 2, 3, 4]]
+        tight = predictor.estimate_plan_breach(build_plan_arrays(routes, time_matrix, 35, 5), rng=np.random.default_rng(1))
+        loose = predictor.estimate_plan_breach(build_plan_arrays(routes, time_matrix, 45, 5), rng=np.random.default_rng(1))
+        repeat = predictor.estimate_plan_breach(build_plan_arrays(routes, time_matrix, 35, 5), rng=np.random.default_rng(1))
+
+        assert np.all(tight.breach_probability >= loose.breach_probability)
+        assert 0.0 < tight.breach_probability[2] < 1.0
+        assert np.array_equal(tight.breach_probability, repeat.breach_probability)
+        assert tight.plan_breach_probability >= tight.breach_probability.max()
+
+    def test_route_plans_conversion(self, predictor):
+        """Test RoutePlan arrival and departure strings become leg and service arrays"""
+        plan = RoutePlan(
+            route_id='R1', vehicle_id='V1', store_sequence=['417', '331'],
+            arrival_times=['09:30', '10:10'], departure_times=['09:45', '10:20'],
+            distances_km=[12.5, 8.0], total_distance_km=20.5, total_duration_min=80,
+            total_cost=100.0, sla_risk_score=0.0,
+        )
+        arrays = plan_arrays_from_route_plans([plan], {'417': '13:00', '331': '10:00'}, speed_kmh=25)
+
+        assert arrays.leg_minutes.tolist() == [30.0, 25.0]
+        assert arrays.service_minutes.tolist() == [15.0, 10.0]
+        assert arrays.departure_minutes.tolist() == [540.0]
+        records = predictor.estimate_plan_breach(arrays).to_records()
+        assert records[0]['breach_probability'] == 0.0
+        assert records[1]['breach_probability'] > 0.95
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -9,6 +9,7 @@ import pandas as pd
 import numpy as np
 from datetime import date, datetime, timedelta
 from unittest.mock import Mock, patch
+import tracemalloc
 import sys
 from pathlib import Path
 
@@ -194,7 +195,51 @@ class TestProphetForecaster:
         
         # No models should be trained due to insufficient data
         assert len(forecaster.models) == 0
-    
+
+    def test_training_stats_reported(self, forecaster, sample_training_data):
+        """Test preprocessing stats are reported and peak memory is measured only when enabled"""
+        with patch.object(forecaster, '_prepare_prophet_data', return_value=pd.DataFrame()):
+            forecaster.train(sample_training_data)
+
+        stats = forecaster.get_model_info()['training_stats']
+        assert stats['input_rows'] == len(sample_training_data)
+        assert 0 < stats['aggregated_rows'] <= len(sample_training_data)
+        assert stats['feature_count'] == len(forecaster.feature_columns)
+        assert stats['preprocess_peak_memory_mb'] is None
+        assert stats['stores_trained'] == 0
+        assert not tracemalloc.is_tracing()
+
+        forecaster.config['profile_memory'] = True
+        with patch.object(forecaster, '_prepare_prophet_data', return_value=pd.DataFrame()):
+            forecaster.train(sample_training_data)
+        assert forecaster.training_stats['preprocess_peak_memory_mb'] > 0
+        assert not tracemalloc.is_tracing()
+
+    def test_outer_memory_tracer_left_untouched(self, forecaster, sample_training_data):
+        """Test an already running tracemalloc session keeps its peak"""
+        forecaster.config['profile_memory'] = True
+        tracemalloc.start()
+        try:
+            ballast = bytearray(64 * 1024 * 1024)
+            del ballast
+            outer_peak = tracemalloc.get_traced_memory()[1]
+            with patch.object(forecaster, '_prepare_prophet_data', return_value=pd.DataFrame()):
+                forecaster.train(sample_training_data)
+            assert tracemalloc.is_tracing()
+            assert tracemalloc.get_traced_memory()[1] >= outer_peak
+        finally:
+            tracemalloc.stop()
+        assert forecaster.training_stats['preprocess_peak_memory_mb'] is None
+
+    def test_preprocessing_single_row_per_store_day(self, forecaster, sample_training_data):
+        """Test duplicate store-day rows are aggregated in one pass"""
+        doubled = pd.concat([sample_training_data, sample_training_data], ignore_index=True)
+        processed_data = forecaster._preprocess_training_data(doubled)
+
+        assert not processed_data.duplicated(['store_code', 'ds']).any()
+        assert processed_data['y'].sum() == doubled['total_quantity'].sum()
+        assert isinstance(processed_data['store_code'].dtype, pd.CategoricalDtype)
+
     def test_prediction_without_training(self, forecaster):
         """Test prediction without training raises error"""
         with pytest.raises(ValueError, match="模型尚未训练"):
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for vectorized safety stock optimizer
+"""
+
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.interfaces import DemandForecast
+from src.modules.inventory.implementations.safety_stock_optimizer import (
+    SafetyStockOptimizer, service_level_z, service_level_z_scores
+)
+
+class TestSafetyStockOptimizer:
+
+    @pytest.fixture
+    def forecasts(self):
+        """Two stores x two SKUs x four days"""
+        demand = {
+            ('417', 'SKU001'): [10, 12, 14, 16],
+            ('417', 'SKU002'): [5, 5, 5, 5],
+            ('331', 'SKU001'): [20, 30, 20, 30],
+            ('331', 'SKU002'): [1, 2, 3, 4],
+        }
+        return [
+            DemandForecast(store, sku, f'2026-01-0{day + 1}', float(value), 0.0, 0.0, 0.9)
+            for (store, sku), values in demand.items()
+            for day, value in enumerate(values)
+        ]
+
+    @pytest.fixture
+    def optimizer(self):
+        return SafetyStockOptimizer()
+
+    def test_z_table_is_cached(self):
+        """Test z-scores come from the cached quantile lookup"""
+        service_level_z.cache_clear()
+        z = service_level_z_scores([0.95, 0.99, 0.95, 0.95])
+
+        assert z == pytest.approx([1.644854, 2.326348, 1.644854, 1.644854], abs=1e-6)
+        assert service_level_z.cache_info().misses == 2
+
+    def test_z_at_service_level_bounds(self):
+        """Test 0 and 1 give finite, clipped z-scores and out-of-range levels raise"""
+        assert service_level_z(1.0) == pytest.approx(5.997807, abs=1e-5)
+        assert service_level_z(0.0) == pytest.approx(-service_level_z(1.0))
+        for level in (-0.1, 1.5, float('nan')):
+            with pytest.raises(ValueError):
+                service_level_z(level)
+
+    def test_grid_matches_formula(self, optimizer):
+        """Test store x sku grid safety stock and reorder point"""
+        frame = optimizer.calculate_safety_stock_frame(
+            [DemandForecast('417', 'SKU001', d, v, 0, 0, 0.9) for d, v in [('a', 10.0), ('b', 14.0)]],
+            service_level={'SKU001': 0.99}, lead_time_days=4,
+        )
+        row = frame.iloc[0]
+
+        assert row['std_demand'] == pytest.approx(np.std([10, 14]))
+        assert row['safety_stock'] == pytest.approx(service_level_z(0.99) * 2.0 * 2.0)
+        assert row['reorder_point'] == pytest.approx(12.0 * 4 + row['safety_stock'])
+
+    def test_sku_level_matches_per_sku_loop(self, optimizer, forecasts):
+        """Test calculate_safety_stock keeps per-SKU aggregation across stores"""
+        safety = optimizer.calculate_safety_stock(forecasts, service_level=0.95, lead_time_days=2)
+        sku1 = [f.forecast_demand for f in forecasts if f.sku_id == 'SKU001']
+
+        assert set(safety) == {'SKU001', 'SKU002'}
+        assert safety['SKU001'] == pytest.approx(service_level_z(0.95) * np.std(sku1) * np.sqrt(2))
+
+    def test_replenishment_frame(self, optimizer, forecasts):
+        """Test network replenishment quantities round up to batch and respect minimum"""
+        frame = optimizer.calculate_safety_stock_frame(forecasts)
+        plan = optimizer.generate_replenishment_frame(
+            frame, {('331', 'SKU001'): 2.0, ('417', 'SKU001'): 100.0}, min_order_qty=10, batch_sizes={'SKU001': 4}
+        )
+        plan = plan.set_index(['store_id', 'sku_id'])
+
+        deficit = plan.loc[('331', 'SKU001'), 'safety_stock'] - 2.0
+        assert plan.loc[('331', 'SKU001'), 'order_quantity'] == max(10, np.ceil(deficit / 4) * 4)
+        assert plan.loc[('417', 'SKU001'), 'status'] == 'sufficient'
+        assert plan.loc[('417', 'SKU002'), 'order_quantity'] == 0.0
+        assert plan.loc[('331', 'SKU002'), 'current'] == 0.0
+
+    def test_replenishment_plan_dict(self, optimizer):
+        """Test dict interface keeps its output format"""
+        result = optimizer.generate_replenishment_plan(
+            {'SKU001': 30.0, 'SKU002': 5.0}, {'SKU001': 3.0, 'SKU002': 8.0}, {'SKU001': 10}, {'SKU001': 25}
+        )
+
+        assert result['total_skus'] == 2
+        assert result['skus_needing_reorder'] == 1
+        assert result['replenishment_plan']['SKU001']['order_quantity'] == 50.0
+        assert result['replenishment_plan']['SKU002']['status'] == 'sufficient'
+
+    def test_delivery_demand_vector(self, optimizer, forecasts):
+        """Test per-store min / target / max quantities for joint planning"""
+        plan = optimizer.generate_replenishment_frame(
+            optimizer.calculate_safety_stock_frame(forecasts), {('417', 'SKU001'): 100.0}, min_order_qty=10, batch_sizes=25
+        )
+        demand = optimizer.delivery_demand_frame(plan).set_index('store_id')
+        rows = plan[plan['store_id'] == '331']
+
+        assert demand.loc['331', 'min_qty'] == np.ceil(rows['safety_stock']).sum()
+        assert demand.loc['331', 'target_qty'] == rows['order_quantity'].sum()
+        assert demand.loc['331', 'max_qty'] == np.maximum(rows['order_quantity'], np.ceil(rows['reorder_point'])).sum()
+        assert demand.loc['417', 'min_qty'] <= demand.loc['417', 'target_qty'] <= demand.loc['417', 'max_qty']
+
+
+class TestInventoryAllocation:
+
+    @pytest.fixture
+    def optimizer(self):
+        return SafetyStockOptimizer()
+
+    @pytest.fixture
+    def forecasts(self):
+        """417 has flat demand (no safety stock); 331 is volatile and needs safety stock"""
+        return [
+            DemandForecast('417', 'SKU001', '2026-01-01', 10.0, 0, 0, 0.9),
+            DemandForecast('417', 'SKU001', '2026-01-02', 10.0, 0, 0, 0.9),
+            DemandForecast('331', 'SKU001', '2026-01-01', 5.0, 0, 0, 0.9),
+            DemandForecast('331', 'SKU001', '2026-01-02', 15.0, 0, 0, 0.9),
+        ]
+
+    def test_shortage_fills_demand_before_safety_stock(self, optimizer, forecasts):
+        """Test scarce stock covers forecast demand first, cheapest stores first"""
+        result = optimizer.optimize_inventory_allocation({}, forecasts, {'SKU001': 30}, {'417': 5.0, '331': 1.0})
+
+        assert result['inventory_allocation'] == {('331', 'SKU001'): 20.0, ('417', 'SKU001'): 10.0}
+        assert result['shortages'] == {'SKU001': 10.0}
+        assert result['fill_rate'] == pytest.approx(0.75)
+        assert result['total_cost'] == pytest.approx(20 * 1.0 + 10 * 5.0)
+
+        more = optimizer.optimize_inventory_allocation({}, forecasts, {'SKU001': 45}, {'417': 5.0, '331': 1.0})
+        assert more['inventory_allocation'] == {('331', 'SKU001'): 25.0, ('417', 'SKU001'): 20.0}
+        assert more['shortages'] == {}
+
+    def test_demand_tier_covers_lead_time_not_horizon(self, optimizer):
+        """Test a 14-day forecast only claims lead-time demand, so scarce stock reaches every store"""
+        forecasts = [
+            DemandForecast(store, 'SKU001', f'2026-01-{day + 1:02d}', rate, 0, 0, 0.9)
+            for store, rate in (('417', 10.0), ('331', 5.0)) for day in range(14)
+        ]
+        result = optimizer.allocate_inventory_frame(forecasts, {'SKU001': 30}, transport_costs={'417': 1.0, '331': 5.0},
+                                                    lead_time_days=2)
+        positions = result['positions'].set_index('store_id')
+
+        assert positions['demand'].to_dict() == {'331': 10.0, '417': 20.0}
+        assert positions['allocated'].to_dict() == {'331': 10.0, '417': 20.0}
+        assert positions['demand_shortage'].sum() == 0.0
+
+    def test_sku_keyed_inventory_is_rejected(self, optimizer, forecasts):
+        """Test stock keyed by SKU only raises instead of being silently treated as zero"""
+        with pytest.raises(ValueError, match='store_id, sku_id'):
+            optimizer.optimize_inventory_allocation({'SKU001': 5.0}, forecasts, {'SKU001': 30}, {'417': 5.0, '331': 1.0})
+
+        result = optimizer.optimize_inventory_allocation({('417', 'SKU001'): 5.0}, forecasts, {'SKU001': 30},
+                                                         {'417': 5.0, '331': 1.0})
+        assert result['inventory_allocation'] == {('331', 'SKU001'): 20.0, ('417', 'SKU001'): 15.0}
+
+    def test_multi_dc_supply_is_conserved(self, optimizer):
+        """Test shipments never exceed DC stock and go to the cheapest DC"""
+        rng = np.random.default_rng(3)
+        forecasts = [
+            DemandForecast(f'S{store}', f'SKU{sku}', f'2026-01-0{day + 1}', float(rng.integers(1, 20)), 0, 0, 0.9)
+            for store in range(8) for sku in range(3) for day in range(3)
+        ]
+        dc_stock = {('DC1', 'SKU0'): 40, ('DC2', 'SKU0'): 40, ('DC1', 'SKU1'): 500, ('DC2', 'SKU2'): 10}
+        costs = {(dc, f'S{store}'): (1.0 + store if dc == 'DC1' else 9.0 - store) for dc in ('DC1', 'DC2') for store in range(8)}
+
+        result = optimizer.allocate_inventory_frame(forecasts, dc_stock, {('S0', 'SKU1'): 5.0}, costs)
+        shipments, positions = result['shipments'], result['positions']
+
+        shipped = shipments.groupby(['dc_id', 'sku_id'])['quantity'].sum()
+        for key, qty in dc_stock.items():
+            assert shipped.get(key, 0.0) <= qty
+        need = (positions['need_demand'] + positions['need_safety']).groupby(positions['sku_id']).sum()
+        supply = {'SKU0': 80, 'SKU1': 500, 'SKU2': 10}
+        assert shipped.sum() == pytest.approx(sum(min(supply[sku], need[sku]) for sku in supply))
+        assert (positions['allocated'] <= positions['need_demand'] + positions['need_safety']).all()
+        assert positions.loc[positions['sku_id'] == 'SKU1', 'demand_shortage'].sum() == 0
+        assert positions.loc[positions['store_id'] == 'S0', 'current'].sum() == 5.0
+
+    def test_greedy_fallback_matches_single_dc_optimum(self, optimizer, forecasts):
+        """Test greedy fallback gives the same single-DC allocation as the flow solver"""
+        positions = optimizer._allocation_needs(forecasts, None, None, 2)
+        supply = optimizer._dc_supply({'SKU001': 30})
+
+        _, greedy = optimizer._greedy_allocation(positions, supply, {'417': 5.0, '331': 1.0})
+        assert dict(zip(greedy['store_id'], greedy['quantity'])) == {'331': 20.0, '417': 10.0}
+
+if __name__ == "__main__":
+    pytest.main([__file__])
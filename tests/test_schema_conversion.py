@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for vectorized schema conversion
+"""
+
+import pickle
+import pytest
+import dataclasses
+import tracemalloc
+import pandas as pd
+import numpy as np
+from datetime import date, datetime
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.data_schema import (
+    OrderDetailSchema, FulfillmentDetailSchema, OrderItem, OrderDetail, StoreLocation,
+    parse_fulfillment_frame, order_columns, orders_from_frame, fulfillments_from_frame
+)
+from src.modules.data.implementations.dfi_data_loader import DFIDataLoader
+
+class TestSchemaConversion:
+
+    @pytest.fixture
+    def orders_df(self):
+        """Order rows including one unparsable date"""
+        return pd.DataFrame({
+            'dt': ['2025-01-01', 'bad-date', '2025-01-03', '2025-01-02'],
+            'order_id': ['O1', 'O2', 'O3', 'O4'],
+            'user_id': ['U1', 'U2', 'U3', 'U4'],
+            'fulfillment_store_code': [417, 331, 417, 213],
+            'unique_sku_cnt': [1, 2, 3, 4],
+            'total_quantity_cnt': [2.0, 4.0, np.nan, 1.5],
+        })
+
+    def test_orders_match_row_parser(self, orders_df):
+        """Test batch conversion equals from_csv_row and skips unparsable rows"""
+        expected = []
+        for record in orders_df.to_dict('records'):
+            try:
+                expected.append(OrderDetailSchema.from_csv_row(record))
+            except Exception:
+                continue
+        orders = orders_from_frame(orders_df)
+
+        assert len(orders) == 3
+        assert [orders[0], orders[2]] == [expected[0], expected[2]]
+        assert np.isnan(orders[1].total_quantity_cnt) and orders[1].order_id == expected[1].order_id == 'O3'
+        assert type(orders[0].dt) is date and type(orders[0].fulfillment_store_code) is int
+
+        columns = order_columns(orders_df)
+        assert columns['fulfillment_store_code'].tolist() == [417, 417, 213]
+        assert columns['dt'].dtype == np.dtype('datetime64[D]')
+
+    def test_fulfillments_match_record_parser(self):
+        """Test batch conversion equals from_parsed_record with None for missing times"""
+        parsed = parse_fulfillment_frame(pd.DataFrame({
+            'order_id': ['A', 'B'],
+            'order_create_time': ['2025-01-01 09:00:00', '2025/01/02 10:00'],
+            'completed_time': ['2025-01-01 12:00:00', ''],
+        }))
+        records = fulfillments_from_frame(parsed)
+
+        assert records == [FulfillmentDetailSchema.from_parsed_record(r) for r in parsed.to_dict('records')]
+        assert records[1].order_create_time == datetime(2025, 1, 2, 10, 0)
+        assert records[1].completed_time is None and records[0].ready_time is None
+
+    def test_loader_column_view(self, tmp_path, orders_df):
+        """Test column view agrees with loaded objects"""
+        orders_df.to_csv(tmp_path / 'case_study_order_detail-000000000000.csv', index=False)
+        loader = DFIDataLoader(str(tmp_path), use_columnar_cache=False)
+
+        columns = loader.load_order_columns(start_date=date(2025, 1, 2))
+        orders = loader.load_orders(start_date=date(2025, 1, 2))
+
+        assert columns['order_id'].tolist() == [o.order_id for o in orders] == ['O3', 'O4']
+        assert columns['dt'].astype(str).tolist() == [o.dt.isoformat() for o in orders]
+
+
+class TestSlottedSchemas:
+
+    def test_slots_frozen_and_pickle(self):
+        """Test slotted instances have no __dict__, frozen ones reject writes, both pickle"""
+        item = OrderItem(sku_id='SKU001', sku_name='Tissue', quantity=2)
+        order = OrderDetail('O1', 'U1', '417', date(2025, 1, 1), [item], 2, 1)
+
+        assert not hasattr(item, '__dict__') and not hasattr(order, '__dict__')
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            item.quantity = 3
+        order.priority = 2
+        assert pickle.loads(pickle.dumps(order)) == order
+        assert pickle.loads(pickle.dumps(item)) == item
+        assert order.to_dict()['items'] == [{'sku_id': 'SKU001', 'sku_name': 'Tissue', 'quantity': 2, 'unit_price': None}]
+
+    def test_codes_interned(self):
+        """Test repeated store and sku strings share one object"""
+        a = StoreLocation(''.join(['4', '17']), 22.3, 114.1, 'Sha Tin', 'A', 'success')
+        b = StoreLocation(str(417), 22.3, 114.1, 'Sha Tin', 'B', 'success')
+        assert a.store_code is b.store_code
+
+        orders = orders_from_frame(pd.DataFrame({
+            'dt': ['2025-01-01', '2025-01-02'] * 2, 'order_id': ['O1', 'O2', 'O3', 'O4'],
+            'user_id': [f'U{i % 2}' for i in range(4)], 'fulfillment_store_code': [417] * 4,
+            'unique_sku_cnt': [1] * 4, 'total_quantity_cnt': [1.0] * 4,
+        }))
+        assert orders[0].dt is orders[2].dt
+        assert orders[0].user_id is orders[2].user_id
+
+    def test_instances_smaller_than_plain_dataclass(self):
+        """Test a slotted schema holds less memory per instance than a dict-backed one"""
+        plain = dataclasses.make_dataclass('PlainOrderItem', [(f.name, f.type, f) for f in dataclasses.fields(OrderItem)])
+
+        def traced(cls):
+            tracemalloc.start()
+            items = [cls('SKU001', 'Tissue', i) for i in range(20000)]
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return size / len(items)
+
+        assert traced(OrderItem) < 0.8 * traced(plain)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for Streaming SLA Monitor
+"""
+
+import pytest
+from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+
+# Add src to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from modules.forecasting.sla_monitor import RingBuffer, StreamingSLAMonitor
+
+class TestStreamingSLAMonitor:
+
+    @pytest.fixture
+    def now(self):
+        return datetime(2026, 3, 2, 18, 0)
+
+    @pytest.fixture
+    def monitor(self, now):
+        """Create monitor with a 4-hour SLA and five orders across two stores"""
+        monitor = StreamingSLAMonitor(sla_target_hours=4, window_hours=24, percentile_buffer=4)
+        for i, (store, hours_ago) in enumerate([('417', 1), ('417', 3), ('417', 6), ('331', 2), ('331', 8)]):
+            order_time = now - timedelta(hours=hours_ago)
+            monitor.record_order(f'O{i}', store, order_time, order_time + timedelta(hours=4))
+        return monitor
+
+    def test_active_order_metrics(self, monitor, now):
+        """Test pending orders older than the SLA target count as delayed"""
+        metrics = monitor.get_active_order_metrics(now)
+
+        assert metrics['total_active_orders'] == 5
+        assert metrics['417_sla_rate'] == pytest.approx(2 / 3)
+        assert metrics['331_sla_rate'] == pytest.approx(0.5)
+        assert metrics['overall_sla_rate'] == pytest.approx(3 / 5)
+        assert metrics['417_avg_time'] == pytest.approx((1 + 3 + 6) / 3)
+
+    def test_duplicate_orders_ignored(self, monitor, now):
+        """Test re-sending a known order id does not double count"""
+        assert not monitor.record_order('O0', '417', now)
+        assert monitor.get_summary()['total_orders'] == 5
+
+    def test_fulfillment_events_update_counters(self, monitor, now):
+        """Test ready and completion events settle SLA outcomes"""
+        monitor.get_active_order_metrics(now)
+        monitor.record_completion('O2', ready_time=now - timedelta(hours=1))
+        monitor.record_completion('O0', ready_time=now)
+        monitor.record_cancellation('O4')
+
+        stats = monitor.get_store_stats('417', now)
+        assert stats['pending_orders'] == 1
+        assert stats['overdue_orders'] == 0
+        assert stats['on_time_orders'] == 1
+        assert stats['late_orders'] == 1
+        assert stats['lead_time_minutes']['p50'] == pytest.approx((60 + 300) / 2)
+
+        summary = monitor.get_summary()
+        assert summary['completed'] == 2
+        assert summary['cancelled'] == 1
+        assert summary['pending'] == 2
+        assert summary['sla_achievement_rate'] == pytest.approx(0.5)
+
+        metrics = monitor.get_active_order_metrics(now)
+        assert metrics['total_active_orders'] == 2
+        assert metrics['overall_sla_rate'] == pytest.approx(1.0)
+
+    def test_hourly_window_evicts_old_hours(self, monitor, now):
+        """Test hourly buckets keep only the rolling window"""
+        hourly = monitor.get_hourly_stats()
+        assert sum(bucket['orders'] for bucket in hourly) == 5
+
+        monitor.record_order('late', '213', now + timedelta(hours=21))
+        hourly = monitor.get_hourly_stats()
+        assert len(hourly) <= 24
+        assert sum(bucket['orders'] for bucket in hourly) == 3
+
+    def test_ring_buffer_keeps_latest_samples(self):
+        """Test percentiles use only the most recent capacity samples"""
+        buffer = RingBuffer(capacity=3)
+        for value in [100, 1, 2, 3]:
+            buffer.append(value)
+
+        assert len(buffer) == 3
+        assert buffer.percentiles((50,)) == {'p50': 2.0}
+        assert RingBuffer().percentiles((90,)) == {'p90': None}
+
+if __name__ == "__main__":
+    pytest.main([__file__])
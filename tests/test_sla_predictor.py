@@ -306,7 +306,24 @@ class TestMLSLAPredictor:
         if mock_orders:
             assert 'overall_sla_rate' in metrics or '417_sla_rate' in metrics
             assert 'total_active_orders' in metrics or 'no_active_orders' in metrics
-    
+
+    def test_real_time_monitoring_only_counts_passed_orders(self, predictor):
+        """Test monitoring keeps no state between calls"""
+        def make_order(store_code, hours_ago):
+            order = Mock(spec=['fulfillment_store_code', 'order_create_time'])
+            order.fulfillment_store_code = store_code
+            order.order_create_time = datetime.now() - timedelta(hours=hours_ago)
+            return order
+
+        first = predictor.monitor_real_time_sla_performance([make_order('417', 1), make_order('417', 30)])
+        assert first['total_active_orders'] == 2
+        assert first['417_sla_rate'] == 0.5
+
+        second = predictor.monitor_real_time_sla_performance([make_order('331', 2)])
+        assert second['total_active_orders'] == 1
+        assert '417_sla_rate' not in second
+        assert predictor.monitor_real_time_sla_performance([]) == {'no_active_orders': 1.0}
+
     def test_sla_alerts_generation(self, predictor):
         """Test SLA alerts generation"""
         # Create mock forecasts
@@ -422,6 +439,98 @@ class TestMLSLAPredictor:
         assert new_predictor.is_trained
         assert new_predictor.feature_columns == ['weekday', 'is_weekend']
     
+    def test_batch_prediction_matches_single(self, predictor, sample_training_data):
+        """Test batch inference matches per-store predictions with one transform and predict"""
+        predictor.train(sample_training_data)
+        stores = ['417', '331', '999']
+        dates = [date(2026, 1, 1) + timedelta(days=i) for i in range(5)]
+        
+        singles = [predictor.predict_sla_performance(s, d) for s in stores for d in dates]
+        predictor.prediction_cache.clear()
+        with patch.object(predictor.scaler, 'transform', wraps=predictor.scaler.transform) as transform, \
+             patch.object(predictor.model, 'predict', wraps=predictor.model.predict) as model_predict:
+            batch = predictor.predict_sla_batch(stores, dates)
+        
+        assert transform.call_count == 1
+        assert model_predict.call_count == 1
+        assert [(f.store_code, f.forecast_date) for f in batch] == [(f.store_code, f.forecast_date) for f in singles]
+        for batch_forecast, single_forecast in zip(batch, singles):
+            assert batch_forecast.predicted_sla_rate == pytest.approx(single_forecast.predicted_sla_rate)
+            assert batch_forecast.confidence_interval == pytest.approx(single_forecast.confidence_interval)
+    
+    def test_predictions_are_deterministic(self, predictor):
+        """Test identical requests give identical results across predictor instances"""
+        forecast_date = date(2026, 2, 14)
+        first = predictor.predict_sla_performance('417', forecast_date)
+        second = MLSLAPredictor().predict_sla_performance('417', forecast_date)
+        
+        assert first.predicted_sla_rate == second.predicted_sla_rate
+        assert first.risk_factors == second.risk_factors
+        assert MLSLAPredictor(seed=7).identify_risk_factors('417', forecast_date) == \
+            MLSLAPredictor(seed=7).identify_risk_factors('417', forecast_date)
+    
+    def test_per_call_seed(self, predictor):
+        """Test a per-call seed or Generator drives the simulated factors and has its own cache entries"""
+        forecast_date = date(2026, 3, 2)
+        default = predictor.predict_sla_performance('331', forecast_date)
+        seeded = predictor.predict_sla_performance('331', forecast_date, seed=123)
+        reference = MLSLAPredictor(seed=123).predict_sla_performance('331', forecast_date)
+        
+        assert (seeded.predicted_sla_rate, seeded.risk_factors) == (reference.predicted_sla_rate, reference.risk_factors)
+        assert predictor.predict_sla_performance('331', forecast_date).predicted_sla_rate == default.predicted_sla_rate
+        assert predictor.prediction_cache.get_stats()['entries'] == 2
+        assert predictor.predict_sla_batch(['331'], [forecast_date], seed=np.random.default_rng(9))[0] == \
+            predictor.predict_sla_batch(['331'], [forecast_date], seed=np.random.default_rng(9))[0]
+    
+    def test_prediction_cache_hits_and_invalidation(self, predictor, sample_training_data):
+        """Test repeated batch requests are served from cache until the model changes"""
+        predictor.train(sample_training_data)
+        dates = [date(2026, 1, 1) + timedelta(days=i) for i in range(3)]
+        first = predictor.predict_sla_batch(['417', '331'], dates)
+        
+        with patch.object(predictor.model, 'predict', wraps=predictor.model.predict) as model_predict:
+            second = predictor.predict_sla_batch(['417', '331'], dates)
+        
+        assert model_predict.call_count == 0
+        assert [f.predicted_sla_rate for f in first] == [f.predicted_sla_rate for f in second]
+        assert predictor.get_model_info()['prediction_cache']['hits'] == 6
+        
+        version = predictor.model_version
+        predictor.train(sample_training_data)
+        assert predictor.model_version == version + 1
+        assert predictor.prediction_cache.get_stats()['entries'] == 0
+    
+    def test_risk_grid_matches_single_row_assessment(self, predictor):
+        """Test whole-grid risk assessment equals one-row identify_risk_factors calls"""
+        stores = ['417', '331', '213', '418', '419', '999']
+        dates = [date(2026, 6, 25) + timedelta(days=i) for i in range(10)]
+        frame = predictor.assess_risk_frame(stores, dates)
+
+        assert len(frame) == len(stores) * len(dates)
+        expected = [predictor.identify_risk_factors(s, d) for s in stores for d in dates]
+        assert predictor.risk_engine.to_risk_factors(frame) == expected
+
+    def test_alert_frame_top_k(self, predictor, sample_training_data):
+        """Test network-wide alert frame keeps the most severe alerts"""
+        predictor.train(sample_training_data)
+        stores = [str(code) for code in range(400, 440)]
+        dates = [date(2026, 1, 1) + timedelta(days=i) for i in range(3)]
+
+        full = predictor.generate_sla_alert_frame(stores, dates, threshold=0.99)
+        top = predictor.generate_sla_alert_frame(stores, dates, threshold=0.99, top_k=5)
+
+        assert len(full) > 5
+        assert len(top) == 5
+        expected = full.sort_values(['severity_rank', 'priority'], ascending=False).head(5)
+        assert top['priority'].tolist() == expected['priority'].tolist()
+
+        forecasts = predictor.predict_sla_batch(stores, dates)
+        alerts = predictor.generate_sla_alerts(forecasts, threshold=0.99)
+        assert [(a['store_code'], a['forecast_date'], a['alert_type']) for a in alerts] == list(
+            zip(full['store_code'], full['forecast_date'], full['alert_type'])
+        )
+        assert len(predictor.generate_sla_alerts(forecasts, threshold=0.99, top_k=5)) == 5
+
     def test_prediction_without_training(self, predictor):
         """Test prediction methods work without trained model"""
         store_code = '417'